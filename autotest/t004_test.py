@@ -558,6 +558,45 @@ def test_mflist():
     assert flx1.sum() == flx2.sum()
 
 
+def test_mflist_cell_indices():
+    ml = flopy.modflow.Modflow(model_ws=out_dir)
+    dis = flopy.modflow.ModflowDis(ml, 3, 4, 5, 3)
+    sp_data = {0: [[1, 1, 1, 1.0, 10.], [1, 1, 1, 3.0, 20.],
+                   [0, 3, 4, 2.0, 30.]],
+               1: [[1, 1, 1, 1.0, 40.], [1, 1, 1, 2.0, 50.],
+                   [0, 3, 4, 5.0, 60.]]}
+    dtype = np.dtype([('k', np.int), ('i', np.int), ('j', np.int),
+                      ('stage', np.float32), ('cond', np.float32)])
+    ghb = flopy.modflow.ModflowGhb(ml, stress_period_data=sp_data,
+                                   dtype=dtype)
+    spd = ghb.stress_period_data
+
+    unique, inverse, counts = spd.get_cell_indices(0)
+    assert np.array_equal(unique, [19, 26])
+    assert np.array_equal(inverse, [1, 1, 0])
+    assert np.array_equal(counts, [1, 2])
+    # stress periods with the same cells share the cached result
+    unique1, inverse1, counts1 = spd.get_cell_indices(1)
+    assert unique1 is unique and inverse1 is inverse
+    # later stress periods reuse the last entry
+    assert spd.get_cell_indices(2)[0] is unique
+
+    # stages are averaged and conductances are added
+    arrays = spd.to_array(0)
+    assert arrays['stage'][1, 1, 1] == 2.
+    assert arrays['stage'][0, 3, 4] == 2.
+    assert arrays['cond'][1, 1, 1] == 30.
+    assert arrays['cond'].sum() == 60.
+    arrays = spd.to_array(1, mask=True)
+    assert np.isnan(arrays['stage']).sum() == 58
+    assert arrays['cond'][1, 1, 1] == 90.
+
+    # changes to the cells are picked up
+    spd[1] = [[2, 0, 0, 1.0, 1.]]
+    assert np.array_equal(spd.get_cell_indices(1)[0], [40])
+    assert spd.to_array(1)['cond'][2, 0, 0] == 1.
+
+
 def test_how():
     import numpy as np
     import flopy
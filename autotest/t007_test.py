@@ -141,6 +141,30 @@ def test_export_output():
     assert np.array_equal(ibound_mask, arr_mask)
 
 
+def test_align_output_times():
+    import os
+    import numpy as np
+    import flopy
+    from flopy.export.utils import align_output_times
+
+    pth = os.path.join("..", "examples", "data", "mf2005_test")
+    cbc = flopy.utils.CellBudgetFile(os.path.join(pth, "test1tr.gitcbc"))
+    cbc2 = flopy.utils.CellBudgetFile(os.path.join(pth, "test1tr.gitcbc"))
+    totim = np.unique(cbc.recordarray["totim"])
+    # shift and drop times in the second file
+    cbc2.recordarray["totim"] += 1.0e-8
+    cbc2.recordarray = cbc2.recordarray[cbc2.recordarray["totim"] >
+                                        totim[4]]
+    oudic = {"a.cbc": cbc, "b.cbc": cbc2}
+    times, skipped, index_map = align_output_times(oudic, stride=2)
+    assert np.allclose(times, np.round(totim[5::2], 6))
+    assert np.allclose(skipped, np.round(totim[:5], 6))
+    assert np.array_equal(index_map["a.cbc"], totim[5::2])
+    assert np.array_equal(index_map["b.cbc"],
+                          np.unique(cbc2.recordarray["totim"])[::2])
+    return
+
+
 def test_mbase_sr():
     import numpy as np
     import flopy
@@ -298,6 +322,135 @@ def test_sr():
     assert ms1.sr == ms.sr
 
 
+def test_sr_vertex_connectivity():
+    import numpy as np
+    from flopy.utils.reference import SpatialReference
+    delr = np.array([10., 20., 15., 5.])
+    delc = np.array([5., 10., 20.])
+    sr = SpatialReference(delr=delr, delc=delc, xul=100., yul=200.,
+                          rotation=30.)
+    nlay, nrow, ncol = 2, 3, 4
+
+    verts, iverts = sr.get_2d_vertex_connectivity()
+    assert iverts[0] == [0, 1, 6, 5]
+    verts, iverts2 = sr.get_2d_vertex_connectivity(as_array=True)
+    assert iverts2.shape == (nrow * ncol, 4)
+    assert np.array_equal(np.array(iverts), iverts2)
+
+    # bilinear interpolation reproduces a linear field at interior vertices
+    z = 2. * sr.xcentergrid - 3. * sr.ycentergrid
+    zv = sr.interpolate_to_vertices(np.array([z, z + 1.]))
+    assert zv.shape == (2, nrow + 1, ncol + 1)
+    zt = 2. * sr.xgrid - 3. * sr.ygrid
+    assert np.allclose(zv[0, 1:-1, 1:-1], zt[1:-1, 1:-1])
+    assert np.allclose(zv[1] - zv[0], 1.)
+
+    botm = np.array([np.zeros((nrow, ncol)) - k for k in range(nlay + 1)])
+    ibound = np.ones((nlay, nrow, ncol), dtype=np.int)
+    ibound[0] = 0
+    ibound[1, 0, 0] = 0
+    verts, iverts = sr.get_3d_vertex_connectivity(nlay, botm, ibound=ibound,
+                                                  as_array=True)
+    assert iverts.shape == (nrow * ncol - 1, 8)
+    assert verts.shape == (8 * (nrow * ncol - 1), 3)
+    assert np.allclose(verts[iverts[:, :4], 2], -2.)
+    assert np.allclose(verts[iverts[:, 4:], 2], -1.)
+
+    verts, iverts = sr.get_3d_shared_vertex_connectivity(nlay, botm,
+                                                         ibound=ibound,
+                                                         as_array=True)
+    assert verts.shape == ((nlay + 1) * (nrow + 1) * (ncol + 1), 3)
+    vc, ivc = sr.get_3d_shared_vertex_connectivity(nlay, botm,
+                                                   ibound=ibound,
+                                                   compact=True)
+    assert vc.shape == (2 * ((nrow + 1) * (ncol + 1) - 1), 3)
+    assert np.allclose(vc[np.array(ivc)], verts[iverts])
+    return
+
+
+def test_sr_get_rc_interpolate():
+    import numpy as np
+    from flopy.utils.reference import SpatialReference
+    delr = np.array([10., 20., 15., 5.])
+    delc = np.array([5., 10., 20.])
+    sr = SpatialReference(delr=delr, delc=delc, xll=100., yll=200.,
+                          rotation=30.)
+
+    # cell centers and points just inside the cell corners
+    r, c = sr.get_rc(sr.xcentergrid.ravel(), sr.ycentergrid.ravel())
+    assert np.array_equal(r, np.repeat(np.arange(3), 4))
+    assert np.array_equal(c, np.tile(np.arange(4), 3))
+    xv, yv = sr.transform(np.array([10.01, 29.99, 1000.]),
+                          np.array([34.99, 20.01, 10.]))
+    r, c = sr.get_rc(xv, yv)
+    assert list(r) == [0, 1, 2] and list(c) == [1, 1, 3]
+    r, c = sr.get_rc(xv, yv, clip=False)
+    assert list(r) == [0, 1, -1] and list(c) == [1, 1, -1]
+    r, c = sr.get_rc(xv[0], yv[0])
+    assert (r, c) == (0, 1)
+
+    # interpolation operators are cached and reused
+    try:
+        import scipy
+    except:
+        return
+    a = 2. * sr.xcentergrid + 3. * sr.ycentergrid
+    xi = np.column_stack((sr.xcentergrid.ravel(), sr.ycentergrid.ravel()))
+    b = sr.interpolate(a, xi, method='linear')
+    assert np.allclose(b, a.ravel())
+    ncache = len(sr._interp_cache)
+    b = sr.interpolate(a + 1., xi, method='linear')
+    assert np.allclose(b, a.ravel() + 1.)
+    assert len(sr._interp_cache) == ncache
+    b = sr.interpolate(a, (sr.xgrid, sr.ygrid), method='linear')
+    assert b.shape == sr.xgrid.shape
+    assert np.allclose(b[1:-1, 1:-1], 2. * sr.xgrid[1:-1, 1:-1] +
+                       3. * sr.ygrid[1:-1, 1:-1])
+    sr.delr = delr * 2.
+    assert len(sr._interp_cache) == 0
+    return
+
+
+def test_sr_geometry_cache():
+    import numpy as np
+    from flopy.utils.reference import SpatialReference
+    sr = SpatialReference(delr=np.array([10., 20., 15., 5.]),
+                          delc=np.array([5., 10., 20.]), xul=100., yul=200.,
+                          rotation=30.)
+    polygons = sr.cell_polygons
+    assert polygons.shape == (12, 5, 2)
+    assert np.allclose(polygons[6], sr.get_vertices(1, 2))
+    assert sr.vertices[6] == polygons[6].tolist()
+    assert np.allclose(sr.cell_bounds[6], [polygons[6, :, 0].min(),
+                                           polygons[6, :, 1].min(),
+                                           polygons[6, :, 0].max(),
+                                           polygons[6, :, 1].max()])
+
+    # repeated access uses the cached geometry
+    info = sr.get_cache_info()
+    for i in range(10):
+        sr.get_vertices(1, 2)
+    info2 = sr.get_cache_info()
+    assert info2['misses'] == info['misses']
+    assert info2['hits'] == info['hits'] + 10
+
+    # setting an unchanged value does not discard the cache
+    sr.rotation = 30.
+    assert 'cell_polygons' in sr.get_cache_info()['cached']
+
+    # changing the origin or rotation only discards real-world geometry
+    sr.xul = 0.
+    cached = sr.get_cache_info()['cached']
+    assert 'xygrid' not in cached and 'xedge' in cached
+    assert np.allclose(sr.get_vertices(0, 0)[0], [0., 200.])
+
+    # changing delr discards everything
+    sr.delr = np.ones(4)
+    assert sr.get_cache_info()['cached'] == []
+    assert sr.cell_polygons.shape == (12, 5, 2)
+    return
+
+
 def test_sr_scaling():
     nlay, nrow, ncol = 1, 10, 5
     delr, delc = 250, 500
@@ -591,6 +744,192 @@ def test_sr_with_Map():
     plt.close()
 
 
+def test_cross_section():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+
+    m = flopy.modflow.Modflow()
+    top = np.arange(12, dtype=np.float).reshape(3, 4) + 10.
+    botm = np.array([5., 4., 0.]).reshape(3, 1, 1) * np.ones((3, 4))
+    dis = flopy.modflow.ModflowDis(m, nlay=2, nrow=3, ncol=4, delr=2.,
+                                   delc=1., top=top, botm=botm,
+                                   laycbd=[1, 0])
+    xs = flopy.plot.ModelCrossSection(model=m, line={'row': 1})
+
+    # elevations of the top, layer 1 bottom, confining bed bottom and
+    # layer 2 bottom on the left and right side of each cell
+    assert xs.zpts.shape == (4, 8)
+    assert np.allclose(xs.zpts[0], np.repeat(top[1], 2))
+    assert np.allclose(xs.xcentergrid[0], [1., 3., 5., 7.], atol=1e-3)
+    assert np.allclose(xs.zcentergrid[:, 0], [9.5, 4.5, 2.])
+
+    verts = xs.get_cell_vertices()
+    assert verts.shape == (3, 4, 4, 2)
+    assert verts is xs.get_cell_vertices()
+    assert np.allclose(verts[0, 1], [[2., 5.], [2., 15.], [4., 15.],
+                                     [4., 5.]], atol=1e-3)
+
+    # one polygon for each cell that is not masked, the confining bed is
+    # not plotted
+    a = np.arange(24, dtype=np.float).reshape(2, 3, 4)
+    a[1, 1, 2] = np.nan
+    pc = xs.plot_array(a)
+    assert isinstance(pc, PolyCollection)
+    assert np.array_equal(pc.get_array(), [4., 5., 6., 7., 16., 17., 19.])
+    assert len(pc.get_paths()) == 7
+
+    # patches that conform to the heads do not change the elevations
+    zpts = xs.zpts.copy()
+    head = np.full((2, 3, 4), 12.)
+    pc = xs.plot_array(a, head=head)
+    assert np.allclose(pc.get_paths()[3].vertices[1], [6., 12.],
+                       atol=1e-3)
+    assert np.array_equal(xs.zpts, zpts)
+    assert np.array_equal(xs.elev[0], top)
+
+    lc = xs.plot_grid()
+    assert len(lc.get_segments()) == 4 * 3 * 4
+    plt.close()
+
+
+def test_plot_array_lod():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.image import AxesImage
+    from flopy.plot.lod import ArrayPyramid
+
+    # block aggregation with partial blocks at the edges
+    a = np.arange(35, dtype=np.float).reshape(5, 7)
+    p = ArrayPyramid(a)
+    assert p.get_level(2).shape == (3, 4)
+    assert np.allclose(p.get_level(2)[0], [4., 6., 8., 9.5])
+    assert np.allclose(p.get_level(2)[2], [28.5, 30.5, 32.5, 34.])
+    assert p.get_level(2) is p.get_level(2)
+    assert np.allclose(ArrayPyramid(a, 'max').get_level(4), [[24., 27.],
+                                                            [31., 34.]])
+    zones = np.array([[1, 1, 2, 2, 3],
+                      [1, 2, 2, 3, 3],
+                      [0, 0, 0, 0, 0]])
+    mode = ArrayPyramid(zones).get_level(2)
+    assert p.method == 'mean' and mode.dtype == zones.dtype
+    assert np.array_equal(mode, [[1, 2, 3], [0, 0, 0]])
+    masked = ArrayPyramid(np.ma.masked_equal(zones, 0)).get_level(2)
+    assert np.array_equal(masked.mask, [[False] * 3, [True] * 3])
+
+    # the array is drawn at about one value per pixel and only the
+    # visible part is drawn again when zooming
+    nrow, ncol = 1000, 1200
+    m = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(m, nlay=1, nrow=nrow, ncol=ncol,
+                                   delr=10., delc=10., rotation=30.)
+    fig = plt.figure(figsize=(4, 4), dpi=50)
+    ax = fig.add_subplot(1, 1, 1, aspect='equal')
+    mm = flopy.plot.ModelMap(model=m, ax=ax)
+    a = np.random.random((nrow, ncol))
+    im = mm.plot_array(a, lod=True)
+    assert isinstance(im, AxesImage)
+    assert mm.sr.rotation == 30.
+    assert im.get_array().shape[0] <= nrow / 4
+    assert np.isclose(im.norm.vmax, a.max())
+    x, y = m.sr.xcentergrid[0, 0], m.sr.ycentergrid[0, 0]
+    ax.set_xlim(x - 10., x + 10.)
+    ax.set_ylim(y - 10., y + 10.)
+    assert im.get_array().shape[0] < 5
+    assert im.get_array()[0, 0] == a[0, 0]
+    # limits that are already set are kept
+    im = mm.plot_array(a, lod=True)
+    assert np.allclose(ax.get_xlim(), (x - 10., x + 10.))
+    assert np.allclose(ax.get_ylim(), (y - 10., y + 10.))
+    assert im.get_array().shape[0] < 5
+    fig.savefig(os.path.join(tpth, 'plot_array_lod.png'))
+    plt.close()
+
+
+class FrameWriter(object):
+    # movie writer that keeps the pixels of each frame
+    def setup(self, fig, outfile, dpi):
+        self.fig = fig
+        self.frames = []
+
+    def grab_frame(self):
+        canvas = self.fig.canvas
+        canvas.draw()
+        w, h = canvas.get_width_height()
+        rgba = np.frombuffer(canvas.buffer_rgba(), dtype=np.uint8)
+        self.frames.append(rgba.reshape(h, w, 4).copy())
+
+    def finish(self):
+        pass
+
+
+def test_model_animation():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.image
+
+    nlay, nrow, ncol = 2, 10, 12
+    m = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(m, nlay=nlay, nrow=nrow, ncol=ncol)
+    times = np.arange(1., 7.)
+    pth = os.path.join(tpth, 'animation.hds')
+    f = open(pth, 'wb')
+    for kper, totim in enumerate(times):
+        for k in range(nlay):
+            header = flopy.utils.BinaryHeader.create(bintype='head',
+                                                     precision='single',
+                                                     text='head', nrow=nrow,
+                                                     ncol=ncol, ilay=k + 1,
+                                                     pertim=totim,
+                                                     totim=totim, kstp=1,
+                                                     kper=kper + 1)
+            a = np.arange(nrow * ncol, dtype=np.float32).reshape(nrow, ncol)
+            a = np.roll(a, kper, axis=1) + k
+            flopy.utils.Util2d.write_bin(a.shape, f, a, header_data=header)
+    f.close()
+    hds = flopy.utils.HeadFile(pth)
+
+    anim = flopy.plot.ModelAnimation(model=m, layer=1, figsize=(3, 3),
+                                     dpi=40, title='{totim:g} days',
+                                     colorbar=True)
+    base = os.path.join(tpth, 'animation', 'serial')
+    filenames = anim.save_frames(hds, base)
+    assert len(filenames) == len(times)
+    assert anim.ax.get_title() == '6 days'
+    assert anim.quadmesh.get_clim() == (1., nrow * ncol)
+
+    # frames that are rendered by other processes are the same
+    anim2 = flopy.plot.ModelAnimation(model=m, layer=1, figsize=(3, 3),
+                                      dpi=40, title='{totim:g} days',
+                                      colorbar=True)
+    base = os.path.join(tpth, 'animation', 'parallel')
+    filenames2 = anim2.save_frames(hds, base, nprocs=2)
+    assert len(filenames2) == len(times)
+    for f1, f2 in zip(filenames, filenames2):
+        assert np.array_equal(matplotlib.image.imread(f1),
+                              matplotlib.image.imread(f2))
+
+    writer = FrameWriter()
+    assert anim.save(hds, 'serial.mp4', writer=writer) == len(times)
+    frames = writer.frames
+    writer = FrameWriter()
+    assert anim2.save(hds, 'parallel.mp4', writer=writer,
+                      nprocs=2) == len(times)
+    for rgba1, rgba2 in zip(frames, writer.frames):
+        assert np.array_equal(rgba1, rgba2)
+    assert not np.array_equal(frames[0], frames[1])
+
+    # frames can be arrays in memory
+    writer = FrameWriter()
+    data = [a for totim, a in hds.iter_data()]
+    anim.save(data, 'arrays.mp4', writer=writer, totims=times)
+    for rgba1, rgba2 in zip(frames, writer.frames):
+        assert np.array_equal(rgba1, rgba2)
+    hds.close()
+
+
 def test_netcdf_classmethods():
     import os
     import flopy
@@ -655,6 +994,347 @@ def test_netcdf_classmethods():
 #     assert f.nc.variables["ibound"][0,0,0] == 1
 
 
+def test_output_store():
+    import os
+    import flopy
+    from flopy.export.outputstore import write_output_store, OutputStore
+
+    # Do not fail if netCDF4 not installed
+    try:
+        import netCDF4
+    except:
+        return
+
+    pth = os.path.join('..', 'examples', 'data', 'mf2005_test')
+    cbc = flopy.utils.CellBudgetFile(os.path.join(pth, 'test1tr.gitcbc'))
+    kstpkper = cbc.get_kstpkper()
+    fnc = os.path.join(npth, "test1tr.cbc.nc")
+    for layout in ('timeseries', 'map'):
+        names = write_output_store(fnc, cbc, layout=layout)
+        assert 'flow_right_face' in names
+        store = OutputStore(fnc)
+        assert store.get_kstpkper() == kstpkper
+        frf = cbc.get_data(text='FLOW RIGHT FACE')
+        ts = store.get_ts('flow_right_face', [(0, 5, 5), (0, 7, 2)])
+        assert ts.shape == (len(kstpkper), 3)
+        assert np.allclose(ts[:, 1], [a[0, 5, 5] for a in frf])
+        assert np.allclose(ts[:, 2], [a[0, 7, 2] for a in frf])
+        a = store.get_data('flow_right_face', kstpkper=kstpkper[10])
+        assert np.allclose(a, frf[10])
+        store.close()
+
+    ucn = flopy.utils.UcnFile(os.path.join('..', 'examples', 'data',
+                                           'mt3d_test', 'mf2kmt3d', 'P07',
+                                           'MT3D001.UCN'))
+    fnc = os.path.join(npth, "P07.ucn.nc")
+    write_output_store(fnc, ucn, chunks=(1, 1, 5, 5), complevel=9)
+    store = OutputStore(fnc)
+    idx = [(k, 7, 10) for k in range(ucn.nlay)]
+    assert np.allclose(store.get_ts('concentration', idx), ucn.get_ts(idx))
+    store.close()
+
+
+def test_netcdf_streaming():
+    import os
+    import flopy
+
+    # Do not fail if netCDF4 not installed
+    try:
+        import netCDF4
+        import pyproj
+    except:
+        return
+
+    ml = flopy.modflow.Modflow(modelname='stream', model_ws=npth)
+    nper = 12
+    dis = flopy.modflow.ModflowDis(ml, nlay=2, nrow=6, ncol=8, nper=nper,
+                                   perlen=1., botm=[-1., -2.])
+    rech = {kper: float(kper + 1) for kper in range(nper)}
+    rch = flopy.modflow.ModflowRch(ml, rech=rech)
+
+    slabs = [np.random.random(ml.dis.botm.shape) for kper in range(nper)]
+    slabs[3][0, 1, 1] = np.NaN
+    for chunks, expected in (('map', [1, 1, 6, 8]),
+                             ({'time': 5, 'y': 3, 'x': 100}, [5, 2, 3, 8])):
+        fnc = os.path.join(npth, "stream.nc")
+        f = flopy.export.NetCdf(fnc, ml, chunks=chunks, complevel=1)
+        var = f.write_slabs('random', {'long_name': 'random'},
+                            (s for s in slabs))
+        assert var.chunking() == expected
+        assert var.filters()['complevel'] == 1
+        data = var[:]
+        assert data.mask[3, 0, 1, 1]
+        data = data.filled(np.NaN)
+        assert np.allclose(data, np.array(slabs), equal_nan=True)
+        assert np.isclose(var.getncattr('max'), np.nanmax(slabs))
+        assert f.var_attr_dict['random']['min'] == var.getncattr('min')
+
+        # transient 2d arrays are streamed to the first layer
+        rch.rech.export(f)
+        a = f.nc.variables['rech'][:]
+        assert np.allclose(a[:, 0, 0, 0], np.arange(1, nper + 1))
+        assert a[:, 1].mask.all()
+
+        # an all-NaN variable is not added to the file
+        writer = f.create_slab_writer('nans', {'long_name': 'nans'},
+                                      skip_all_nan=True)
+        for s in slabs:
+            writer.write(np.NaN * s)
+        writer.close()
+        assert np.isnan(writer.max)
+        assert 'nans' not in f.nc.variables
+        # the times before the first valid value are read as fill values
+        writer = f.create_slab_writer('late', {'long_name': 'late'},
+                                      skip_all_nan=True)
+        for kper, s in enumerate(slabs):
+            if kper < 4:
+                s = np.NaN * s
+            writer.write(s)
+        writer.close()
+        data = f.nc.variables['late'][:]
+        assert data[:4].mask.all()
+        assert np.allclose(data[4:], np.array(slabs[4:]))
+        f.write()
+
+
+def test_netcdf_chunked_arithmetic():
+    import os
+    import flopy
+    from flopy.export.netcdf import iter_chunk_slices
+
+    # Do not fail if netCDF4 not installed
+    try:
+        import netCDF4
+        import pyproj
+    except:
+        return
+
+    ml = flopy.modflow.Modflow(modelname='chunked', model_ws=npth)
+    nper = 6
+    dis = flopy.modflow.ModflowDis(ml, nlay=2, nrow=6, ncol=8, nper=nper,
+                                   perlen=1., botm=[-1., -2.])
+    slabs = [np.random.random(ml.dis.botm.shape) for kper in range(nper)]
+    slabs[2][1, 2, 3] = np.NaN
+    nets = []
+    for name, offset in (('a', 0.), ('b', 1.)):
+        f = flopy.export.NetCdf(os.path.join(npth, 'chunked_{}.nc'.format(
+            name)), ml, chunks={'time': 2, 'y': 3, 'x': 4})
+        f.write_slabs('random', {'long_name': 'random'},
+                      (s + offset for s in slabs))
+        f.write_slabs('same', {'long_name': 'same'}, iter(slabs))
+        nets.append(f)
+    a, b = nets
+
+    # the blocks cover every value once and are aligned with the chunks
+    var = a.nc.variables['random']
+    count = np.zeros(var.shape, dtype=int)
+    for sl in iter_chunk_slices(var, max_memory=4 * 2 * 6 * 4):
+        assert sl[0].start % 2 == 0 and sl[3].start % 4 == 0
+        count[sl] += 1
+    assert np.all(count == 1)
+
+    data = var[:]
+    for nprocs in (1, 2):
+        fnc = os.path.join(npth, 'chunked_sum{}.nc'.format(nprocs))
+        c = a.binary_op(b, 'add', output_filename=fnc, nprocs=nprocs,
+                        max_memory=1000)
+        result = c.nc.variables['random'][:]
+        assert np.allclose(result, 2. * data + 1.)
+        assert result.mask[2, 1, 2, 3]
+        assert c.nc.variables['random'].chunking() == var.chunking()
+        c.write()
+    c = a * 2.
+    assert np.allclose(c.nc.variables['random'][:], 2. * data)
+    c.write()
+    os.remove(c.output_filename)
+
+    b.write()
+    d = a.difference(b.output_filename, nprocs=2, max_memory=1000)
+    diff = d.nc.variables['random']
+    assert np.allclose(diff[:], -1.)
+    assert diff[:].mask[2, 1, 2, 3]
+    assert np.isclose(diff.getncattr('min'), -1.)
+    # variables without differences are skipped
+    assert 'same' not in d.nc.variables
+    d.write()
+
+
+def test_write_ensemble():
+    import os
+    import flopy
+    from flopy.export.ensemble import write_ensemble
+
+    # Do not fail if netCDF4 not installed
+    try:
+        import netCDF4
+        import pyproj
+    except:
+        return
+
+    # make realizations from the freyberg model
+    src = os.path.join('..', 'examples', 'data', 'freyberg')
+    epth = os.path.join(npth, 'ensemble')
+    if os.path.isdir(epth):
+        shutil.rmtree(epth)
+    realizations = []
+    for i in range(4):
+        ws = os.path.join(epth, 'real{}'.format(i))
+        os.makedirs(ws)
+        for fname in os.listdir(src):
+            if fname.startswith('freyberg.') and \
+                    not fname.endswith(('.nam', '.chk')):
+                shutil.copy(os.path.join(src, fname), ws)
+        shutil.copy(os.path.join(src, 'freyberg.nam'),
+                    os.path.join(ws, 'freyberg_{}.nam'.format(i)))
+        if i != 2:
+            shutil.move(os.path.join(ws, 'freyberg.githds'),
+                        os.path.join(ws, 'freyberg.hds'))
+        realizations.append(('freyberg_{}.nam'.format(i), ws))
+
+    fin = os.path.join(epth, 'inputs.nc')
+    fout = os.path.join(epth, 'outputs.nc')
+    stats = write_ensemble(realizations, fin, fout, nprocs=2)
+    # realization 2 does not have a head file
+    assert stats.status.tolist() == ['written', 'written', 'failed',
+                                     'written']
+    assert stats.megabytes[0] > 0.
+
+    shutil.move(os.path.join(epth, 'real2', 'freyberg.githds'),
+                os.path.join(epth, 'real2', 'freyberg.hds'))
+    stats = write_ensemble(realizations, fin, fout, resume=True)
+    assert stats.status.tolist() == ['skipped', 'skipped', 'written',
+                                     'skipped']
+
+    ml = flopy.modflow.Modflow.load('freyberg.nam', model_ws=src,
+                                    check=False)
+    hds = flopy.utils.HeadFile(os.path.join(src, 'freyberg.githds'))
+    nc = netCDF4.Dataset(fout)
+    assert nc.variables['completed'][:].tolist() == [1, 1, 1, 1]
+    assert nc.variables['realization_name'][:].tolist() == ['0', '1', '2',
+                                                            '3']
+    head = nc.variables['head']
+    assert head.chunking() == [1, 1, 1, 40, 20]
+    for i in range(4):
+        h = head[i, 0]
+        assert np.allclose(h[~h.mask], hds.get_data()[~h.mask])
+    nc.close()
+    nc = netCDF4.Dataset(fin)
+    assert np.allclose(nc.variables['hk'][3], ml.lpf.hk.array)
+    assert np.allclose(nc.variables['rech'][2, 0, 0],
+                       ml.rch.rech.array[0, 0])
+    nc.close()
+
+
+def test_write_grid_shapefile_bulk():
+    import numpy as np
+    from flopy.utils.reference import SpatialReference
+    from flopy.export.shapefile_utils import write_grid_shapefile_bulk
+    try:
+        import shapefile
+    except:
+        return
+    sr = SpatialReference(delr=np.array([1., 2., 3.]),
+                          delc=np.array([4., 5., 6., 7.]), xll=10., yll=20.,
+                          rotation=45.)
+    nrow, ncol = sr.nrow, sr.ncol
+    fval = np.arange(nrow * ncol, dtype=np.float).reshape(nrow, ncol) / 3.
+    fval[0, 0] = np.nan
+    ival = np.arange(nrow * ncol).reshape(nrow, ncol)
+    lval = ival % 2 == 0
+    big = 1.0e25 * np.ones((1, nrow, ncol))
+    array_dict = {'fval': fval, 'ival': ival, 'lval': lval,
+                  'big_attribute': big}
+    shpname = os.path.join(spth, 'bulk.shp')
+    write_grid_shapefile_bulk(shpname, sr, array_dict, nan_val=-999.,
+                              chunk_rows=3)
+    shp = shapefile.Reader(shpname)
+    assert shp.numRecords == nrow * ncol
+    names = [f[0] for f in shp.fields[1:]]
+    assert sorted(names) == sorted(['row', 'column', 'fval', 'ival', 'lval',
+                                   'big_attri1'])
+    for shape, rec in zip(shp.shapes(), shp.records()):
+        rec = dict(zip(names, rec))
+        i, j = rec['row'] - 1, rec['column'] - 1
+        assert np.allclose(shape.points, sr.get_vertices(i, j))
+        if i == 0 and j == 0:
+            assert rec['fval'] == -999.
+        else:
+            assert np.allclose(rec['fval'], fval[i, j])
+        assert rec['ival'] == ival[i, j]
+        assert rec['lval'] == lval[i, j]
+        assert np.allclose(rec['big_attri1'], 1.0e25)
+    return
+
+
+def test_sr_unstructured():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+    from flopy.utils.reference import SpatialReferenceUnstructured
+    try:
+        import shapefile
+    except:
+        shapefile = None
+
+    # a counterclockwise triangle, a closed square and a clockwise
+    # triangle, in two layers with the same cells
+    verts = np.array([[0., 0.], [1., 0.], [1., 1.], [0., 1.], [2., 0.],
+                      [2., 1.]])
+    iverts = [[0, 1, 2], [1, 4, 5, 2, 1], [0, 3, 2]]
+    xc = np.array([2., 4.5, 1.]) / 3.
+    yc = np.array([1., 1.5, 2.]) / 3.
+    sr = SpatialReferenceUnstructured(xc, yc, verts, iverts,
+                                      np.array([3, 3]))
+    assert np.array_equal(sr.xcenter, xc)
+    v, nverts = sr.get_cell_vertices(1)
+    assert v.shape == (3, 5, 2)
+    assert np.array_equal(nverts, [3, 4, 3])
+    assert np.array_equal(v[0], verts[[0, 1, 2, 0, 0]])
+    assert np.array_equal(v[1], verts[[1, 4, 5, 2, 1]])
+    # all layers have the same vertices
+    assert v is sr.get_cell_vertices(0)[0]
+
+    a = np.arange(6.)
+    pc = sr.plot_array(a, layer=1)
+    assert isinstance(pc, PolyCollection)
+    assert np.array_equal(pc.get_array(), [3., 4., 5.])
+    assert len(pc.get_paths()) == 3
+    lc = sr.get_grid_line_collection(colors='k')
+    assert len(lc.get_paths()) == 3
+    plt.close()
+
+    if shapefile is not None:
+        shpname = os.path.join(spth, 'unstructured.shp')
+        sr.write_shapefile(shpname, array_dict={'a': a, 'b': [1, 2, 3]})
+        shp = shapefile.Reader(shpname)
+        names = [f[0] for f in shp.fields[1:]]
+        assert names == ['node', 'a_1', 'a_2', 'b']
+        # rings are closed and clockwise
+        shapes = shp.shapes()
+        assert shapes[0].points == [(0., 0.), (1., 1.), (1., 0.), (0., 0.)]
+        assert shapes[2].points == [(0., 0.), (0., 1.), (1., 1.), (0., 0.)]
+        assert shp.records()[1] == [2, 1., 4., 2]
+        sr.write_shapefile(shpname, array_dict={'a': a}, layer=1)
+        shp = shapefile.Reader(shpname)
+        assert [r[:2] for r in shp.records()] == [[4, 3.], [5, 4.], [6, 5.]]
+
+    # the cached vertices are discarded if the cells change, and the cells
+    # in each layer of a grid that is not layered are selected
+    sr.layered = False
+    sr.iverts = iverts + [[0, 1, 5, 3]]
+    sr.ncpl = np.array([3, 1])
+    sr.xc = np.append(xc, 1.)
+    v, nverts = sr.get_cell_vertices(1)
+    assert v.shape == (1, 5, 2)
+    assert np.array_equal(nverts, [4])
+    assert len(sr.get_cell_vertices(0)[0]) == 3
+    pc = sr.plot_array(np.arange(4.), layer=1)
+    assert np.array_equal(pc.get_array(), [3.])
+    plt.close()
+    return
+
+
 def test_shapefile_ibound():
     import os
     import flopy
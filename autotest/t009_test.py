@@ -312,6 +312,18 @@ def test_SfrFile():
         assert df.col16.values[-1] == 5.502E-02
         assert df.shape == (1080, 20)
 
+    # time series from the indexed reader
+    assert sfrout.get_ntimes() == 30
+    ts = sfrout.get_ts([1, 2], [1, 3], column='Qout')
+    assert ts.shape == (30, 2)
+    if sfrout.pd is not None:
+        results = sfrout.get_results(2, 3)
+        assert np.allclose(ts[:, 1], results.Qout.values)
+    ts = sfrout.get_ts(1, 1, column='Qaquifer', kstpkper=[(0, 0)])
+    assert ts[0, 0] == 7.7759E-01
+    ra = sfrout.get_data(idx=29)
+    assert ra.col16[-1] == 5.502E-02
+
 
 def test_sfr_plot():
     #m = flopy.modflow.Modflow.load('test1ss.nam', model_ws=path, verbose=False)
@@ -69,6 +69,51 @@ def test_usg_sms_load():
 
     return
 
+def test_usg_connectivity():
+
+    pthusgtest = os.path.join('..', 'examples', 'data', 'mfusg_test',
+                              '01A_nestedgrid_nognc')
+    m = flopy.modflow.Modflow.load('flow.nam', model_ws=pthusgtest,
+                                   version='mfusg', check=False)
+    con = m.disu.get_connectivity()
+    assert isinstance(con, flopy.utils.Connectivity)
+    assert con.nodes == 121
+    assert con.nja == 601
+    assert np.array_equal(con.iac, m.disu.iac.array)
+    assert np.array_equal(con.get_neighbors(0), [1, 7])
+    n, nb = con.get_neighbors([0, 1])
+    assert np.array_equal(n, [0, 0, 1, 1, 1])
+    assert np.array_equal(nb, [1, 7, 0, 2, 8])
+    assert np.array_equal(con.get_connection([0, 0], [7, 2]),
+                          [2, -1])
+    assert np.array_equal(con.ja[con.isym[con.isym]], con.ja)
+    vol = m.disu.get_cell_volumes()
+    assert np.allclose(vol, con.get_cell_volumes())
+    assert np.allclose(vol[:3], 1.e6)
+
+    # the flow into each cell across its faces is balanced by the constant
+    # head flow
+    cbc = flopy.utils.CellBudgetFile(os.path.join(pthusgtest, 'output',
+                                                  'flow.cbc'))
+    flowja = cbc.get_data(text='FLOW JA FACE')[0]
+    q = flowja.ravel()
+    assert np.array_equal(q[con.isym], -q)
+    n, nb, qf = con.get_face_flows(flowja)
+    assert qf.shape[0] == con.nja - con.nodes
+    net = np.bincount(n, weights=qf, minlength=con.nodes)
+    chd = cbc.get_data(text='CONSTANT HEAD')[0].ravel()
+    assert np.allclose(net, -chd, atol=1e-5)
+    n, nb, qf = con.get_face_flows(flowja, nodes=[0])
+    assert np.array_equal(nb, [1, 7])
+
+    # layer slicing
+    conk = con.get_layer_connectivity(0)
+    assert conk.nja == con.nja
+
+    return
+
+
 if __name__ == '__main__':
     test_usg_disu_load()
     test_usg_sms_load()
+    test_usg_connectivity()
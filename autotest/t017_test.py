@@ -234,8 +234,57 @@ def test_binaryfile_writeread():
     return
 
 
+def test_binaryfile_iter_data():
+    import os
+    import flopy
+    nlay, nrow, ncol = 2, 3, 4
+    times = [1., 2.5, 10.]
+    tpth = os.path.join('temp', 't017')
+    if not os.path.isdir(tpth):
+        os.makedirs(tpth)
+    pth = os.path.join(tpth, 'iter_data.hds')
+    f = open(pth, 'wb')
+    for kper, totim in enumerate(times):
+        for k in range(nlay):
+            header = flopy.utils.BinaryHeader.create(bintype='head',
+                                                     precision='single',
+                                                     text='head', nrow=nrow,
+                                                     ncol=ncol, ilay=k + 1,
+                                                     pertim=totim,
+                                                     totim=totim, kstp=1,
+                                                     kper=kper + 1)
+            a = np.full((nrow, ncol), 10. * kper + k, dtype=np.float32)
+            flopy.utils.Util2d.write_bin(a.shape, f, a, header_data=header)
+    f.close()
+
+    hds = flopy.utils.HeadFile(pth)
+    data = list(hds.iter_data())
+    assert [totim for totim, a in data] == times
+    for totim, a in data:
+        assert np.array_equal(a, hds.get_data(totim=totim))
+    data = list(hds.iter_data(totims=[10.], mflay=1))
+    assert len(data) == 1
+    assert data[0][1].shape == (nrow, ncol)
+    assert np.all(data[0][1] == 21.)
+    try:
+        list(hds.iter_data(totims=[3.]))
+    except Exception:
+        pass
+    else:
+        raise AssertionError('iter_data should fail for a missing time')
+    hds.close()
+
+    # formatted files are read the same way
+    h = flopy.utils.FormattedHeadFile(
+        os.path.join('..', 'examples', 'data', 'mf2005_test',
+                     'test1tr.githds'))
+    for totim, a in h.iter_data(mflay=0):
+        assert np.array_equal(a, h.get_data(totim=totim, mflay=0))
+
+
 if __name__ == '__main__':
     test_binaryfile_writeread()
+    test_binaryfile_iter_data()
     test_formattedfile_read()
     test_binaryfile_read()
     test_cellbudgetfile_read()
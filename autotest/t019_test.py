@@ -129,6 +129,37 @@ def test_hydmodfile_read():
     return
 
 
+def test_hydmodfile_read_subset():
+    pth = os.path.join('..', 'examples', 'data', 'hydmod_test',
+                       'test1tr.hyd.gitbin')
+    h = flopy.utils.HydmodObs(pth)
+    labels = h.get_obsnames()
+    data = h.get_data()
+
+    # compare memory-mapped data to data read into memory
+    hlazy = flopy.utils.HydmodObs(pth, lazy=True)
+    assert isinstance(hlazy.data, np.memmap), 'data are not memory-mapped'
+    assert hlazy.get_ntimes() == h.get_ntimes(), \
+        'memory-mapped data do not have the same number of times'
+    for name in data.dtype.names:
+        assert np.array_equal(hlazy.data[name], data[name]), \
+            'memory-mapped {} data not equal to bulk data'.format(name)
+
+    # load a subset of the observations
+    names = labels[1:3]
+    hsub = flopy.utils.HydmodObs(pth, obsnames=names)
+    assert hsub.get_obsnames() == names, \
+        'subset obsnames are not {}'.format(names)
+    assert hsub.get_times() == h.get_times(), \
+        'subset times not equal to full times'
+    for name in names:
+        ts = hsub.get_data(obsname=name)
+        assert np.array_equal(ts[name], data[name]), \
+            'subset {} data not equal to full data'.format(name)
+
+    return
+
+
 if __name__ == '__main__':
     #test_hydmodfile_read()
     test_hydmodfile_create()
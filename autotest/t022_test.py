@@ -393,6 +393,29 @@ def test_swr_binary_obs(ipos=5):
     return
 
 
+def test_swr_binary_ts_batch():
+    import numpy as np
+
+    for ipos, cls in ((0, flopy.utils.SwrStage), (2, flopy.utils.SwrFlow),
+                      (4, flopy.utils.SwrStructure)):
+        fpth = os.path.join(pth, files[ipos])
+        sobj = cls(fpth)
+        nrec = sobj.get_nrecords()[0]
+        irec = list(range(nrec))
+        for memmap in (False, True):
+            ts = sobj.get_ts_batch(irec=irec, memmap=memmap)
+            assert ts.shape == (sobj.get_ntimes(), nrec), \
+                '{} batch timeseries shape does not equal ' \
+                '({}, {})'.format(cls.__name__, sobj.get_ntimes(), nrec)
+            for i in irec[::6]:
+                ts1 = sobj.get_ts(irec=i)
+                for name in ts1.dtype.names:
+                    assert np.array_equal(ts[name][:, i], ts1[name]), \
+                        '{} batch {} timeseries for reach {} not equal ' \
+                        'to get_ts'.format(cls.__name__, name, i)
+    return
+
+
 if __name__ == '__main__':
     test_swr_binary_obs()
     test_swr_binary_stage()
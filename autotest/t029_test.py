@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import flopy
 
 pthtest = os.path.join('..', 'examples', 'data', 'mfgrd_test')
@@ -35,6 +36,30 @@ def test_mfgrddisv():
     assert len(iverts) == 218, errmsg
 
 
+def test_mfgrdconnectivity():
+    fn = os.path.join(pthtest, 'nwtp3.dis.grb')
+    con = flopy.utils.MfGrdFile(fn).get_connectivity()
+    assert con.nodes == 6400
+    assert con.nja == 31680
+    assert np.array_equal(con.get_neighbors(81), [1, 80, 82, 161])
+    assert np.allclose(con.area, 10000.)
+    assert np.allclose(con.thickness, con.top - con.bot)
+    assert con.ihc.sum() == con.nja - con.nodes
+    a = con.get_matrix()
+    assert a.shape == (6400, 6400)
+    assert np.array_equal(a.sum(axis=1).A.ravel(), con.iac)
+
+    # the older disv files do not have ia and ja
+    fn = os.path.join(pthtest, 'flow.disv.grb')
+    try:
+        flopy.utils.MfGrdFile(fn).get_connectivity()
+    except Exception as e:
+        assert 'does not contain IA and JA' in str(e)
+    else:
+        raise AssertionError('connectivity should fail without IA and JA')
+
+
 if __name__ == '__main__':
     test_mfgrddis()
     test_mfgrddisv()
+    test_mfgrdconnectivity()
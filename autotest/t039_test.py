@@ -3,6 +3,7 @@ Test zonbud utility
 """
 import os
 import numpy as np
+import flopy
 from flopy.utils import CellBudgetFile, ZoneBudget, \
     MfListBudget, read_zbarray, write_zbarray
 
@@ -206,6 +207,56 @@ def test_zonbud_readwrite_zbarray():
     return
 
 
+def test_zonbud_usg():
+    """
+    t039 Compare zonbud for an unstructured model to ZONBUDUSG
+    """
+    pth = os.path.join('..', 'examples', 'data', 'mfusg_test',
+                       '01A_nestedgrid_nognc')
+    m = flopy.modflow.Modflow.load('flow.nam', model_ws=pth,
+                                   version='mfusg', check=False)
+    cbc_f = os.path.join(pth, 'output', 'flow.cbc')
+
+    # the zones in zonbudusg/zbud.zon
+    zon = np.ones(121, dtype=np.int)
+    zon[40:] = 2
+    zb = ZoneBudget(cbc_f, zon, dis=m.disu)
+    bud = zb.get_budget()
+
+    # the flow budgets in zonbudusg/output/zbud.list
+    expected = {'CONSTANT_HEAD_IN': (118.24, 0.),
+                'CONSTANT_HEAD_OUT': (118.24, 0.),
+                'ZONE_1_IN': (0., 65.779),
+                'ZONE_1_OUT': (0., 65.779),
+                'ZONE_2_IN': (65.779, 0.),
+                'ZONE_2_OUT': (65.779, 0.),
+                'TOTAL_IN': (184.02, 65.779),
+                'TOTAL_OUT': (184.02, 65.779)}
+    for name, (z1, z2) in expected.items():
+        rec = bud[bud['name'] == name]
+        assert np.allclose([rec['ZONE_1'][0], rec['ZONE_2'][0]], [z1, z2],
+                           rtol=1e-4), name
+    assert np.allclose(bud['ZONE_1'][bud['name'] == 'IN-OUT'], 0., atol=1e-4)
+    nlay, nodelay = zb.get_model_shape()
+    assert nlay == m.disu.nlay
+    assert zb.nodes == nodelay.sum() == 121
+    assert zb.nrow is None and zb.ncol is None
+
+    # the connectivity can also be passed directly
+    zb2 = ZoneBudget(cbc_f, zon, connectivity=m.disu.get_connectivity())
+    assert np.array_equal(zb2.get_budget(), bud)
+
+    # a zone for each node is needed
+    try:
+        ZoneBudget(cbc_f, zon[1:], dis=m.disu)
+    except AssertionError:
+        pass
+    else:
+        raise AssertionError('ZoneBudget should fail for a zone array '
+                             'that does not have a zone for each node')
+    return
+
+
 if __name__ == '__main__':
     # test_comare2mflist_mlt()
     test_compare2zonebudget()
@@ -215,3 +266,4 @@ if __name__ == '__main__':
     test_zonbud_copy()
     test_zonbud_readwrite_zbarray()
     test_zonbud_get_record_names()
+    test_zonbud_usg()
@@ -213,6 +213,82 @@ def test_pathline_plot():
 
     return
 
+
+def test_pathline_plot_batched():
+    import numpy as np
+    pth = os.path.join('..', 'examples', 'data', 'freyberg')
+    m = flopy.modflow.Modflow.load('freyberg.nam', model_ws=pth,
+                                   check=False)
+    pthfile = os.path.join('..', 'examples', 'data', 'mp6_examples',
+                           'freybergmpp.gitmppth')
+    pthobj = flopy.utils.PathlineFile(pthfile)
+
+    # the pathlines are grouped by particle
+    plines = pthobj.get_alldata()
+    assert len(plines) == pthobj.nid
+    for partid in (0, 17, pthobj.nid - 1):
+        p = pthobj.get_data(partid=partid)
+        assert np.array_equal(plines[partid], p)
+    plines2 = pthobj.get_alldata(totim=1e4, ge=False)
+    assert np.array_equal(plines2[17],
+                          pthobj.get_data(partid=17, totim=1e4, ge=False))
+
+    # the flat pathline data is split into a pathline for each particle
+    mm = flopy.plot.ModelMap(model=m)
+    lc = mm.plot_pathline(plines, layer='all', travel_time='< 5e4')
+    segs = lc.get_segments()
+    lc2 = mm.plot_pathline(pthobj._data, layer='all', travel_time='< 5e4')
+    segs2 = lc2.get_segments()
+    assert len(segs) == len(segs2) == pthobj.nid
+    for s1, s2 in zip(segs, segs2):
+        assert np.allclose(s1, s2)
+    npts = (pthobj._data['time'] < 5e4).sum()
+    assert sum([s.shape[0] for s in segs2]) == npts
+
+    # time and layer selection
+    lc = mm.plot_pathline(pthobj._data, layer=0, travel_time='>= 5e4')
+    idx = (pthobj._data['time'] >= 5e4) & (pthobj._data['k'] == 0)
+    assert sum([s.shape[0] for s in lc.get_segments()]) == idx.sum()
+
+    # decimation keeps the ends of each pathline
+    lc = mm.plot_pathline(pthobj._data, layer='all', decimate=True)
+    segs3 = lc.get_segments()
+    assert len(segs3) == pthobj.nid
+    assert sum([s.shape[0] for s in segs3]) < pthobj._data.shape[0]
+    for s1, s3 in zip(mm.plot_pathline(plines, layer='all').get_segments(),
+                      segs3):
+        assert np.allclose(s1[[0, -1]], s3[[0, -1]])
+    plt.close()
+
+
+def test_pathline_plot_reentry():
+    import numpy as np
+    m = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(m, nlay=2, nrow=1, ncol=10, delr=1.,
+                                   delc=1.)
+    dtype = np.dtype([('particleid', np.int), ('x', np.float),
+                      ('y', np.float), ('time', np.float), ('k', np.int)])
+    # particle 0 goes from layer 0 to layer 1 and back to layer 0
+    kk = [0, 0, 1, 1, 0, 0, 0, 1]
+    ids = [0] * 6 + [1] * 2
+    pl = np.array([(i, float(n), 0.5, float(n), k)
+                   for n, (i, k) in enumerate(zip(ids, kk))],
+                  dtype=dtype).view(np.recarray)
+    mm = flopy.plot.ModelMap(model=m, layer=0)
+    segs = mm.plot_pathline(pl).get_segments()
+    assert len(segs) == 3
+    assert [s.shape[0] for s in segs] == [2, 2, 1]
+    assert np.allclose(segs[0][:, 0], [0., 1.])
+    assert np.allclose(segs[1][:, 0], [4., 5.])
+    segs = mm.plot_pathline([pl[:6], pl[6:]], layer=1).get_segments()
+    assert [s.shape[0] for s in segs] == [2, 1]
+    segs = mm.plot_pathline(pl, layer='all').get_segments()
+    assert [s.shape[0] for s in segs] == [6, 2]
+    plt.close()
+
+
 if __name__ == '__main__':
     test_modpath()
     test_pathline_plot()
+    test_pathline_plot_batched()
+    test_pathline_plot_reentry()
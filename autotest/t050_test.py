@@ -47,6 +47,58 @@ def test_vtkoutput_noibound():
     return
 
 
+def test_vtkoutput_binary():
+    """Make binary and appended raw vtk files and a pvd time series"""
+    import base64
+    nlay = 3
+    nrow = 4
+    ncol = 5
+    ml = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(ml, nlay=nlay, nrow=nrow, ncol=ncol, top=0,
+                                   botm=[-1., -2., -3.])
+    ibound = np.ones((nlay, nrow, ncol), dtype=np.int)
+    ibound[0, 1, 1] = 0
+    bas = flopy.modflow.ModflowBas(ml, ibound=ibound)
+    a = np.arange(nlay * nrow * ncol, dtype=np.float).reshape((nlay, nrow,
+                                                               ncol))
+    ncells = (ibound != 0).sum()
+
+    # inline base64 data
+    fvtkout = os.path.join(cpth, 'test_binary.vtu')
+    vtkfile = Vtk(fvtkout, ml, fmt='binary')
+    vtkfile.add_array('testarray', a)
+    vtkfile.write(shared_vertex=True, ibound_filter=True)
+    lines = open(fvtkout).readlines()
+    idx = [i for i, line in enumerate(lines) if 'Name="testarray"' in line]
+    b = base64.b64decode(lines[idx[0] + 1].strip())
+    assert np.frombuffer(b[:8], dtype='<u8')[0] == ncells * 8
+    assert np.array_equal(np.frombuffer(b[8:], dtype='<f8'),
+                          a[ibound != 0])
+
+    # appended raw data
+    fvtkout = os.path.join(cpth, 'test_appended.vtu')
+    vtkfile = Vtk(fvtkout, ml, fmt='appended')
+    vtkfile.add_array('testarray', a)
+    vtkfile.write(shared_vertex=False, ibound_filter=True)
+    buf = open(fvtkout, 'rb').read()
+    data = buf[buf.index(b'_', buf.index(b'<AppendedData')) + 1:]
+    nbytes = int(np.frombuffer(data[:8], dtype='<u8')[0])
+    assert nbytes == ncells * 8 * 3 * 8
+    verts = np.frombuffer(data[8:8 + nbytes], dtype='<f8').reshape(-1, 3)
+    assert verts[:, 2].min() == -3. and verts[:, 2].max() == 0.
+
+    # time series of arrays sharing the same geometry
+    pvd = vtkfile.write_time_series('head', [a, 2. * a], times=[1., 2.],
+                                    ibound_filter=True)
+    assert os.path.isfile(pvd)
+    assert open(pvd).read().count('<DataSet') == 2
+    for i in range(2):
+        assert os.path.isfile(os.path.join(cpth,
+                                           'test_appended_{:05d}.vtu'.format(i)))
+    return
+
+
 if __name__ == '__main__':
     test_vtkoutput()
     test_vtkoutput_noibound()
+    test_vtkoutput_binary()
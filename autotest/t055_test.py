@@ -0,0 +1,352 @@
+# Test unstructured grid utilities
+import os
+import sys
+import numpy as np
+import flopy
+from flopy.utils.cvfdutil import to_cvfd, iverts_to_array
+from flopy.utils.gridgen import Gridgen
+from flopy.utils.quadtree import Quadtree
+
+tpth = os.path.join('temp', 't055')
+if not os.path.isdir(tpth):
+    os.makedirs(tpth)
+
+
+def square(x0, y0, s):
+    # clockwise vertices of a closed square cell
+    return [(x0, y0 + s), (x0 + s, y0 + s), (x0 + s, y0), (x0, y0),
+            (x0, y0 + s)]
+
+
+def test_to_cvfd():
+    # a 20 by 20 cell to the left of a column of two 10 by 10 cells and a
+    # column of four 5 by 5 cells, so each cell in the first two columns
+    # has one hanging node
+    vertdict = {0: square(0., 0., 20.),
+                1: square(20., 10., 10.),
+                2: square(20., 0., 10.)}
+    for i in range(4):
+        vertdict[3 + i] = square(30., 15. - 5. * i, 5.)
+    verts, iverts = to_cvfd(vertdict)
+    assert len(iverts) == 7
+    assert verts.shape == (15, 2)
+    # vertices are numbered in the order that they are first used
+    assert np.array_equal(verts[:4], [[0., 20.], [20., 20.], [20., 0.],
+                                      [0., 0.]])
+    assert iverts[0] == [0, 1, 6, 2, 3, 0]
+    assert np.array_equal(verts[6], [20., 10.])
+    xy = [tuple(verts[iv]) for iv in iverts[1]]
+    assert xy == [(20., 20.), (30., 20.), (30., 15.), (30., 10.),
+                  (20., 10.), (20., 20.)]
+    assert iverts[3] == [4, 8, 9, 10, 4]
+
+    # the closed cells as an array that is padded with the first vertex
+    ivarr, nverts = iverts_to_array(iverts)
+    assert ivarr.shape == (7, 5)
+    assert np.array_equal(nverts, [5, 5, 5, 4, 4, 4, 4])
+    assert np.array_equal(ivarr[0], [0, 1, 6, 2, 3])
+    assert np.array_equal(ivarr[3], [4, 8, 9, 10, 4])
+    padded = np.where(ivarr[3:] == ivarr[3:, :1], -1, ivarr[3:])
+    padded[:, 0] = ivarr[3:, 0]
+    ivarr2, nverts2 = iverts_to_array(padded)
+    assert np.array_equal(ivarr2, ivarr[3:, :4])
+    assert np.array_equal(nverts2, nverts[3:])
+
+    verts2, iverts2 = to_cvfd(vertdict, skip_hanging_node_check=True)
+    assert np.array_equal(verts, verts2)
+    assert iverts2[0] == [0, 1, 2, 3, 0]
+
+    # vertices that only differ by round-off are the same
+    vertdict[1] = [(x + 1e-12, y) for x, y in vertdict[1]]
+    verts3, iverts3 = to_cvfd(vertdict)
+    assert np.allclose(verts, verts3)
+    assert iverts == iverts3
+
+    # cells from nodestart up to nodestop
+    verts, iverts = to_cvfd(vertdict, nodestart=3, nodestop=7)
+    assert len(iverts) == 4
+    assert verts.shape == (10, 2)
+
+    vertdict[1] = vertdict[1][:-1]
+    try:
+        to_cvfd(vertdict)
+    except Exception as e:
+        assert str(e) == 'Cell 1 not closed'
+    else:
+        raise AssertionError('to_cvfd should fail for a cell that is not '
+                             'closed')
+    return
+
+
+def check_gridprops(gp):
+    # the connections are symmetric and the horizontal face widths add up
+    # to the perimeter of the cells inside of the grid
+    nodes = gp['nodes']
+    n = np.repeat(np.arange(nodes), gp['iac'])
+    m = gp['ja'] - 1
+    assert gp['nja'] == n.shape[0]
+    assert np.array_equal(m[np.cumsum(gp['iac']) - gp['iac']],
+                          np.arange(nodes))
+    pairs = set(zip(n, m))
+    assert all([(b, a) in pairs for a, b in pairs])
+    ihc = gp['ihc'] == 1
+    width = np.bincount(n[ihc], weights=gp['hwva'][ihc], minlength=nodes)
+    return width
+
+
+def test_quadtree():
+    ml = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(ml, nlay=2, nrow=3, ncol=3, delr=10.,
+                                   delc=10., top=10., botm=[5., 0.])
+    q = Quadtree(dis)
+    q.add_refinement_features([(15., 15.)], 'point', 1, [0])
+    q.build()
+    gp = q.get_gridprops()
+    assert q.nodes == 21
+    assert np.array_equal(q.nodelay, [12, 9])
+    assert np.isclose(gp['area'][:12].sum(), 900.)
+    # the center cell is split into four cells that are numbered after the
+    # base cells before it
+    assert np.array_equal(q.get_vertices(4), square(10., 15., 5.))
+    assert q.get_center(4) == (12.5, 17.5)
+    width = check_gridprops(gp)
+    assert np.allclose(width[4:8], 20.)
+    assert np.isclose(width[1], 30.)
+    assert np.allclose(width[[0, 2, 9, 11]], 20.)
+    gp['top'][:] = -1.
+    assert np.allclose(q.get_gridprops()['top'][:12], 10.)
+
+    # node 1 is connected to itself, its neighbors in the first row, the
+    # two cells below it and the cell in the second layer
+    i0 = gp['iac'][0]
+    ja = gp['ja'][i0:i0 + gp['iac'][1]] - 1
+    assert np.array_equal(ja, [1, 0, 2, 4, 5, 13])
+    fldr = gp['fldr'][i0:i0 + gp['iac'][1]]
+    assert np.array_equal(fldr, [0, -1, 1, -2, -2, -3])
+    cl12 = gp['cl12'][i0:i0 + gp['iac'][1]]
+    assert np.allclose(cl12, [0., 5., 5., 5., 5., 2.5])
+    fahl = gp['fahl'][i0:i0 + gp['iac'][1]]
+    assert np.allclose(fahl, [0., 50., 50., 25., 25., 100.])
+
+    # smoothing limits the difference in level between neighbors to one,
+    # also in the layer below
+    q = Quadtree(dis)
+    q.add_refinement_features([(15.2, 15.2)], 'point', 3, [0])
+    q.build()
+    gp = q.get_gridprops()
+    check_gridprops(gp)
+    dx = np.sqrt(gp['area'])
+    n = np.repeat(np.arange(q.nodes), gp['iac'])
+    m = gp['ja'] - 1
+    ratio = dx[n] / dx[m]
+    assert ratio.max() == 2.
+    assert dx.min() == 1.25
+    assert dx[q.nodelay[0]:].min() == 2.5
+    # the overlap of the cells in the two layers is the area of the grid
+    ivc = gp['ivc'] == 1
+    assert np.isclose(gp['fahl'][ivc].sum(), 2 * 900.)
+
+    # lines, polygons and the active domain
+    q = Quadtree(dis, surface_interpolation='interpolate')
+    q.add_active_domain([[[(0., 30.), (20., 30.), (20., 10.), (0., 10.),
+                           (0., 30.)]]], [0, 1])
+    q.add_refinement_features([[[(1., 29.), (19., 29.)]]], 'line', 1, [0, 1])
+    q.add_refinement_features([[[(1., 11.), (4., 11.), (4., 14.), (1., 14.),
+                                 (1., 11.)]]], 'polygon', 2, [0, 1])
+    q.build()
+    gp = q.get_gridprops()
+    check_gridprops(gp)
+    assert np.array_equal(q.nodelay, [16, 16])
+    assert np.isclose(gp['area'][:16].sum(), 400.)
+    assert np.array_equal(q.intersect([(12., 22.)], 'point', 1).nodenumber,
+                          [22])
+
+    # grids for MODFLOW-USG and MODFLOW 6
+    disu = q.get_disu(ml)
+    assert disu.nodes == 32
+    assert disu.njag == gp['nja']
+    con = disu.get_connectivity()
+    assert np.array_equal(con.ihc, gp['ihc'])
+    assert np.allclose(con.get_cell_volumes(), gp['area'] * 5.)
+    assert np.array_equal(con.get_layer(np.array([15, 16])), [0, 1])
+    conk = con.get_layer_connectivity(1)
+    assert conk.nodes == 16
+    assert conk.nja == gp['iac'][16:].sum() - 16
+    assert np.array_equal(conk.ihc, conk.ja != conk.n)
+    fname = os.path.join(tpth, 'quadtree.disv')
+    q.to_disv6(fname)
+    fname = os.path.join(tpth, 'quadtree.disu')
+    q.to_disu6(fname)
+    return
+
+
+def test_quadtree_smoothing():
+    # a point at level 2 in the center of a 3x3 grid splits one quadrant
+    # of the center cell again.  Face smoothing splits the two base cells
+    # next to that quadrant and full smoothing, as in gridgen, also splits
+    # the base cell at its corner.  The center cell of the second layer is
+    # split because it is below the level 2 cells.
+    ml = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(ml, nlay=2, nrow=3, ncol=3, delr=10.,
+                                   delc=10., top=10., botm=[5., 0.])
+    expected = {'full': [24, 12], 'face': [21, 12], 'none': [15, 9]}
+    for smoothing, nodelay in expected.items():
+        q = Quadtree(dis, smoothing=smoothing)
+        assert q.exe_name is None
+        q.add_refinement_features([(15., 15.)], 'point', 2, [0])
+        q.build()
+        assert np.array_equal(q.nodelay, nodelay)
+        gp = q.get_gridprops()
+        check_gridprops(gp)
+        assert np.isclose(gp['area'][:nodelay[0]].sum(), 900.)
+    return
+
+
+def test_quadtree_rotated():
+    ml = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(ml, nlay=1, nrow=20, ncol=30, delr=100.,
+                                   delc=100., xul=1000., yul=5000.,
+                                   rotation=30.)
+    q = Quadtree(dis)
+    x, y = ml.sr.transform(np.array([50., 2950.]), np.array([50., 1950.]))
+    line = [[list(zip(x, y))]]
+    q.add_refinement_features(line, 'line', 3, [0])
+    q.build()
+    gp = q.get_gridprops()
+    check_gridprops(gp)
+    assert np.isclose(gp['area'].sum(), 600 * 100. ** 2)
+    xv, yv = ml.sr.transform(*np.array(q.get_vertices(0)).T, inverse=True)
+    assert np.allclose(xv, [0., 100., 100., 0., 0.])
+    assert np.allclose(yv, [2000., 2000., 1900., 1900., 2000.])
+    return
+
+
+def write_usgdata(fname, a, ncol=10):
+    # write values with ncol values on a line, like gridgen does
+    a = np.asarray(a)
+    with open(fname, 'w') as f:
+        for i in range(0, a.shape[0], ncol):
+            f.write(' '.join([str(v) for v in a[i:i + ncol]]) + '\n')
+    return
+
+
+def write_gridgen_output(q):
+    # write the gridgen output files of a quadtree grid to its model_ws
+    ws = q.model_ws
+    q.export()
+    gp = q.get_gridprops()
+    with open(os.path.join(ws, 'qtg.nod'), 'w') as f:
+        f.write('{} {}\n'.format(gp['nodes'], gp['nlay']))
+    for k in range(gp['nlay']):
+        s = slice(gp['nodelay'][:k].sum(), gp['nodelay'][:k + 1].sum())
+        for name in ['top', 'bot']:
+            fname = os.path.join(ws, 'quadtreegrid.{}{}.dat'.format(name,
+                                                                   k + 1))
+            write_usgdata(fname, gp[name][s])
+    for name, key in [('nodesperlay', 'nodelay'), ('area', 'area'),
+                      ('iac', 'iac'), ('ja', 'ja'), ('fldr', 'fldr'),
+                      ('c1', 'cl12'), ('fahl', 'fahl')]:
+        write_usgdata(os.path.join(ws, 'qtg.{}.dat'.format(name)), gp[key])
+    dfn = os.path.join(ws, 'quadtreegrid.dfn')
+    with open(dfn, 'w') as f:
+        f.write('BEGIN QUADTREE_GRID quadtreegrid\n')
+    return gp
+
+
+def test_gridgen_gridprops():
+    # write the gridgen output for a quadtree grid and read it back
+    ws = os.path.join(tpth, 'gridgen')
+    if not os.path.isdir(ws):
+        os.makedirs(ws)
+    ml = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(ml, nlay=2, nrow=3, ncol=4, delr=10.,
+                                   delc=10., top=10., botm=[5., 0.])
+    q = Quadtree(dis, model_ws=ws)
+    q.add_refinement_features([(15., 15.)], 'point', 2, [0])
+    q.build()
+    gp = write_gridgen_output(q)
+    dfn = os.path.join(ws, 'quadtreegrid.dfn')
+
+    g = Gridgen(dis, model_ws=ws, exe_name=sys.executable)
+    g._mkvertdict()
+    gp2 = g.get_gridprops()
+    for key in gp:
+        if key == 'hwva':
+            assert np.allclose(gp2[key], gp[key]), key
+        else:
+            assert np.array_equal(gp2[key], gp[key]), key
+
+    # the grid properties are read again only if the grid changed
+    cached = g._gridprops
+    gp3 = g.get_gridprops()
+    assert g._gridprops is cached
+    # the returned arrays are copies of the cached arrays
+    gp3['top'][:] = -1.
+    assert np.array_equal(g.get_gridprops()['top'], gp['top'])
+    with open(dfn, 'a') as f:
+        f.write('END QUADTREE_GRID\n')
+    g.get_gridprops()
+    assert g._gridprops is not cached
+
+    disu = g.get_disu(ml)
+    assert disu.nodes == gp['nodes']
+    assert disu.njag == gp['nja']
+    return
+
+
+def test_gridgen_rebuild():
+    # a stand-in for gridgen that copies the output of a quadtree grid
+    ws = os.path.join(tpth, 'gridgen_rebuild')
+    if not os.path.isdir(ws):
+        os.makedirs(ws)
+    exe_name = os.path.abspath(os.path.join(ws, 'gridgen.py'))
+    with open(exe_name, 'w') as f:
+        f.write('#!{}\n'.format(sys.executable))
+        f.write('import os, shutil, sys\n')
+        f.write('if sys.argv[1] == "quadtreebuilder":\n')
+        f.write('    src = os.environ["GRIDGEN_OUTPUT"]\n')
+        f.write('    for fname in os.listdir(src):\n')
+        f.write('        shutil.copy(os.path.join(src, fname), ".")\n')
+    os.chmod(exe_name, 0o755)
+
+    ml = flopy.modflow.Modflow()
+    dis = flopy.modflow.ModflowDis(ml, nlay=2, nrow=3, ncol=4, delr=10.,
+                                   delc=10., top=10., botm=[5., 0.])
+    g = Gridgen(dis, model_ws=ws, exe_name=exe_name)
+    g.add_refinement_features([(15., 15.)], 'point', 1, [0])
+    # elevations that vary are written to files that the dfn names, so
+    # the dfn files do not change when the elevations do
+    botm = np.array([np.full((3, 4), 5.), np.zeros((3, 4))])
+    botm[:, 0, 0] -= 1.
+    bots = []
+    for i in range(2):
+        botm[1] -= i
+        dis.botm = botm
+        out = os.path.join(ws, 'output{}'.format(i))
+        if not os.path.isdir(out):
+            os.makedirs(out)
+        q = Quadtree(dis, model_ws=out)
+        q.add_refinement_features([(15., 15.)], 'point', 1, [0])
+        q.build()
+        write_gridgen_output(q)
+        for fname in ['qtgrid_pt.shp', 'qtg.vtu', 'qtg_sv.vtu']:
+            open(os.path.join(out, fname), 'w').close()
+        os.environ['GRIDGEN_OUTPUT'] = os.path.abspath(out)
+
+        # the dfn files are the same, but the grid is read again
+        g.build()
+        bots.append(g.get_gridprops()['bot'])
+        assert np.allclose(bots[-1], q.get_gridprops()['bot'])
+        disu = g.get_disu(flopy.modflow.Modflow())
+        assert np.isclose(disu.bot[1].array.max(), botm[1].max())
+    assert not np.allclose(bots[0], bots[1])
+    return
+
+
+if __name__ == '__main__':
+    test_to_cvfd()
+    test_quadtree()
+    test_quadtree_smoothing()
+    test_quadtree_rotated()
+    test_gridgen_gridprops()
+    test_gridgen_rebuild()
@@ -0,0 +1,89 @@
+"""
+Test the native grid intersection of point, line, and polygon features
+"""
+import numpy as np
+import flopy
+from flopy.utils.reference import SpatialReference
+from flopy.utils.gridintersect import GridIntersect
+
+
+def get_gridintersect(rotation=0.):
+    delr = np.array([1., 2., 3., 4., 5.])
+    delc = np.array([3., 2., 1., 2.])
+    sr = SpatialReference(delr=delr, delc=delc, xll=100., yll=50.,
+                          rotation=rotation)
+    return sr, GridIntersect(sr)
+
+
+def to_world(sr, xy):
+    xy = np.array(xy, dtype=np.float64)
+    x, y = sr.transform(xy[:, 0], xy[:, 1])
+    return list(zip(x, y))
+
+
+def test_gridintersect_points():
+    sr, ix = get_gridintersect(rotation=30.)
+    pts = to_world(sr, [(0.5, 7.5), (14.9, 0.1), (6.5, 3.5), (-1., 1.)])
+    result = ix.intersect_points(pts)
+    assert result.fid.tolist() == [0, 1, 2]
+    assert result.row.tolist() == [0, 3, 1]
+    assert result.col.tolist() == [0, 4, 3]
+    assert result.nodenumber.tolist() == [0, 19, 8]
+    return
+
+
+def test_gridintersect_lines():
+    sr, ix = get_gridintersect(rotation=30.)
+    line = to_world(sr, [(-1., 7.), (4., 7.), (4., 1.)])
+    result = ix.intersect_lines([line])
+    assert np.allclose(result.length.sum(), 4. + 6.)
+    assert np.allclose(result.starting_distance[1:],
+                       result.ending_distance[:-1])
+    # the pieces on either side of the corner are combined
+    assert list(zip(result.row, result.col)) == [(0, 0), (0, 1), (0, 2),
+                                                 (1, 2), (2, 2), (3, 2)]
+    assert np.allclose(result.length, [1., 2., 3., 2., 1., 1.])
+    return
+
+
+def test_gridintersect_polygons():
+    sr, ix = get_gridintersect(rotation=30.)
+    # a polygon with a hole
+    exterior = [(0.5, 0.5), (14.5, 0.5), (14.5, 7.5), (0.5, 7.5)]
+    hole = [(2., 2.), (2., 4.), (5., 4.), (5., 2.)]
+    result = ix.intersect_polygons([[to_world(sr, exterior),
+                                     to_world(sr, hole)]])
+    assert np.allclose(result.area.sum(), 14. * 7. - 6.)
+    assert np.all(result.area > 0.)
+
+    # a polygon that covers the whole grid
+    cover = [(-10., -10.), (-10., 20.), (30., 20.), (30., -10.)]
+    result = ix.intersect_polygons([to_world(sr, cover)])
+    assert result.shape[0] == sr.nrow * sr.ncol
+    assert np.allclose(result.fraction, 1.)
+
+    # a triangle compared with the exact area in each cell
+    tri = [(0., 0.), (15., 0.), (0., 8.)]
+    result = ix.intersect_polygons([to_world(sr, tri)])
+    assert np.allclose(result.area.sum(), 0.5 * 15. * 8.)
+    area = np.zeros((sr.nrow, sr.ncol))
+    area[result.row, result.col] = result.area
+    # the upper right cell is outside of the triangle
+    assert area[0, 4] == 0.
+    assert np.allclose(area[3, 0], 2.)
+    return
+
+
+def test_gridintersect_query_bbox():
+    sr, ix = get_gridintersect()
+    rows, cols = ix.query_bbox(101.5, 50.5, 104., 52.)
+    assert sorted(set(rows.tolist())) == [3]
+    assert sorted(set(cols.tolist())) == [1, 2]
+    return
+
+
+if __name__ == '__main__':
+    test_gridintersect_points()
+    test_gridintersect_lines()
+    test_gridintersect_polygons()
+    test_gridintersect_query_bbox()
@@ -0,0 +1,77 @@
+"""
+Benchmark the chunking of NetCdf exports for map and time series reads.
+
+A synthetic transient model is exported with the netCDF library default
+chunking and with the 'map' and 'timeseries' chunk layouts. The time
+slabs are streamed from a generator, so only the times in one chunk are
+held in memory while a variable is written. The write time, the file size,
+the time to read maps, and the time to read cell time series are reported
+for each chunking.
+
+usage: python flopy3_netcdf_chunk_benchmark.py [nper] [nrow] [ncol]
+
+"""
+import os
+import sys
+import time
+import numpy as np
+import flopy
+
+nper = 1000
+nlay, nrow, ncol = 3, 100, 100
+if len(sys.argv) > 1:
+    nper = int(sys.argv[1])
+if len(sys.argv) > 3:
+    nrow, ncol = int(sys.argv[2]), int(sys.argv[3])
+
+opth = os.path.join('data', 'netcdf_chunks')
+if not os.path.isdir(opth):
+    os.makedirs(opth)
+
+ml = flopy.modflow.Modflow(modelname='chunks', model_ws=opth)
+dis = flopy.modflow.ModflowDis(ml, nlay=nlay, nrow=nrow, ncol=ncol,
+                               nper=nper, perlen=1., top=0.,
+                               botm=[-10., -20., -30.])
+
+
+def slabs():
+    # one (nlay, nrow, ncol) array for each time is generated at a time
+    rs = np.random.RandomState(0)
+    for kper in range(nper):
+        yield rs.random_sample((nlay, nrow, ncol)).astype(np.float32)
+
+
+nread = 20
+rs = np.random.RandomState(1)
+itimes = rs.randint(0, nper, nread)
+cells = list(zip(rs.randint(0, nlay, nread), rs.randint(0, nrow, nread),
+                 rs.randint(0, ncol, nread)))
+
+print('{} times, {} layers, {} rows, {} columns'.format(nper, nlay, nrow,
+                                                       ncol))
+print('{:>12s} {:>20s} {:>10s} {:>10s} {:>10s} {:>10s}'.format(
+    'chunks', 'chunk shape', 'write (s)', 'size (MB)', 'map (s)', 'ts (s)'))
+for chunks in (None, 'map', 'timeseries'):
+    fnc = os.path.join(opth, 'chunks_{}.nc'.format(chunks))
+    f = flopy.export.NetCdf(fnc, ml, chunks=chunks, verbose=False)
+    t0 = time.time()
+    var = f.write_slabs('random', {'long_name': 'random'}, slabs())
+    shape = var.chunking()
+    f.write()
+    twrite = time.time() - t0
+    size = os.path.getsize(fnc) / 2. ** 20
+
+    import netCDF4
+    nc = netCDF4.Dataset(fnc, 'r')
+    var = nc.variables['random']
+    t0 = time.time()
+    for itime in itimes:
+        a = var[itime, 0]
+    tmap = time.time() - t0
+    t0 = time.time()
+    for k, i, j in cells:
+        a = var[:, k, i, j]
+    tts = time.time() - t0
+    nc.close()
+    print('{:>12s} {:>20s} {:10.3f} {:10.2f} {:10.4f} {:10.4f}'.format(
+        str(chunks), str(shape), twrite, size, tmap, tts))
@@ -5,3 +5,5 @@ from . import utils
 from . import shapefile_utils
 from .netcdf import Logger
 from . import metadata
+from . import outputstore
+from . import ensemble
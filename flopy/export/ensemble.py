@@ -0,0 +1,429 @@
+"""
+Export the inputs and outputs of an ensemble of model realizations to
+NetCDF files with a realization dimension.  Realizations are loaded in
+worker processes and written, one realization at a time, by the calling
+process, so an interrupted export can be resumed.
+
+"""
+from __future__ import print_function, division
+import os
+import time
+import numpy as np
+
+from .netcdf import NetCdf, FILLVALUE, NC_LONG_NAMES
+
+# variable dimensions for each number of array dimensions
+ARRAY_DIMENSIONS = {2: ("y", "x"), 3: ("layer", "y", "x"),
+                    4: ("time", "layer", "y", "x")}
+
+
+def _get_name(namefile):
+    name = os.path.splitext(os.path.basename(namefile))[0]
+    return name.split('_')[-1]
+
+
+def _load_realization(args):
+    """
+    Load the arrays of a realization.  This function is run by the worker
+    processes, so it catches every error and returns the error message.
+
+    """
+    irealization, namefile, model_ws, model_class, load_kwargs, inputs, \
+        outputs = args
+    t0 = time.time()
+    try:
+        if model_class is None:
+            from ..modflow import Modflow
+            model_class = Modflow
+        kwargs = {'check': False, 'verbose': False}
+        kwargs.update(load_kwargs)
+        m = model_class.load(namefile, model_ws=model_ws, **kwargs)
+        input_dict, output_dict, times = None, None, None
+        if inputs:
+            input_dict = {}
+            m.export(input_dict)
+        if outputs:
+            from .utils import output_helper, align_output_times
+            oudic = _get_output_files(m)
+            if len(oudic) == 0:
+                raise Exception('no output files found')
+            times = align_output_times(oudic)[0]
+            output_dict = {}
+            output_helper(output_dict, m, oudic)
+    except Exception as e:
+        return irealization, None, None, None, time.time() - t0, \
+               '{}: {}'.format(type(e).__name__, str(e))
+    return irealization, input_dict, output_dict, times, time.time() - t0, \
+           None
+
+
+def _get_output_files(m):
+    """
+    Open the binary head, drawdown, and budget files of a model that are
+    in the model workspace
+
+    """
+    from ..utils import HeadFile, CellBudgetFile
+    oc = m.get_package('OC')
+    oudic = {}
+    for fname, unit, binflag in zip(m.output_fnames, m.output_units,
+                                    m.output_binflag):
+        fpth = os.path.join(m.model_ws, fname)
+        if not binflag or not os.path.exists(fpth):
+            continue
+        if oc is not None and unit == oc.iuhead:
+            oudic[fname] = HeadFile(fpth, model=m)
+        elif oc is not None and unit == oc.iuddn:
+            oudic[fname] = HeadFile(fpth, text='drawdown', model=m)
+        else:
+            try:
+                oudic[fname] = CellBudgetFile(fpth, model=m)
+            except:
+                continue
+    return oudic
+
+
+def _get_chunksizes(nc, dimensions, chunks):
+    """
+    Get the chunk sizes of a realization-dimensioned variable.  Every
+    chunk holds part of a single realization.
+
+    """
+    shape = [len(nc.dimensions[d]) for d in dimensions]
+    if isinstance(chunks, str):
+        from .outputstore import get_chunk_shape
+        full = dict(zip(("time", "layer", "y", "x"),
+                        [len(nc.dimensions[d]) for d in
+                         ("time", "layer", "y", "x")]))
+        chunk_shape = get_chunk_shape([full[d] for d in
+                                       ("time", "layer", "y", "x")],
+                                      layout=chunks)
+        chunks = dict(zip(("time", "layer", "y", "x"), chunk_shape))
+    sizes = [1]
+    for d, n in zip(dimensions[1:], shape[1:]):
+        sizes.append(max(1, min(int(chunks.get(d, n)), n)))
+    return tuple(sizes)
+
+
+class _EnsembleFile(object):
+    """
+    A realization-dimensioned NetCDF file that is created (or reopened
+    when resuming) when the first realization is written
+
+    """
+
+    def __init__(self, filename, names, chunks, zlib, complevel, shuffle,
+                 resume):
+        self.filename = filename
+        self.names = names
+        self.chunks = chunks
+        self.zlib = zlib
+        self.complevel = complevel
+        self.shuffle = shuffle
+        self.net = None
+        self.nc = None
+        if resume and os.path.exists(filename):
+            import netCDF4
+            self.nc = netCDF4.Dataset(filename, 'a')
+            saved = [str(s) for s in self.nc.variables['realization_name'][:]]
+            if saved != list(names):
+                raise Exception('the realizations in {} are not the '
+                                'realizations being exported'.format(
+                                 filename))
+
+    def get_completed(self):
+        if self.nc is None:
+            return np.zeros(len(self.names), dtype=bool)
+        return np.ma.filled(self.nc.variables['completed'][:], 0) == 1
+
+    def initialize(self, model, time_values=None):
+        if self.nc is not None:
+            return
+        self.net = NetCdf(self.filename, model, time_values=time_values)
+        self.nc = self.net.nc
+        self.nc.createDimension('realization', len(self.names))
+        var = self.nc.createVariable('realization', 'i4', ('realization',))
+        var.long_name = 'realization'
+        var[:] = np.arange(len(self.names))
+        var = self.nc.createVariable('realization_name', str,
+                                     ('realization',))
+        var.long_name = 'realization name'
+        for i, name in enumerate(self.names):
+            var[i] = name
+        var = self.nc.createVariable('completed', 'i4', ('realization',),
+                                     fill_value=0)
+        var.long_name = 'realization has been completely written'
+        self.nc.sync()
+
+    def write(self, irealization, array_dict):
+        """
+        Write the arrays of a realization
+
+        Returns
+        -------
+        nbytes : int
+            number of bytes written
+
+        """
+        nbytes = 0
+        for name, a in array_dict.items():
+            name = NetCdf.normalize_name(name)
+            a = np.asarray(a)
+            if a.ndim not in ARRAY_DIMENSIONS:
+                continue
+            var = self.nc.variables.get(name)
+            if var is None:
+                var = self._create_variable(name, a)
+            if a.dtype.kind == 'f':
+                a = np.where(np.isnan(a), FILLVALUE, a)
+            # arrays with fewer layers (for example Transient2d arrays) are
+            # written to the first layers
+            var[(irealization,) + tuple(slice(0, n) for n in a.shape)] = a
+            nbytes += a.size * var.dtype.itemsize
+        self.nc.variables['completed'][irealization] = 1
+        self.nc.sync()
+        return nbytes
+
+    def _create_variable(self, name, a):
+        dimensions = ('realization',) + ARRAY_DIMENSIONS[a.ndim]
+        precision_str = 'i4' if a.dtype.kind in 'iu' else 'f4'
+        chunksizes = _get_chunksizes(self.nc, dimensions, self.chunks)
+        var = self.nc.createVariable(name, precision_str, dimensions,
+                                     fill_value=FILLVALUE, zlib=self.zlib,
+                                     complevel=self.complevel,
+                                     shuffle=self.shuffle,
+                                     chunksizes=chunksizes)
+        var.long_name = NC_LONG_NAMES.get(name, name)
+        var.coordinates = "layer latitude longitude"
+        if 'time' in dimensions:
+            var.coordinates = "time layer latitude longitude"
+        return var
+
+    def close(self):
+        if self.net is not None:
+            self.net.write()
+        elif self.nc is not None:
+            self.nc.close()
+
+
+def write_ensemble(realizations, inputs_filename=None, outputs_filename=None,
+                   names=None, model=None, model_class=None,
+                   load_kwargs=None, nprocs=1, resume=False, chunks='map',
+                   zlib=True, complevel=4, shuffle=True, verbose=False):
+    """
+    Export the inputs and outputs of an ensemble of model realizations to
+    NetCDF files with a realization dimension.  All of the realizations
+    must have the same discretization and spatial reference.
+
+    Parameters
+    ----------
+    realizations : list
+        list of (namefile, model_ws) tuples for each realization
+    inputs_filename : str
+        name of the NetCDF file for the model input arrays. If None, the
+        inputs are not exported. (default is None)
+    outputs_filename : str
+        name of the NetCDF file for the model output arrays. The binary
+        head, drawdown, and budget files of each realization are exported.
+        If None, the outputs are not exported. (default is None)
+    names : list of str
+        names of the realizations. If None, the part of each name file
+        name after the last underscore is used (as in ensemble_helper),
+        or the realization number if these are not unique.
+        (default is None)
+    model : flopy model instance
+        model used for the discretization, coordinates, and time values
+        of the files. If None, the first realization is loaded.
+        (default is None)
+    model_class : class
+        model class used to load the realizations (default is None, which
+        uses flopy.modflow.Modflow)
+    load_kwargs : dict
+        keyword arguments passed to model_class.load() (default is None)
+    nprocs : int
+        number of worker processes used to load the realizations. The
+        processes are spawned, so a script that uses more than one process
+        must guard its main code with if __name__ == '__main__'.
+        (default is 1, which loads the realizations in this process)
+    resume : bool
+        if True and the files exist, only realizations that have not been
+        completely written are exported (default is False)
+    chunks : str or dict
+        chunking of the non-realization dimensions: 'map', 'timeseries',
+        or a dict of {dimension name: chunk size}. Every chunk holds a
+        single realization. (default is 'map')
+    zlib : bool
+        compress the variables with zlib (default is True)
+    complevel : int
+        zlib compression level (1-9) (default is 4)
+    shuffle : bool
+        apply the HDF5 shuffle filter before compression (default is True)
+    verbose : bool
+        print the throughput of each realization (default is False)
+
+    Returns
+    -------
+    stats : np.recarray
+        recarray with the realization number, name, status ('written',
+        'skipped', or 'failed'), load_time and write_time in seconds,
+        megabytes (MB written), and error message of each realization
+
+    Notes
+    -----
+    Failed realizations are reported and are not marked as completed, so
+    they are exported again when resume is True.
+
+    Examples
+    --------
+
+    >>> import flopy
+    >>> reals = [('model_{}.nam'.format(i), 'real{}'.format(i))
+    ...          for i in range(500)]
+    >>> stats = flopy.export.ensemble.write_ensemble(
+    ...     reals, inputs_filename='inputs.nc', outputs_filename='outputs.nc',
+    ...     nprocs=8, resume=True, verbose=True)
+
+    """
+    assert inputs_filename is not None or outputs_filename is not None, \
+        'inputs_filename and/or outputs_filename must be specified'
+    realizations = [tuple(r) for r in realizations]
+    nreal = len(realizations)
+    if names is None:
+        names = [_get_name(r[0]) for r in realizations]
+        if len(set(names)) != nreal:
+            names = [str(i) for i in range(nreal)]
+    names = [str(name) for name in names]
+    assert len(names) == nreal, 'names and realizations must be the same ' \
+                                'length'
+    if load_kwargs is None:
+        load_kwargs = {}
+
+    files = []
+    for filename in (inputs_filename, outputs_filename):
+        if filename is None:
+            files.append(None)
+        else:
+            files.append(_EnsembleFile(filename, names, chunks, zlib,
+                                       complevel, shuffle, resume))
+    completed = np.ones(nreal, dtype=bool)
+    for f in files:
+        if f is not None:
+            completed &= f.get_completed()
+
+    dtype = [('realization', int), ('name', object), ('status', object),
+             ('load_time', float), ('write_time', float),
+             ('megabytes', float), ('error', object)]
+    stats = np.recarray(nreal, dtype=dtype)
+    stats['realization'] = np.arange(nreal)
+    stats['name'] = names
+    stats['status'] = 'skipped'
+    stats['load_time'] = 0.
+    stats['write_time'] = 0.
+    stats['megabytes'] = 0.
+    stats['error'] = ''
+
+    tasks = [(i, realizations[i][0], realizations[i][1], model_class,
+              load_kwargs, inputs_filename is not None,
+              outputs_filename is not None)
+             for i in range(nreal) if not completed[i]]
+    if verbose:
+        print('exporting {} of {} realizations'.format(len(tasks), nreal))
+
+    t0 = time.time()
+    try:
+        for result in _map_realizations(tasks, nprocs):
+            i, input_dict, output_dict, times, load_time, error = result
+            stats.load_time[i] = load_time
+            tw = time.time()
+            if error is None:
+                try:
+                    if model is None:
+                        model = _load_model(realizations[i], model_class,
+                                            load_kwargs)
+                    nbytes = 0
+                    for f, d, tv in zip(files, (input_dict, output_dict),
+                                        (None, times)):
+                        if f is None:
+                            continue
+                        f.initialize(model, time_values=tv)
+                        nbytes += f.write(i, d)
+                    stats.megabytes[i] = nbytes / 2. ** 20
+                except Exception as e:
+                    error = '{}: {}'.format(type(e).__name__, str(e))
+            stats.write_time[i] = time.time() - tw
+            if error is None:
+                stats.status[i] = 'written'
+            else:
+                stats.status[i] = 'failed'
+                stats.error[i] = error
+            if verbose:
+                if error is None:
+                    print('realization {} ({}): loaded in {:.2f} s, wrote '
+                          '{:.1f} MB in {:.2f} s ({:.1f} MB/s)'.format(
+                           i, names[i], load_time, stats.megabytes[i],
+                           stats.write_time[i], stats.megabytes[i] /
+                           max(load_time + stats.write_time[i], 1.0e-6)))
+                else:
+                    print('realization {} ({}) failed: {}'.format(
+                        i, names[i], error))
+    finally:
+        for f in files:
+            if f is not None:
+                f.close()
+
+    if verbose:
+        elapsed = time.time() - t0
+        nwritten = (stats.status == 'written').sum()
+        print('{} realizations written, {} failed, and {} skipped in '
+              '{:.1f} s ({:.1f} realizations per hour)'.format(
+               nwritten, (stats.status == 'failed').sum(),
+               (stats.status == 'skipped').sum(), elapsed,
+               3600. * nwritten / max(elapsed, 1.0e-6)))
+    return stats
+
+
+def _load_model(realization, model_class, load_kwargs):
+    if model_class is None:
+        from ..modflow import Modflow
+        model_class = Modflow
+    kwargs = {'check': False, 'verbose': False}
+    kwargs.update(load_kwargs)
+    return model_class.load(realization[0], model_ws=realization[1],
+                            **kwargs)
+
+
+def _map_realizations(tasks, nprocs):
+    """
+    Generator of loaded realizations in the order that they are finished.
+    At most two realizations per process are loaded and not yet written.
+
+    """
+    if nprocs is None or nprocs <= 1 or len(tasks) < 2:
+        for task in tasks:
+            yield _load_realization(task)
+        return
+    # the workers are spawned, as in flopy.export.netcdf, so they do not
+    # inherit the state of the NetCDF files that are open in this process.
+    # The workers do not open these files, so Python 2 can fork them.
+    import multiprocessing
+    ctx = multiprocessing
+    if hasattr(multiprocessing, "get_context"):
+        ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(processes=nprocs)
+    try:
+        pending = []
+        itask = 0
+        while itask < len(tasks) or len(pending) > 0:
+            while itask < len(tasks) and len(pending) < 2 * nprocs:
+                pending.append(pool.apply_async(_load_realization,
+                                                (tasks[itask],)))
+                itask += 1
+            ready = [r for r in pending if r.ready()]
+            if len(ready) == 0:
+                time.sleep(0.01)
+                continue
+            for r in ready:
+                pending.remove(r)
+                yield r.get()
+    finally:
+        pool.terminate()
@@ -7,6 +7,7 @@ import json
 import numpy as np
 from datetime import datetime
 import time
+import warnings
 from .metadata import acdd
 import flopy
 
@@ -17,6 +18,9 @@ ITMUNI = {0: "undefined", 1: "seconds", 2: "minutes", 3: "hours", 4: "days",
 LENUNI = {0: "undefined", 1: "feet", 2: "meters", 3: "centimeters"}
 PRECISION_STRS = ["f4", "f8", "i4"]
 
+BINARY_OPS = {"add": np.add, "sub": np.subtract, "mul": np.multiply,
+              "div": np.true_divide}
+
 STANDARD_VARS = ["longitude", "latitude", "layer", "elevation", "delr", "delc",
                  "time"]
 
@@ -126,6 +130,18 @@ class NetCdf(object):
     forgive: what to do if a duplicate variable name is being created.  If
         True, then the newly requested var is skipped.  If False, then
         an exception is raised.
+    chunks : str or dict
+        chunking of the variables. Can be 'map' (one layer for a single
+        time per chunk, for reading maps), 'timeseries' (blocks of cells
+        for many times per chunk, for reading cell time series), or a dict
+        of {dimension name: chunk size}. If None, the netCDF library
+        default chunking is used. (default is None)
+    zlib : bool
+        compress the variables with zlib (default is True)
+    complevel : int
+        zlib compression level (1-9) (default is 4)
+    shuffle : bool
+        apply the HDF5 shuffle filter before compression (default is True)
 
     Notes
     -----
@@ -137,7 +153,8 @@ class NetCdf(object):
 
     def __init__(self, output_filename, model, time_values=None, z_positive='up',
                  verbose=None,
-                 logger=None, forgive=False):
+                 logger=None, forgive=False, chunks=None, zlib=True,
+                 complevel=4, shuffle=True):
 
         assert output_filename.lower().endswith(".nc")
         if verbose is None:
@@ -154,6 +171,10 @@ class NetCdf(object):
         self.output_filename = output_filename
 
         self.forgive = bool(forgive)
+        self.chunking = chunks
+        self.zlib = bool(zlib)
+        self.complevel = int(complevel)
+        self.shuffle = bool(shuffle)
 
         assert model.dis is not None
         self.model = model
@@ -189,71 +210,90 @@ class NetCdf(object):
         self.log("initializing file")
 
     def __add__(self, other):
-        new_net = NetCdf.zeros_like(self)
-        if np.isscalar(other) or isinstance(other, np.ndarray):
-            for vname in self.var_attr_dict.keys():
-                new_net.nc.variables[vname][:] = self.nc.variables[vname][:] + \
-                                                 other
-        elif isinstance(other, NetCdf):
-            for vname in self.var_attr_dict.keys():
-                new_net.nc.variables[vname][:] = self.nc.variables[vname][:] + \
-                                                 other.nc.variables[vname][:]
-        else:
-            raise Exception("NetCdf.__add__(): unrecognized other:{0}". \
-                            format(str(type(other))))
-        return new_net
+        return self.binary_op(other, "add")
 
     def __sub__(self, other):
-        new_net = NetCdf.zeros_like(self)
-        if np.isscalar(other) or isinstance(other, np.ndarray):
-            for vname in self.var_attr_dict.keys():
-                new_net.nc.variables[vname][:] = self.nc.variables[vname][:] - \
-                                                 other
-        elif isinstance(other, NetCdf):
-            for vname in self.var_attr_dict.keys():
-                new_net.nc.variables[vname][:] = self.nc.variables[vname][:] - \
-                                                 other.nc.variables[vname][:]
-        else:
-            raise Exception("NetCdf.__sub__(): unrecognized other:{0}". \
-                            format(str(type(other))))
-        return new_net
+        return self.binary_op(other, "sub")
 
     def __mul__(self, other):
-        new_net = NetCdf.zeros_like(self)
-        if np.isscalar(other) or isinstance(other, np.ndarray):
-            for vname in self.var_attr_dict.keys():
-                new_net.nc.variables[vname][:] = self.nc.variables[vname][:] * \
-                                                 other
-        elif isinstance(other, NetCdf):
-            for vname in self.var_attr_dict.keys():
-                new_net.nc.variables[vname][:] = self.nc.variables[vname][:] * \
-                                                 other.nc.variables[vname][:]
-        else:
-            raise Exception("NetCdf.__mul__(): unrecognized other:{0}". \
-                            format(str(type(other))))
-        return new_net
+        return self.binary_op(other, "mul")
 
     def __div__(self, other):
         return self.__truediv__(other)
 
     def __truediv__(self, other):
-        new_net = NetCdf.zeros_like(self)
-        with np.errstate(invalid="ignore"):
-            if np.isscalar(other) or isinstance(other, np.ndarray):
-                for vname in self.var_attr_dict.keys():
-                    new_net.nc.variables[vname][:] = self.nc.variables[vname][
-                                                     :] / \
-                                                     other
-            elif isinstance(other, NetCdf):
-                for vname in self.var_attr_dict.keys():
-                    new_net.nc.variables[vname][:] = self.nc.variables[vname][
-                                                     :] / \
-                                                     other.nc.variables[vname][
-                                                     :]
-            else:
-                raise Exception("NetCdf.__sub__(): unrecognized other:{0}". \
-                                format(str(type(other))))
-            return new_net
+        return self.binary_op(other, "div")
+
+    def binary_op(self, other, op, output_filename=None, nprocs=1,
+                  max_memory=2 ** 26):
+        """
+        Make a new NetCdf instance from an arithmetic operation on each
+        variable.  Variables are processed chunk by chunk, so only a few
+        chunks of each variable are held in memory.
+
+        Parameters
+        ----------
+        other : scalar, numpy.ndarray, or NetCdf instance
+            right operand.  Arrays must broadcast to the shape of every
+            variable.
+        op : str
+            'add', 'sub', 'mul', or 'div'
+        output_filename : str
+            name of the new .nc file (default is None, which uses a
+            temporary file name)
+        nprocs : int
+            number of processes used to read and compute the chunks. The
+            results are written by the calling process. The processes are
+            spawned, so a script that uses more than one process must
+            guard its main code with if __name__ == '__main__'. Python 2
+            cannot spawn processes, so a single process is used there.
+            (default is 1)
+        max_memory : int
+            maximum number of bytes in a block of chunks (default is 64 MB)
+
+        Returns
+        -------
+        new NetCdf instance
+
+        """
+        if op not in BINARY_OPS:
+            raise Exception("NetCdf.binary_op(): unrecognized op:{0}". \
+                            format(op))
+        if isinstance(other, NetCdf):
+            other.nc.sync()
+            ofile = other.output_filename
+        elif np.isscalar(other) or isinstance(other, np.ndarray):
+            ofile = None
+        else:
+            raise Exception("NetCdf.__{0}__(): unrecognized other:{1}". \
+                            format(op, str(type(other))))
+        self.nc.sync()
+        new_net = NetCdf.empty_like(self, output_filename=output_filename)
+        new_net._add_variables_like(self)
+        datasets = {self.output_filename: self.nc}
+        if ofile is not None:
+            datasets[ofile] = other.nc
+
+        for vname in self.var_attr_dict.keys():
+            var = self.nc.variables[vname]
+            new_var = new_net.nc.variables[vname]
+            if ofile is None and isinstance(other, np.ndarray):
+                other_array = np.broadcast_to(other, var.shape)
+            tasks, slices = [], []
+            for sl in iter_chunk_slices(var, max_memory=max_memory):
+                sources = [("file", self.output_filename, vname, sl)]
+                if ofile is not None:
+                    sources.append(("file", ofile, vname, sl))
+                elif isinstance(other, np.ndarray):
+                    sources.append(("array", other_array[sl]))
+                else:
+                    sources.append(("array", other))
+                tasks.append((_binary_op_chunk, sources, {"op": op}))
+                slices.append(sl)
+            for sl, result in zip(slices, _map_chunks(tasks, nprocs,
+                                                      datasets)):
+                new_var[sl] = result
+        return new_net
 
     def append(self, other, suffix="_1"):
         assert isinstance(other, NetCdf) or isinstance(other, dict)
@@ -311,9 +351,14 @@ class NetCdf(object):
         return
 
     def copy(self, output_filename):
-        new_net = NetCdf.zeros_like(self, output_filename=output_filename)
+        self.nc.sync()
+        new_net = NetCdf.empty_like(self, output_filename=output_filename)
+        new_net._add_variables_like(self)
         for vname in self.var_attr_dict.keys():
-            new_net.nc.variables[vname][:] = self.nc.variables[vname][:]
+            var = self.nc.variables[vname]
+            new_var = new_net.nc.variables[vname]
+            for sl in iter_chunk_slices(var):
+                new_var[sl] = var[sl]
         return new_net
 
     @classmethod
@@ -322,33 +367,46 @@ class NetCdf(object):
         new_net = NetCdf.empty_like(other, output_filename=output_filename,
                                     verbose=verbose, logger=logger)
         # add the vars to the instance
-        for vname in other.var_attr_dict.keys():
-            if new_net.nc.variables.get(vname) is not None:
-                new_net.logger.warn("variable {0} already defined, skipping". \
-                                    format(vname))
-                continue
+        for vname in new_net._add_variables_like(other):
             new_net.log("adding variable {0}".format(vname))
             var = other.nc.variables[vname]
-            data = var[:]
-            try:
-                mask = data.mask
-                data = np.array(data)
-            except:
-                mask = None
-            new_data = np.zeros_like(data)
-            new_data[mask] = FILLVALUE
-            new_var = new_net.create_variable(vname,
-                                              other.var_attr_dict[vname],
-                                              var.dtype,
-                                              dimensions=var.dimensions)
-            new_var[:] = new_data
+            new_var = new_net.nc.variables[vname]
+            for sl in iter_chunk_slices(var):
+                data = var[sl]
+                new_data = np.zeros(data.shape, dtype=data.dtype)
+                new_data[np.ma.getmaskarray(data)] = FILLVALUE
+                new_var[sl] = new_data
             new_net.log("adding variable {0}".format(vname))
+        return new_net
+
+    def _add_variables_like(self, other):
+        """
+        Create (without writing data) the variables of another NetCdf
+        instance that are not already defined, using the same chunking,
+        and copy the global attributes
+
+        Returns
+        -------
+        vnames : list of the names of the created variables
+
+        """
+        vnames = []
+        for vname in other.var_attr_dict.keys():
+            if self.nc.variables.get(vname) is not None:
+                self.logger.warn("variable {0} already defined, skipping". \
+                                 format(vname))
+                continue
+            var = other.nc.variables[vname]
+            self.create_variable(vname, other.var_attr_dict[vname],
+                                 var.dtype, dimensions=var.dimensions,
+                                 chunksizes=var.chunking())
+            vnames.append(vname)
         global_attrs = {}
         for attr in other.nc.ncattrs():
-            if attr not in new_net.nc.ncattrs():
+            if attr not in self.nc.ncattrs():
                 global_attrs[attr] = other.nc[attr]
-        new_net.add_global_attributes(global_attrs)
-        return new_net
+        self.add_global_attributes(global_attrs)
+        return vnames
 
     @classmethod
     def empty_like(cls, other, output_filename=None,
@@ -366,11 +424,12 @@ class NetCdf(object):
 
         new_net = cls(output_filename, other.model,
                       time_values=other.time_values_arg, verbose=verbose,
-                      logger=logger)
+                      logger=logger, chunks=other.chunking, zlib=other.zlib,
+                      complevel=other.complevel, shuffle=other.shuffle)
         return new_net
 
     def difference(self, other, minuend="self", mask_zero_diff=True,
-                   onlydiff=True):
+                   onlydiff=True, nprocs=1, max_memory=2 ** 26):
         """
         make a new NetCDF instance that is the difference with another
         netcdf file
@@ -389,6 +448,12 @@ class NetCdf(object):
 
         only_diff : bool flag to only add non-zero diffs to output file
 
+        nprocs : int number of processes used to read and difference the
+            chunks of each variable. See binary_op(). (default is 1)
+
+        max_memory : int maximum number of bytes in a block of chunks
+            (default is 64 MB)
+
         Returns
         -------
         net NetCDF instance
@@ -399,7 +464,9 @@ class NetCdf(object):
         variable names and dimensions between the two files must match
         exactly. The name of the new .nc file is
         <self.output_filename>.diff.nc.  The masks from both self and
-        other are carried through to the new instance
+        other are carried through to the new instance.  Variables are
+        differenced chunk by chunk and written incrementally, so only a few
+        chunks of each variable are held in memory.
 
         """
 
@@ -440,10 +507,20 @@ class NetCdf(object):
                                  "{0}:{1}".format(self_dimens[d],
                                                   other_dimens[d]))
                 return
+        if minuend.lower() not in ("self", "other"):
+            mess = "unrecognized minuend {0}".format(minuend)
+            self.logger.warn(mess)
+            raise Exception(mess)
+
         # should be good to go
         time_values = self.nc.variables.get("time")[:]
         new_net = NetCdf(self.output_filename.replace(".nc", ".diff.nc"),
                          self.model, time_values=time_values)
+        self.nc.sync()
+        ofile = other.filepath()
+        datasets = {self.output_filename: self.nc, ofile: other}
+        kwargs = {"minuend": minuend.lower(),
+                  "mask_zero_diff": mask_zero_diff}
         # add the vars to the instance
         for vname in self_vars:
             if vname not in self.var_attr_dict or \
@@ -452,71 +529,46 @@ class NetCdf(object):
                 continue
             self.log("processing variable {0}".format(vname))
             s_var = self.nc.variables[vname]
-            o_var = other.variables[vname]
-            s_data = s_var[:]
-            o_data = o_var[:]
-            o_mask, s_mask = None, None
-
-            # keep the masks to apply later
-            if isinstance(s_data, np.ma.MaskedArray):
-                self.logger.warn("masked array for {0}".format(vname))
-                s_mask = s_data.mask
-                s_data = np.array(s_data)
-                s_data[s_mask] = 0.0
-            else:
-                np.nan_to_num(s_data)
-
-            if isinstance(o_data, np.ma.MaskedArray):
-                o_mask = o_data.mask
-                o_data = np.array(o_data)
-                o_data[o_mask] = 0.0
-            else:
-                np.nan_to_num(o_data)
-
-            # difference with self
-            if minuend.lower() == "self":
-                d_data = s_data - o_data
-            elif minuend.lower() == "other":
-                d_data = o_data - s_data
-            else:
-                mess = "unrecognized minuend {0}".format(minuend)
-                self.logger.warn(mess)
-                raise Exception(mess)
-
-            # check for non-zero diffs
-            if onlydiff and d_data.sum() == 0.0:
+            tasks, slices = [], []
+            for sl in iter_chunk_slices(s_var, max_memory=max_memory):
+                sources = [("file", self.output_filename, vname, sl),
+                           ("file", ofile, vname, sl)]
+                tasks.append((_difference_chunk, sources, kwargs))
+                slices.append(sl)
+
+            # the variable is created at the first non-zero difference
+            # and the leading chunks with zero differences are redone
+            var = None
+            dmin, dmax = np.inf, -np.inf
+            izero = []
+            results = _map_chunks(tasks, nprocs, datasets)
+            for i, (d_data, mn, mx, nonzero) in enumerate(results):
+                dmin, dmax = np.nanmin([dmin, mn]), np.nanmax([dmax, mx])
+                if var is None and onlydiff and not nonzero:
+                    izero.append(i)
+                    continue
+                if var is None:
+                    attrs = self.var_attr_dict[vname].copy()
+                    var = new_net.create_variable(vname, attrs,
+                                                  s_var.dtype,
+                                                  dimensions=s_var.dimensions,
+                                                  chunksizes=s_var.chunking())
+                    for j, zero_data in zip(izero, _map_chunks(
+                            [tasks[j] for j in izero], nprocs, datasets)):
+                        var[slices[j]] = zero_data[0]
+                var[slices[i]] = d_data
+
+            if var is None:
                 self.logger.warn(
                     "var {0} has zero differences, skipping...".format(vname))
                 continue
-
             self.logger.warn(
-                "resetting diff attrs max,min:{0},{1}".format(d_data.min(),
-                                                              d_data.max()))
-            attrs = self.var_attr_dict[vname].copy()
-            attrs["max"] = np.nanmax(d_data)
-            attrs["min"] = np.nanmin(d_data)
-            # reapply masks
-            if s_mask is not None:
-                self.log("applying self mask")
-                s_mask[d_data != 0.0] = False
-                d_data[s_mask] = FILLVALUE
-                self.log("applying self mask")
-            if o_mask is not None:
-                self.log("applying other mask")
-                o_mask[d_data != 0.0] = False
-                d_data[o_mask] = FILLVALUE
-                self.log("applying other mask")
-
-            d_data[np.isnan(d_data)] = FILLVALUE
-            if mask_zero_diff:
-                d_data[np.where(d_data == 0.0)] = FILLVALUE
-
-            var = new_net.create_variable(vname, attrs,
-                                          s_var.dtype,
-                                          dimensions=s_var.dimensions)
-
-            var[:] = d_data
+                "resetting diff attrs max,min:{0},{1}".format(dmin, dmax))
+            for k, v in (("min", dmin), ("max", dmax)):
+                new_net.var_attr_dict[vname][k] = v
+                var.setncattr(k, v)
             self.log("processing variable {0}".format(vname))
+        return new_net
 
     def _dt_str(self, dt):
         """ for datetime to string for year < 1900
@@ -731,6 +783,8 @@ class NetCdf(object):
         self.nc.createDimension('layer', self.shape[0])
         self.nc.createDimension('y', self.shape[1])
         self.nc.createDimension('x', self.shape[2])
+        if self.chunking is not None:
+            self.set_chunks(self.chunking)
         self.log("creating dimensions")
 
         self.log("setting CRS info")
@@ -830,12 +884,38 @@ class NetCdf(object):
         exp._CoordinateAxes = "layer"
         return
 
+    def set_chunks(self, chunks):
+        """
+        Set the chunk sizes of variables that are created after this call
+
+        Parameters
+        ----------
+        chunks : str or dict
+            'map', 'timeseries', or a dict of {dimension name: chunk size}.
+            See flopy.export.outputstore.get_chunk_shape for the 'map' and
+            'timeseries' layouts.
+
+        """
+        if isinstance(chunks, str):
+            from .outputstore import get_chunk_shape
+            ntimes = len(self.nc.dimensions["time"])
+            shape = get_chunk_shape((ntimes,) + self.shape, layout=chunks)
+            chunks = dict(zip(("time", "layer", "y", "x"), shape))
+            chunks["z"] = chunks["layer"]
+        for dimension, chunk in chunks.items():
+            if dimension in self.nc.dimensions:
+                chunk = min(int(chunk), len(self.nc.dimensions[dimension]))
+            self.chunks[dimension] = max(1, int(chunk))
+        self.chunking = chunks
+        return
+
     @staticmethod
     def normalize_name(name):
         return name.replace('.', '_').replace(' ', '_').replace('-', '_')
 
     def create_variable(self, name, attributes, precision_str='f4',
-                        dimensions=("time", "layer", "y", "x")):
+                        dimensions=("time", "layer", "y", "x"),
+                        chunksizes=None):
         """
         Create a new variable in the netcdf object
 
@@ -850,6 +930,9 @@ class NetCdf(object):
         dimensions : tuple
             which dimensions the variable applies to
             default : ("time","layer","x","y")
+        chunksizes : tuple
+            chunk size of each dimension. If None, the chunk sizes are
+            set from self.chunks. default : None
 
         Returns
         -------
@@ -907,9 +990,16 @@ class NetCdf(object):
 
         self.var_attr_dict[name] = attributes
 
+        if not isinstance(chunksizes, (list, tuple)):
+            chunksizes = None
+            if self.chunking is not None and len(chunks) > 0:
+                chunksizes = tuple(chunks)
         var = self.nc.createVariable(name, precision_str, dimensions,
-                                     fill_value=self.fillvalue, zlib=True)  # ,
-        # chunksizes=tuple(chunks))
+                                     fill_value=self.fillvalue,
+                                     zlib=self.zlib,
+                                     complevel=self.complevel,
+                                     shuffle=self.shuffle,
+                                     chunksizes=chunksizes)
         for k, v in attributes.items():
             try:
                 var.setncattr(k, v)
@@ -919,6 +1009,90 @@ class NetCdf(object):
         self.log("creating variable: " + str(name))
         return var
 
+    def create_slab_writer(self, name, attributes, precision_str='f4',
+                           dimensions=("time", "layer", "y", "x"),
+                           skip_all_nan=False):
+        """
+        Create a new variable that is written one time slab at a time
+
+        Parameters
+        ----------
+        name : str
+            the name of the variable
+        attributes : dict
+            attributes to add to the new variable. The min and max
+            attributes are set from the data when the writer is closed.
+        precision_str : str
+            netcdf-compliant string. e.g. f4
+        dimensions : tuple
+            which dimensions the variable applies to. The first dimension
+            must be time.
+        skip_all_nan : bool
+            if True, the variable is only created when the first slab with
+            a valid (non-NaN) value is written, so that nothing is added
+            to the file if all the values are NaN. (default is False)
+
+        Returns
+        -------
+        SlabWriter instance (None if the variable is a skipped duplicate)
+
+        """
+        assert dimensions[0] == "time", \
+            "netcdf.create_slab_writer() first dimension must be time"
+        if skip_all_nan and self.nc is not None and \
+                self.normalize_name(name) not in self.nc.variables.keys():
+            shape = tuple([len(self.nc.dimensions[d])
+                           for d in dimensions[1:]])
+            create = lambda: self.create_variable(name, attributes,
+                                                  precision_str=precision_str,
+                                                  dimensions=dimensions)
+            return SlabWriter(self, self.normalize_name(name), None,
+                              shape=shape, create=create)
+        var = self.create_variable(name, attributes,
+                                   precision_str=precision_str,
+                                   dimensions=dimensions)
+        if var is None:
+            return None
+        return SlabWriter(self, self.normalize_name(name), var)
+
+    def write_slabs(self, name, attributes, slabs, precision_str='f4',
+                    dimensions=("time", "layer", "y", "x")):
+        """
+        Create a new variable and write it from an iterable of time slabs
+        so that only the times in one chunk are held in memory
+
+        Parameters
+        ----------
+        name : str
+            the name of the variable
+        attributes : dict
+            attributes to add to the new variable. The min and max
+            attributes are set from the data.
+        slabs : iterable
+            iterable (for example a generator) of arrays for each time.
+            Each array has the shape of the remaining dimensions. NaN
+            values are written as the fill value.
+        precision_str : str
+            netcdf-compliant string. e.g. f4
+        dimensions : tuple
+            which dimensions the variable applies to. The first dimension
+            must be time.
+
+        Returns
+        -------
+        nc variable
+
+        """
+        writer = self.create_slab_writer(name, attributes,
+                                         precision_str=precision_str,
+                                         dimensions=dimensions)
+        if writer is None:
+            return None
+        for slab in slabs:
+            writer.write(slab)
+        writer.close()
+        return writer.var
+
     def add_global_attributes(self, attr_dict):
         """ add global attribute to an initialized file
 
@@ -1076,3 +1250,287 @@ class NetCdf(object):
         elif model.gmg is not None:
             return model.gmg.hclose, model.gmg.rclose
 
+
+class SlabWriter(object):
+    """
+    Write a time-dimensioned netCDF variable one time slab at a time.
+    Slabs are buffered until a complete time chunk is available, so that
+    each chunk is only compressed once.
+
+    Parameters
+    ----------
+    nc : NetCdf instance
+    name : str
+        name of the variable
+    var : netCDF4 variable
+        the variable, or None if it is created by create when the first
+        slab with a valid value is written
+    max_memory : int
+        maximum number of bytes of buffered slabs (default is 256 MB)
+    shape : tuple
+        shape of a slab (only used if var is None)
+    create : callable
+        function that creates and returns the variable (only used if var
+        is None)
+
+    Attributes
+    ----------
+    min, max : float
+        minimum and maximum of the (non-NaN) values written so far
+
+    """
+
+    def __init__(self, nc, name, var, max_memory=2 ** 28, shape=None,
+                 create=None):
+        self.nc = nc
+        self.name = name
+        self.var = None
+        self.fillvalue = nc.fillvalue
+        self.max_memory = max_memory
+        self.create = create
+        self.shape = shape
+        self.ntimes = 1
+        if var is not None:
+            self._set_var(var)
+        self.buffer = []
+        self.itime = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _set_var(self, var):
+        self.var = var
+        self.shape = var.shape[1:]
+        chunking = var.chunking()
+        if isinstance(chunking, list):
+            nbytes = int(np.prod(self.shape)) * var.dtype.itemsize
+            self.ntimes = max(1, min(chunking[0], self.max_memory // nbytes))
+
+    def write(self, slab):
+        """
+        Write the next time slab. Slabs with fewer dimensions than the
+        variable (for example a 2D array for a variable with a layer
+        dimension) are written to the first index of the extra dimensions.
+
+        """
+        slab = np.asarray(slab)
+        if slab.shape != self.shape:
+            full = np.empty(self.shape, dtype=np.float64)
+            full[:] = np.NaN
+            full[(0,) * (len(self.shape) - slab.ndim)] = slab
+            slab = full
+        if slab.dtype.kind == 'f':
+            isnan = np.isnan(slab)
+            allnan = isnan.all()
+            if not allnan:
+                valid = slab[~isnan]
+                self.min = min(self.min, valid.min())
+                self.max = max(self.max, valid.max())
+            if isnan.any():
+                slab = slab.copy()
+                slab[isnan] = self.fillvalue
+        else:
+            allnan = slab.size == 0
+            if not allnan:
+                self.min = min(self.min, slab.min())
+                self.max = max(self.max, slab.max())
+        if self.var is None:
+            # unwritten times are read as the fill value
+            if allnan:
+                self.itime += 1
+                return
+            self._set_var(self.create())
+        self.buffer.append(slab)
+        if len(self.buffer) >= self.ntimes:
+            self.flush()
+        return
+
+    def flush(self):
+        """
+        Write the buffered slabs to the file
+
+        """
+        if len(self.buffer) > 0:
+            n = len(self.buffer)
+            self.var[self.itime:self.itime + n] = np.array(self.buffer)
+            self.itime += n
+            self.buffer = []
+        return
+
+    def close(self):
+        """
+        Write any buffered slabs and set the min and max attributes
+
+        """
+        self.flush()
+        if np.isinf(self.min):
+            self.min, self.max = np.NaN, np.NaN
+        if self.var is None:
+            return
+        attributes = self.nc.var_attr_dict[self.name]
+        for k, v in (("min", self.min), ("max", self.max)):
+            attributes[k] = v
+            self.var.setncattr(k, v)
+        return
+
+
+def iter_chunk_slices(var, max_memory=2 ** 26):
+    """
+    Iterate over blocks of a netCDF variable that are aligned with its
+    chunks, so that each chunk is read (and decompressed) only once.
+    Blocks are extended over the trailing dimensions and then over
+    multiples of the chunk size of the leading dimension that is not
+    complete, up to max_memory bytes.
+
+    Parameters
+    ----------
+    var : netCDF4 variable
+    max_memory : int
+        maximum number of bytes in a block (default is 64 MB)
+
+    Returns
+    -------
+    generator of tuples of slices
+
+    """
+    shape = var.shape
+    if len(shape) == 0:
+        yield ()
+        return
+    chunking = var.chunking()
+    if isinstance(chunking, list):
+        chunk = [max(1, int(c)) for c in chunking]
+    else:
+        chunk = [1] + list(shape[1:])
+    itemsize = var.dtype.itemsize
+    block = [min(c, max(1, n)) for c, n in zip(chunk, shape)]
+    for axis in range(len(shape) - 1, -1, -1):
+        other = int(np.prod(block)) // block[axis]
+        n = max(1, max_memory // (other * itemsize))
+        if n >= shape[axis]:
+            block[axis] = max(1, shape[axis])
+        else:
+            block[axis] = max(block[axis], (n // block[axis]) * block[axis])
+            break
+    starts = [range(0, n, b) for n, b in zip(shape, block)]
+    for start in np.ndindex(*[len(r) for r in starts]):
+        yield tuple(slice(starts[i][j], min(starts[i][j] + block[i],
+                                            shape[i]))
+                    for i, j in enumerate(start))
+
+
+# netCDF4 datasets opened by pool worker processes
+_DATASETS = {}
+
+
+def _read_chunk(source, datasets):
+    if source[0] == "array":
+        return source[1]
+    filename, vname, sl = source[1:]
+    nc = datasets.get(filename)
+    if nc is None:
+        import netCDF4
+        nc = netCDF4.Dataset(filename, "r")
+        datasets[filename] = nc
+    return nc.variables[vname][sl]
+
+
+def _chunk_task(task, datasets=None):
+    """
+    Read the sources of a chunk task and apply the task function
+
+    """
+    if datasets is None:
+        datasets = _DATASETS
+    func, sources, kwargs = task
+    data = [_read_chunk(source, datasets) for source in sources]
+    return func(*data, **kwargs)
+
+
+def _map_chunks(tasks, nprocs, datasets):
+    """
+    Generator of the results of chunk tasks, in order. If nprocs is greater
+    than one, the tasks are run by a process pool in batches so that only
+    a few chunks are held in memory.
+
+    """
+    if nprocs is None or nprocs <= 1 or len(tasks) < 2:
+        for task in tasks:
+            yield _chunk_task(task, datasets)
+        return
+    # the workers are spawned, rather than forked, so they do not inherit
+    # the HDF5 state of the files that are open in this process. Python 2
+    # can only fork, so the chunks are processed serially there.
+    import multiprocessing
+    if not hasattr(multiprocessing, "get_context"):
+        warnings.warn("nprocs > 1 requires Python 3.4 or later, the chunks "
+                      "are processed by a single process")
+        for task in tasks:
+            yield _chunk_task(task, datasets)
+        return
+    ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(processes=nprocs)
+    try:
+        nbatch = 2 * nprocs
+        for i0 in range(0, len(tasks), nbatch):
+            for result in pool.map(_chunk_task, tasks[i0:i0 + nbatch]):
+                yield result
+    finally:
+        pool.terminate()
+
+
+def _binary_op_chunk(a, b, op="add"):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return BINARY_OPS[op](a, b)
+
+
+def _difference_chunk(s_data, o_data, minuend="self", mask_zero_diff=True):
+    """
+    Difference a chunk of two variables
+
+    Returns
+    -------
+    d_data : numpy.ndarray
+        differences with masked and zero (if mask_zero_diff) values set
+        to FILLVALUE
+    mn, mx : float
+        minimum and maximum difference before masking
+    nonzero : bool
+        True if any differences are non-zero
+
+    """
+    o_mask, s_mask = None, None
+
+    # keep the masks to apply later
+    if isinstance(s_data, np.ma.MaskedArray):
+        s_mask = np.ma.getmaskarray(s_data)
+        s_data = np.array(s_data)
+        s_data[s_mask] = 0.0
+    if isinstance(o_data, np.ma.MaskedArray):
+        o_mask = np.ma.getmaskarray(o_data)
+        o_data = np.array(o_data)
+        o_data[o_mask] = 0.0
+
+    # difference with self
+    if minuend == "self":
+        d_data = s_data - o_data
+    else:
+        d_data = o_data - s_data
+    d_data = np.asarray(d_data)
+
+    nonzero = bool(np.any(d_data != 0.0))
+    mn, mx = np.nan, np.nan
+    if d_data.size > 0 and not np.isnan(d_data).all():
+        mn, mx = np.nanmin(d_data), np.nanmax(d_data)
+
+    # reapply masks
+    if s_mask is not None:
+        s_mask[d_data != 0.0] = False
+        d_data[s_mask] = FILLVALUE
+    if o_mask is not None:
+        o_mask[d_data != 0.0] = False
+        d_data[o_mask] = FILLVALUE
+
+    d_data[np.isnan(d_data)] = FILLVALUE
+    if mask_zero_diff:
+        d_data[np.where(d_data == 0.0)] = FILLVALUE
+    return d_data, mn, mx, nonzero
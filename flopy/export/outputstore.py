@@ -0,0 +1,376 @@
+"""
+Convert MODFLOW and MT3D binary output files (HeadFile, UcnFile, and
+CellBudgetFile) to chunked, compressed NetCDF4 or HDF5 stores that can be
+read efficiently as maps or as cell time series.
+
+"""
+from __future__ import print_function, division
+import os
+import numpy as np
+
+from ..utils import HeadFile, UcnFile, CellBudgetFile
+from .netcdf import FILLVALUE
+
+CHUNK_LAYOUTS = ('timeseries', 'map')
+HDF5_EXTENSIONS = ('.h5', '.hdf5', '.hdf')
+
+
+def get_chunk_shape(shape, layout='timeseries', itemsize=4,
+                    chunk_bytes=2 ** 20, max_memory=2 ** 28, block=16):
+    """
+    Get the chunk shape for a (ntimes, nlay, nrow, ncol) variable.
+
+    Parameters
+    ----------
+    shape : tuple of ints
+        (ntimes, nlay, nrow, ncol) shape of the variable.
+    layout : str
+        'timeseries' chunks store block x block cells for many times so
+        that the time series for a cell is read from a few chunks. 'map'
+        chunks store a complete layer for a single time.
+        (default is 'timeseries')
+    itemsize : int
+        Number of bytes for each value. (default is 4)
+    chunk_bytes : int
+        Target number of bytes for a 'timeseries' chunk. (default is 1 MB)
+    max_memory : int
+        Maximum number of bytes used to buffer the times in a chunk while a
+        variable is being written. (default is 256 MB)
+    block : int
+        Number of rows and columns in a 'timeseries' chunk. (default is 16)
+
+    Returns
+    -------
+    chunks : tuple of ints
+
+    """
+    ntimes, nlay, nrow, ncol = [max(1, int(v)) for v in shape]
+    if layout == 'map':
+        return (1, 1, nrow, ncol)
+    elif layout != 'timeseries':
+        raise Exception('unrecognized chunk layout {}. Available layouts '
+                        'are {}'.format(layout, ', '.join(CHUNK_LAYOUTS)))
+    by, bx = min(nrow, block), min(ncol, block)
+    ntc = chunk_bytes // (by * bx * itemsize)
+    # the writer buffers every cell for the times in a chunk
+    ntc = min(ntc, max_memory // (nlay * nrow * ncol * itemsize))
+    ntc = int(max(1, min(ntimes, ntc)))
+    return (ntc, 1, by, bx)
+
+
+def _get_variables(out_obj):
+    """
+    Get the variable names in a binary output file and functions that
+    return the (nlay, nrow, ncol) array for a zero-based (kstp, kper).
+
+    """
+    variables = []
+    if isinstance(out_obj, UcnFile):
+        def reader(kstpkper):
+            return out_obj.get_data(kstpkper=kstpkper)
+
+        variables.append(('concentration', reader))
+    elif isinstance(out_obj, HeadFile):
+        text = out_obj.text
+        if isinstance(text, bytes):
+            text = text.decode()
+
+        def reader(kstpkper):
+            return out_obj.get_data(kstpkper=kstpkper)
+
+        variables.append((text.strip().lower(), reader))
+    elif isinstance(out_obj, CellBudgetFile):
+        shape = (out_obj.nlay, out_obj.nrow, out_obj.ncol)
+        for text in out_obj.textlist:
+            name = text
+            if isinstance(name, bytes):
+                name = name.decode()
+            name = '_'.join(name.strip().lower().split())
+
+            def reader(kstpkper, text=text):
+                records = out_obj.get_data(kstpkper=kstpkper, text=text,
+                                           full3D=True)
+                data = np.zeros(shape, dtype=np.float64)
+                mask = np.ones(shape, dtype=bool)
+                for rec in records:
+                    if rec.ndim == 2:
+                        rec = rec.reshape((1,) + rec.shape)
+                    rec = np.ma.asarray(rec)
+                    nl = rec.shape[0]
+                    data[:nl] += rec.filled(0.)
+                    mask[:nl] &= np.ma.getmaskarray(rec)
+                return np.ma.masked_array(data, mask=mask)
+
+            variables.append((name, reader))
+    else:
+        raise Exception('unsupported output file type: '
+                        '{}'.format(type(out_obj)))
+    return variables
+
+
+def write_output_store(filename, out_obj, layout='timeseries', chunks=None,
+                       complevel=4, shuffle=True, precision='f4',
+                       max_memory=2 ** 28, verbose=False):
+    """
+    Write one or more MODFLOW or MT3D binary output files to a chunked,
+    compressed NetCDF4 (.nc) or HDF5 (.h5, .hdf5) store. Data are streamed
+    from the binary files, so only the times in one chunk are held in
+    memory.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the store. HDF5 stores are written with h5py if the
+        extension is .h5, .hdf5, or .hdf; otherwise a NetCDF4 file is
+        written with netCDF4.
+    out_obj : HeadFile, UcnFile, CellBudgetFile or list of these
+        Binary output files to convert. Every file must have the same
+        stress periods and time steps.
+    layout : str
+        'timeseries' or 'map' chunk layout (see get_chunk_shape).
+        (default is 'timeseries')
+    chunks : tuple of ints
+        (ntimes, nlay, nrow, ncol) chunk shape. If chunks is not None,
+        layout is not used. (default is None)
+    complevel : int
+        zlib compression level (0-9). 0 disables compression.
+        (default is 4)
+    shuffle : bool
+        Apply the HDF5 shuffle filter before compression. (default is True)
+    precision : str
+        'f4' or 'f8' precision of the stored values. (default is 'f4')
+    max_memory : int
+        Maximum number of bytes used to buffer times while a variable is
+        being written. (default is 256 MB)
+    verbose : bool
+        Write information to the screen. (default is False)
+
+    Returns
+    -------
+    names : list of str
+        Names of the variables written to the store.
+
+    Examples
+    --------
+
+    >>> import flopy
+    >>> hds = flopy.utils.HeadFile('model.hds')
+    >>> cbc = flopy.utils.CellBudgetFile('model.cbc')
+    >>> flopy.export.outputstore.write_output_store('model.out.nc',
+    ...                                             [hds, cbc])
+    >>> store = flopy.export.outputstore.OutputStore('model.out.nc')
+    >>> ts = store.get_ts('head', [(0, 10, 10), (0, 20, 20)])
+
+    """
+    if not isinstance(out_obj, (list, tuple)):
+        out_obj = [out_obj]
+    assert len(out_obj) > 0
+    dtype = np.dtype(precision)
+
+    kstpkper = None
+    totim = None
+    shape3d = None
+    for obj in out_obj:
+        kk = [tuple(int(v) for v in k) for k in obj.get_kstpkper()]
+        s3d = (int(obj.nlay), int(obj.nrow), int(obj.ncol))
+        if kstpkper is None:
+            kstpkper = kk
+            shape3d = s3d
+            totim = np.array(obj.get_times(), dtype=np.float64)
+        elif kk != kstpkper or s3d != shape3d:
+            raise Exception('{} does not have the same times and shape as '
+                            '{}'.format(obj.filename, out_obj[0].filename))
+    ntimes = len(kstpkper)
+    if totim.shape[0] != ntimes:
+        totim = np.arange(1, ntimes + 1, dtype=np.float64)
+    shape = (ntimes,) + shape3d
+
+    if chunks is None:
+        chunks = get_chunk_shape(shape, layout=layout,
+                                 itemsize=dtype.itemsize,
+                                 max_memory=max_memory)
+    chunks = tuple(int(min(max(1, c), max(1, s)))
+                   for c, s in zip(chunks, shape))
+
+    hdf5 = filename.lower().endswith(HDF5_EXTENSIONS)
+    if os.path.exists(filename):
+        os.remove(filename)
+    if hdf5:
+        try:
+            import h5py
+        except Exception as e:
+            raise Exception('error importing h5py: {}'.format(str(e)))
+        f = h5py.File(filename, 'w')
+        f.attrs['layout'] = layout
+    else:
+        try:
+            import netCDF4
+        except Exception as e:
+            raise Exception('error importing netCDF4: {}'.format(str(e)))
+        f = netCDF4.Dataset(filename, 'w', format='NETCDF4')
+        for dim, n in zip(('time', 'layer', 'row', 'column'), shape):
+            f.createDimension(dim, n)
+        f.setncattr('layout', layout)
+
+    def create(name, dt, shp, chk=None, fill=None):
+        if hdf5:
+            kwargs = {}
+            if chk is not None:
+                kwargs['chunks'] = chk
+                if complevel > 0:
+                    kwargs['compression'] = 'gzip'
+                    kwargs['compression_opts'] = complevel
+                kwargs['shuffle'] = shuffle
+            if fill is not None:
+                kwargs['fillvalue'] = fill
+            return f.create_dataset(name, shp, dtype=dt, **kwargs)
+        dims = ('time', 'layer', 'row', 'column')[:len(shp)]
+        if chk is None:
+            return f.createVariable(name, dt, dims)
+        return f.createVariable(name, dt, dims, zlib=complevel > 0,
+                                complevel=max(1, complevel),
+                                shuffle=shuffle, chunksizes=chk,
+                                fill_value=fill)
+
+    try:
+        create('time', 'f8', (ntimes,))[:] = totim
+        kk = np.array(kstpkper, dtype=np.int32).reshape(ntimes, 2)
+        create('kstp', 'i4', (ntimes,))[:] = kk[:, 0]
+        create('kper', 'i4', (ntimes,))[:] = kk[:, 1]
+
+        names = []
+        ntc = chunks[0]
+        buf = np.empty((ntc,) + shape3d, dtype=dtype)
+        for obj in out_obj:
+            for name, reader in _get_variables(obj):
+                if name in names:
+                    name = '{}_{}'.format(name, len(names))
+                if verbose:
+                    print('writing {} from {} with chunks {}'.format(
+                        name, obj.filename, chunks))
+                var = create(name, dtype, shape, chk=chunks,
+                             fill=dtype.type(FILLVALUE))
+                for t0 in range(0, ntimes, ntc):
+                    t1 = min(ntimes, t0 + ntc)
+                    for it in range(t0, t1):
+                        a = reader(kstpkper[it])
+                        buf[it - t0] = np.ma.filled(a, FILLVALUE)
+                    var[t0:t1] = buf[:t1 - t0]
+                names.append(name)
+    finally:
+        f.close()
+    return names
+
+
+class OutputStore(object):
+    """
+    Read a NetCDF4 or HDF5 store written by write_output_store. The store
+    is opened read-only, so many processes can read the same store at
+    the same time.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the store.
+
+    Examples
+    --------
+
+    >>> import flopy
+    >>> store = flopy.export.outputstore.OutputStore('model.out.h5')
+    >>> ts = store.get_ts('head', (0, 10, 10))
+    >>> h = store.get_data('head', kstpkper=(0, 0))
+
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.hdf5 = filename.lower().endswith(HDF5_EXTENSIONS)
+        if self.hdf5:
+            import h5py
+            self.f = h5py.File(filename, 'r')
+            self.variables = self.f
+        else:
+            import netCDF4
+            self.f = netCDF4.Dataset(filename, 'r')
+            self.f.set_auto_mask(False)
+            self.variables = self.f.variables
+        self.times = np.array(self.variables['time'][:], dtype=np.float64)
+        self.kstpkper = list(zip(np.array(self.variables['kstp'][:]),
+                                 np.array(self.variables['kper'][:])))
+        self.kstpkper = [(int(kstp), int(kper))
+                         for kstp, kper in self.kstpkper]
+        self.names = [name for name in self.variables.keys()
+                      if name not in ('time', 'kstp', 'kper')]
+
+    def get_names(self):
+        """Get the names of the output variables in the store."""
+        return list(self.names)
+
+    def get_times(self):
+        """Get a list of the simulation times (totim) in the store."""
+        return self.times.tolist()
+
+    def get_kstpkper(self):
+        """Get a list of zero-based (kstp, kper) tuples in the store."""
+        return list(self.kstpkper)
+
+    def _get_var(self, name):
+        if name not in self.names:
+            raise Exception('{} not in {}. Available variables are '
+                            '{}'.format(name, self.filename,
+                                        ', '.join(self.names)))
+        return self.variables[name]
+
+    def get_data(self, name, kstpkper=None, idx=None, totim=None,
+                 mflay=None):
+        """
+        Get a (nlay, nrow, ncol) array, or a (nrow, ncol) array if mflay is
+        not None, for a single time. If kstpkper, idx, and totim are None,
+        the last time is returned.
+
+        """
+        if kstpkper is not None:
+            idx = self.kstpkper.index(tuple(kstpkper))
+        elif totim is not None:
+            idx = int(np.where(self.times == totim)[0][0])
+        elif idx is None:
+            idx = len(self.kstpkper) - 1
+        var = self._get_var(name)
+        if mflay is None:
+            return np.array(var[idx])
+        return np.array(var[idx, mflay])
+
+    def get_ts(self, name, idx):
+        """
+        Get time series for one or more cells.
+
+        Parameters
+        ----------
+        name : str
+            Name of the variable.
+        idx : tuple of ints, or a list of a tuple of ints
+            idx can be (layer, row, column) or it can be a list in the form
+            [(layer, row, column), (layer, row, column), ...]. The layer,
+            row, and column values must be zero based.
+
+        Returns
+        -------
+        out : numpy array
+            Array has size (ntimes, ncells + 1). The first column in the
+            data array will contain time (totim).
+
+        """
+        var = self._get_var(name)
+        if isinstance(idx, tuple):
+            idx = [idx]
+        result = np.empty((self.times.shape[0], len(idx) + 1),
+                          dtype=np.float64)
+        result[:, 0] = self.times
+        for n, (k, i, j) in enumerate(idx):
+            result[:, n + 1] = var[:, k, i, j]
+        return result
+
+    def close(self):
+        """Close the store."""
+        self.f.close()
@@ -2,6 +2,7 @@
 Module for exporting and importing flopy model attributes
 """
 import shutil
+from collections import OrderedDict
 import numpy as np
 import numpy.lib.recfunctions as rf
 
@@ -65,76 +66,409 @@ def write_grid_shapefile(filename, sr, array_dict, nan_val=-1.0e9):
     None
 
     """
+    names = list(array_dict.keys())
+    names.sort()
+    array_dict = OrderedDict([(name, array_dict[name]) for name in names])
+    write_grid_shapefile_bulk(filename, sr, array_dict, nan_val=nan_val)
 
-    try:
-        import shapefile
-    except Exception as e:
-        raise Exception("io.to_shapefile(): error " +
-                        "importing shapefile - try pip install pyshp")
 
-    wr = shapefile.Writer(shapeType=shapefile.POLYGON)
-    wr.field("row", "N", 10, 0)
-    wr.field("column", "N", 10, 0)
+def write_grid_shapefile2(filename, sr, array_dict, nan_val=-1.0e9,
+                          epsg=None, prj=None):
+    """
+    Write a grid shapefile array_dict attributes and a projection file.
 
-    arrays = []
-    names = list(array_dict.keys())
-    names.sort()
-    # for name,array in array_dict.items():
-    for name in names:
-        array = array_dict[name]
+    Parameters
+    ----------
+    filename : string
+        name of the shapefile to write
+    sr : spatial reference instance
+        spatial reference object for model grid
+    array_dict : dict
+       Dictionary of name and 2D array pairs.  Additional 2D arrays to add as
+       attributes to the grid shapefile.
+    nan_val : float
+        value used for nan values in the attribute arrays (default -1.0e9)
+    epsg : int
+        EPSG code used to write the projection file (default is None)
+    prj : str
+        existing projection file to copy (default is None)
+
+    Returns
+    -------
+    None
+
+    """
+    write_grid_shapefile_bulk(filename, sr, array_dict, nan_val=nan_val,
+                              epsg=epsg, prj=prj)
+
+
+def write_grid_shapefile_bulk(filename, sr, array_dict, nan_val=-1.0e9,
+                              epsg=None, prj=None, chunk_rows=None,
+                              chunk_size=100000):
+    """
+    Write a polygon shapefile of a structured grid with array_dict
+    attributes. The shp, shx, and dbf files are written directly as binary
+    buffers built from numpy arrays a block of rows at a time, so pyshp is
+    not required and memory use is constant per block of rows.
+
+    Parameters
+    ----------
+    filename : string
+        name of the shapefile to write
+    sr : spatial reference instance
+        spatial reference object for model grid
+    array_dict : dict
+       Dictionary of name and 2D array pairs.  Additional 2D arrays to add as
+       attributes to the grid shapefile. Arrays with a shape of
+       (1, nrow, ncol) are also accepted.
+    nan_val : float
+        value used for nan values in the attribute arrays (default -1.0e9)
+    epsg : int
+        EPSG code used to write the projection file (default is None)
+    prj : str
+        existing projection file to copy (default is None)
+    chunk_rows : int
+        number of grid rows written in each block (default is None, which
+        uses chunk_size to set the number of rows)
+    chunk_size : int
+        approximate number of cells written in each block if chunk_rows is
+        not specified (default is 100000)
+
+    Returns
+    -------
+    None
+
+    """
+    nrow, ncol = sr.nrow, sr.ncol
+    ncells = nrow * ncol
+    if chunk_rows is None:
+        chunk_rows = max(1, chunk_size // ncol)
+
+    # set up the attribute fields
+    names = ['row', 'column']
+    arrays = [None, None]
+    for name, array in array_dict.items():
+        array = np.asarray(array)
         if array.ndim == 3:
             assert array.shape[0] == 1
             array = array[0, :, :]
-        assert array.shape == (sr.nrow, sr.ncol)
-        array[np.where(np.isnan(array))] = nan_val
-        if array.dtype in [np.int,np.int32,np.int64]:
-            wr.field(name, "N", 20, 0)
-        else:
-            wr.field(name, "N", 20, 12)
+        assert array.shape == (nrow, ncol)
+        names.append(name)
         arrays.append(array)
+    names = enforce_10ch_limit(names)
+    fields = [('N', 20, 0), ('N', 20, 0)]
+    formats = ['%20d', '%20d']
+    for array in arrays[2:]:
+        field, fmt = _get_dbf_field(array, nan_val)
+        fields.append(field)
+        formats.append(fmt)
+
+    shpname = filename
+    if not shpname.lower().endswith('.shp'):
+        shpname += '.shp'
+    base = shpname[:-4]
+
+    # polygon record layout; record numbers and content lengths are big
+    # endian and the record contents are little endian
+    rec_dtype = np.dtype([('number', '>i4'), ('length', '>i4'),
+                          ('shapetype', '<i4'), ('bbox', '<f8', 4),
+                          ('nparts', '<i4'), ('npoints', '<i4'),
+                          ('parts', '<i4'), ('points', '<f8', (5, 2))])
+    content_words = (rec_dtype.itemsize - 8) // 2
+    rec_words = rec_dtype.itemsize // 2
+    bbox = [sr.xgrid.min(), sr.ygrid.min(), sr.xgrid.max(), sr.ygrid.max()]
+
+    fshp = open(shpname, 'wb')
+    fshx = open(base + '.shx', 'wb')
+    fdbf = open(base + '.dbf', 'wb')
+    fshp.write(_shp_header(50 + ncells * rec_words, bbox))
+    fshx.write(_shp_header(50 + ncells * 4, bbox))
+    fdbf.write(_dbf_header(names, fields, ncells))
+    recfmt = ' ' + ''.join(formats)
+
+    for i0 in range(0, nrow, chunk_rows):
+        i1 = min(i0 + chunk_rows, nrow)
+        n = (i1 - i0) * ncol
+        inode0 = i0 * ncol
+
+        # geometry - vertices in the same order as sr.get_vertices()
+        xg = sr.xgrid[i0:i1 + 1]
+        yg = sr.ygrid[i0:i1 + 1]
+        px = np.stack([xg[:-1, :-1], xg[1:, :-1], xg[1:, 1:],
+                       xg[:-1, 1:], xg[:-1, :-1]], axis=-1).reshape(n, 5)
+        py = np.stack([yg[:-1, :-1], yg[1:, :-1], yg[1:, 1:],
+                       yg[:-1, 1:], yg[:-1, :-1]], axis=-1).reshape(n, 5)
+        recs = np.zeros(n, dtype=rec_dtype)
+        recs['number'] = np.arange(inode0 + 1, inode0 + n + 1)
+        recs['length'] = content_words
+        recs['shapetype'] = 5
+        recs['bbox'] = np.column_stack((px.min(axis=1), py.min(axis=1),
+                                        px.max(axis=1), py.max(axis=1)))
+        recs['nparts'] = 1
+        recs['npoints'] = 5
+        recs['points'][:, :, 0] = px
+        recs['points'][:, :, 1] = py
+        fshp.write(recs.tobytes())
+
+        # index
+        shx = np.empty((n, 2), dtype='>i4')
+        shx[:, 0] = 50 + rec_words * np.arange(inode0, inode0 + n)
+        shx[:, 1] = content_words
+        fshx.write(shx.tobytes())
+
+        # attributes
+        ii, jj = np.meshgrid(np.arange(i0 + 1, i1 + 1),
+                             np.arange(1, ncol + 1), indexing='ij')
+        values = np.empty((n, len(names)), dtype=object)
+        values[:, 0] = ii.ravel().tolist()
+        values[:, 1] = jj.ravel().tolist()
+        for iarr, array in enumerate(arrays[2:]):
+            values[:, iarr + 2] = _get_dbf_values(array[i0:i1].ravel(),
+                                                  fields[iarr + 2], nan_val)
+        s = (n * recfmt) % tuple(values.ravel().tolist())
+        fdbf.write(s.encode('ascii', 'replace'))
+
+    fdbf.write(b'\x1a')
+    fshp.close()
+    fshx.close()
+    fdbf.close()
+    print('wrote {}'.format(shpname))
+    # write the projection file
+    write_prj(shpname, epsg, prj)
 
-    for i in range(sr.nrow):
-        for j in range(sr.ncol):
-            pts = sr.get_vertices(i, j)
-            wr.poly(parts=[pts])
-            rec = [i + 1, j + 1]
-            for array in arrays:
-                rec.append(array[i, j])
-            wr.record(*rec)
-    wr.save(filename)
-    print('wrote {}'.format(filename))
 
-def write_grid_shapefile2(filename, sr, array_dict, nan_val=-1.0e9,
-                          epsg=None, prj=None):
+def write_cvfd_shapefile(filename, verts, iverts, array_dict=None,
+                         nodes=None, nan_val=-1.0e9, epsg=None, prj=None,
+                         chunk_size=100000):
+    """
+    Write a polygon shapefile of the cells of an unstructured grid with
+    array_dict attributes. Like write_grid_shapefile_bulk(), the shp, shx,
+    and dbf files are written directly as binary buffers built from numpy
+    arrays a block of cells at a time, so pyshp is not required.
+
+    Parameters
+    ----------
+    filename : string
+        name of the shapefile to write
+    verts : ndarray
+        2d array of x and y points.
+    iverts : list of lists or ndarray
+        list containing a list of vertex numbers for each cell, or a 2d
+        array of vertex numbers padded with negative values
+    array_dict : dict
+       Dictionary of name and 1D array pairs with a value for each cell.
+       Additional arrays to add as attributes to the shapefile.
+    nodes : ndarray
+        node numbers written to the node attribute (default is None, which
+        numbers the cells from 1)
+    nan_val : float
+        value used for nan values in the attribute arrays (default -1.0e9)
+    epsg : int
+        EPSG code used to write the projection file (default is None)
+    prj : str
+        existing projection file to copy (default is None)
+    chunk_size : int
+        number of cells written in each block (default is 100000)
 
-    sf = import_shapefile()
-    verts = sr.vertices.copy()
+    Returns
+    -------
+    None
+
+    """
+    from ..utils.cvfdutil import iverts_to_array, _expand
+    verts = np.asarray(verts, dtype=np.float64)[:, :2]
+    ivarr, nverts = iverts_to_array(iverts)
+    ncells, maxnverts = ivarr.shape
+    if nodes is None:
+        nodes = np.arange(1, ncells + 1)
 
-    w = sf.Writer(5) # polygon
-    w.autoBalance = 1
     # set up the attribute fields
-    names = ['row', 'column'] + list(array_dict.keys())
+    names = ['node']
+    arrays = [np.asarray(nodes)]
+    if array_dict is None:
+        array_dict = {}
+    for name, array in array_dict.items():
+        array = np.asarray(array).ravel()
+        assert array.shape[0] == ncells
+        names.append(name)
+        arrays.append(array)
     names = enforce_10ch_limit(names)
-    dtypes = [('row', np.dtype('int')), ('column', np.dtype('int'))] + \
-             [(name, arr.dtype) for name, arr in array_dict.items()]
-
-    # set-up array of attributes of shape ncells x nattributes
-    col = list(range(1, sr.ncol + 1)) * sr.nrow
-    row = sorted(list(range(1, sr.nrow + 1)) * sr.ncol)
-    at = np.vstack([row, col] + [arr.ravel() for arr in array_dict.values()]).transpose()
-    at[np.isnan(at)] = nan_val
-
-    for i, npdtype in enumerate(dtypes):
-        w.field(names[i], *get_pyshp_field_info(npdtype[1].name))
-
-    for i, r in enumerate(at):
-        w.poly([verts[i]])
-        w.record(*r)
-    w.save(filename)
-    print('wrote {}'.format(filename))
-    # write the projection file
+    fields = []
+    formats = []
+    for array in arrays:
+        field, fmt = _get_dbf_field(array, nan_val)
+        fields.append(field)
+        formats.append(fmt)
+
+    shpname = filename
+    if not shpname.lower().endswith('.shp'):
+        shpname += '.shp'
+    base = shpname[:-4]
+
+    # polygon records have a fixed 56 byte (28 word) part followed by the
+    # closed ring of points. Lengths and offsets are in 16-bit words.
+    # Record numbers and content lengths are big endian and the record
+    # contents are little endian
+    head_dtype = np.dtype([('number', '>i4'), ('length', '>i4'),
+                           ('shapetype', '<i4'), ('bbox', '<f8', 4),
+                           ('nparts', '<i4'), ('npoints', '<i4'),
+                           ('parts', '<i4')])
+    npoints = nverts + 1
+    content_words = 24 + 8 * npoints
+    rec_words = content_words + 4
+    offset = 50 + np.cumsum(rec_words) - rec_words
+    used = np.zeros(verts.shape[0], dtype=np.bool)
+    used[ivarr] = True
+    xy = verts[used]
+    bbox = [xy[:, 0].min(), xy[:, 1].min(), xy[:, 0].max(), xy[:, 1].max()]
+
+    fshp = open(shpname, 'wb')
+    fshx = open(base + '.shx', 'wb')
+    fdbf = open(base + '.dbf', 'wb')
+    fshp.write(_shp_header(50 + rec_words.sum(), bbox))
+    fshx.write(_shp_header(50 + ncells * 4, bbox))
+    fdbf.write(_dbf_header(names, fields, ncells))
+    recfmt = ' ' + ''.join(formats)
+
+    j = np.arange(maxnverts)
+    for i0 in range(0, ncells, chunk_size):
+        i1 = min(i0 + chunk_size, ncells)
+        n = i1 - i0
+        iv = ivarr[i0:i1]
+        nv = nverts[i0:i1]
+        npts = npoints[i0:i1]
+
+        # polygon rings are clockwise, so reverse the order of the
+        # vertices of counterclockwise cells, keeping the first vertex
+        x = verts[iv, 0]
+        y = verts[iv, 1]
+        area = (x * np.roll(y, -1, axis=1) -
+                np.roll(x, -1, axis=1) * y).sum(axis=1)
+        rev = np.where(j < nv[:, None], -j % np.maximum(nv, 1)[:, None], 0)
+        iv = np.where((area > 0)[:, None],
+                      iv[np.arange(n)[:, None], rev], iv)
+
+        # closed rings, the first vertex pads the end of each row
+        iv = np.column_stack((iv, iv[:, 0]))
+        pts = verts[iv[np.arange(maxnverts + 1) < npts[:, None]]]
+        x = verts[iv, 0]
+        y = verts[iv, 1]
+
+        head = np.zeros(n, dtype=head_dtype)
+        head['number'] = np.arange(i0 + 1, i1 + 1)
+        head['length'] = content_words[i0:i1]
+        head['shapetype'] = 5
+        head['bbox'] = np.column_stack((x.min(axis=1), y.min(axis=1),
+                                        x.max(axis=1), y.max(axis=1)))
+        head['nparts'] = 1
+        head['npoints'] = npts
+
+        # scatter the fixed part and the points of each record into one
+        # buffer of 16-bit words
+        recstart = offset[i0:i1] - offset[i0]
+        buf = np.empty(rec_words[i0:i1].sum(), dtype='<u2')
+        buf[(recstart[:, None] + np.arange(28)).ravel()] = \
+            head.view('<u2').ravel()
+        buf[_expand(recstart + 28, 8 * npts)] = \
+            np.ascontiguousarray(pts, dtype='<f8').view('<u2').ravel()
+        fshp.write(buf.tobytes())
+
+        # index
+        shx = np.empty((n, 2), dtype='>i4')
+        shx[:, 0] = offset[i0:i1]
+        shx[:, 1] = content_words[i0:i1]
+        fshx.write(shx.tobytes())
+
+        # attributes
+        values = np.empty((n, len(names)), dtype=object)
+        for iarr, array in enumerate(arrays):
+            values[:, iarr] = _get_dbf_values(array[i0:i1], fields[iarr],
+                                              nan_val)
+        s = (n * recfmt) % tuple(values.ravel().tolist())
+        fdbf.write(s.encode('ascii', 'replace'))
+
+    fdbf.write(b'\x1a')
+    fshp.close()
+    fshx.close()
+    fdbf.close()
+    print('wrote {}'.format(shpname))
     # write the projection file
-    write_prj(filename, epsg, prj)
+    write_prj(shpname, epsg, prj)
+
+
+def _shp_header(file_words, bbox, shapetype=5):
+    """Return the 100 byte main file header for a shp or shx file."""
+    header = np.zeros(1, dtype=[('code', '>i4'), ('unused', '>i4', 5),
+                                ('length', '>i4'), ('version', '<i4'),
+                                ('shapetype', '<i4'), ('bbox', '<f8', 4),
+                                ('zm', '<f8', 4)])
+    header['code'] = 9994
+    header['length'] = file_words
+    header['version'] = 1000
+    header['shapetype'] = shapetype
+    header['bbox'] = bbox
+    return header.tobytes()
+
+
+def _dbf_header(names, fields, nrecords):
+    """Return the dbf file header and field descriptors."""
+    import time
+    now = time.localtime()
+    reclen = 1 + sum([f[1] for f in fields])
+    hdrlen = 32 * (len(fields) + 1) + 1
+    header = np.zeros(1, dtype=[('version', 'u1'), ('date', 'u1', 3),
+                                ('nrecords', '<u4'), ('hdrlen', '<u2'),
+                                ('reclen', '<u2'), ('reserved', 'V20')])
+    header['version'] = 3
+    header['date'] = (now.tm_year - 1900, now.tm_mon, now.tm_mday)
+    header['nrecords'] = nrecords
+    header['hdrlen'] = hdrlen
+    header['reclen'] = reclen
+    desc = np.zeros(len(fields), dtype=[('name', 'S11'), ('type', 'S1'),
+                                        ('address', 'V4'), ('size', 'u1'),
+                                        ('deci', 'u1'), ('reserved', 'V14')])
+    desc['name'] = [n.encode('ascii', 'replace') for n in names]
+    desc['type'] = [f[0].encode() for f in fields]
+    desc['size'] = [f[1] for f in fields]
+    desc['deci'] = [f[2] for f in fields]
+    return header.tobytes() + desc.tobytes() + b'\r'
+
+
+def _get_dbf_field(array, nan_val):
+    """
+    Return the dbf field information (type, size, decimal) and the format
+    string used to write the values of array.
+
+    """
+    kind = array.dtype.kind
+    if kind in 'iu':
+        return ('N', 20, 0), '%20d'
+    elif kind == 'b':
+        return ('L', 1, 0), '%s'
+    elif kind == 'f':
+        a = np.where(np.isnan(array), nan_val, array)
+        a = np.abs(a[np.isfinite(a)])
+        ndigits = 1
+        if a.size > 0:
+            ndigits = len('{:.0f}'.format(a.max()))
+        # reduce the number of decimals so that values fit in the field
+        deci = min(12, 20 - 2 - ndigits)
+        if deci < 1:
+            return ('F', 20, 12), '%20.12e'
+        return ('F', 20, deci), '%20.{}f'.format(deci)
+    return ('C', 50, 0), '%-50.50s'
+
+
+def _get_dbf_values(a, field, nan_val):
+    """Return a list of the values in a for a dbf field."""
+    if field[0] == 'L':
+        return np.where(a, 'T', 'F').tolist()
+    elif field[0] == 'C':
+        return a.astype(str).tolist()
+    elif field[2] > 0 or a.dtype.kind == 'f':
+        a = a.astype(np.float64)
+        a[np.isnan(a)] = nan_val
+    return a.tolist()
 
 
 def model_attributes_to_shapefile(filename, ml, package_names=None, array_dict=None,
@@ -36,7 +36,8 @@ def ensemble_helper(inputs_filename, outputs_filename, models, add_reals=True,
     """ helper to export an ensemble of model instances.  Assumes
     all models have same dis and sr, only difference is properties and
     boundary conditions.  Assumes model.nam.split('_')[-1] is the
-    realization suffix to use in the netcdf variable names
+    realization suffix to use in the netcdf variable names.  See
+    flopy.export.ensemble.write_ensemble for large ensembles.
     """
     f_in, f_out = None, None
     for m in models[1:]:
@@ -123,18 +124,80 @@ def ensemble_helper(inputs_filename, outputs_filename, models, add_reals=True,
     return f_in, f_out
 
 
-def _add_output_nc_variable(f, times, shape3d, out_obj, var_name, logger=None,
-                            text='',
-                            mask_vals=[], mask_array3d=None):
-    if logger:
-        logger.log("creating array for {0}".format(
-            var_name))
-
-    array = np.zeros((len(times), shape3d[0], shape3d[1], shape3d[2]),
-                     dtype=np.float32)
-    array[:] = np.NaN
-    for i, t in enumerate(times):
-        if t in out_obj.recordarray["totim"]:
+def align_output_times(oudic, stride=1, tol=1.0e-6):
+    """find the output times that are common to every output file instance
+    in oudic.
+
+    Parameters
+    ----------
+        oudic : dict {output_filename,flopy datafile/cellbudgetfile instance}
+        stride : int
+            stride to apply to the common times (default is 1)
+        tol : float
+            absolute tolerance used to match times between files
+            (default is 1.0e-6)
+
+    Returns
+    -------
+        times : np.ndarray
+            common times (rounded to six decimal places) after the stride
+            has been applied
+        skipped_times : np.ndarray
+            times that are not common to all output files
+        index_map : dict
+            {output_filename: totims}, where totims is an np.ndarray of the
+            totim values stored in each output file that correspond to
+            times
+
+    """
+    assert len(oudic.keys()) > 0
+    # sorted unique totims for each file, rounded for matching
+    ftimes = {}
+    for filename, out_obj in oudic.items():
+        ftimes[filename] = np.unique(np.asarray(out_obj.recordarray["totim"],
+                                                dtype=np.float64))
+    union = np.round(np.concatenate(list(ftimes.values())), 6)
+    union = np.unique(union)
+    assert len(union) > 0
+    # merge times that are within tol of each other
+    if len(union) > 1:
+        union = union[np.concatenate(([True], np.diff(union) > tol))]
+
+    common = np.ones(union.shape, dtype=bool)
+    fidx = {}
+    for filename, t in ftimes.items():
+        idx = np.searchsorted(t, union)
+        lo = np.clip(idx - 1, 0, len(t) - 1)
+        hi = np.clip(idx, 0, len(t) - 1)
+        dlo = np.abs(t[lo] - union)
+        dhi = np.abs(t[hi] - union)
+        idx = np.where(dhi < dlo, hi, lo)
+        common &= np.minimum(dlo, dhi) <= tol
+        fidx[filename] = idx
+
+    skipped_times = union[~common]
+    sel = np.where(common)[0][::stride]
+    times = union[sel]
+    index_map = {}
+    for filename, t in ftimes.items():
+        index_map[filename] = t[fidx[filename][sel]]
+    return times, skipped_times, index_map
+
+
+def _get_output_slabs(times, shape3d, out_obj, var_name, logger=None,
+                      text='', mask_vals=[], mask_array3d=None, totims=None):
+    """
+    Generator of the (nlay, nrow, ncol) float32 output arrays for each time.
+    Masked values and times that are not in the output file are NaN.
+
+    """
+    if totims is None:
+        rtimes = np.asarray(out_obj.recordarray["totim"])
+        totims = [t if t in rtimes else None for t in times]
+    for t in totims:
+        array = np.empty(shape3d, dtype=np.float32)
+        array[:] = np.NaN
+        if t is not None:
             try:
                 if text:
                     a = out_obj.get_data(totim=t, full3D=True, text=text)
@@ -142,6 +205,10 @@ def _add_output_nc_variable(f, times, shape3d, out_obj, var_name, logger=None,
                         a = a[0]
                 else:
                     a = out_obj.get_data(totim=t)
+                if mask_array3d is not None and \
+                        a.shape == mask_array3d.shape:
+                    a[mask_array3d] = np.NaN
+                array[:] = a.astype(np.float32)
             except Exception as e:
                 estr = "error getting data for {0} at time {1}:{2}".format(
                     var_name + text.decode().strip().lower(), t, str(e))
@@ -149,32 +216,23 @@ def _add_output_nc_variable(f, times, shape3d, out_obj, var_name, logger=None,
                     logger.warn(estr)
                 else:
                     print(estr)
-                continue
-            if mask_array3d is not None and a.shape == mask_array3d.shape:
-                a[mask_array3d] = np.NaN
-            try:
-                array[i, :, :, :] = a.astype(np.float32)
-            except Exception as e:
-                estr = "error assigning {0} data to array for time {1}:{2}".format(
-                    var_name + text.decode().strip().lower(), t, str(e))
-                if logger:
-                    logger.warn(estr)
-                else:
-                    print(estr)
-                continue
+        for mask_val in mask_vals:
+            array[array == mask_val] = np.NaN
+        yield array
 
-    if logger:
-        logger.log("creating array for {0}".format(
-            var_name))
 
-    for mask_val in mask_vals:
-        array[np.where(array == mask_val)] = np.NaN
-    mx, mn = np.nanmax(array), np.nanmin(array)
-    array[np.isnan(array)] = netcdf.FILLVALUE
+def _add_output_nc_variable(f, times, shape3d, out_obj, var_name, logger=None,
+                            text='',
+                            mask_vals=[], mask_array3d=None, totims=None):
+    slabs = _get_output_slabs(times, shape3d, out_obj, var_name,
+                              logger=logger, text=text, mask_vals=mask_vals,
+                              mask_array3d=mask_array3d, totims=totims)
+    if text:
+        var_name = text.decode().strip().lower()
 
     if isinstance(f, dict):
-        if text:
-            var_name = text.decode().strip().lower()
+        array = np.array(list(slabs), dtype=np.float32)
+        array[np.isnan(array)] = netcdf.FILLVALUE
         f[var_name] = array
         return f
 
@@ -184,18 +242,14 @@ def _add_output_nc_variable(f, times, shape3d, out_obj, var_name, logger=None,
             f.grid_units, f.time_units)
     precision_str = "f4"
 
-    if text:
-        var_name = text.decode().strip().lower()
     attribs = {"long_name": var_name}
     attribs["coordinates"] = "time layer latitude longitude"
-    attribs["min"] = mn
-    attribs["max"] = mx
     if units is not None:
         attribs["units"] = units
     try:
-        var = f.create_variable(var_name, attribs,
-                                precision_str=precision_str,
-                                dimensions=("time", "layer", "y", "x"))
+        writer = f.create_slab_writer(var_name, attribs,
+                                      precision_str=precision_str,
+                                      dimensions=("time", "layer", "y", "x"))
     except Exception as e:
         estr = "error creating variable {0}:\n{1}".format(
             var_name, str(e))
@@ -203,9 +257,16 @@ def _add_output_nc_variable(f, times, shape3d, out_obj, var_name, logger=None,
             logger.lraise(estr)
         else:
             raise Exception(estr)
+    if writer is None:
+        return
 
+    # the arrays for each time are streamed to the file
+    if logger:
+        logger.log("writing array for {0}".format(var_name))
     try:
-        var[:] = array
+        for slab in slabs:
+            writer.write(slab)
+        writer.close()
     except Exception as e:
         estr = "error setting array to variable {0}:\n{1}".format(
             var_name, str(e))
@@ -213,6 +274,8 @@ def _add_output_nc_variable(f, times, shape3d, out_obj, var_name, logger=None,
             logger.lraise(estr)
         else:
             raise Exception(estr)
+    if logger:
+        logger.log("writing array for {0}".format(var_name))
 
 
 def output_helper(f, ml, oudic, **kwargs):
@@ -237,49 +300,31 @@ def output_helper(f, ml, oudic, **kwargs):
     stride = kwargs.pop("stride", 1)
     suffix = kwargs.pop("suffix", None)
     forgive = kwargs.pop("forgive", False)
+    nc_kwargs = {}
+    for k in ("chunks", "zlib", "complevel", "shuffle"):
+        if k in kwargs:
+            nc_kwargs[k] = kwargs.pop(k)
     if len(kwargs) > 0 and logger is not None:
         str_args = ','.join(kwargs)
         logger.warn("unused kwargs: " + str_args)
-    # this sucks!  need to round the totims in each output file instance so
-    # that they will line up
-    for key, out in oudic.items():
-        times = [float("{0:15.6f}".format(t)) for t in
-                 out.recordarray["totim"]]
-        out.recordarray["totim"] = times
-
-    times = []
-    for filename, df in oudic.items():
-        [times.append(t) for t in df.recordarray["totim"] if t not in times]
+    # vectorized alignment of the output times - only use times that are
+    # common to every output file
+    times, skipped_times, index_map = align_output_times(oudic,
+                                                         stride=stride)
     assert len(times) > 0
-    times.sort()
-
-    # rectify times - only use times that are common to every output file
-    common_times = []
-    skipped_times = []
-    for t in times:
-        keep = True
-        for filename, df in oudic.items():
-            if t not in df.recordarray["totim"]:
-                keep = False
-                break
-        if keep:
-            common_times.append(t)
-        else:
-            skipped_times.append(t)
-    assert len(common_times) > 0
     if len(skipped_times) > 0:
         if logger:
             logger.warn("the following output times are not common to all" + \
                         " output files and are being skipped:\n" + \
-                        "{0}".format(skipped_times))
+                        "{0}".format(skipped_times.tolist()))
         else:
             print("the following output times are not common to all" + \
                   " output files and are being skipped:\n" + \
-                  "{0}".format(skipped_times))
-    times = [t for t in common_times[::stride]]
+                  "{0}".format(skipped_times.tolist()))
+    times = times.tolist()
     if isinstance(f, str) and f.lower().endswith(".nc"):
         f = NetCdf(f, ml, time_values=times, logger=logger,
-                   forgive=forgive)
+                   forgive=forgive, **nc_kwargs)
     elif isinstance(f, NetCdf):
         otimes = list(f.nc.variables["time"][:])
         assert otimes == times
@@ -296,25 +341,29 @@ def output_helper(f, ml, oudic, **kwargs):
             mask_vals.append(ml.lpf.hdry)
 
         for filename, out_obj in oudic.items():
+            totims = index_map[filename]
             filename = filename.lower()
 
             if isinstance(out_obj, UcnFile):
                 _add_output_nc_variable(f, times, shape3d, out_obj,
                                         "concentration", logger=logger,
                                         mask_vals=mask_vals,
-                                        mask_array3d=mask_array3d)
+                                        mask_array3d=mask_array3d,
+                                        totims=totims)
 
             elif isinstance(out_obj, HeadFile):
                 _add_output_nc_variable(f, times, shape3d, out_obj,
                                         out_obj.text.decode(), logger=logger,
                                         mask_vals=mask_vals,
-                                        mask_array3d=mask_array3d)
+                                        mask_array3d=mask_array3d,
+                                        totims=totims)
 
             elif isinstance(out_obj, FormattedHeadFile):
                 _add_output_nc_variable(f, times, shape3d, out_obj,
                                         out_obj.text, logger=logger,
                                         mask_vals=mask_vals,
-                                        mask_array3d=mask_array3d)
+                                        mask_array3d=mask_array3d,
+                                        totims=totims)
 
             elif isinstance(out_obj, CellBudgetFile):
                 var_name = "cell_by_cell_flow"
@@ -322,7 +371,8 @@ def output_helper(f, ml, oudic, **kwargs):
                     _add_output_nc_variable(f, times, shape3d, out_obj,
                                             var_name, logger=logger, text=text,
                                             mask_vals=mask_vals,
-                                            mask_array3d=mask_array3d)
+                                            mask_array3d=mask_array3d,
+                                            totims=totims)
 
             else:
                 estr = "unrecognized file extention:{0}".format(filename)
@@ -527,49 +577,35 @@ def mflist_helper(f, mfl, **kwargs):
         # f.log("getting 4D masked arrays for {0}".format(base_name))
 
         # for name, array in m4d.items():
-        for name, array in mfl.masked_4D_arrays_itr():
-            var_name = base_name + '_' + name
-            if isinstance(f, dict):
-                f[var_name] = array
-                continue
-            f.log("processing {0} attribute".format(name))
+        if isinstance(f, dict):
+            for name, array in mfl.masked_4D_arrays_itr():
+                f[base_name + '_' + name] = array
+            return f
 
-            units = None
-            if var_name in NC_UNITS_FORMAT:
-                units = NC_UNITS_FORMAT[var_name].format(f.grid_units,
-                                                         f.time_units)
-            precision_str = NC_PRECISION_TYPE[mfl.dtype[name].type]
-            if var_name in NC_LONG_NAMES:
-                attribs = {"long_name": NC_LONG_NAMES[var_name]}
-            else:
-                attribs = {"long_name": var_name}
-            attribs["coordinates"] = "time layer latitude longitude"
-            attribs["min"] = np.nanmin(array)
-            attribs["max"] = np.nanmax(array)
-            if np.isnan(attribs["min"]) or np.isnan(attribs["max"]):
+        # stream the arrays for each stress period to the file
+        writers = {}
+        for kper in range(mfl.model.nper):
+            arrays = mfl.to_array(kper=kper, mask=True)
+            for name, array in arrays.items():
+                if kper == 0:
+                    writers[name] = _get_mflist_writer(f, mfl, base_name,
+                                                       name)
+                if writers[name] is None:
+                    continue
+                try:
+                    writers[name].write(array)
+                except Exception as e:
+                    estr = "error setting array to variable {0}:\n{1}". \
+                        format(base_name + '_' + name, str(e))
+                    f.logger.warn(estr)
+                    raise Exception(estr)
+        for name, writer in writers.items():
+            if writer is None:
+                continue
+            writer.close()
+            if np.isnan(writer.min) or np.isnan(writer.max):
                 raise Exception(
-                    "error processing {0}: all NaNs".format(var_name))
-
-            if units is not None:
-                attribs["units"] = units
-            try:
-                var = f.create_variable(var_name, attribs,
-                                        precision_str=precision_str,
-                                        dimensions=("time", "layer", "y", "x"))
-            except Exception as e:
-                estr = "error creating variable {0}:\n{1}".format(var_name,
-                                                                  str(e))
-                f.logger.warn(estr)
-                raise Exception(estr)
-
-            array[np.isnan(array)] = f.fillvalue
-            try:
-                var[:] = array
-            except Exception as e:
-                estr = "error setting array to variable {0}:\n{1}".format(
-                    var_name, str(e))
-                f.logger.warn(estr)
-                raise Exception(estr)
+                    "error processing {0}: all NaNs".format(writer.name))
             f.log("processing {0} attribute".format(name))
 
         return f
@@ -577,6 +613,37 @@ def mflist_helper(f, mfl, **kwargs):
         raise NotImplementedError("unrecognized export argument:{0}".format(f))
 
 
+def _get_mflist_writer(f, mfl, base_name, name):
+    """
+    Create the NetCdf slab writer for an MfList attribute
+
+    """
+    var_name = base_name + '_' + name
+    f.log("processing {0} attribute".format(name))
+    units = None
+    if var_name in NC_UNITS_FORMAT:
+        units = NC_UNITS_FORMAT[var_name].format(f.grid_units,
+                                                 f.time_units)
+    precision_str = NC_PRECISION_TYPE[mfl.dtype[name].type]
+    if var_name in NC_LONG_NAMES:
+        attribs = {"long_name": NC_LONG_NAMES[var_name]}
+    else:
+        attribs = {"long_name": var_name}
+    attribs["coordinates"] = "time layer latitude longitude"
+    if units is not None:
+        attribs["units"] = units
+    try:
+        writer = f.create_slab_writer(var_name, attribs,
+                                      precision_str=precision_str,
+                                      dimensions=("time", "layer", "y", "x"),
+                                      skip_all_nan=True)
+    except Exception as e:
+        estr = "error creating variable {0}:\n{1}".format(var_name, str(e))
+        f.logger.warn(estr)
+        raise Exception(estr)
+    return writer
+
+
 def transient2d_helper(f, t2d, **kwargs):
     """ export helper for Transient2d instances
 
@@ -618,34 +685,21 @@ def transient2d_helper(f, t2d, **kwargs):
             ibnd = np.abs(t2d.model.btn.icbund.array).sum(axis=0)
             mask = ibnd == 0
 
-        # f.log("getting 4D array for {0}".format(t2d.name_base))
-        array = t2d.array
-        # f.log("getting 4D array for {0}".format(t2d.name_base))
-        with np.errstate(invalid="ignore"):
-            if array.dtype not in [int, np.int, np.int32, np.int64]:
-                if mask is not None:
-                    array[:, 0, mask] = np.NaN
-                array[array <= min_valid] = np.NaN
-                array[array >= max_valid] = np.NaN
-                mx, mn = np.nanmax(array), np.nanmin(array)
-            else:
-                mx, mn = np.nanmax(array), np.nanmin(array)
-                array[array <= min_valid] = netcdf.FILLVALUE
-                array[array >= max_valid] = netcdf.FILLVALUE
-                # if t2d.model.bas6 is not None:
-                #    array[:, 0, t2d.model.bas6.ibound.array[0] == 0] = \
-                #        f.fillvalue
-                # elif t2d.model.btn is not None:
-                #    array[:, 0, t2d.model.btn.icbund.array[0] == 0] = \
-                #        f.fillvalue
-
         var_name = t2d.name_base.replace('_', '')
         if isinstance(f, dict):
-            array[array == netcdf.FILLVALUE] = np.NaN
+            array = t2d.array
+            with np.errstate(invalid="ignore"):
+                if array.dtype not in [int, np.int, np.int32, np.int64]:
+                    if mask is not None:
+                        array[:, 0, mask] = np.NaN
+                    array[array <= min_valid] = np.NaN
+                    array[array >= max_valid] = np.NaN
+                else:
+                    array[array <= min_valid] = netcdf.FILLVALUE
+                    array[array >= max_valid] = netcdf.FILLVALUE
             f[var_name] = array
             return f
 
-        array[np.isnan(array)] = f.fillvalue
         units = "unitless"
 
         if var_name in NC_UNITS_FORMAT:
@@ -661,25 +715,38 @@ def transient2d_helper(f, t2d, **kwargs):
             attribs = {"long_name": var_name}
         attribs["coordinates"] = "time layer latitude longitude"
         attribs["units"] = units
-        attribs["min"] = mn
-        attribs["max"] = mx
-        if np.isnan(attribs["min"]) or np.isnan(attribs["max"]):
-            raise Exception("error processing {0}: all NaNs".format(var_name))
         try:
-            var = f.create_variable(var_name, attribs,
-                                    precision_str=precision_str,
-                                    dimensions=("time", "layer", "y", "x"))
+            writer = f.create_slab_writer(var_name, attribs,
+                                          precision_str=precision_str,
+                                          dimensions=("time", "layer", "y",
+                                                      "x"),
+                                          skip_all_nan=True)
         except Exception as e:
             estr = "error creating variable {0}:\n{1}".format(var_name, str(e))
             f.logger.warn(estr)
             raise Exception(estr)
+        if writer is None:
+            return f
+
+        # stream the array for each stress period to the first layer
         try:
-            var[:, 0] = array
+            for kper in range(t2d.model.nper):
+                array = t2d[kper].array.astype(np.float64)
+                with np.errstate(invalid="ignore"):
+                    if t2d.dtype not in [int, np.int, np.int32, np.int64] \
+                            and mask is not None:
+                        array[mask] = np.NaN
+                    array[array <= min_valid] = np.NaN
+                    array[array >= max_valid] = np.NaN
+                writer.write(array)
+            writer.close()
         except Exception as e:
             estr = "error setting array to variable {0}:\n{1}".format(var_name,
                                                                       str(e))
             f.logger.warn(estr)
             raise Exception(estr)
+        if np.isnan(writer.min) or np.isnan(writer.max):
+            raise Exception("error processing {0}: all NaNs".format(var_name))
         return f
 
     else:
@@ -1,7 +1,15 @@
 from __future__ import print_function, division
 import os
+import base64
 import numpy as np
 
+# vtk cell type used for model cells
+VTK_VOXEL = 11
+
+# vtk names of the numpy types written to the vtk file
+VTK_TYPES = {'<f8': 'Float64', '<f4': 'Float32', '<i4': 'Int32',
+             '<i8': 'Int64', '|u1': 'UInt8'}
+
 
 def start_tag(f, tag, indent_level, indent_char='  '):
     s = indent_level * indent_char + tag
@@ -21,8 +29,22 @@ class Vtk(object):
     """
     Support for writing a model to a vtk file
 
+    Parameters
+    ----------
+    output_filename : str
+        name of the vtu file
+    model : flopy.modflow.Modflow
+        model instance with a discretization package
+    verbose : bool
+        verbose flag (default is model.verbose)
+    fmt : str
+        format of the data arrays in the vtu file. 'ascii' writes text,
+        'binary' writes inline base64 encoded data, and 'appended' writes
+        raw binary data to an appended data section at the end of the
+        file (default is 'ascii')
+
     """
-    def __init__(self, output_filename, model, verbose=None):
+    def __init__(self, output_filename, model, verbose=None, fmt='ascii'):
 
         assert output_filename.lower().endswith(".vtu")
         if verbose is None:
@@ -39,7 +61,13 @@ class Vtk(object):
         self.model = model
         self.shape = (self.model.nlay, self.model.nrow, self.model.ncol)
 
+        fmt = fmt.lower()
+        assert fmt in ('ascii', 'binary', 'appended'), \
+            'fmt must be ascii, binary, or appended'
+        self.fmt = fmt
+
         self.arrays = {}
+        self._geometry = {}
 
         return
 
@@ -52,36 +80,172 @@ class Vtk(object):
         """
         Write the vtk file
 
-        """
+        Parameters
+        ----------
+        shared_vertex : bool
+            write points that are shared by adjacent cells (default is False)
+        ibound_filter : bool
+            only write cells with a non-zero ibound value (default is False)
 
-        indent_level = 0
+        """
         if self.verbose:
             print('writing vtk file')
-        f = open(self.output_filename, 'w')
+        geom = self._get_geometry(shared_vertex, ibound_filter)
+        self._write_vtu(self.output_filename, geom, self._get_arrays(geom))
+        return
+
+    def write_time_series(self, name, data, times=None, shared_vertex=False,
+                          ibound_filter=False):
+        """
+        Write a time series of arrays to a vtu file for each time and a
+        ParaView collection (.pvd) file that references them. The points
+        and cells are only built once and are shared by every vtu file.
+
+        Parameters
+        ----------
+        name : str
+            name of the time varying cell data array (for example 'head')
+        data : flopy.utils.HeadFile or list of numpy.ndarray
+            binary output file instance (any object with get_times() and
+            get_data(totim=) methods) or a list of arrays of shape
+            (nlay, nrow, ncol)
+        times : list
+            times for each entry in data. If data is a binary output file
+            instance, times are a subset of the times in the file
+            (default is None, which uses all of the times in the file or
+            0, 1, 2, ... for a list of arrays)
+        shared_vertex : bool
+            write points that are shared by adjacent cells (default is False)
+        ibound_filter : bool
+            only write cells with a non-zero ibound value (default is False)
+
+        Returns
+        -------
+        pvd_filename : str
+            name of the pvd file. The vtu files are named using the
+            output_filename with a zero-padded time index suffix.
+
+        """
+        if hasattr(data, 'get_times') and hasattr(data, 'get_data'):
+            if times is None:
+                times = data.get_times()
+            get_array = lambda idx, t: data.get_data(totim=t)
+        else:
+            if times is None:
+                times = list(range(len(data)))
+            assert len(times) == len(data), \
+                'times and data must be the same length'
+            get_array = lambda idx, t: data[idx]
+
+        geom = self._get_geometry(shared_vertex, ibound_filter)
+        arrays = self._get_arrays(geom)
+
+        base = os.path.splitext(self.output_filename)[0]
+        pvd_filename = base + '.pvd'
+        datasets = []
+        for idx, t in enumerate(times):
+            a = np.asarray(get_array(idx, t))
+            assert a.shape == self.shape
+            fname = '{}_{:05d}.vtu'.format(base, idx)
+            if self.verbose:
+                print('writing vtk file: {} for time {}'.format(fname, t))
+            a = self._filter_array(a, geom['ibound'])
+            self._write_vtu(fname, geom, arrays + [(name, a)])
+            datasets.append((t, os.path.basename(fname)))
+
+        f = open(pvd_filename, 'w')
+        f.write('<?xml version="1.0"?>\n')
+        indent_level = start_tag(f, '<VTKFile type="Collection" '
+                                    'version="0.1" '
+                                    'byte_order="LittleEndian">', 0)
+        indent_level = start_tag(f, '<Collection>', indent_level)
+        for t, fname in datasets:
+            s = indent_level * '  ' + '<DataSet timestep="{}" group="" ' \
+                'part="0" file="{}"/>\n'.format(t, fname)
+            f.write(s)
+        indent_level = end_tag(f, '</Collection>', indent_level)
+        end_tag(f, '</VTKFile>', indent_level)
+        f.close()
+        return pvd_filename
+
+    def _get_geometry(self, shared_vertex, ibound_filter):
+        """
+        Build (or return the previously built) points, connectivity,
+        offsets, and cell types for the model grid.
+
+        """
+        key = (shared_vertex, ibound_filter)
+        if key in self._geometry:
+            return self._geometry[key]
 
-        # calculate number of active cells
-        nlay, nrow, ncol = self.shape
-        ncells = nlay * nrow * ncol
         ibound = None
         if ibound_filter:
             assert self.model.bas6, 'Cannot find basic (BAS6) package ' \
                 'and ibound_filter is set to True.'
             ibound = self.model.bas6.ibound.array
-            ncells = (ibound != 0).sum()
+
+        dis = self.model.dis
+        z = np.vstack([dis.top.array.reshape(1, dis.nrow, dis.ncol),
+                       dis.botm.array])
         if shared_vertex:
-            npoints = (nrow + 1) * (ncol + 1) * (nlay + 1)
+            verts, iverts = dis.sr.get_3d_shared_vertex_connectivity(
+                dis.nlay, z, ibound=ibound, as_array=True,
+                compact=ibound_filter)
         else:
-            npoints = ncells * 8
+            verts, iverts = dis.sr.get_3d_vertex_connectivity(dis.nlay, z,
+                                                              ibound=ibound,
+                                                              as_array=True)
+        npoints, ncells = verts.shape[0], iverts.shape[0]
         if self.verbose:
             s = 'Number of point is {}\n ' \
                 'Number of cells is {}\n'.format(npoints, ncells)
             print(s)
 
+        itype = '<i4'
+        if npoints > np.iinfo(np.int32).max:
+            itype = '<i8'
+        nvert = iverts.shape[1]
+        geom = {'ibound': ibound, 'z': z,
+                'points': verts.astype('<f8'),
+                'connectivity': iverts.astype(itype).ravel(),
+                'offsets': np.arange(nvert, nvert * (ncells + 1), nvert,
+                                     dtype=itype),
+                'types': np.full(ncells, VTK_VOXEL, dtype='|u1')}
+        self._geometry[key] = geom
+        return geom
+
+    @staticmethod
+    def _filter_array(a, ibound):
+        if ibound is None:
+            return a.ravel()
+        return a[ibound != 0]
+
+    def _get_arrays(self, geom):
+        ibound = geom['ibound']
+        arrays = [('top', self._filter_array(geom['z'][0:-1], ibound))]
+        for name, a in self.arrays.items():
+            arrays.append((name, self._filter_array(a, ibound)))
+        return arrays
+
+    def _write_vtu(self, filename, geom, arrays):
+        """
+        Write a vtu file using the geometry and a list of (name, array)
+        cell data tuples
+
+        """
+        npoints = geom['points'].shape[0]
+        ncells = geom['types'].shape[0]
+
+        # the file is written as bytes so that appended raw data can be
+        # written to the same file
+        f = _ByteWriter(open(filename, 'wb'))
+        appended = []
+
         # xml
-        s = '<?xml version="1.0"?>'
-        f.write(s + '\n')
-        indent_level = start_tag(f, '<VTKFile type="UnstructuredGrid">',
-                                 indent_level)
+        f.write('<?xml version="1.0"?>\n')
+        s = '<VTKFile type="UnstructuredGrid" version="1.0" ' \
+            'byte_order="LittleEndian" header_type="UInt64">'
+        indent_level = start_tag(f, s, 0)
 
         # unstructured grid
         indent_level = start_tag(f, '<UnstructuredGrid>', indent_level)
@@ -92,74 +256,24 @@ class Vtk(object):
         indent_level = start_tag(f, s, indent_level)
 
         # points
-        s = '<Points>'
-        indent_level = start_tag(f, s, indent_level)
-
-        s = '<DataArray type="Float64" NumberOfComponents="3">'
-        indent_level = start_tag(f, s, indent_level)
-        dis = self.model.dis
-        z = np.vstack([dis.top.array.reshape(1, dis.nrow, dis.ncol),
-                       dis.botm.array])
-        if shared_vertex:
-            verts, iverts = dis.sr.get_3d_shared_vertex_connectivity(dis.nlay,
-                                                            z, ibound=ibound)
-        else:
-            verts, iverts = dis.sr.get_3d_vertex_connectivity(dis.nlay, z,
-                                                              ibound=ibound)
-
-        for row in verts:
-            s = indent_level * '  ' + '{} {} {} \n'.format(*row)
-            f.write(s)
-        s = '</DataArray>'
-        indent_level = end_tag(f, s, indent_level)
-
-        s = '</Points>'
-        indent_level = end_tag(f, s, indent_level)
+        indent_level = start_tag(f, '<Points>', indent_level)
+        self._write_array(f, indent_level, geom['points'], appended,
+                          ncomp=3)
+        indent_level = end_tag(f, '</Points>', indent_level)
 
         # cells
-        s = '<Cells>'
-        indent_level = start_tag(f, s, indent_level)
-
-        s = '<DataArray type="Int32" Name="connectivity">'
-        indent_level = start_tag(f, s, indent_level)
-        for row in iverts:
-            s = indent_level * '  ' + ' '.join([str(i) for i in row]) + '\n'
-            f.write(s)
-        s = '</DataArray>'
-        indent_level = end_tag(f, s, indent_level)
-
-        s = '<DataArray type="Int32" Name="offsets">'
-        indent_level = start_tag(f, s, indent_level)
-        icount = 0
-        for row in iverts:
-            icount += len(row)
-            s = indent_level * '  ' + '{} \n'.format(icount)
-            f.write(s)
-        s = '</DataArray>'
-        indent_level = end_tag(f, s, indent_level)
-
-        s = '<DataArray type="UInt8" Name="types">'
-        indent_level = start_tag(f, s, indent_level)
-        for row in iverts:
-            s = indent_level * '  ' + '{} \n'.format(11)
-            f.write(s)
-        s = '</DataArray>'
-        indent_level = end_tag(f, s, indent_level)
-
-        s = '</Cells>'
-        indent_level = end_tag(f, s, indent_level)
+        indent_level = start_tag(f, '<Cells>', indent_level)
+        for name in ('connectivity', 'offsets', 'types'):
+            self._write_array(f, indent_level, geom[name], appended,
+                              name=name)
+        indent_level = end_tag(f, '</Cells>', indent_level)
 
         # add cell data
         s = '<CellData Scalars="scalars">'
         indent_level = start_tag(f, s, indent_level)
-
-        self._write_data_array(f, indent_level, 'top', z[0:-1], ibound)
-
-        for name, a in self.arrays.items():
-            self._write_data_array(f, indent_level, name, a, ibound)
-
-        s = '</CellData>'
-        indent_level = end_tag(f, s, indent_level)
+        for name, a in arrays:
+            self._write_data_array(f, indent_level, name, a, appended)
+        indent_level = end_tag(f, '</CellData>', indent_level)
 
         # end piece
         indent_level = end_tag(f, '</Piece>', indent_level)
@@ -167,6 +281,17 @@ class Vtk(object):
         # end unstructured grid
         indent_level = end_tag(f, '</UnstructuredGrid>', indent_level)
 
+        # appended raw data
+        if self.fmt == 'appended':
+            indent_level = start_tag(f, '<AppendedData encoding="raw">',
+                                     indent_level)
+            f.write(indent_level * '  ' + '_')
+            for a in appended:
+                f.write_bytes(np.array([a.nbytes], dtype='<u8').tobytes())
+                f.write_bytes(a.tobytes())
+            f.write('\n')
+            indent_level = end_tag(f, '</AppendedData>', indent_level)
+
         # end xml
         indent_level = end_tag(f, '</VTKFile>', indent_level)
 
@@ -174,36 +299,84 @@ class Vtk(object):
         f.close()
         return
 
-    def _write_data_array(self, f, indent_level, name, a, ibound):
+    def _write_data_array(self, f, indent_level, name, a, appended):
         """
         Write a numpy array to the vtk file
 
         """
+        self._write_array(f, indent_level, np.asarray(a, dtype='<f8'),
+                          appended, name=name)
+        return
 
-        # header tag
-        s = '<DataArray type="Float64" Name="{}" format="ascii">'.format(name)
-        indent_level = start_tag(f, s, indent_level)
+    def _write_array(self, f, indent_level, a, appended, name=None,
+                     ncomp=None):
+        """
+        Write a DataArray element using the format of the vtk file
 
-        # data
-        nlay = a.shape[0]
-        for k in range(nlay):
-            s = indent_level * '  '
-            f.write(s)
-            if ibound is None:
-                ak = a[k].flatten()
-            else:
-                idx = (ibound[k] != 0)
-                ak = a[k][idx].flatten()
-            for v in ak:
-                s = ' {}'.format(v)
-                f.write(s)
+        """
+        s = '<DataArray type="{}"'.format(VTK_TYPES[a.dtype.str])
+        if name is not None:
+            s += ' Name="{}"'.format(name)
+        if ncomp is not None:
+            s += ' NumberOfComponents="{}"'.format(ncomp)
+        a = np.ascontiguousarray(a)
+
+        if self.fmt == 'appended':
+            offset = sum([8 + b.nbytes for b in appended])
+            s += ' format="appended" offset="{}"/>'.format(offset)
+            f.write(indent_level * '  ' + s + '\n')
+            appended.append(a)
+            return
+
+        s += ' format="{}">'.format(self.fmt)
+        indent_level = start_tag(f, s, indent_level)
+        if self.fmt == 'binary':
+            header = np.array([a.nbytes], dtype='<u8').tobytes()
+            f.write(indent_level * '  ')
+            f.write_bytes(base64.b64encode(header + a.tobytes()))
             f.write('\n')
-
-        # ending tag
-        s = '</DataArray>'
-        indent_level = end_tag(f, s, indent_level)
+        else:
+            _write_ascii(f, indent_level, a.reshape(a.shape[0], -1))
+        end_tag(f, '</DataArray>', indent_level)
         return
 
+
+class _ByteWriter(object):
+    """
+    Minimal wrapper that encodes strings written to a binary file
+
+    """
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, s):
+        self.f.write(s.encode('ascii'))
+
+    def write_bytes(self, b):
+        self.f.write(b)
+
+    def close(self):
+        self.f.close()
+
+
+def _write_ascii(f, indent_level, a, nrows=10000):
+    """
+    Write a two-dimensional array to a file with one row per line in blocks
+    of nrows rows
+
+    """
+    ncol = a.shape[1]
+    if a.dtype.kind == 'f':
+        a = a.astype(np.float64)
+    else:
+        a = a.astype(np.int64)
+    for i0 in range(0, a.shape[0], nrows):
+        block = a[i0:i0 + nrows]
+        fmt = indent_level * '  ' + ' '.join(ncol * ['{}']) + '\n'
+        f.write((block.shape[0] * fmt).format(*block.ravel().tolist()))
+    return
+
+
 if __name__ == '__main__':
     import flopy
     import numpy as np
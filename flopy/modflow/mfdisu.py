@@ -389,15 +389,24 @@ class ModflowDisU(Package):
         vol : array of floats (nodes)
 
         """
-        vol = np.empty((self.nodes))
-        for n in range(self.nodes):
-            nn = n
-            if self.ivsd == -1:
-                nn = n % self.nodelay[0]
-            area = self.area[nn]
-            vol[n] = area * (self.top[n] - self.bot[n])
+        area = self.area.array.ravel()
+        if self.ivsd == -1:
+            area = np.tile(area, self.nlay)
+        vol = area * self.thickness.array.ravel()
         return vol
 
+    def get_connectivity(self):
+        """
+        Get the compressed sparse row connectivity of the grid.
+
+        Returns
+        -------
+        con : flopy.utils.Connectivity
+
+        """
+        from ..utils.connectivity import Connectivity
+        return Connectivity.from_disu(self)
+
     @property
     def zcentroids(self):
         """
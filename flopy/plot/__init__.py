@@ -23,3 +23,4 @@
 from .plotutil import SwiConcentration, plot_shapefile, shapefile_extents
 from .map import ModelMap
 from .crosssection import ModelCrossSection
+from .animation import ModelAnimation
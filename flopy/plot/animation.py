@@ -0,0 +1,422 @@
+"""
+Animation of transient model arrays, like heads and concentrations, on a
+map of the model.
+
+"""
+import os
+import time
+from collections import deque
+import numpy as np
+from .map import ModelMap
+from ..utils.datafile import LayerFile
+
+
+def _iter_frames(frames, totims=None, layer=0):
+    """
+    Generator of (totim, array) tuples for a LayerFile or an iterable of
+    arrays or (totim, array) tuples
+
+    """
+    if isinstance(frames, LayerFile):
+        for totim, a in frames.iter_data(totims=totims, mflay=layer):
+            yield totim, a
+        return
+    if totims is not None:
+        frames = zip(totims, frames)
+    for frame in frames:
+        if isinstance(frame, tuple):
+            yield frame
+        else:
+            yield None, frame
+
+
+class ModelAnimation(object):
+    """
+    Animation of a transient array on a map of the model. The figure, the
+    mesh of the grid, and the color map are created for the first frame and
+    only the data of the mesh are updated for the following frames. The
+    figure is not a pyplot figure, so the frames can be rendered without a
+    display.
+
+    Parameters
+    ----------
+    model : flopy.modflow.Modflow object
+        (default is None)
+    sr : flopy.utils.reference.SpatialReference
+        The spatial reference class (default is None, which uses the spatial
+        reference of the model)
+    layer : int
+        zero-based layer that is animated (default is 0)
+    figsize : tuple of floats
+        size of the figure in inches (default is None, which is the
+        matplotlib default)
+    dpi : float
+        resolution of the frames in dots per inch (default is None, which is
+        the matplotlib default)
+    masked_values : iterable of floats
+        values that are not plotted (default is None)
+    title : str
+        format string for the title of each frame, that can use the totim
+        and frame fields, for example 'head at {totim:g} days'
+        (default is None, which does not add a title)
+    colorbar : bool or str
+        Boolean used to determine if a color bar will be added to the
+        figure. A string is used as the label of the color bar.
+        (default is False)
+    grid : bool
+        Boolean used to determine if the model grid will be plotted on the
+        figure. (default is False)
+    **kwargs : dictionary
+        keyword arguments passed to ModelMap.plot_array, for example cmap,
+        vmin and vmax. If vmin and vmax are not specified, the color limits
+        are set using the first frame.
+
+    Attributes
+    ----------
+    fig : matplotlib.figure.Figure
+    ax : matplotlib.axes.Axes
+    mm : flopy.plot.ModelMap
+    quadmesh : matplotlib.collections.QuadMesh
+        mesh that is updated for each frame
+
+    Notes
+    -----
+    Frames can be a LayerFile, like a HeadFile or UcnFile, or an iterable of
+    arrays or (totim, array) tuples. The data of a LayerFile are read one
+    time and layer at a time. Frames can only be rendered by more than one
+    process (nprocs > 1) for a LayerFile, because each process reads its own
+    frames from the file. Scripts that use nprocs > 1 need to be protected
+    by if __name__ == '__main__'.
+
+    Examples
+    --------
+    >>> import flopy
+    >>> ml = flopy.modflow.Modflow.load('test.nam')
+    >>> hds = flopy.utils.HeadFile('test.hds')
+    >>> anim = flopy.plot.ModelAnimation(model=ml, layer=0, vmin=0.,
+    ...                                  vmax=10., title='{totim:g} days')
+    >>> filenames = anim.save_frames(hds, 'frames/head', nprocs=4)
+    >>> anim.save(hds, 'head.mp4', fps=24)
+
+    """
+
+    def __init__(self, model=None, sr=None, layer=0, figsize=None, dpi=None,
+                 masked_values=None, title=None, colorbar=False, grid=False,
+                 **kwargs):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(1, 1, 1, aspect='equal')
+        self.mm = ModelMap(model=model, sr=sr, ax=self.ax, layer=layer)
+        self.layer = layer
+        self.masked_values = masked_values
+        self.title = title
+        self.colorbar = colorbar
+        self.grid = grid
+        self.kwargs = kwargs
+        self.quadmesh = None
+
+    def _get_init_kwargs(self):
+        """
+        Arguments to create the same animation in a worker process
+        """
+        kwargs = dict(self.kwargs)
+        kwargs.update(sr=self.mm.sr, layer=self.layer,
+                      figsize=tuple(self.fig.get_size_inches()),
+                      dpi=self.fig.dpi, masked_values=self.masked_values,
+                      title=self.title, colorbar=self.colorbar,
+                      grid=self.grid)
+        return kwargs
+
+    def _get_plotarray(self, a):
+        a = np.asanyarray(a)
+        if a.ndim == 3:
+            a = a[self.layer]
+        a = np.ma.masked_invalid(a)
+        if self.masked_values is not None:
+            for mval in self.masked_values:
+                a = np.ma.masked_equal(a, mval)
+        return a
+
+    def update(self, a, totim=None, frame=None):
+        """
+        Draw the data of a frame. The mesh is created for the first frame.
+
+        Parameters
+        ----------
+        a : numpy.ndarray
+            array for the frame. If the array is three-dimensional, then
+            the layer of the animation is plotted.
+        totim : float
+            simulation time of the frame, used for the title
+            (default is None)
+        frame : int
+            frame number, used for the title (default is None)
+
+        Returns
+        -------
+        quadmesh : matplotlib.collections.QuadMesh
+
+        """
+        plotarray = self._get_plotarray(a)
+        if self.quadmesh is None:
+            self.quadmesh = self.mm.plot_array(plotarray, ax=self.ax,
+                                               **self.kwargs)
+            # keep the color limits of the first frame for all frames
+            vmin, vmax = self.quadmesh.get_clim()
+            self.kwargs.update(vmin=vmin, vmax=vmax)
+            if self.colorbar:
+                label = ''
+                if not isinstance(self.colorbar, bool):
+                    label = str(self.colorbar)
+                self.fig.colorbar(self.quadmesh, ax=self.ax, shrink=0.5,
+                                  label=label)
+            if self.grid:
+                self.mm.plot_grid(ax=self.ax)
+        else:
+            shape = self.quadmesh.get_array().shape
+            self.quadmesh.set_array(plotarray.reshape(shape))
+        if self.title is not None:
+            self.ax.set_title(self.title.format(totim=totim, frame=frame))
+        return self.quadmesh
+
+    def iter_frames(self, frames, totims=None):
+        """
+        Generator that draws each frame
+
+        Parameters
+        ----------
+        frames : LayerFile or iterable
+            LayerFile, or iterable of arrays or (totim, array) tuples
+        totims : list of floats
+            simulation times of the frames (default is None, which is all of
+            the times in a LayerFile)
+
+        Returns
+        -------
+        out : generator of (frame, totim) tuples
+            the figure is updated for the frame when it is yielded
+
+        """
+        for iframe, (totim, a) in enumerate(_iter_frames(frames, totims,
+                                                         self.layer)):
+            self.update(a, totim=totim, frame=iframe)
+            yield iframe, totim
+
+    def get_rgba(self):
+        """
+        Render the figure and return the pixels
+
+        Returns
+        -------
+        rgba : numpy.ndarray
+            (height, width, 4) array of unsigned 8-bit integers
+
+        """
+        canvas = self.fig.canvas
+        canvas.draw()
+        width, height = canvas.get_width_height()
+        rgba = np.frombuffer(canvas.buffer_rgba(), dtype=np.uint8)
+        return rgba.reshape(height, width, 4).copy()
+
+    def save_frames(self, frames, filename_base, totims=None, fext='png',
+                    nprocs=None):
+        """
+        Save each frame to a separate image file.
+
+        Parameters
+        ----------
+        frames : LayerFile or iterable
+            LayerFile, or iterable of arrays or (totim, array) tuples
+        filename_base : str
+            base of the file names. The frame number and the extension are
+            added, for example filename_base_00000.png
+        totims : list of floats
+            simulation times of the frames (default is None, which is all of
+            the times in a LayerFile)
+        fext : str
+            file extension and image format (default is 'png')
+        nprocs : int
+            number of processes used to render the frames of a LayerFile
+            (default is None, which renders the frames in this process)
+
+        Returns
+        -------
+        filenames : list of str
+
+        """
+        dirname = os.path.dirname(filename_base)
+        if dirname != '' and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        task = ('file', filename_base, fext)
+        filenames = []
+        for result in self._map_frames(frames, totims, nprocs, task):
+            filenames += result
+        return filenames
+
+    def save(self, frames, filename, writer='ffmpeg', fps=10, totims=None,
+             nprocs=None, **kwargs):
+        """
+        Save the frames to a movie using a matplotlib movie writer.
+
+        Parameters
+        ----------
+        frames : LayerFile or iterable
+            LayerFile, or iterable of arrays or (totim, array) tuples
+        filename : str
+            name of the movie file
+        writer : str or matplotlib.animation.MovieWriter
+            name of a writer in matplotlib.animation.writers, or a writer
+            object (default is 'ffmpeg')
+        fps : float
+            frames per second, only used if writer is a str (default is 10)
+        totims : list of floats
+            simulation times of the frames (default is None, which is all of
+            the times in a LayerFile)
+        nprocs : int
+            number of processes used to render the frames of a LayerFile.
+            The frames are written to the movie in order by this process.
+            (default is None, which renders the frames in this process)
+        **kwargs : dictionary
+            keyword arguments passed to the writer if writer is a str,
+            for example codec, bitrate and metadata
+
+        Returns
+        -------
+        nframes : int
+            number of frames written
+
+        """
+        if isinstance(writer, str):
+            from matplotlib import animation
+            writer = animation.writers[writer](fps=fps, **kwargs)
+
+        if nprocs is None or nprocs <= 1:
+            fig = self.fig
+            task = ('draw',)
+        else:
+            # frames rendered by the worker processes are drawn as an image
+            # on a figure with the same size and resolution
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            fig = Figure(figsize=self.fig.get_size_inches(),
+                         dpi=self.fig.dpi)
+            FigureCanvasAgg(fig)
+            task = ('rgba',)
+
+        nframes = 0
+        image = None
+        try:
+            for result in self._map_frames(frames, totims, nprocs, task):
+                for rgba in result:
+                    if nframes == 0:
+                        writer.setup(fig, filename, dpi=fig.dpi)
+                    if rgba is not None:
+                        if image is None:
+                            image = fig.figimage(rgba, origin='upper')
+                        else:
+                            image.set_data(rgba)
+                    writer.grab_frame()
+                    nframes += 1
+        finally:
+            if nframes > 0:
+                writer.finish()
+        return nframes
+
+    def _iter_results(self, frames, totims, task, start=0):
+        """
+        Generator that draws each frame and returns the result of a task.
+        The task is ('file', filename_base, fext) to save the frames to
+        files, ('rgba',) to return the pixels, or ('draw',) to only draw.
+
+        """
+        for i, (totim, a) in enumerate(_iter_frames(frames, totims,
+                                                    self.layer)):
+            iframe = start + i
+            self.update(a, totim=totim, frame=iframe)
+            if task[0] == 'file':
+                fname = '{}_{:05d}.{}'.format(task[1], iframe, task[2])
+                self.fig.savefig(fname, dpi=self.fig.dpi, format=task[2])
+                yield fname
+            elif task[0] == 'rgba':
+                yield self.get_rgba()
+            else:
+                yield None
+
+    def _map_frames(self, frames, totims, nprocs, task):
+        """
+        Generator of the results of a task for chunks of frames, in the
+        order of the frames
+
+        """
+        if nprocs is None or nprocs <= 1:
+            for result in self._iter_results(frames, totims, task):
+                yield [result]
+            return
+
+        if not isinstance(frames, LayerFile):
+            raise Exception('frames must be a LayerFile if nprocs > 1')
+        if totims is None:
+            totims = frames.get_times()
+        totims = list(totims)
+        if len(totims) == 0:
+            return
+        # the first frame sets the color limits used by all of the workers
+        if self.quadmesh is None:
+            for totim, a in frames.iter_data(totims=totims[:1],
+                                             mflay=self.layer):
+                self.update(a, totim=totim, frame=0)
+
+        fileargs = (type(frames), frames.filename,
+                    {'text': frames.text.decode(),
+                     'precision': frames.precision})
+        initargs = (fileargs, self._get_init_kwargs())
+        # small chunks keep the order and the memory of the rgba frames
+        # that are not written yet in check
+        chunksize = max(1, min(16, len(totims) // (4 * nprocs)))
+        chunks = [(i, totims[i:i + chunksize])
+                  for i in range(0, len(totims), chunksize)]
+
+        import multiprocessing
+        if hasattr(multiprocessing, 'get_context'):
+            ctx = multiprocessing.get_context('spawn')
+        else:
+            ctx = multiprocessing
+        pool = ctx.Pool(processes=nprocs, initializer=_init_worker,
+                        initargs=initargs)
+        try:
+            pending = deque()
+            ichunk = 0
+            while ichunk < len(chunks) or len(pending) > 0:
+                while ichunk < len(chunks) and len(pending) < 2 * nprocs:
+                    i0, chunk = chunks[ichunk]
+                    pending.append(pool.apply_async(_render_chunk,
+                                                    (i0, chunk, task)))
+                    ichunk += 1
+                r = pending[0]
+                if not r.ready():
+                    time.sleep(0.01)
+                    continue
+                pending.popleft()
+                yield r.get()
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+# animation and file of a worker process
+_worker = {}
+
+
+def _init_worker(fileargs, kwargs):
+    cls, filename, filekwargs = fileargs
+    _worker['file'] = cls(filename, **filekwargs)
+    _worker['animation'] = ModelAnimation(**kwargs)
+
+
+def _render_chunk(start, totims, task):
+    anim = _worker['animation']
+    return list(anim._iter_results(_worker['file'], totims, task,
+                                   start=start))
@@ -133,10 +133,15 @@ class ModelCrossSection(object):
             raise Exception(s)           
         
         # set horizontal distance
-        d = []
-        for v in self.xpts:
-            d.append(v[2])
-        self.d = np.array(d)
+        self.d = self.xpts[:, 2].copy()
+
+        # find the cells containing the points along the line once, so that
+        # the values of any array can be sampled by indexing
+        irow, jcol = plotutil.findrowcolumns(self.xpts[:, 0], self.xpts[:, 1],
+                                             self.sr.xedge, self.sr.yedge)
+        idx = irow >= 0
+        self._irow, self._jcol = irow[idx], jcol[idx]
+        self._cell_verts = None
 
         self.ncb = 0
         self.laycbd = self.dis.laycbd.array
@@ -161,45 +166,18 @@ class ModelCrossSection(object):
         self.layer0 = 0
         self.layer1 = self.dis.nlay + self.ncb + 1
         
-        zpts = []
-        for k in range(self.layer0, self.layer1):
-            zpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge,
-                                                   self.elev[k, :, :]))
-        self.zpts = np.array(zpts)
-        
-        xcentergrid = []
-        zcentergrid = []
-        nz = 0
+        self.zpts = self._cell_values(self.elev[self.layer0:self.layer1])
+
+        # the points along the line are the left and right side of each cell
+        i = np.arange(0, self.xpts.shape[0] - 1, 2)
+        xcenter = 0.5 * (self.d[i] + self.d[i + 1])
         if self.dis.nlay == 1:
-            for k in range(0, self.zpts.shape[0]):
-                nz += 1
-                nx = 0
-                for i in range(0, self.xpts.shape[0], 2):
-                    try:
-                        xp = 0.5 * (self.xpts[i][2] + self.xpts[i+1][2])
-                        zp = self.zpts[k, i]
-                        xcentergrid.append(xp)
-                        zcentergrid.append(zp)
-                        nx += 1
-                    except:
-                        break
+            self.zcentergrid = self.zpts[:, i]
         else:
-            for k in range(0, self.zpts.shape[0]-1):
-                nz += 1
-                nx = 0
-                for i in range(0, self.xpts.shape[0], 2):
-                    try:
-                        xp = 0.5 * (self.xpts[i][2] + self.xpts[i+1][2])
-                        zp = 0.5 * (self.zpts[k, i] + self.zpts[k+1, i+1])
-                        xcentergrid.append(xp)
-                        zcentergrid.append(zp)
-                        nx += 1
-                    except:
-                        break
-        self.xcentergrid = np.array(xcentergrid).reshape((nz, nx))
-        self.zcentergrid = np.array(zcentergrid).reshape((nz, nx))
-        
+            self.zcentergrid = 0.5 * (self.zpts[:-1, i] +
+                                      self.zpts[1:, i + 1])
+        self.xcentergrid = np.tile(xcenter, (self.zcentergrid.shape[0], 1))
+
         # Create cross-section extent
         if extent is None:
             self.extent = self.get_extent()
@@ -239,18 +217,7 @@ class ModelCrossSection(object):
         else:
             ax = self.ax
 
-        vpts = []
-        for k in range(self.dis.nlay):
-            vpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge,
-                                                   a[k, :, :]))
-            if self.laycbd[k] > 0:
-                ta = np.empty((self.dis.nrow, self.dis.ncol), dtype=np.float)
-                ta[:, :] = -1e9
-                vpts.append(plotutil.cell_value_points(self.xpts,
-                                                       self.sr.xedge,
-                                                       self.sr.yedge, ta))
-        vpts = np.array(vpts)
+        vpts = self._layer_values(a, -1e9)
         if masked_values is not None:
             for mval in masked_values:
                 vpts = np.ma.masked_equal(vpts, mval)
@@ -296,7 +263,6 @@ class ModelCrossSection(object):
 
         plotarray = a
 
-        vpts = []
         if len(plotarray.shape) == 2:
             nlay = 1
             plotarray = np.reshape(plotarray, (1, plotarray.shape[0], plotarray.shape[1]))
@@ -304,12 +270,8 @@ class ModelCrossSection(object):
             nlay = plotarray.shape[0]
         else:
             raise Exception('plot_array array must be a 2D or 3D array')
-        for k in range(nlay):
-            vpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge,
-                                                   plotarray[k, :, :]))
-        vpts = np.array(vpts)
-        
+        vpts = self._cell_values(plotarray)
+
         if masked_values is not None:
             for mval in masked_values:
                 vpts = np.ma.masked_equal(vpts, mval)
@@ -350,25 +312,17 @@ class ModelCrossSection(object):
 
         plotarray = a
 
-        vpts = []
-        for k in range(self.dis.nlay):
-            #print('k', k, self.laycbd[k])
-            vpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge,
-                                                   plotarray[k, :, :]))
-            if self.laycbd[k] > 0:
-                ta = np.empty((self.dis.nrow, self.dis.ncol), dtype=np.float)
-                ta[:, :] = self.dis.botm.array[k, :, :]
-                vpts.append(plotutil.cell_value_points(self.xpts,
-                                                       self.sr.xedge,
-                                                       self.sr.yedge, ta))
-
+        kcbd = np.nonzero(self.laycbd > 0)[0]
+        vpts = self._layer_values(plotarray, self.dis.botm.array[kcbd])
         vpts = np.ma.array(vpts, mask=False)
 
+        # the elevations are modified below, so work on copies
         if isinstance(head, np.ndarray):
             zpts = self.set_zpts(head)
+            zbot = self.zpts.copy()
         else:
-            zpts = self.zpts
+            zpts = self.zpts.copy()
+            zbot = zpts
 
         if masked_values is not None:
             for mval in masked_values:
@@ -403,7 +357,7 @@ class ModelCrossSection(object):
             plot.append(ax.fill_between(self.d, y1=y1, y2=y2,
                                         color=colors[0], **kwargs))
             y1 = y2
-            y2 = self.zpts[k+1, :]
+            y2 = zbot[k+1, :]
             y2[idxmk] = np.nan
             plot.append(ax.fill_between(self.d, y1=y1, y2=y2,
                                         color=colors[1], **kwargs))
@@ -433,12 +387,7 @@ class ModelCrossSection(object):
         """
         plotarray = a
 
-        vpts = []
-        for k in range(self.dis.nlay):
-            vpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge,
-                                                   plotarray[k, :, :]))
-        vpts = np.array(vpts)
+        vpts = self._cell_values(plotarray[:self.dis.nlay])
         vpts = vpts[:, ::2]
         if self.dis.nlay == 1:
             vpts = np.vstack((vpts, vpts))
@@ -579,8 +528,8 @@ class ModelCrossSection(object):
 
         # Plot the list locations
         plotarray = np.zeros(self.dis.botm.shape, dtype=np.int)
-        idx = [mflist['k'], mflist['i'], mflist['j']]
-        plotarray[idx] = 1
+        nodes = p.stress_period_data.get_cell_indices(kper)[0]
+        plotarray.flat[nodes] = 1
         plotarray = np.ma.masked_equal(plotarray, 0)
         if color is None:
             if ftype in bc_color_dict:
@@ -690,36 +639,17 @@ class ModelCrossSection(object):
             zcentergrid = self.zcentergrid
         
         if nlay == 1:
-            x = []
-            z = []
-            for k in range(nlay):
-                for i in range(self.xcentergrid.shape[1]):
-                    x.append(self.xcentergrid[k, i])
-                    z.append(0.5 * (zcentergrid[k, i] + zcentergrid[k+1, i]))
-            x = np.array(x).reshape((1, self.xcentergrid.shape[1]))
-            z = np.array(z).reshape((1, self.xcentergrid.shape[1]))
+            x = self.xcentergrid[0:1, :].copy()
+            z = 0.5 * (zcentergrid[0:1, :] + zcentergrid[1:2, :])
         else:
             x = self.xcentergrid
             z = zcentergrid
-            
-        upts = []
-        u2pts = []
-        vpts = []
-        ibpts = []
-        for k in range(self.dis.nlay):
-            upts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge, u[k, :, :]))
-            u2pts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                    self.sr.yedge, u2[k, :, :]))
-            vpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge, v[k, :, :]))
-            ibpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                    self.sr.yedge, ib[k, :, :]))
-        # convert upts, u2pts, and vpts to numpy arrays
-        upts = np.array(upts)
-        u2pts = np.array(u2pts)
-        vpts = np.array(vpts)
-        ibpts = np.array(ibpts)
+
+        nlay = self.dis.nlay
+        upts = self._cell_values(u[:nlay])
+        u2pts = self._cell_values(u2[:nlay])
+        vpts = self._cell_values(v[:nlay])
+        ibpts = self._cell_values(ib[:nlay])
 
         # Select correct slice and apply step
         x = x[::kstep, ::hstep]
@@ -760,7 +690,7 @@ class ModelCrossSection(object):
 
     def get_grid_patch_collection(self, zpts, plotarray, **kwargs):
         """
-        Get a PatchCollection of plotarray in unmasked cells
+        Get a PolyCollection of plotarray in unmasked cells
 
         Parameters
         ----------
@@ -771,16 +701,14 @@ class ModelCrossSection(object):
         plotarray : numpy.ndarray
             Three-dimensional array to attach to the Patch Collection.
         **kwargs : dictionary
-            keyword arguments passed to matplotlib.collections.PatchCollection
+            keyword arguments passed to matplotlib.collections.PolyCollection
 
         Returns
         -------
-        patches : matplotlib.collections.PatchCollection
+        patches : matplotlib.collections.PolyCollection
 
         """
-        from matplotlib.patches import Polygon
-        from matplotlib.collections import PatchCollection
-        rectcol = []
+        from matplotlib.collections import PolyCollection
 
         if 'vmin' in kwargs:
             vmin = kwargs.pop('vmin')
@@ -791,33 +719,19 @@ class ModelCrossSection(object):
         else:
             vmax = None
 
-        v = []
-        
-        colors = []
-        for k in range(zpts.shape[0]-1):
-            for idx in range(0, len(self.xpts)-1, 2):
-                try:
-                    ll = ((self.xpts[idx][2], zpts[k+1, idx]))
-                    try:
-                        dx = self.xpts[idx+2][2] - self.xpts[idx][2]
-                    except:
-                        dx = self.xpts[idx+1][2] - self.xpts[idx][2]
-                    dz = zpts[k, idx] - zpts[k+1, idx]
-                    pts = (ll, 
-                          (ll[0], ll[1]+dz), (ll[0]+dx, ll[1]+dz),
-                          (ll[0]+dx, ll[1])) #, ll) 
-                    if np.isnan(plotarray[k, idx]):
-                        continue
-                    if plotarray[k, idx] is np.ma.masked:
-                        continue
-                    rectcol.append(Polygon(pts, closed=True))
-                    colors.append(plotarray[k, idx])
-                except:
-                    pass
-
-        if len(rectcol) > 0:
-            patches = PatchCollection(rectcol, **kwargs)
-            patches.set_array(np.array(colors))
+        verts = self.get_cell_vertices(zpts)
+        nz = min(verts.shape[0], plotarray.shape[0])
+        verts = verts[:nz]
+        idx = np.arange(0, self.xpts.shape[0] - 1, 2)
+        values = plotarray[:nz, idx]
+        skip = np.ma.getmaskarray(values)
+        if values.dtype.kind == 'f':
+            skip = skip | np.isnan(np.ma.getdata(values))
+        keep = ~skip
+
+        if keep.any():
+            patches = PolyCollection(verts[keep], closed=True, **kwargs)
+            patches.set_array(np.array(np.ma.getdata(values)[keep]))
             patches.set_clim(vmin, vmax)
         else:
             patches = None
@@ -838,28 +752,58 @@ class ModelCrossSection(object):
         """
         from matplotlib.collections import LineCollection
 
-        linecol = []
-        for k in range(self.zpts.shape[0]-1):
-            for idx in range(0, len(self.xpts)-1, 2):
-                try:
-                    ll = ((self.xpts[idx][2], self.zpts[k+1, idx]))
-                    try:
-                        dx = self.xpts[idx+2][2] - self.xpts[idx][2]
-                    except:
-                        dx = self.xpts[idx+1][2] - self.xpts[idx][2]
-                    dz = self.zpts[k, idx] - self.zpts[k+1, idx]
-                    # horizontal lines
-                    linecol.append(((ll), (ll[0]+dx, ll[1])))
-                    linecol.append(((ll[0], ll[1]+dz), (ll[0]+dx, ll[1]+dz)))
-                    #vertical lines
-                    linecol.append(((ll), (ll[0], ll[1]+dz)))
-                    linecol.append(((ll[0]+dx, ll[1]), (ll[0]+dx, ll[1]+dz)))
-                except:
-                    pass
-
-        linecollection = LineCollection(linecol, **kwargs)
+        # the bottom, top, left, and right side of each cell
+        verts = self.get_cell_vertices()
+        segments = verts[:, :, [[0, 3], [1, 2], [0, 1], [3, 2]], :]
+        linecollection = LineCollection(segments.reshape(-1, 2, 2), **kwargs)
         return linecollection
-        
+
+    def get_cell_vertices(self, zpts=None):
+        """
+        Get the vertices of the cells in the cross-section. The vertices of
+        the cross-section elevations (self.zpts) are only calculated once.
+
+        Parameters
+        ----------
+        zpts : numpy.ndarray
+            array of z elevations that correspond to the x, y, and horizontal
+            distance along the cross-section (self.xpts). (default is None,
+            which uses self.zpts)
+
+        Returns
+        -------
+        verts : numpy.ndarray
+            Array of shape (nz, ncell, 4, 2) with the horizontal distance and
+            elevation of the lower left, upper left, upper right, and lower
+            right corner of each cell, where nz is one less than the number of
+            elevations in zpts and ncell is the number of cells along the
+            cross-section.
+
+        """
+        if zpts is None:
+            zpts = self.zpts
+        cache = zpts is self.zpts
+        if cache and self._cell_verts is not None:
+            return self._cell_verts
+
+        # each cell extends from its left side to the left side of the
+        # next cell
+        npts = self.xpts.shape[0]
+        idx = np.arange(0, npts - 1, 2)
+        x0 = self.d[idx]
+        dx = self.d[np.minimum(idx + 2, npts - 1)] - x0
+        x1 = np.broadcast_to(x0 + dx, (zpts.shape[0] - 1, idx.shape[0]))
+        x0 = np.broadcast_to(x0, x1.shape)
+        z0 = zpts[1:, idx]
+        z1 = z0 + (zpts[:-1, idx] - z0)
+        verts = np.stack((np.stack((x0, z0), axis=-1),
+                          np.stack((x0, z1), axis=-1),
+                          np.stack((x1, z1), axis=-1),
+                          np.stack((x1, z0), axis=-1)), axis=2)
+        if cache:
+            self._cell_verts = verts
+        return verts
+
     def set_zpts(self, vs):
         """
         Get an array of z elevations based on minimum of cell elevation
@@ -875,16 +819,12 @@ class ModelCrossSection(object):
         zpts : numpy.ndarray
 
         """
-        zpts = []
-        for k in range(self.layer0, self.layer1):
-            e = self.elev[k, :, :]
-            if k < self.dis.nlay:
-                v = vs[k, :, :]
-                idx =  v < e
-                e[idx] = v[idx] 
-            zpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge, e))
-        return np.array(zpts)
+        e = self.elev[self.layer0:self.layer1].copy()
+        nlay = self.dis.nlay
+        v = vs[:nlay]
+        idx = v < e[:nlay]
+        e[:nlay][idx] = v[idx]
+        return self._cell_values(e)
         
     def set_zcentergrid(self, vs):
         """
@@ -901,43 +841,51 @@ class ModelCrossSection(object):
         zcentergrid : numpy.ndarray
 
         """
-        vpts = []
-        for k in range(self.layer0, self.layer1):
-            if k < self.dis.nlay:
-                e = vs[k, :, :]
-            else:
-                e = self.elev[k, :, :]
-            vpts.append(plotutil.cell_value_points(self.xpts, self.sr.xedge,
-                                                   self.sr.yedge, e))
-        vpts = np.array(vpts)
+        nlay = self.dis.nlay
+        e = np.vstack((vs[:nlay], self.elev[nlay:self.layer1]))
+        vpts = self._cell_values(e)
 
-        zcentergrid = []
-        nz = 0
-        if self.dis.nlay == 1:
-            for k in range(0, self.zpts.shape[0]):
-                nz += 1
-                nx = 0
-                for i in range(0, self.xpts.shape[0], 2):
-                    nx += 1
-                    vp = vpts[k, i]
-                    zp = self.zpts[k, i]
-                    if k == 0:
-                        if vp < zp:
-                            zp = vp
-                    zcentergrid.append(zp)
+        i = np.arange(0, self.xpts.shape[0], 2)
+        vpts = vpts[:, i]
+        zpts = self.zpts[:, i].astype(np.result_type(self.zpts, vpts))
+        if nlay == 1:
+            zcentergrid = zpts
+            idx = vpts[0] < zpts[0]
+            zcentergrid[0, idx] = vpts[0, idx]
         else:
-            for k in range(0, self.zpts.shape[0] - 1):
-                nz += 1
-                nx = 0
-                for i in range(0, self.xpts.shape[0], 2):
-                    nx += 1
-                    vp = vpts[k, i]
-                    ep = self.zpts[k, i]
-                    if vp < ep:
-                        ep = vp
-                    zp = 0.5 * (ep + self.zpts[k+1, i+1])
-                    zcentergrid.append(zp)
-        return np.array(zcentergrid).reshape((nz, nx)) 
+            ep = zpts[:-1]
+            idx = vpts[:-1] < ep
+            ep[idx] = vpts[:-1][idx]
+            zcentergrid = 0.5 * (ep + self.zpts[1:, i + 1])
+        return zcentergrid
+
+    def _cell_values(self, a):
+        """
+        Get the values of a two- or three-dimensional array at the points
+        along the cross-section (self.xpts) that are in the grid.
+
+        """
+        return np.asarray(a)[..., self._irow, self._jcol]
+
+    def _layer_values(self, a, cbd):
+        """
+        Get the values of a three-dimensional array at the points along the
+        cross-section with rows for the quasi-3D confining beds. The
+        confining bed values are cbd, which can be a scalar or an array with
+        a two-dimensional array for each confining bed.
+
+        """
+        vpts = self._cell_values(a[:self.dis.nlay])
+        if self.ncb == 0:
+            return vpts
+        cbd = np.asarray(cbd)
+        if cbd.ndim > 0:
+            cbd = self._cell_values(cbd)
+        dtype = np.result_type(vpts.dtype, cbd.dtype, np.float)
+        values = np.empty((self.active.shape[0], vpts.shape[1]), dtype=dtype)
+        values[self.active == 1] = vpts
+        values[self.active == 0] = cbd
+        return values
 
     def get_extent(self):
         """
@@ -0,0 +1,362 @@
+"""
+Level-of-detail rendering of model arrays on large structured grids.
+
+An array is aggregated to blocks of cells so that only about one value is
+drawn per screen pixel. The aggregated arrays are cached in a pyramid and
+only the part of the grid that is visible in the axis is drawn.
+
+"""
+import numpy as np
+
+
+class ArrayPyramid(object):
+    """
+    Cached pyramid of block aggregated versions of a two-dimensional array.
+    Level f of the pyramid aggregates blocks of f by f cells and is
+    calculated from the full array the first time it is requested.
+
+    Parameters
+    ----------
+    a : numpy.ndarray
+        two-dimensional array, masked values and NaNs are not used
+    method : str
+        aggregation method ('mean', 'max', 'min', or 'mode'). 'mode' is the
+        most frequent value in a block and is intended for integer arrays
+        like ibound or zones. (default is None, which is 'mode' for integer
+        and boolean arrays and 'mean' for other arrays)
+    weights : numpy.ndarray
+        two-dimensional array of weights used by the 'mean' method, for
+        example the cell areas (default is None, which uses equal weights)
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from flopy.plot.lod import ArrayPyramid
+    >>> p = ArrayPyramid(np.random.random((1000, 1000)))
+    >>> a = p.get_level(4)  # 250 by 250 masked array
+
+    """
+
+    methods = ('mean', 'max', 'min', 'mode')
+
+    def __init__(self, a, method=None, weights=None):
+        a = np.ma.asanyarray(a)
+        assert a.ndim == 2, 'ArrayPyramid array must be two-dimensional'
+        data = np.ma.getdata(a)
+        if method is None:
+            if data.dtype.kind in 'iub':
+                method = 'mode'
+            else:
+                method = 'mean'
+        method = method.lower()
+        assert method in self.methods, \
+            'method must be one of {}'.format(', '.join(self.methods))
+        mask = np.ma.getmaskarray(a)
+        if data.dtype.kind == 'f':
+            mask = mask | ~np.isfinite(data)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float)
+            assert weights.shape == a.shape, \
+                'weights must have the same shape as the array'
+
+        self.shape = a.shape
+        self.method = method
+        self.weights = weights
+        self._data = data
+        self._mask = mask
+        self._levels = {1: np.ma.array(data, mask=mask)}
+
+    def get_level(self, f):
+        """
+        Get the array aggregated to blocks of f by f cells
+
+        Parameters
+        ----------
+        f : int
+            block size
+
+        Returns
+        -------
+        a : numpy.ma.MaskedArray
+            array with ceil(nrow / f) rows and ceil(ncol / f) columns.
+            Blocks without values are masked.
+
+        """
+        f = int(f)
+        assert f > 0, 'block size must be greater than zero'
+        if f not in self._levels:
+            self._levels[f] = self._aggregate(f)
+        return self._levels[f]
+
+    def _blocks(self, a, f, fill):
+        """
+        Reshape an array to (nr, nc, f * f) blocks, padding the last rows
+        and columns with fill
+
+        """
+        nrow, ncol = self.shape
+        nr, nc = -(-nrow // f), -(-ncol // f)
+        p = np.empty((nr * f, nc * f), dtype=a.dtype)
+        p.fill(fill)
+        p[:nrow, :ncol] = a
+        return p.reshape(nr, f, nc, f).swapaxes(1, 2).reshape(nr, nc, f * f)
+
+    def _aggregate(self, f):
+        mask = self._blocks(self._mask, f, True)
+        empty = mask.all(axis=-1)
+        if self.method == 'mean':
+            w = self.weights
+            if w is None:
+                w = np.ones(self.shape)
+            w = self._blocks(np.where(self._mask, 0., w), f, 0.)
+            data = self._blocks(np.where(self._mask, 0., self._data), f, 0.)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                v = (data * w).sum(axis=-1) / w.sum(axis=-1)
+        elif self.method in ('max', 'min'):
+            data = np.ma.array(self._blocks(self._data, f, 0), mask=mask)
+            if self.method == 'max':
+                v = data.max(axis=-1)
+            else:
+                v = data.min(axis=-1)
+            v = np.ma.getdata(v)
+        else:
+            v = self._mode(self._blocks(self._data, f, 0), mask)
+        return np.ma.array(v, mask=empty)
+
+    @staticmethod
+    def _mode(data, mask):
+        """
+        Most frequent unmasked value in each block, ties are resolved
+        using the smallest value
+
+        """
+        nr, nc, n = data.shape
+        data = data.reshape(-1, n)
+        mask = mask.reshape(-1, n)
+        # sort the values in each block with the masked values last
+        order = np.lexsort((data, mask), axis=-1)
+        rows = np.arange(data.shape[0])[:, None]
+        data = data[rows, order]
+        valid = ~mask[rows, order]
+
+        best = data[:, 0].copy()
+        bestcnt = valid[:, 0].astype(np.int)
+        cnt = bestcnt.copy()
+        for j in range(1, n):
+            same = valid[:, j] & (data[:, j] == data[:, j - 1])
+            cnt = np.where(same, cnt + 1, valid[:, j].astype(np.int))
+            idx = cnt > bestcnt
+            best[idx] = data[idx, j]
+            bestcnt[idx] = cnt[idx]
+        return best.reshape(nr, nc)
+
+
+class LODArray(object):
+    """
+    Level-of-detail rendering of a two-dimensional array on a structured
+    grid. The array is aggregated to about one value per pixel of the axis,
+    using the axis limits, the axis size, and the figure dpi, and only the
+    part of the grid in the axis limits is drawn. The array is drawn again
+    when the axis limits change, for example when zooming interactively.
+
+    Grids with a constant row and column spacing are drawn as an image
+    (which can be rotated). Other grids are drawn using pcolormesh on the
+    aggregated grid, which creates a new QuadMesh when the limits change.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        axis to draw the array on
+    sr : flopy.utils.reference.SpatialReference
+        spatial reference of the grid
+    a : numpy.ndarray
+        two-dimensional array with the shape (nrow, ncol)
+    method : str
+        aggregation method ('mean', 'max', 'min', or 'mode').
+        See ArrayPyramid. (default is None)
+    **kwargs : dictionary
+        keyword arguments passed to matplotlib.image.AxesImage or
+        matplotlib.pyplot.pcolormesh. If norm is not specified, a norm is
+        created using vmin and vmax, or the range of the full array, so the
+        colors are the same at every level.
+
+    Attributes
+    ----------
+    artist : matplotlib.image.AxesImage or matplotlib.collections.QuadMesh
+        artist that is currently drawn
+    level : int
+        block size of the level that is currently drawn
+    pyramid : ArrayPyramid
+        aggregated arrays
+
+    """
+
+    def __init__(self, ax, sr, a, method=None, **kwargs):
+        import matplotlib.colors
+
+        self.ax = ax
+        self.sr = sr
+        delr = np.asarray(sr.delr, dtype=np.float)
+        delc = np.asarray(sr.delc, dtype=np.float)
+        self.pyramid = ArrayPyramid(a, method=method,
+                                    weights=np.outer(delc, delr))
+        self.uniform = np.allclose(delr, delr[0]) and \
+                       np.allclose(delc, delc[0])
+
+        vmin = kwargs.pop('vmin', None)
+        vmax = kwargs.pop('vmax', None)
+        if kwargs.get('norm') is None:
+            full = self.pyramid.get_level(1)
+            if vmin is None and full.count() > 0:
+                vmin = full.min()
+            if vmax is None and full.count() > 0:
+                vmax = full.max()
+            kwargs['norm'] = matplotlib.colors.Normalize(vmin=vmin,
+                                                         vmax=vmax)
+        self.kwargs = kwargs
+
+        self.artist = None
+        self.level = None
+        self._updating = False
+        self.update()
+
+        # matplotlib keeps weak references to bound methods, the function
+        # keeps this object alive while it is connected to the axis
+        def changed(ax):
+            self.update()
+
+        self._cids = [ax.callbacks.connect('xlim_changed', changed),
+                      ax.callbacks.connect('ylim_changed', changed)]
+
+    def update(self):
+        """
+        Draw the level and part of the array for the current limits and
+        size of the axis.
+
+        """
+        if self._updating:
+            return
+        self._updating = True
+        try:
+            self._draw()
+        finally:
+            self._updating = False
+
+    def remove(self):
+        """
+        Remove the array from the axis and stop updating it.
+
+        """
+        for cid in self._cids:
+            self.ax.callbacks.disconnect(cid)
+        self._cids = []
+        if self.artist is not None:
+            self.artist.remove()
+            self.artist = None
+
+    def get_window(self):
+        """
+        Get the rows and columns of the grid in the axis limits
+
+        Returns
+        -------
+        r0, r1, c0, c1 : int
+            the first row, one past the last row, the first column, and one
+            past the last column in the axis limits
+
+        """
+        sr = self.sr
+        x0, x1 = self.ax.get_xlim()
+        y0, y1 = self.ax.get_ylim()
+        xv, yv = sr.transform(np.array([x0, x1, x1, x0], dtype=np.float),
+                              np.array([y0, y0, y1, y1], dtype=np.float),
+                              inverse=True)
+        xedge, yedge = sr.xedge, sr.yedge
+        c0 = int(np.sum(xedge[1:] <= xv.min()))
+        c1 = int(np.sum(xedge[:-1] < xv.max()))
+        r0 = int(np.sum(yedge[1:] >= yv.max()))
+        r1 = int(np.sum(yedge[:-1] > yv.min()))
+        return r0, r1, c0, c1
+
+    def get_block_size(self, window=None):
+        """
+        Get the largest block size (a power of two) with blocks that are
+        not larger than a pixel of the axis
+
+        """
+        if window is None:
+            window = self.get_window()
+        r0, r1, c0, c1 = window
+        sr = self.sr
+        ax = self.ax
+        x0, x1 = ax.get_xlim()
+        y0, y1 = ax.get_ylim()
+        bbox = ax.get_window_extent()
+        # pixels per model length unit
+        scale = sr.length_multiplier * min(bbox.width / abs(x1 - x0),
+                                           bbox.height / abs(y1 - y0))
+        dx = (sr.xedge[c1] - sr.xedge[c0]) / (c1 - c0)
+        dy = (sr.yedge[r0] - sr.yedge[r1]) / (r1 - r0)
+        cell = min(dx, dy) * scale
+        nmax = max(self.pyramid.shape)
+        f = 1
+        while 2 * f * cell <= 1. and 2 * f <= nmax:
+            f *= 2
+        return f
+
+    def _draw(self):
+        nrow, ncol = self.pyramid.shape
+        window = self.get_window()
+        r0, r1, c0, c1 = window
+        if r1 <= r0 or c1 <= c0:
+            if self.artist is not None:
+                self.artist.set_visible(False)
+            return
+
+        f = self.get_block_size(window)
+        self.level = f
+        rf0, rf1 = r0 // f, -(-r1 // f)
+        cf0, cf1 = c0 // f, -(-c1 // f)
+        data = self.pyramid.get_level(f)[rf0:rf1, cf0:cf1]
+        if self.uniform:
+            self._draw_image(data, f, rf0, rf1, cf0, cf1)
+        else:
+            self._draw_mesh(data, f, rf0, rf1, cf0, cf1)
+
+    def _draw_image(self, data, f, rf0, rf1, cf0, cf1):
+        from matplotlib.image import AxesImage
+        from matplotlib.transforms import Affine2D
+
+        sr = self.sr
+        ax = self.ax
+        dx, dy = f * sr.delr[0], f * sr.delc[0]
+        # the image is a unit square that is scaled to the model
+        # coordinates of the blocks and transformed to map coordinates
+        xa, xb = sr.xedge[0] + cf0 * dx, sr.xedge[0] + cf1 * dx
+        ya, yb = sr.yedge[0] - rf1 * dy, sr.yedge[0] - rf0 * dy
+        t = Affine2D().scale(xb - xa, yb - ya).translate(xa, ya)
+        t = t.scale(sr.length_multiplier).translate(sr.xll, sr.yll)
+        t = t.rotate_deg_around(sr.xll, sr.yll, sr.rotation)
+
+        if self.artist is None:
+            kwargs = dict(self.kwargs)
+            kwargs.setdefault('zorder', 1)
+            kwargs.setdefault('interpolation', 'nearest')
+            self.artist = AxesImage(ax, extent=(0, 1, 0, 1), origin='upper',
+                                    **kwargs)
+            ax.add_image(self.artist)
+            self.artist.set_clip_path(ax.patch)
+        self.artist.set_data(data)
+        self.artist.set_transform(t + ax.transData)
+        self.artist.set_visible(True)
+
+    def _draw_mesh(self, data, f, rf0, rf1, cf0, cf1):
+        nrow, ncol = self.pyramid.shape
+        rows = np.append(np.arange(rf0, rf1) * f, min(rf1 * f, nrow))
+        cols = np.append(np.arange(cf0, cf1) * f, min(cf1 * f, ncol))
+        idx = np.ix_(rows, cols)
+        if self.artist is not None:
+            self.artist.remove()
+        self.artist = self.ax.pcolormesh(self.sr.xgrid[idx],
+                                         self.sr.ygrid[idx], data,
+                                         **self.kwargs)
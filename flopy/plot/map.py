@@ -9,6 +9,7 @@ except:
 from . import plotutil
 from .plotutil import bc_color_dict
 from ..utils import SpatialReference
+from ..utils.reference import SpatialReferenceUnstructured
 
 class ModelMap(object):
     """
@@ -114,14 +115,30 @@ class ModelMap(object):
             Array to plot.
         masked_values : iterable of floats, ints
             Values to mask.
+        lod : bool
+            Boolean flag that indicates if a two-dimensional array is drawn
+            with level-of-detail rendering, which aggregates the array to
+            about one value per pixel and draws only the part of the grid in
+            the axis limits. The axis limits are only set to the model
+            extent if they have not been set already, and the array is
+            drawn again when they change. See flopy.plot.lod.LODArray.
+            (default is False)
+        lod_method : str
+            method used to aggregate the array for level-of-detail rendering
+            ('mean', 'max', 'min', or 'mode'). (default is None, which is
+            'mode' for integer arrays and 'mean' for other arrays)
         **kwargs : dictionary
             keyword arguments passed to matplotlib.pyplot.pcolormesh
 
         Returns
         -------
         quadmesh : matplotlib.collections.QuadMesh
+            or matplotlib.image.AxesImage if lod is True and the grid
+            has a constant row and column spacing
 
         """
+        lod = kwargs.pop('lod', False)
+        lod_method = kwargs.pop('lod_method', None)
         if a.ndim == 3:
             plotarray = a[self.layer, :, :]
         elif a.ndim == 2:
@@ -138,9 +155,25 @@ class ModelMap(object):
         else:
             ax = self.ax
 
+        if lod and plotarray.ndim == 2 and \
+                not isinstance(self.sr, SpatialReferenceUnstructured):
+            from .lod import LODArray
+            # the limits are needed to select the level of detail, limits
+            # that were already set on the axis are kept
+            if ax.get_autoscalex_on():
+                ax.set_xlim(self.extent[0], self.extent[1])
+            if ax.get_autoscaley_on():
+                ax.set_ylim(self.extent[2], self.extent[3])
+            lodarray = LODArray(ax, self.sr, plotarray, method=lod_method,
+                                **kwargs)
+            return lodarray.artist
+
         # quadmesh = ax.pcolormesh(self.sr.xgrid, self.sr.ygrid, plotarray,
         #                          **kwargs)
-        quadmesh = self.sr.plot_array(plotarray, ax=ax)
+        if isinstance(self.sr, SpatialReferenceUnstructured):
+            quadmesh = self.sr.plot_array(plotarray, ax=ax, layer=self.layer)
+        else:
+            quadmesh = self.sr.plot_array(plotarray, ax=ax)
 
         # set max and min
         if 'vmin' in kwargs:
@@ -308,6 +341,8 @@ class ModelMap(object):
 
         if 'colors' not in kwargs:
             kwargs['colors'] = '0.5'
+        if isinstance(self.sr, SpatialReferenceUnstructured):
+            kwargs['layer'] = self.layer
 
         lc = self.sr.get_grid_line_collection(**kwargs)
         ax.add_collection(lc)
@@ -374,17 +409,13 @@ class ModelMap(object):
         nlay = self.model.nlay
         # Plot the list locations
         plotarray = np.zeros((nlay, self.sr.nrow, self.sr.ncol), dtype=np.int)
+        nodes = p.stress_period_data.get_cell_indices(kper)[0]
         if plotAll:
-            idx = [mflist['i'], mflist['j']]
-            # plotarray[:, idx] = 1
             pa = np.zeros((self.sr.nrow, self.sr.ncol), dtype=np.int)
-            pa[idx] = 1
-            for k in range(nlay):
-                plotarray[k, :, :] = pa.copy()
+            pa.flat[nodes % (self.sr.nrow * self.sr.ncol)] = 1
+            plotarray[:, :, :] = pa
         else:
-            idx = [mflist['k'], mflist['i'], mflist['j']]
-
-            plotarray[idx] = 1
+            plotarray.flat[nodes] = 1
         plotarray = np.ma.masked_equal(plotarray, 0)
         if color is None:
             if ftype in bc_color_dict:
@@ -622,7 +653,9 @@ class ModelMap(object):
             rec array or list of rec arrays is data returned from
             modpathfile PathlineFile get_data() or get_alldata()
             methods. Data in rec array is 'x', 'y', 'z', 'time',
-            'k', and 'particleid'.
+            'k', and 'particleid'. A single rec array with a 'particleid'
+            or 'id' field (for example PathlineFile._data) is split into
+            a pathline for each particle.
         travel_time: float or str
             travel_time is a travel time selection for the displayed
             pathlines. If a float is passed then pathlines with times
@@ -633,9 +666,15 @@ class ModelMap(object):
             >. For example, to select all pathlines less than 10000 days
             travel_time='< 10000' would be passed to plot_pathline.
             (default is None)
-        kwargs : layer, ax, colors.  The remaining kwargs are passed
-            into the LineCollection constructor. If layer='all',
-            pathlines are output for all layers
+        kwargs : layer, ax, colors, decimate.  The remaining kwargs are
+            passed into the LineCollection constructor. If layer='all',
+            pathlines are output for all layers. Otherwise the parts of a
+            pathline that are outside of the layer are not drawn, so a
+            pathline that leaves the layer and comes back is drawn as
+            separate lines. If decimate=True,
+            consecutive points of a pathline that are in the same pixel of
+            the axis are only plotted once, which reduces the size of the
+            plot for a large number of pathlines.
 
         Returns
         -------
@@ -643,9 +682,6 @@ class ModelMap(object):
 
         """
         from matplotlib.collections import LineCollection
-        # make sure pathlines is a list
-        if not isinstance(pl, list):
-            pl = [pl]
 
         if 'layer' in kwargs:
             kon = kwargs.pop('layer')
@@ -665,64 +701,75 @@ class ModelMap(object):
         else:
             ax = self.ax
 
+        decimate = kwargs.pop('decimate', False)
+
         if 'colors' not in kwargs:
             kwargs['colors'] = '0.5'
 
-        linecol = []
-        for p in pl:
-            if travel_time is None:
-                tp = p.copy()
+        # combine the pathlines in a single set of arrays with the index of
+        # the pathline for each point
+        if isinstance(pl, list):
+            npts = [p.shape[0] for p in pl]
+            if len(pl) > 0:
+                x, y, t, k = [np.concatenate([p[name] for p in pl])
+                              for name in ('x', 'y', 'time', 'k')]
             else:
-                if isinstance(travel_time, str):
-                    if '<=' in travel_time:
-                        time = float(travel_time.replace('<=', ''))
-                        idx = (p['time'] <= time)
-                    elif '<' in travel_time:
-                        time = float(travel_time.replace('<', ''))
-                        idx = (p['time'] < time)
-                    elif '>=' in travel_time:
-                        time = float(travel_time.replace('>=', ''))
-                        idx = (p['time'] >= time)
-                    elif '<' in travel_time:
-                        time = float(travel_time.replace('>', ''))
-                        idx = (p['time'] > time)
-                    else:
-                        try:
-                            time = float(travel_time)
-                            idx = (p['time'] <= time)
-                        except:
-                            errmsg = 'flopy.map.plot_pathline travel_time ' + \
-                                     'variable cannot be parsed. ' + \
-                                     'Acceptable logical variables are , ' + \
-                                     '<=, <, >=, and >. ' + \
-                                     'You passed {}'.format(travel_time)
-                            raise Exception(errmsg)
-                else:
-                    time = float(travel_time)
-                    idx = (p['time'] <= time)
-                tp = p[idx]
-
-            vlc = []
-            # rotate data
-            x0r, y0r = self.sr.rotate(tp['x'], tp['y'], self.sr.rotation, 0.,
-                                      self.sr.yedge[0])
-            x0r += self.sr.xul
-            y0r += self.sr.yul - self.sr.yedge[0]
-            # build polyline array
-            arr = np.vstack((x0r, y0r)).T
-            # select based on layer
-            if kon >= 0:
-                kk = p['k'].copy().reshape(p.shape[0], 1)
-                kk = np.repeat(kk, 2, axis=1)
-                arr = np.ma.masked_where((kk != kon), arr)
+                x, y, t, k = [np.array([]) for i in range(4)]
+            lineid = np.repeat(np.arange(len(pl)), npts)
+        else:
+            names = pl.dtype.names
+            idname = None
+            for name in ('particleid', 'id'):
+                if name in names:
+                    idname = name
+                    break
+            if idname is None:
+                order = np.arange(pl.shape[0])
+                lineid = np.zeros(pl.shape[0], dtype=np.int)
             else:
-                arr = np.ma.asarray(arr)
-            # append line to linecol if there is some unmasked segment
-            if not arr.mask.all():
-                linecol.append(arr)
+                # a stable sort keeps the order of the points of a particle
+                order = np.argsort(pl[idname], kind='mergesort')
+                lineid = pl[idname][order]
+            x, y, t, k = [pl[name][order] for name in ('x', 'y', 'time', 'k')]
+
+        # select the points based on travel time and layer
+        idx = np.ones(x.shape[0], dtype=np.bool)
+        if travel_time is not None:
+            idx &= plotutil.travel_time_selection(t, travel_time)
+        if kon >= 0:
+            idx &= k == kon
+        ipos = np.nonzero(idx)[0]
+        x, y, lineid = x[idx], y[idx], lineid[idx]
+
+        # rotate data
+        x0r, y0r = self.sr.rotate(x, y, self.sr.rotation, 0.,
+                                  self.sr.yedge[0])
+        x0r += self.sr.xul
+        y0r += self.sr.yul - self.sr.yedge[0]
+        # build polyline array
+        arr = np.vstack((x0r, y0r)).T
+
+        # the first point of each pathline, and of each part of a pathline
+        # that leaves the selection and comes back
+        start = np.ones(arr.shape[0], dtype=np.bool)
+        start[1:] = (lineid[1:] != lineid[:-1]) | (ipos[1:] != ipos[:-1] + 1)
+
+        if decimate and arr.shape[0] > 0:
+            # keep the first and last point of each pathline and points that
+            # are not in the same pixel as the previous point
+            pix = np.floor(ax.transData.transform(arr))
+            keep = start.copy()
+            keep[1:] |= np.any(pix[1:] != pix[:-1], axis=1)
+            keep[:-1] |= start[1:]
+            keep[-1] = True
+            arr, start = arr[keep], start[keep]
+
+        # split the points into pathlines
+        linecol = np.split(arr, np.nonzero(start)[0][1:])
+
         # create line collection
         lc = None
-        if len(linecol) > 0:
+        if arr.shape[0] > 0:
             lc = LineCollection(linecol, **kwargs)
             ax.add_collection(lc)
         return lc
@@ -358,6 +358,10 @@ def _plot_array_helper(plotarray, model=None, sr=None, axes=None,
         fmt = kwargs.pop('fmt')
     else:
         fmt = '%1.3f'
+
+    # level-of-detail rendering is only used by plot_array
+    lod = kwargs.pop('lod', False)
+    lod_method = kwargs.pop('lod_method', None)
     
     if mflay is not None:
         i0 = int(mflay)
@@ -409,7 +413,9 @@ def _plot_array_helper(plotarray, model=None, sr=None, axes=None,
     else:
         axes = []
         for idx, k in enumerate(range(i0, i1)):
-            fig = plt.figure(figsize=figsize, num=fignum[idx])
+            # the level of detail depends on the dpi of the figure
+            fig = plt.figure(figsize=figsize, num=fignum[idx],
+                             dpi=dpi if lod else None)
             ax = plt.subplot(1, 1, 1, aspect='equal')
             if names is not None:
                 title = names[k]
@@ -426,7 +432,8 @@ def _plot_array_helper(plotarray, model=None, sr=None, axes=None,
         mm = map.ModelMap(ax=axes[idx], model=model, sr=sr, layer=k)
         if pcolor:
             cm = mm.plot_array(plotarray[k], masked_values=masked_values,
-                               ax=axes[idx], **kwargs)
+                               ax=axes[idx], lod=lod, lod_method=lod_method,
+                               **kwargs)
             if cb:
                 label = ''
                 if not isinstance(cb,bool):
@@ -933,23 +940,23 @@ def cvfd_to_patch_collection(verts, iverts):
     ----------
     verts : ndarray
         2d array of x and y points.
-    iverts : list of lists
-        should be of len(ncells) with a list of vertex numbers for each cell
+    iverts : list of lists or ndarray
+        should be of len(ncells) with a list of vertex numbers for each cell,
+        or a 2d array of vertex numbers padded with negative values (see
+        flopy.utils.cvfdutil.iverts_to_array)
+
+    Returns
+    -------
+    pc : matplotlib.collections.PolyCollection
 
     """
-    from matplotlib.patches import Polygon
-    from matplotlib.collections import PatchCollection
-    ptchs = []
-    for icell, ivertlist in enumerate(iverts):
-        points = []
-        for iv in ivertlist:
-            points.append((verts[iv, 0], verts[iv, 1]))
-        # close the polygon, if necessary
-        if ivertlist[0] != ivertlist[-1]:
-            iv = ivertlist[0]
-            points.append((verts[iv, 0], verts[iv, 1]))
-        ptchs.append(Polygon(points))
-    pc = PatchCollection(ptchs)
+    from matplotlib.collections import PolyCollection
+    from ..utils.cvfdutil import iverts_to_array
+    # gather the closed rings of vertices of all of the cells from a single
+    # padded array
+    ivarr, nverts = iverts_to_array(iverts)
+    ivarr = np.column_stack((ivarr, ivarr[:, 0]))
+    pc = PolyCollection(np.asarray(verts)[ivarr, :2], closed=False)
     return pc
 
 
@@ -1023,23 +1030,6 @@ def plot_cvfd(verts, iverts, ax=None, layer=0, cmap='Dark2',
             i1 = i0 + ncpl[k]
         # retain iverts in selected layer
         iverts = iverts[i0:i1]
-        # retain vertices in selected layer
-        tverts = []
-        for iv in iverts:
-            for iloc in iv:
-                tverts.append((verts[iloc, 0], verts[iloc, 1]))
-        verts = np.array(tverts)
-        # calculate offset for starting vertex in layer based on
-        # global vertex numbers
-        iadj = iverts[0][0]
-        # reset iverts to relative vertices in selected layer
-        tiverts = []
-        for iv in iverts:
-            i = []
-            for t in iv:
-                i.append(t-iadj)
-            tiverts.append(i)
-        iverts = tiverts
     else:
         i0 = 0
         i1 = len(iverts)
@@ -1259,6 +1249,53 @@ def findrowcolumn(pt, xedge, yedge):
     return irow, jcol
 
 
+def findrowcolumns(x, y, xedge, yedge):
+    """
+    Find the MODFLOW cells containing a set of x- and y- points. This is a
+    vectorized version of findrowcolumn().
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        x-coordinates of the points
+    y : numpy.ndarray
+        y-coordinates of the points
+    xedge : numpy.ndarray
+        x-coordinate of the edge of each MODFLOW column. xedge is dimensioned
+        to NCOL + 1.
+    yedge : numpy.ndarray
+        y-coordinate of the edge of each MODFLOW row. yedge is dimensioned
+        to NROW + 1.
+
+    Returns
+    -------
+    irow, jcol : numpy.ndarray
+        Row and column locations containing the x- and y- points. The row
+        and column of points outside of the grid are -1.
+
+    Examples
+    --------
+    >>> import flopy
+    >>> irow, jcol = flopy.plotutil.findrowcolumns(x, y, xedge, yedge)
+
+    """
+    xedge = np.asarray(xedge)
+    yedge = np.asarray(yedge)
+    x = np.atleast_1d(np.asarray(x, dtype=np.float))
+    y = np.atleast_1d(np.asarray(y, dtype=np.float))
+
+    # columns increase with x
+    jcol = np.searchsorted(xedge, x, side='right') - 1
+    # rows increase as y decreases
+    irow = yedge.shape[0] - np.searchsorted(yedge[::-1], y, side='left') - 1
+
+    outside = (jcol < 0) | (jcol >= xedge.shape[0] - 1) | \
+              (irow < 0) | (irow >= yedge.shape[0] - 1)
+    irow[outside] = -1
+    jcol[outside] = -1
+    return irow, jcol
+
+
 def line_intersect_grid(ptsin, xedge, yedge, returnvertices=False):
     """
     Intersect a list of polyline vertices with a rectilinear MODFLOW
@@ -1412,14 +1449,15 @@ def cell_value_points(pts, xedge, yedge, vdata):
         numpy.ndarray.
     vdata : numpy.ndarray
         Data (i.e., head, hk, etc.) for a rectilinear MODFLOW model grid. The
-        shape of vdata is (NROW, NCOL). If vdata is not a numpy.ndarray it is
-        converted to a numpy.ndarray.
+        shape of vdata is (NROW, NCOL) or (NLAY, NROW, NCOL). If vdata is not
+        a numpy.ndarray it is converted to a numpy.ndarray.
 
     Returns
     -------
     vcell : numpy.ndarray
         numpy.ndarray of of data values from the vdata numpy.ndarray at x- and
-        y-coordinate locations in pts.
+        y-coordinate locations in pts that are in the grid. The shape of
+        vcell is (npts) or (NLAY, npts).
 
     Examples
     --------
@@ -1433,21 +1471,63 @@ def cell_value_points(pts, xedge, yedge, vdata):
         xedge = np.array(xedge)
     if not isinstance(yedge, np.ndarray):
         yedge = np.array(yedge)
-    if not isinstance(vdata, np.ndarray):
-        vdata = np.array(vdata)
-
-    vcell = []
-    for idx, [xt, yt, dlen] in enumerate(pts):
-        # find the modflow cell containing point
-        irow, jcol = findrowcolumn((xt, yt), xedge, yedge)
-        if irow >= 0 and jcol >= 0:
-            if np.isnan(vdata[irow, jcol]):
-                vcell.append(np.nan)
-            else:
-                v = np.asarray(vdata[irow, jcol])
-                vcell.append(v) 
+    vdata = np.asarray(vdata)
+
+    pts = np.asarray(pts)
+    if pts.shape[0] == 0:
+        return np.array([])
+
+    # find the modflow cells containing the points
+    irow, jcol = findrowcolumns(pts[:, 0], pts[:, 1], xedge, yedge)
+    idx = irow >= 0
+    return vdata[..., irow[idx], jcol[idx]]
+
+
+def travel_time_selection(times, travel_time):
+    """
+    Select MODPATH pathline points using a travel time selection.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        times of the pathline points
+    travel_time: float or str
+        If a float is passed then times less than or equal to the passed
+        time are selected. If a string is passed one of the logical
+        constraints <=, <, >=, and > can be added in front of the time
+        value (for example '< 10000').
 
-    return np.array(vcell)
+    Returns
+    -------
+    idx : numpy.ndarray
+        boolean array that is True for the selected times
+
+    """
+    if isinstance(travel_time, str):
+        for op in ('<=', '>=', '<', '>'):
+            if op in travel_time:
+                break
+        else:
+            op = '<='
+        try:
+            time = float(travel_time.replace(op, ''))
+        except:
+            errmsg = 'flopy.map.plot_pathline travel_time ' + \
+                     'variable cannot be parsed. ' + \
+                     'Acceptable logical variables are , ' + \
+                     '<=, <, >=, and >. ' + \
+                     'You passed {}'.format(travel_time)
+            raise Exception(errmsg)
+    else:
+        op = '<='
+        time = float(travel_time)
+    if op == '<=':
+        return times <= time
+    elif op == '<':
+        return times < time
+    elif op == '>=':
+        return times >= time
+    return times > time
 
 
 
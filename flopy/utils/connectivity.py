@@ -0,0 +1,478 @@
+"""
+connectivity module.  Contains the Connectivity class, a compressed sparse
+row (CSR) representation of the cell connections of an unstructured grid.
+
+"""
+import numpy as np
+
+
+def _expand(start, count):
+    # concatenated ranges start[i], ..., start[i] + count[i] - 1
+    offset = np.repeat(np.cumsum(count) - count, count)
+    return np.repeat(start, count) + np.arange(count.sum()) - offset
+
+
+class Connectivity(object):
+    """
+    Compressed sparse row (CSR) connectivity of an unstructured grid.
+
+    The connections of node n are ja[ia[n]:ia[n + 1]], and the first
+    connection of each node is the node itself, as in the DISU package and
+    the MODFLOW 6 binary grid file.  Connection properties, such as cl12,
+    fahl and the FLOW JA FACE budget, are arrays of size nja in the same
+    order.
+
+    Parameters
+    ----------
+    ia : array of ints (nodes + 1)
+        zero-based position in ja of the first connection of each node
+    ja : array of ints (nja)
+        zero-based node numbers of the connections of each node
+    nodelay : array of ints (nlay)
+        number of nodes in each layer (default is one layer)
+    top : array of floats (nodes)
+        cell top elevations (default is None)
+    bot : array of floats (nodes)
+        cell bottom elevations (default is None)
+    area : array of floats (nodes)
+        cell areas (default is None)
+    ihc : array of ints (nja)
+        1 for horizontal connections and 0 for vertical connections and the
+        cell itself.  If not specified, connections between nodes in
+        different layers are vertical.
+    cl12 : array of floats (nja)
+        distance from the center of the node to the shared face
+        (default is None)
+    fahl : array of floats (nja)
+        face area (default is None)
+
+    Attributes
+    ----------
+    nodes : int
+        number of nodes
+    nja : int
+        number of connections, including the nodes themselves
+    nlay : int
+        number of layers
+
+    Examples
+    --------
+
+    >>> import flopy
+    >>> m = flopy.modflow.Modflow.load('flow.nam', version='mfusg')
+    >>> con = flopy.utils.Connectivity.from_disu(m.disu)
+    >>> con.get_neighbors(0)
+
+    """
+
+    def __init__(self, ia, ja, nodelay=None, top=None, bot=None, area=None,
+                 ihc=None, cl12=None, fahl=None):
+        self.ia = np.asarray(ia, dtype=np.int)
+        self.ja = np.asarray(ja, dtype=np.int)
+        self.nodes = self.ia.shape[0] - 1
+        self.nja = self.ja.shape[0]
+        if self.ia[-1] != self.nja:
+            raise Exception('The last value of ia ({}) must equal the '
+                            'number of connections ({}).'.format(self.ia[-1],
+                                                                 self.nja))
+        if nodelay is None:
+            nodelay = [self.nodes]
+        self.nodelay = np.asarray(nodelay, dtype=np.int).ravel()
+        if self.nodelay.sum() != self.nodes:
+            raise Exception('The sum of nodelay ({}) must equal the number '
+                            'of nodes ({}).'.format(self.nodelay.sum(),
+                                                    self.nodes))
+        self.nlay = self.nodelay.shape[0]
+        self._layerstart = np.append(0, np.cumsum(self.nodelay))
+        self.top = self._nodearray(top)
+        self.bot = self._nodearray(bot)
+        self.area = self._nodearray(area)
+        self.cl12 = self._connectionarray(cl12)
+        self.fahl = self._connectionarray(fahl)
+        self._n = None
+        self._isym = None
+        self._sorted = None
+        if ihc is None:
+            n, m = self.n, self.ja
+            ihc = np.where((n != m) &
+                           (self.get_layer(n) == self.get_layer(m)), 1, 0)
+        self.ihc = self._connectionarray(ihc).astype(np.int)
+        return
+
+    def _nodearray(self, a):
+        if a is None:
+            return None
+        a = np.asarray(a).ravel()
+        assert a.shape[0] == self.nodes, \
+            'array size {} is not nodes {}'.format(a.shape[0], self.nodes)
+        return a
+
+    def _connectionarray(self, a):
+        if a is None:
+            return None
+        a = np.asarray(a).ravel()
+        assert a.shape[0] == self.nja, \
+            'array size {} is not nja {}'.format(a.shape[0], self.nja)
+        return a
+
+    @classmethod
+    def from_iac(cls, iac, ja, one_based=True, **kwargs):
+        """
+        Create the connectivity from the number of connections of each node
+        and the connections, as in the DISU package.
+
+        Parameters
+        ----------
+        iac : array of ints (nodes)
+            number of connections of each node, including the node itself
+        ja : array of ints (nja)
+            node numbers of the connections of each node
+        one_based : bool
+            ja is one-based (default is True)
+        kwargs : dictionary
+            other Connectivity arguments
+
+        Returns
+        -------
+        con : Connectivity
+
+        """
+        ia = np.append(0, np.cumsum(iac))
+        ja = np.asarray(ja, dtype=np.int).ravel()
+        if one_based:
+            ja = ja - 1
+        return cls(ia, ja, **kwargs)
+
+    @classmethod
+    def from_disu(cls, disu):
+        """
+        Create the connectivity of a DISU package.
+
+        Parameters
+        ----------
+        disu : flopy.modflow.ModflowDisU
+
+        Returns
+        -------
+        con : Connectivity
+
+        """
+        nodelay = disu.nodelay.array
+        area = disu.area.array.ravel()
+        if disu.ivsd == -1:
+            area = np.tile(area, disu.nlay)
+        con = cls.from_iac(disu.iac.array, disu.ja.array, nodelay=nodelay,
+                           top=disu.top.array, bot=disu.bot.array,
+                           area=area)
+        if disu.ivsd == 1:
+            n = con.n
+            con.ihc = np.where((n != con.ja) & (disu.ivc.array == 0), 1, 0)
+        if disu.idsymrd == 1:
+            # cl1, cl2 and fahl are for the upper triangle of the symmetric
+            # connections, in the order of the connections
+            upper = np.where(con.ja > con.n)[0]
+            lower = con.isym[upper]
+            con.cl12 = np.zeros(con.nja, dtype=np.float32)
+            con.cl12[upper] = disu.cl1.array
+            con.cl12[lower] = disu.cl2.array
+            con.fahl = np.zeros(con.nja, dtype=np.float32)
+            con.fahl[upper] = disu.fahl.array
+            con.fahl[lower] = disu.fahl.array
+        else:
+            con.cl12 = disu.cl12.array
+            con.fahl = disu.fahl.array
+        return con
+
+    @classmethod
+    def from_grdfile(cls, grd):
+        """
+        Create the connectivity of a MODFLOW 6 binary grid file.
+
+        Parameters
+        ----------
+        grd : flopy.utils.MfGrdFile or str
+            binary grid file or the name of the binary grid file
+
+        Returns
+        -------
+        con : Connectivity
+
+        """
+        if isinstance(grd, str):
+            from .mfgrdfile import MfGrdFile
+            grd = MfGrdFile(grd)
+        d = grd._datadict
+        if 'IA' not in d or 'JA' not in d:
+            raise Exception('{} does not contain IA and JA'.format(
+                grd.file.name))
+        nodes = int(d['NCELLS'])
+        area = None
+        if grd._grid == 'DIS':
+            ncpl = int(d['NROW']) * int(d['NCOL'])
+            area = np.tile(np.outer(d['DELC'], d['DELR']).ravel(),
+                           int(d['NLAY']))
+        elif grd._grid == 'DISV':
+            ncpl = int(d['NCPL'])
+            # shoelace formula for the area of the cell polygons
+            verts = d['VERTICES'].reshape(-1, 2)
+            iavert = d['IAVERT'] - 1
+            javert = d['JAVERT'] - 1
+            x, y = verts[javert, 0], verts[javert, 1]
+            nxt = np.arange(1, javert.shape[0] + 1)
+            nxt[iavert[1:] - 1] = iavert[:-1]
+            cross = x * y[nxt] - x[nxt] * y
+            area = 0.5 * np.abs(np.add.reduceat(cross, iavert[:-1]))
+            area = np.tile(area, int(d['NLAY']))
+        else:
+            ncpl = nodes
+            if 'AREA' in d:
+                area = d['AREA']
+        nodelay = [ncpl] * (nodes // ncpl)
+        if 'BOTM' in d:
+            bot = d['BOTM']
+            top = np.concatenate((d['TOP'], bot[:-ncpl]))
+        else:
+            top = d['TOP']
+            bot = d['BOT']
+        return cls(d['IA'] - 1, d['JA'] - 1, nodelay=nodelay, top=top,
+                   bot=bot, area=area)
+
+    @property
+    def iac(self):
+        """
+        Number of connections of each node, including the node itself.
+
+        """
+        return np.diff(self.ia)
+
+    @property
+    def n(self):
+        """
+        Node number of each connection, so that the connections are from
+        n to ja.
+
+        """
+        if self._n is None:
+            self._n = np.repeat(np.arange(self.nodes), self.iac)
+        return self._n
+
+    @property
+    def isym(self):
+        """
+        Position of the reverse connection, from ja to n, of each
+        connection, or -1 if there is no reverse connection.
+
+        """
+        if self._isym is None:
+            self._isym = self.get_connection(self.ja, self.n)
+        return self._isym
+
+    @property
+    def offdiagonal(self):
+        """
+        Boolean array that is True for the connections between different
+        nodes.
+
+        """
+        return self.ja != self.n
+
+    @property
+    def thickness(self):
+        """
+        Cell thicknesses.
+
+        """
+        return self.top - self.bot
+
+    def get_cell_volumes(self):
+        """
+        Get an array of cell volumes.
+
+        Returns
+        -------
+        vol : array of floats (nodes)
+
+        """
+        return self.area * self.thickness
+
+    def get_layer(self, nodes):
+        """
+        Get the zero-based layer of nodes.
+
+        Parameters
+        ----------
+        nodes : int or array of ints
+
+        Returns
+        -------
+        layer : int or array of ints
+
+        """
+        return np.searchsorted(self._layerstart, nodes, side='right') - 1
+
+    def get_layer_nodes(self, k):
+        """
+        Get the node numbers of a layer.
+
+        Parameters
+        ----------
+        k : int
+            zero-based layer number
+
+        Returns
+        -------
+        nodes : array of ints
+
+        """
+        return np.arange(self._layerstart[k], self._layerstart[k + 1])
+
+    def get_neighbors(self, nodes):
+        """
+        Get the neighbors of one or more nodes.
+
+        Parameters
+        ----------
+        nodes : int or array of ints
+
+        Returns
+        -------
+        neighbors : array of ints
+            for a single node, the nodes that are connected to it
+        (n, m) : tuple of arrays of ints
+            for an array of nodes, the nodes and the neighbors that they
+            are connected to, in the order of the nodes
+
+        """
+        if np.isscalar(nodes):
+            return self.ja[self.ia[nodes] + 1:self.ia[nodes + 1]]
+        nodes = np.asarray(nodes, dtype=np.int)
+        ipos = _expand(self.ia[nodes] + 1, self.iac[nodes] - 1)
+        return self.n[ipos], self.ja[ipos]
+
+    def get_connection(self, n, m):
+        """
+        Get the position of the connections from n to m.
+
+        Parameters
+        ----------
+        n : int or array of ints
+        m : int or array of ints
+
+        Returns
+        -------
+        ipos : int or array of ints
+            position of the connections in ja, or -1 if n is not connected
+            to m
+
+        """
+        if self._sorted is None:
+            # the off-diagonal connections are sorted by n, and usually also
+            # by m within each node, so they only need sorting if they are
+            # not in order
+            ipos = np.where(self.offdiagonal)[0]
+            skey = self.n[ipos] * self.nodes + self.ja[ipos]
+            if np.any(np.diff(skey) <= 0):
+                order = np.argsort(skey)
+                ipos, skey = ipos[order], skey[order]
+            self._sorted = (skey, ipos)
+        skey, ipos = self._sorted
+        n = np.asarray(n)
+        m = np.asarray(m)
+        k = n * self.nodes + m
+        if skey.shape[0] > 0:
+            pos = np.minimum(np.searchsorted(skey, k), skey.shape[0] - 1)
+            found = np.where(skey[pos] == k, ipos[pos], -1)
+        else:
+            found = np.full(k.shape, -1, dtype=np.int)
+        ipos = np.where(n == m, self.ia[n], found)
+        if ipos.ndim == 0:
+            ipos = int(ipos)
+        return ipos
+
+    def get_face_flows(self, flowja, nodes=None):
+        """
+        Map a FLOW JA FACE budget record to the cell faces.
+
+        Parameters
+        ----------
+        flowja : array of floats
+            FLOW JA FACE record with nja values, in any shape, such as the
+            record returned by CellBudgetFile.get_data()
+        nodes : array of ints
+            only return the faces of these nodes (default is all nodes)
+
+        Returns
+        -------
+        (n, m, q) : tuple of arrays
+            node, neighbor and the flow between them for each face.  A
+            positive flow is into node n.
+
+        """
+        q = np.asarray(flowja).ravel()
+        if q.shape[0] != self.nja:
+            raise Exception('FLOW JA FACE has {} values, which is not nja '
+                            '({}).'.format(q.shape[0], self.nja))
+        if nodes is None:
+            ipos = np.where(self.offdiagonal)[0]
+        else:
+            nodes = np.asarray(nodes, dtype=np.int)
+            ipos = _expand(self.ia[nodes] + 1, self.iac[nodes] - 1)
+        return self.n[ipos], self.ja[ipos], q[ipos]
+
+    def get_layer_connectivity(self, k):
+        """
+        Get the connectivity of the nodes in a layer, with only the
+        connections within the layer.
+
+        Parameters
+        ----------
+        k : int
+            zero-based layer number
+
+        Returns
+        -------
+        con : Connectivity
+            connectivity with zero-based node numbers in the layer
+
+        """
+        i0, i1 = self._layerstart[k], self._layerstart[k + 1]
+        ipos = np.arange(self.ia[i0], self.ia[i1])
+        keep = (self.ja[ipos] >= i0) & (self.ja[ipos] < i1)
+        ipos = ipos[keep]
+        count = np.bincount(self.n[ipos] - i0, minlength=i1 - i0)
+        kwargs = {}
+        for name in ['top', 'bot', 'area']:
+            a = getattr(self, name)
+            if a is not None:
+                kwargs[name] = a[i0:i1]
+        for name in ['ihc', 'cl12', 'fahl']:
+            a = getattr(self, name)
+            if a is not None:
+                kwargs[name] = a[ipos]
+        return Connectivity(np.append(0, np.cumsum(count)), self.ja[ipos] - i0,
+                            **kwargs)
+
+    def get_matrix(self, values=None):
+        """
+        Get a scipy sparse matrix of the connections.
+
+        Parameters
+        ----------
+        values : array of floats (nja)
+            values of the connections, such as the FLOW JA FACE record
+            (default is ones)
+
+        Returns
+        -------
+        a : scipy.sparse.csr_matrix
+
+        """
+        try:
+            from scipy.sparse import csr_matrix
+        except:
+            raise Exception('Could not import scipy.sparse')
+        if values is None:
+            values = np.ones(self.nja)
+        values = np.asarray(values).ravel()
+        return csr_matrix((values, self.ja, self.ia),
+                          shape=(self.nodes, self.nodes))
@@ -1,4 +1,4 @@
-from collections import OrderedDict
+import itertools
 import numpy as np
 
 
@@ -95,6 +95,117 @@ def segment_face(ivert, ivlist1, ivlist2, vertices):
     return
 
 
+def _unique_vertices(xy, precision=1.e-9):
+    """
+    Number the unique vertices in the order that they are first used.
+    Coordinates are quantized to precision times the largest absolute
+    coordinate, so vertices that only differ by round-off are the same.
+
+    Returns
+    -------
+    ivert : ndarray
+        vertex number of each point
+    verts : ndarray
+        coordinates of the unique vertices
+
+    """
+    npts = xy.shape[0]
+    if npts == 0:
+        return np.zeros(0, dtype=np.int), np.zeros((0, 2), dtype=np.float)
+    q = precision * max(np.abs(xy).max(), 1.)
+    key = np.round(xy / q).astype(np.int64)
+    # the sort is stable, so the first point of each group is the first
+    # point that uses the vertex
+    order = np.lexsort((key[:, 1], key[:, 0]))
+    skey = key[order]
+    isnew = np.ones(npts, dtype=np.bool)
+    isnew[1:] = np.any(skey[1:] != skey[:-1], axis=1)
+    group = np.cumsum(isnew) - 1
+    first = order[isnew]
+    rank = np.empty(first.shape[0], dtype=np.int)
+    rank[np.argsort(first)] = np.arange(first.shape[0])
+    ivert = np.empty(npts, dtype=np.int)
+    ivert[order] = rank[group]
+    return ivert, xy[np.sort(first)]
+
+
+def _expand(start, count):
+    """
+    Concatenated ranges start[i], ..., start[i] + count[i] - 1
+    """
+    offset = np.repeat(np.cumsum(count) - count, count)
+    return np.repeat(start, count) + np.arange(offset.shape[0]) - offset
+
+
+def _find_hanging_nodes(verts, v1, v2, tol=1.e-6, chunksize=1000000):
+    """
+    Find the vertices that are on an edge between vertices v1 and v2, but
+    are not end points of the edge. The edges are stored in a uniform grid
+    of buckets, with the median edge length as the bucket size, and each
+    vertex is only tested against the edges in its bucket.
+
+    Returns
+    -------
+    iv : ndarray
+        vertex numbers
+    iedge : ndarray
+        edge numbers
+    t : ndarray
+        relative position of the vertex on the edge from v1 to v2
+
+    """
+    nvert = verts.shape[0]
+    x1, y1 = verts[v1, 0], verts[v1, 1]
+    dx, dy = verts[v2, 0] - x1, verts[v2, 1] - y1
+    length2 = dx * dx + dy * dy
+    dtol = tol * np.sqrt(length2)
+    h = np.median(np.sqrt(length2)) if length2.shape[0] > 0 else 0.
+    empty = (np.zeros(0, dtype=np.int), np.zeros(0, dtype=np.int),
+             np.zeros(0, dtype=np.float))
+    if not h > 0.:
+        return empty
+    xmin, ymin = verts.min(axis=0) - dtol.max()
+    ymax = verts[:, 1].max() + dtol.max()
+    nby = int(np.floor((ymax - ymin) / h)) + 1
+
+    def bucket(x, y):
+        return (np.floor((x - xmin) / h).astype(np.int64),
+                np.floor((y - ymin) / h).astype(np.int64))
+
+    x2, y2 = x1 + dx, y1 + dy
+    ix0, iy0 = bucket(np.minimum(x1, x2) - dtol, np.minimum(y1, y2) - dtol)
+    ix1, iy1 = bucket(np.maximum(x1, x2) + dtol, np.maximum(y1, y2) + dtol)
+    ny = iy1 - iy0 + 1
+    nb = (ix1 - ix0 + 1) * ny
+    edge = np.repeat(np.arange(nb.shape[0]), nb)
+    k = _expand(np.zeros(nb.shape[0], dtype=np.int64), nb)
+    ebucket = (ix0[edge] + k // ny[edge]) * nby + iy0[edge] + k % ny[edge]
+    order = np.argsort(ebucket, kind='mergesort')
+    ebucket = ebucket[order]
+    edge = edge[order]
+
+    vx, vy = bucket(verts[:, 0], verts[:, 1])
+    vbucket = vx * nby + vy
+    result = []
+    for i0 in range(0, nvert, chunksize):
+        i1 = min(i0 + chunksize, nvert)
+        lo = np.searchsorted(ebucket, vbucket[i0:i1], side='left')
+        cnt = np.searchsorted(ebucket, vbucket[i0:i1], side='right') - lo
+        iv = np.repeat(np.arange(i0, i1), cnt)
+        ie = edge[_expand(lo, cnt)]
+        px = verts[iv, 0] - x1[ie]
+        py = verts[iv, 1] - y1[ie]
+        cross = dx[ie] * py - dy[ie] * px
+        t = (dx[ie] * px + dy[ie] * py) / length2[ie]
+        idx = (iv != v1[ie]) & (iv != v2[ie]) & (t > tol) & \
+              (t < 1. - tol) & \
+              (np.abs(cross) <= dtol[ie] * np.sqrt(length2[ie]))
+        result.append((iv[idx], ie[idx], t[idx]))
+    if len(result) == 0:
+        return empty
+    return tuple(np.concatenate(a) for a in zip(*result))
+
+
 def to_cvfd(vertdict, nodestart=None, nodestop=None,
             skip_hanging_node_check=False, verbose=False):
     """
@@ -126,6 +237,17 @@ def to_cvfd(vertdict, nodestart=None, nodestop=None,
     iverts : list
         list containing a list for each cell
 
+    Notes
+    -----
+    Vertices are the same if their coordinates are equal to about nine
+    significant digits of the largest coordinate. Vertices are numbered in
+    the order that they are first used.
+
+    A vertex that is on the edge of a cell, but is not a vertex of the cell
+    (a hanging node, for example on the edge of a large cell next to
+    smaller cells in a quadtree grid), is inserted in the vertex list of
+    the cell.
+
     """
 
     if nodestart is None:
@@ -134,85 +256,83 @@ def to_cvfd(vertdict, nodestart=None, nodestop=None,
         nodestop = len(vertdict)
     ncells = nodestop - nodestart
 
-    # First create vertexdict {(x1, y1): ivert1, (x2, y2): ivert2, ...} and
-    # vertexlist [[ivert1, ivert2, ...], [ivert9, ivert10, ...], ...]
-    # In the process, filter out any duplicate vertices
-    vertexdict = OrderedDict()
-    vertexlist = []
-    xcyc = np.empty((ncells, 2), dtype=np.float)
-    iv = 0
-    nvertstart = 0
+    # First create an array with the number of the unique vertex for each
+    # point of each cell. In the process, filter out any duplicate vertices
     if verbose:
         print('Converting vertdict to cvfd representation.')
         print('Number of cells in vertdict is: {}'.format(len(vertdict)))
         print('Cell {} up to {} (but not including) will be processed.'
               .format(nodestart, nodestop))
-    for icell in range(nodestart, nodestop):
-        points = vertdict[icell]
-        nvertstart += len(points)
-        xc, yc = centroid_of_polygon(points)
-        xcyc[icell, 0] = xc
-        xcyc[icell, 1] = yc
-        ivertlist = []
-        for p in points:
-            pt = tuple(p)
-            if pt in vertexdict:
-                ivert = vertexdict[pt]
-            else:
-                vertexdict[pt] = iv
-                ivert = iv
-                iv += 1
-            ivertlist.append(ivert)
-        if ivertlist[0] != ivertlist[-1]:
-            raise Exception('Cell {} not closed'.format(icell))
-        vertexlist.append(ivertlist)
-
-    # next create vertex_cell_dict = {}; for each vertex, store list of cells
-    # that use it
-    nvert = len(vertexdict)
+    points = [vertdict[icell] for icell in range(nodestart, nodestop)]
+    npoints = np.array([len(p) for p in points], dtype=np.int)
+    xy = np.array([pt for p in points for pt in p],
+                  dtype=np.float).reshape(-1, 2)
+    ivert, verts = _unique_vertices(xy)
+    nvertstart = xy.shape[0]
+    nvert = verts.shape[0]
+
+    start = np.cumsum(npoints) - npoints
+    last = start + npoints - 1
+    notclosed = np.where((npoints == 0) |
+                         (ivert[start] != ivert[np.maximum(last, 0)]))[0]
+    if notclosed.shape[0] > 0:
+        raise Exception('Cell {} not closed'.format(nodestart +
+                                                    notclosed[0]))
     if verbose:
         print('Started with {} vertices.'.format(nvertstart))
         print('Ended up with {} vertices.'.format(nvert))
         print('Reduced total number of vertices by {}'.format(nvertstart -
                                                               nvert))
-        print('Creating dict of vertices with their associated cells')
-    vertex_cell_dict = OrderedDict()
-    for icell in range(nodestart, nodestop):
-        ivertlist = vertexlist[icell]
-        for ivert in ivertlist:
-            if ivert in vertex_cell_dict:
-                vertex_cell_dict[ivert].append(icell)
-            else:
-                vertex_cell_dict[ivert] = [icell]
-
-    # Now, go through each vertex and look at the cells that use the vertex.
+
+    # cell, position in the cell, relative position on the edge from the
+    # point at that position, and vertex number of each vertex of each cell
+    cell = np.repeat(np.arange(ncells), npoints)
+    pos = np.arange(nvertstart) - np.repeat(start, npoints)
+    t = np.zeros(nvertstart, dtype=np.float)
+    iv = ivert
+
     # For quadtree-like grids, there may be a need to add a new hanging node
     # vertex to the larger cell.
-    if verbose:
-        print('Done creating dict of vertices with their associated cells')
-        print('Checking for hanging nodes.')
-    vertexdict_keys = list(vertexdict.keys())
-    for ivert, cell_list in vertex_cell_dict.items():
-        for icell1 in cell_list:
-            for icell2 in cell_list:
-
-                # skip if same cell
-                if icell1 == icell2:
-                    continue
-
-                # skip if share face already
-                ivertlist1 = vertexlist[icell1]
-                ivertlist2 = vertexlist[icell2]
-                if shared_face(ivertlist1, ivertlist2):
-                    continue
-
-                # don't share a face, so need to segment if necessary
-                segment_face(ivert, ivertlist1, ivertlist2, vertexdict_keys)
-    if verbose:
-        print('Done checking for hanging nodes.')
-
-    verts = np.array(vertexdict_keys)
-    iverts = vertexlist
+    if not skip_hanging_node_check and nvertstart > 0:
+        if verbose:
+            print('Checking for hanging nodes.')
+        # edges from each point to the next point of the cell
+        isedge = np.ones(nvertstart, dtype=np.bool)
+        isedge[last] = False
+        iedge = np.where(isedge)[0]
+        e1, e2 = ivert[iedge], ivert[iedge + 1]
+        lo, hi = np.minimum(e1, e2), np.maximum(e1, e2)
+        uedge, ue1 = np.unique(lo * nvert + hi, return_inverse=True)
+        hv, he, ht = _find_hanging_nodes(verts, uedge // nvert,
+                                         uedge % nvert)
+        if verbose:
+            print('Found {} hanging nodes.'.format(hv.shape[0]))
+        if hv.shape[0] > 0:
+            # hanging nodes of each edge of each cell
+            order = np.argsort(he, kind='mergesort')
+            hv, he, ht = hv[order], he[order], ht[order]
+            hlo = np.searchsorted(he, ue1, side='left')
+            cnt = np.searchsorted(he, ue1, side='right') - hlo
+            ih = _expand(hlo, cnt)
+            ie = np.repeat(np.arange(iedge.shape[0]), cnt)
+            tnew = ht[ih]
+            reverse = e1[ie] != lo[ie]
+            tnew[reverse] = 1. - tnew[reverse]
+            ipt = iedge[ie]
+            cell = np.concatenate((cell, cell[ipt]))
+            pos = np.concatenate((pos, pos[ipt]))
+            t = np.concatenate((t, tnew))
+            iv = np.concatenate((iv, hv[ih]))
+            order = np.lexsort((t, pos, cell))
+            iv = iv[order]
+            npoints = np.bincount(cell, minlength=ncells)
+        if verbose:
+            print('Done checking for hanging nodes.')
+
+    iv = iv.tolist()
+    end = np.cumsum(npoints).tolist()
+    start = [0] + end[:-1]
+    iverts = [iv[i0:i1] for i0, i1 in zip(start, end)]
 
     return verts, iverts
 
@@ -230,3 +350,57 @@ def shapefile_to_cvfd(shp, **kwargs):
     return verts, iverts
 
 
+
+
+def iverts_to_array(iverts):
+    """
+    Convert the vertex numbers of the cells to a padded array, so that the
+    vertices of all of the cells can be gathered with a single index
+    operation, such as verts[ivarr].
+
+    Parameters
+    ----------
+    iverts : list of lists or ndarray
+        list containing a list of vertex numbers for each cell.  The cells
+        may be closed (the last vertex number is the first) or not.  A
+        two-dimensional array of vertex numbers that is padded at the end
+        of each row with negative values is also accepted.
+
+    Returns
+    -------
+    ivarr : ndarray
+        array of shape (ncells, maxnverts) with the vertex numbers of each
+        cell, without the closing vertex and padded with the first vertex
+        of the cell
+    nverts : ndarray
+        number of vertices of each cell
+
+    """
+    if isinstance(iverts, np.ndarray) and iverts.ndim == 2:
+        ivarr = iverts.astype(np.int)
+        nverts = (ivarr >= 0).sum(axis=1)
+    else:
+        nverts = np.array([len(iv) for iv in iverts], dtype=np.int)
+        ncells = nverts.shape[0]
+        if ncells == 0:
+            return np.zeros((0, 0), dtype=np.int), nverts
+        iv = np.fromiter(itertools.chain.from_iterable(iverts), dtype=np.int,
+                         count=nverts.sum())
+        cell = np.repeat(np.arange(ncells), nverts)
+        pos = _expand(np.zeros(ncells, dtype=np.int), nverts)
+        ivarr = np.full((ncells, nverts.max()), -1, dtype=np.int)
+        ivarr[cell, pos] = iv
+    ncells = ivarr.shape[0]
+    if ncells == 0:
+        return ivarr, nverts
+
+    # remove the closing vertex
+    first = ivarr[:, 0]
+    icell = np.where((nverts > 1) &
+                     (ivarr[np.arange(ncells), nverts - 1] == first))[0]
+    nverts[icell] -= 1
+    ivarr[icell, nverts[icell]] = -1
+
+    ivarr = ivarr[:, :nverts.max()]
+    ivarr = np.where(ivarr < 0, first[:, None], ivarr)
+    return ivarr, nverts
@@ -230,6 +230,11 @@ class LayerFile(object):
                 on the figure. (default is False)
             masked_values : list
                 List of unique values to be excluded from the plot.
+            lod : bool
+                Boolean used to determine if the arrays are plotted with
+                level-of-detail rendering, which aggregates large arrays
+                to the resolution of the figure. Only used if
+                pcolor=True. (default is False)
             file_extension : str
                 Valid matplotlib.pyplot file extension for savefig(). Only used
                 if filename_base is not None. (default is 'png')
@@ -428,6 +433,70 @@ class LayerFile(object):
         else:
             return data[mflay, :, :]
 
+    def iter_data(self, totims=None, mflay=None):
+        """
+        Generator of the data in the file, one time at a time. Only the
+        records of the requested times and layer are read, so files with
+        many times can be processed without loading all of the data.
+
+        Parameters
+        ----------
+        totims : list of floats
+            The simulation times. (Default is None, which is all of the
+            times in the file.)
+        mflay : integer
+           MODFLOW zero-based layer number to return.  If None, then all
+           all layers will be included. (Default is None.)
+
+        Returns
+        ----------
+        out : generator of (totim, data) tuples
+            data has size (nlay, nrow, ncol) if mflay is None or it has size
+            (nrow, ncol) if mlay is specified.
+
+        Examples
+        --------
+        >>> import flopy
+        >>> hds = flopy.utils.HeadFile('model.hds')
+        >>> for totim, head in hds.iter_data(mflay=0):
+        ...     print(totim, head.max())
+
+        """
+        if totims is None:
+            totims = self.times
+        # record indices for each time
+        records = {}
+        for idx, totim in enumerate(self.recordarray['totim']):
+            records.setdefault(totim, []).append(idx)
+        for totim in totims:
+            if totim not in records:
+                msg = 'totim value ({}) not found in file...'.format(totim)
+                raise Exception(msg)
+            data = None
+            for idx in records[totim]:
+                ilay = self.recordarray['ilay'][idx]
+                if mflay is not None and ilay != mflay + 1:
+                    continue
+                nrow = self.recordarray['nrow'][idx]
+                ncol = self.recordarray['ncol'][idx]
+                if data is None:
+                    if mflay is None:
+                        data = np.empty((self.nlay, nrow, ncol),
+                                        dtype=self.realtype)
+                    else:
+                        data = np.empty((nrow, ncol), dtype=self.realtype)
+                    data[:] = np.nan
+                self.file.seek(self.iposarray[idx], 0)
+                if mflay is None:
+                    data[ilay - 1] = self._read_data((nrow, ncol))
+                else:
+                    data[:, :] = self._read_data((nrow, ncol))
+            if data is None:
+                msg = 'layer {} not found in file for '.format(mflay) + \
+                      'totim value ({})'.format(totim)
+                raise Exception(msg)
+            yield totim, data
+
     def get_alldata(self, mflay=None, nodata=-9999):
         """
         Get all of the data from the file.
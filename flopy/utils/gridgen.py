@@ -1,5 +1,6 @@
 from __future__ import print_function
 import os
+import hashlib
 import numpy as np
 import subprocess
 
@@ -26,15 +27,11 @@ except:
 def read1d(f, a):
     """
     Quick file to array reader for reading gridgen output.  Much faster
-    than the read1d function in util_array
+    than the read1d function in util_array because the whole file is
+    parsed by numpy at once.
 
     """
-    dtype = a.dtype.type
-    lines = f.readlines()
-    l = []
-    for line in lines:
-        l += [dtype(i) for i in line.strip().split()]
-    a[:] = np.array(l, dtype=dtype)
+    a[:] = np.fromstring(f.read(), dtype=a.dtype, sep=' ')
     return a
 
 
@@ -138,10 +135,7 @@ class Gridgen(object):
         self._vertdict = {}
         self.dis = dis
         self.model_ws = model_ws
-        exe_name = which(exe_name)
-        if exe_name is None:
-            raise Exception('Cannot find gridgen binary executable')
-        self.exe_name = os.path.abspath(exe_name)
+        self.exe_name = self._find_exe(exe_name)
 
         # Set default surface interpolation for all surfaces (nlay + 1)
         surface_interpolation = surface_interpolation.upper()
@@ -168,8 +162,20 @@ class Gridgen(object):
         # Set up blank _elev and _elev_extent dictionaries
         self._asciigrid_dict = {}
 
+        # grid properties read from the gridgen output and the hash of the
+        # dfn files that they were read for
+        self._gridprops = None
+        self._gridprops_hash = None
+
         return
 
+    def _find_exe(self, exe_name):
+        # absolute path of the gridgen executable
+        exe_name = which(exe_name)
+        if exe_name is None:
+            raise Exception('Cannot find gridgen binary executable')
+        return os.path.abspath(exe_name)
+
     def set_surface_interpolation(self, isurf, type, elev=None,
                                   elev_extent=None):
         """
@@ -323,6 +329,11 @@ class Gridgen(object):
         None
 
         """
+        # the dfn files name the elevation files without their values, so
+        # the grid properties are always read again after a build
+        self._gridprops = None
+        self._gridprops_hash = None
+
         fname = os.path.join(self.model_ws, '_gridgen_build.dfn')
         f = open(fname, 'w')
 
@@ -564,14 +575,10 @@ class Gridgen(object):
 
     def get_disu(self, model, nper=1, perlen=1, nstp=1, tsmult=1, steady=True,
                  itmuni=4, lenuni=2):
+        gridprops = self.get_gridprops()
 
         # nodes, nlay, ivsd, itmuni, lenuni, idsymrd, laycbd
-        fname = os.path.join(self.model_ws, 'qtg.nod')
-        f = open(fname, 'r')
-        line = f.readline()
-        ll = line.strip().split()
-        nodes = int(ll.pop(0))
-        f.close()
+        nodes = gridprops['nodes']
         nlay = self.dis.nlay
         ivsd = 0
         idsymrd = 0
@@ -581,113 +588,47 @@ class Gridgen(object):
         self.nodes = nodes
 
         # nodelay
-        nodelay = np.empty((nlay), dtype=np.int)
-        fname = os.path.join(self.model_ws, 'qtg.nodesperlay.dat')
-        f = open(fname, 'r')
-        nodelay = read1d(f, nodelay)
-        f.close()
-
-        # top
-        top = [0] * nlay
-        for k in range(nlay):
-            fname = os.path.join(self.model_ws,
-                                 'quadtreegrid.top{}.dat'.format(k + 1))
-            f = open(fname, 'r')
-            tpk = np.empty((nodelay[k]), dtype=np.float32)
-            tpk = read1d(f, tpk)
-            f.close()
-            if tpk.min() == tpk.max():
-                tpk = tpk.min()
-            else:
-                tpk = Util2d(model, (1, nodelay[k]), np.float32,
-                             np.reshape(tpk, (1, nodelay[k])),
-                             name='top {}'.format(k + 1))
-            top[k] = tpk
-
-        # bot
-        bot = [0] * nlay
-        for k in range(nlay):
-            fname = os.path.join(self.model_ws,
-                                 'quadtreegrid.bot{}.dat'.format(k + 1))
-            f = open(fname, 'r')
-            btk = np.empty((nodelay[k]), dtype=np.float32)
-            btk = read1d(f, btk)
-            f.close()
-            if btk.min() == btk.max():
-                btk = btk.min()
-            else:
-                btk = Util2d(model, (1, nodelay[k]), np.float32,
-                             np.reshape(btk, (1, nodelay[k])),
-                             name='bot {}'.format(k + 1))
-            bot[k] = btk
-
-        # area
-        area = [0] * nlay
-        fname = os.path.join(self.model_ws, 'qtg.area.dat')
-        f = open(fname, 'r')
-        anodes = np.empty((nodes), dtype=np.float32)
-        anodes = read1d(f, anodes)
-        f.close()
-        istart = 0
-        for k in range(nlay):
-            istop = istart + nodelay[k]
-            ark = anodes[istart: istop]
-            if ark.min() == ark.max():
-                ark = ark.min()
-            else:
-                ark = Util2d(model, (1, nodelay[k]), np.float32,
-                             np.reshape(ark, (1, nodelay[k])),
-                             name='area layer {}'.format(k + 1))
-            area[k] = ark
-            istart = istop
-
-        # iac
-        iac = np.empty((nodes), dtype=np.int)
-        fname = os.path.join(self.model_ws, 'qtg.iac.dat')
-        f = open(fname, 'r')
-        iac = read1d(f, iac)
-        f.close()
+        nodelay = gridprops['nodelay']
 
-        # Calculate njag and save as nja to self
-        njag = iac.sum()
+        # top, bot and area, as a constant for layers where they do not vary
+        layered = {}
+        for name in ['top', 'bot', 'area']:
+            layered[name] = [0] * nlay
+            istart = 0
+            for k in range(nlay):
+                istop = istart + nodelay[k]
+                ak = gridprops[name][istart:istop]
+                if ak.min() == ak.max():
+                    ak = ak.min()
+                else:
+                    if name == 'area':
+                        nm = 'area layer {}'.format(k + 1)
+                    else:
+                        nm = '{} {}'.format(name, k + 1)
+                    ak = Util2d(model, (1, nodelay[k]), np.float32,
+                                np.reshape(ak, (1, nodelay[k])), name=nm)
+                layered[name][k] = ak
+                istart = istop
+
+        # iac, and njag saved as nja to self
+        iac = gridprops['iac']
+        njag = gridprops['nja']
         self.nja = njag
 
-        # ja
-        ja = np.empty((njag), dtype=np.int)
-        fname = os.path.join(self.model_ws, 'qtg.ja.dat')
-        f = open(fname, 'r')
-        ja = read1d(f, ja)
-        f.close()
-
-        # ivc
-        fldr = np.empty((njag), dtype=np.int)
-        fname = os.path.join(self.model_ws, 'qtg.fldr.dat')
-        f = open(fname, 'r')
-        fldr = read1d(f, fldr)
-        ivc = np.where(abs(fldr) == 3, 1, 0)
-        f.close()
-
+        # ja, ivc, cl12 and fahl
+        ja = gridprops['ja']
+        ivc = gridprops['ivc']
         cl1 = None
         cl2 = None
-        # cl12
-        cl12 = np.empty((njag), dtype=np.float32)
-        fname = os.path.join(self.model_ws, 'qtg.c1.dat')
-        f = open(fname, 'r')
-        cl12 = read1d(f, cl12)
-        f.close()
-
-        # fahl
-        fahl = np.empty((njag), dtype=np.float32)
-        fname = os.path.join(self.model_ws, 'qtg.fahl.dat')
-        f = open(fname, 'r')
-        fahl = read1d(f, fahl)
-        f.close()
+        cl12 = gridprops['cl12']
+        fahl = gridprops['fahl']
 
         # create dis object instance
         disu = ModflowDisU(model, nodes=nodes, nlay=nlay, njag=njag, ivsd=ivsd,
                            nper=nper, itmuni=itmuni, lenuni=lenuni,
                            idsymrd=idsymrd, laycbd=laycbd, nodelay=nodelay,
-                           top=top, bot=bot, area=area, iac=iac, ja=ja,
+                           top=layered['top'], bot=layered['bot'],
+                           area=layered['area'], iac=iac, ja=ja,
                            ivc=ivc, cl1=cl1, cl2=cl2, cl12=cl12, fahl=fahl,
                            perlen=perlen, nstp=nstp, tsmult=tsmult,
                            steady=steady)
@@ -696,72 +637,88 @@ class Gridgen(object):
         return disu
 
     def get_gridprops(self):
+        """
+        Return a dictionary of the grid properties: nodes, nlay, nodelay,
+        top, bot, area, iac, nja, ja (one-based), fldr, ivc, cl12, fahl,
+        ihc, hwva, angldegx, nvert, vertices and cellxy.
+
+        The properties are read from the gridgen output once and cached
+        until the grid is built again or the gridgen definition files
+        change. The arrays that are
+        returned are copies, so changing them does not change the cache.
+
+        """
+        dfnhash = self._dfn_hash()
+        if self._gridprops is None or self._gridprops_hash != dfnhash:
+            self._gridprops = self._read_gridprops()
+            self._gridprops_hash = dfnhash
+        gridprops = {}
+        for key, value in self._gridprops.items():
+            if isinstance(value, np.ndarray):
+                value = value.copy()
+            gridprops[key] = value
+        return gridprops
+
+    def _dfn_hash(self):
+        """
+        Return the md5 hash of the build and quadtree grid definition files.
+
+        """
+        md5 = hashlib.md5()
+        for fname in ['_gridgen_build.dfn', 'quadtreegrid.dfn']:
+            fname = os.path.join(self.model_ws, fname)
+            if os.path.isfile(fname):
+                with open(fname, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1048576), b''):
+                        md5.update(chunk)
+        return md5.hexdigest()
+
+    def _read_usgdata(self, fname, dtype, count):
+        """
+        Read a gridgen output file into a one-dimensional array.
+
+        """
+        a = np.empty((count), dtype=dtype)
+        with open(os.path.join(self.model_ws, fname), 'r') as f:
+            a = read1d(f, a)
+        return a
+
+    def _read_gridprops(self):
         gridprops = {}
 
         # nodes, nlay, ivsd, itmuni, lenuni, idsymrd, laycbd
         fname = os.path.join(self.model_ws, 'qtg.nod')
-        f = open(fname, 'r')
-        line = f.readline()
-        ll = line.strip().split()
+        with open(fname, 'r') as f:
+            ll = f.readline().strip().split()
         nodes = int(ll.pop(0))
-        f.close()
         nlay = self.dis.nlay
         gridprops['nodes'] = nodes
         gridprops['nlay'] = nlay
 
-
         # nodelay
-        nodelay = np.empty((nlay), dtype=np.int)
-        fname = os.path.join(self.model_ws, 'qtg.nodesperlay.dat')
-        f = open(fname, 'r')
-        nodelay = read1d(f, nodelay)
-        f.close()
+        nodelay = self._read_usgdata('qtg.nodesperlay.dat', np.int, nlay)
         gridprops['nodelay'] = nodelay
 
-        # top
-        top = np.empty((nodes), dtype=np.float32)
-        istart = 0
-        for k in range(nlay):
-            istop = istart + nodelay[k]
-            fname = os.path.join(self.model_ws,
-                                 'quadtreegrid.top{}.dat'.format(k + 1))
-            f = open(fname, 'r')
-            tpk = np.empty((nodelay[k]), dtype=np.float32)
-            tpk = read1d(f, tpk)
-            f.close()
-            top[istart:istop] = tpk
-            istart = istop
-        gridprops['top'] = top
-
-        # bot
-        bot = np.empty((nodes), dtype=np.float32)
-        istart = 0
-        for k in range(nlay):
-            istop = istart + nodelay[k]
-            fname = os.path.join(self.model_ws,
-                                 'quadtreegrid.bot{}.dat'.format(k + 1))
-            f = open(fname, 'r')
-            btk = np.empty((nodelay[k]), dtype=np.float32)
-            btk = read1d(f, btk)
-            f.close()
-            bot[istart:istop] = btk
-            istart = istop
-        gridprops['bot'] = bot
+        # top and bot
+        for name in ['top', 'bot']:
+            a = np.empty((nodes), dtype=np.float32)
+            istart = 0
+            for k in range(nlay):
+                istop = istart + nodelay[k]
+                fname = 'quadtreegrid.{}{}.dat'.format(name, k + 1)
+                a[istart:istop] = self._read_usgdata(fname, np.float32,
+                                                     nodelay[k])
+                istart = istop
+            gridprops[name] = a
+        top = gridprops['top']
+        bot = gridprops['bot']
 
         # area
-        fname = os.path.join(self.model_ws, 'qtg.area.dat')
-        f = open(fname, 'r')
-        area = np.empty((nodes), dtype=np.float32)
-        area = read1d(f, area)
-        f.close()
-        gridprops['area'] = area
+        gridprops['area'] = self._read_usgdata('qtg.area.dat', np.float32,
+                                               nodes)
 
         # iac
-        iac = np.empty((nodes), dtype=np.int)
-        fname = os.path.join(self.model_ws, 'qtg.iac.dat')
-        f = open(fname, 'r')
-        iac = read1d(f, iac)
-        f.close()
+        iac = self._read_usgdata('qtg.iac.dat', np.int, nodes)
         gridprops['iac'] = iac
 
         # Calculate njag and save as nja to self
@@ -769,19 +726,11 @@ class Gridgen(object):
         gridprops['nja'] = njag
 
         # ja
-        ja = np.empty((njag), dtype=np.int)
-        fname = os.path.join(self.model_ws, 'qtg.ja.dat')
-        f = open(fname, 'r')
-        ja = read1d(f, ja)
-        f.close()
+        ja = self._read_usgdata('qtg.ja.dat', np.int, njag)
         gridprops['ja'] = ja
 
         # fldr
-        fldr = np.empty((njag), dtype=np.int)
-        fname = os.path.join(self.model_ws, 'qtg.fldr.dat')
-        f = open(fname, 'r')
-        fldr = read1d(f, fldr)
-        f.close()
+        fldr = self._read_usgdata('qtg.fldr.dat', np.int, njag)
         gridprops['fldr'] = fldr
 
         # ivc
@@ -790,48 +739,24 @@ class Gridgen(object):
         ivc[idx] = 1
         gridprops['ivc'] = ivc
 
-        cl1 = None
-        cl2 = None
         # cl12
-        cl12 = np.empty((njag), dtype=np.float32)
-        fname = os.path.join(self.model_ws, 'qtg.c1.dat')
-        f = open(fname, 'r')
-        cl12 = read1d(f, cl12)
-        f.close()
-        gridprops['cl12'] = cl12
+        gridprops['cl12'] = self._read_usgdata('qtg.c1.dat', np.float32, njag)
 
         # fahl
-        fahl = np.empty((njag), dtype=np.float32)
-        fname = os.path.join(self.model_ws, 'qtg.fahl.dat')
-        f = open(fname, 'r')
-        fahl = read1d(f, fahl)
-        f.close()
+        fahl = self._read_usgdata('qtg.fahl.dat', np.float32, njag)
         gridprops['fahl'] = fahl
 
         # ihc
-        ihc = np.empty(fldr.shape, dtype=np.int)
-        ihc = np.where(abs(fldr) == 0, 0, ihc)
-        ihc = np.where(abs(fldr) == 1, 1, ihc)
-        ihc = np.where(abs(fldr) == 2, 1, ihc)
-        ihc = np.where(abs(fldr) == 3, 0, ihc)
+        ihc = np.where((abs(fldr) == 1) | (abs(fldr) == 2), 1, 0)
         gridprops['ihc'] = ihc
 
-        #hwva
+        # hwva, the horizontal face area divided by the average thickness
+        n = np.repeat(np.arange(nodes), iac)
+        m = ja - 1
+        dz = top - bot
         hwva = fahl.copy()
-        ipos = 0
-        for n in range(nodes):
-            for j in range(iac[n]):
-                if j == 0:
-                    pass
-                elif ihc[ipos] == 0:
-                    pass
-                else:
-                    m = ja[ipos] - 1
-                    dzn = top[n] - bot[n]
-                    dzm = top[m] - bot[m]
-                    dzavg = 0.5 * (dzn + dzm)
-                    hwva[ipos] = hwva[ipos] / dzavg
-                ipos += 1
+        idx = ihc == 1
+        hwva[idx] = fahl[idx] / (0.5 * (dz[n[idx]] + dz[m[idx]]))
         gridprops['hwva'] = hwva
 
         # angldegx
@@ -844,23 +769,17 @@ class Gridgen(object):
         gridprops['angldegx'] = angldegx
 
         # vertices -- not optimized for redundant vertices yet
+        vts = np.array([self.get_vertices(i)[:4] for i in range(nodes)],
+                       dtype=np.float)
         nvert = nodes * 4
-        vertices = np.empty((nvert, 2), dtype=np.float)
-        ipos = 0
-        for n in range(nodes):
-            vs = self.get_vertices(n)
-            for x, y in vs[:-1]:  # do not include last vertex
-                vertices[ipos, 0] = x
-                vertices[ipos, 1] = y
-                ipos += 1
         gridprops['nvert'] = nvert
-        gridprops['vertices'] = vertices
+        gridprops['vertices'] = vts.reshape((nvert, 2))
 
+        # cell centers from the x of the first two and the y of the first
+        # and third vertices, as in get_center
         cellxy = np.empty((nodes, 2), dtype=np.float)
-        for n in range(nodes):
-            x, y = self.get_center(n)
-            cellxy[n, 0] = x
-            cellxy[n, 1] = y
+        cellxy[:, 0] = 0.5 * (vts[:, 0, 0] + vts[:, 1, 0])
+        cellxy[:, 1] = 0.5 * (vts[:, 2, 1] + vts[:, 0, 1])
         gridprops['cellxy'] = cellxy
 
         return gridprops
@@ -0,0 +1,404 @@
+"""
+Module for intersecting point, line, and polygon features with a structured
+model grid without the GRIDGEN executable.
+
+Features are rotated and scaled into model coordinates once using the
+SpatialReference.  In model coordinates the grid is rectilinear, so the
+sorted row and column edges are an exact bounding-box index that is queried
+with np.searchsorted.
+
+"""
+import numpy as np
+
+
+def _shoelace(ring):
+    """Return the signed area of a ring (positive for counter-clockwise)."""
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * (np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]) +
+                  x[-1] * y[0] - x[0] * y[-1])
+
+
+def _get_parts(feature, featuretype):
+    """
+    Return a list of (npts, 2) coordinate arrays for the parts of a
+    feature.  For polygons, the first part is the exterior and parts with
+    the opposite orientation are holes.
+
+    """
+    if featuretype == 'polygon' and hasattr(feature, 'exterior'):
+        exterior = np.asarray(feature.exterior, dtype=np.float64)[:, :2]
+        if _shoelace(exterior) < 0.:
+            exterior = exterior[::-1]
+        parts = [exterior]
+        for interior in feature.interiors:
+            interior = np.asarray(list(interior), dtype=np.float64)[:, :2]
+            if _shoelace(interior) > 0.:
+                interior = interior[::-1]
+            parts.append(interior)
+        return parts
+    elif hasattr(feature, 'parts') and hasattr(feature, 'points'):
+        # pyshp shape
+        points = np.asarray(feature.points, dtype=np.float64)[:, :2]
+        i0 = list(feature.parts)
+        i1 = i0[1:] + [len(points)]
+        return [points[a:b] for a, b in zip(i0, i1)]
+    elif hasattr(feature, 'coords'):
+        coords = np.asarray(feature.coords, dtype=np.float64)
+        return [coords.reshape(-1, coords.shape[-1])[:, :2]]
+    if featuretype == 'point':
+        return [np.asarray(feature, dtype=np.float64).reshape(1, -1)[:, :2]]
+    a = np.asarray(feature)
+    if a.dtype != object and a.ndim == 2:
+        return [a.astype(np.float64)[:, :2]]
+    return [np.asarray(part, dtype=np.float64)[:, :2] for part in feature]
+
+
+class GridIntersect(object):
+    """
+    Intersect point, line, and polygon features with a structured grid.
+
+    Parameters
+    ----------
+    sr : flopy.utils.reference.SpatialReference
+        spatial reference of the model grid
+
+    Notes
+    -----
+    Lengths and areas are returned in model length units.  Features can be
+    flopy.utils.geometry Point, LineString, or Polygon instances, pyshp
+    shapes, coordinate sequences, or the name of a shapefile.  Line and
+    polygon coordinate sequences can also be lists of parts (as in
+    flopy.utils.gridgen.features_to_shapefile).
+
+    Examples
+    --------
+
+    >>> import flopy
+    >>> from flopy.utils.gridintersect import GridIntersect
+    >>> m = flopy.modflow.Modflow.load('model.nam')
+    >>> ix = GridIntersect(m.sr)
+    >>> result = ix.intersect_lines([[(0., 0.), (100., 50.)]])
+
+    """
+
+    def __init__(self, sr):
+        self.sr = sr
+        self.nrow, self.ncol = sr.nrow, sr.ncol
+        self.xedge = sr.get_xedge_array()
+        # ascending row edges (the bottom of the last row is first)
+        self.yedge = sr.get_yedge_array()[::-1]
+        self.delr = sr.delr
+        self.delc = sr.delc
+
+    def _to_model(self, xy):
+        x, y = self.sr.transform(xy[:, 0].copy(), xy[:, 1].copy(),
+                                 inverse=True)
+        return np.column_stack((x, y))
+
+    def _get_features(self, features, featuretype):
+        if isinstance(features, str):
+            import shapefile
+            features = shapefile.Reader(features).shapes()
+        elif hasattr(features, 'exterior') or hasattr(features, 'coords'):
+            features = [features]
+        return [[self._to_model(part) for part in
+                 _get_parts(feature, featuretype)] for feature in features]
+
+    def _get_col(self, x):
+        return np.searchsorted(self.xedge, x, side='right') - 1
+
+    def _get_row(self, y):
+        return self.nrow - np.searchsorted(self.yedge, y, side='left')
+
+    def query_bbox(self, xmin, ymin, xmax, ymax):
+        """
+        Get the rows and columns of the cells that may intersect a
+        bounding box in real-world coordinates.
+
+        Parameters
+        ----------
+        xmin, ymin, xmax, ymax : float
+            bounding box
+
+        Returns
+        -------
+        rows : np.ndarray
+            zero-based rows of the candidate cells
+        cols : np.ndarray
+            zero-based columns of the candidate cells
+
+        """
+        corners = self._to_model(np.array([[xmin, ymin], [xmax, ymin],
+                                           [xmax, ymax], [xmin, ymax]]))
+        c0, c1 = self._get_col(corners[:, 0].min()), \
+                 self._get_col(corners[:, 0].max())
+        r0, r1 = self._get_row(corners[:, 1].max()), \
+                 self._get_row(corners[:, 1].min())
+        c0, r0 = max(c0, 0), max(r0, 0)
+        c1, r1 = min(c1, self.ncol - 1), min(r1, self.nrow - 1)
+        if c1 < c0 or r1 < r0:
+            return np.array([], dtype=np.int), np.array([], dtype=np.int)
+        rows, cols = np.meshgrid(np.arange(r0, r1 + 1),
+                                 np.arange(c0, c1 + 1), indexing='ij')
+        return rows.ravel(), cols.ravel()
+
+    def intersect_points(self, points):
+        """
+        Find the cells that contain points.
+
+        Parameters
+        ----------
+        points : list or str
+            list of (x, y) points or Point instances, or the name of a
+            point shapefile
+
+        Returns
+        -------
+        result : np.recarray
+            recarray with the feature id (fid), row, col, and zero-based
+            nodenumber of each point inside the grid
+
+        """
+        xy = np.array([f[0][0] for f in self._get_features(points, 'point')])
+        xy = xy.reshape(-1, 2)
+        fid = np.arange(xy.shape[0])
+        col = self._get_col(xy[:, 0])
+        row = self._get_row(xy[:, 1])
+        # points on the outer grid edges belong to the edge cells
+        col[(col == self.ncol) & (xy[:, 0] == self.xedge[-1])] -= 1
+        row[(row == self.nrow) & (xy[:, 1] == self.yedge[0])] -= 1
+        idx = (col >= 0) & (col < self.ncol) & (row >= 0) & (row < self.nrow)
+        return self._get_recarray([('fid', fid[idx]), ('row', row[idx]),
+                                   ('col', col[idx])])
+
+    def intersect_lines(self, lines):
+        """
+        Intersect lines with the grid.
+
+        Parameters
+        ----------
+        lines : list or str
+            list of lines (each a list of (x, y) points, a list of parts,
+            or a LineString instance) or the name of a line shapefile
+
+        Returns
+        -------
+        result : np.recarray
+            recarray with the feature id (fid), row, col, zero-based
+            nodenumber, length, starting_distance, and ending_distance of
+            each piece of a line in a cell, in order along each line.
+            Consecutive pieces of a line in the same cell are combined.
+
+        """
+        x0, y0, x1, y1, sfid, sdist = [], [], [], [], [], []
+        for fid, parts in enumerate(self._get_features(lines, 'line')):
+            dist = 0.
+            for part in parts:
+                if part.shape[0] < 2:
+                    continue
+                seglen = np.hypot(np.diff(part[:, 0]), np.diff(part[:, 1]))
+                x0.append(part[:-1, 0])
+                y0.append(part[:-1, 1])
+                x1.append(part[1:, 0])
+                y1.append(part[1:, 1])
+                sfid.append(np.full(seglen.shape[0], fid, dtype=np.int))
+                sdist.append(dist + np.cumsum(seglen) - seglen)
+                dist += seglen.sum()
+        if len(x0) == 0:
+            return self._get_recarray([('fid', []), ('row', []),
+                                       ('col', [])],
+                                      [('length', []),
+                                       ('starting_distance', []),
+                                       ('ending_distance', [])])
+        x0, y0, x1, y1, sfid, sdist = [np.concatenate(a) for a in
+                                       (x0, y0, x1, y1, sfid, sdist)]
+        seg, ta, tb = self._split_segments(x0, y0, x1, y1)
+        tm = 0.5 * (ta + tb)
+        col = self._get_col(x0[seg] + tm * (x1 - x0)[seg])
+        row = self._get_row(y0[seg] + tm * (y1 - y0)[seg])
+        seglen = np.hypot(x1 - x0, y1 - y0)[seg]
+        start = sdist[seg] + ta * seglen
+        end = sdist[seg] + tb * seglen
+        fid = sfid[seg]
+        idx = (col >= 0) & (col < self.ncol) & (row >= 0) & (row < self.nrow)
+        fid, row, col, start, end = [a[idx] for a in
+                                     (fid, row, col, start, end)]
+
+        # combine consecutive pieces in the same cell
+        if fid.shape[0] > 0:
+            new = np.ones(fid.shape[0], dtype=np.bool)
+            new[1:] = (fid[1:] != fid[:-1]) | (row[1:] != row[:-1]) | \
+                      (col[1:] != col[:-1]) | \
+                      ~np.isclose(start[1:], end[:-1])
+            igroup = np.where(new)[0]
+            ilast = np.append(igroup[1:], fid.shape[0]) - 1
+            length = np.add.reduceat(end - start, igroup)
+            fid, row, col = fid[igroup], row[igroup], col[igroup]
+            start, end = start[igroup], end[ilast]
+        else:
+            length = end - start
+        return self._get_recarray([('fid', fid), ('row', row), ('col', col)],
+                                  [('length', length),
+                                   ('starting_distance', start),
+                                   ('ending_distance', end)])
+
+    def intersect_polygons(self, polygons):
+        """
+        Intersect polygons with the grid.
+
+        Parameters
+        ----------
+        polygons : list or str
+            list of polygons (each a list of (x, y) points, a list of rings,
+            or a Polygon instance) or the name of a polygon shapefile.  For
+            lists of rings, the first ring is the exterior and rings with
+            the opposite orientation are holes.
+
+        Returns
+        -------
+        result : np.recarray
+            recarray with the feature id (fid), row, col, zero-based
+            nodenumber, area, and fraction (area divided by the cell area)
+            of each cell that intersects a polygon
+
+        """
+        features = self._get_features(polygons, 'polygon')
+        x0, y0, x1, y1, sfid, sign = [], [], [], [], [], []
+        for fid, parts in enumerate(features):
+            parts = [p for p in parts if p.shape[0] > 2]
+            if len(parts) == 0:
+                continue
+            # close the rings
+            parts = [p if np.array_equal(p[0], p[-1])
+                     else np.vstack((p, p[:1])) for p in parts]
+            for part in parts:
+                x0.append(part[:-1, 0])
+                y0.append(part[:-1, 1])
+                x1.append(part[1:, 0])
+                y1.append(part[1:, 1])
+                sfid.append(np.full(part.shape[0] - 1, fid, dtype=np.int))
+            sign.append((fid, -np.sign(_shoelace(parts[0]))))
+
+        fields = [[], [], [], [], []]
+        if len(x0) > 0:
+            x0, y0, x1, y1, sfid = [np.concatenate(a) for a in
+                                    (x0, y0, x1, y1, sfid)]
+            sign = dict(sign)
+            seg, ta, tb = self._split_segments(x0, y0, x1, y1)
+            tm = 0.5 * (ta + tb)
+            xm = x0[seg] + tm * (x1 - x0)[seg]
+            ym = y0[seg] + tm * (y1 - y0)[seg]
+            dx = (tb - ta) * (x1 - x0)[seg]
+            col = self._get_col(xm)
+            row = self._get_row(ym)
+            # pieces above the grid (row -1) only contribute to the rows
+            # below them and pieces below the grid (row nrow) only set the
+            # lowest row that is evaluated
+            idx = (col >= 0) & (col < self.ncol) & (dx != 0.)
+            pfid, col, row, ym, dx = [a[idx] for a in
+                                      (sfid[seg], col, row, ym, dx)]
+            row = np.clip(row, -1, self.nrow)
+            # pieces are sorted by feature
+            bounds = np.searchsorted(pfid, np.arange(len(features) + 1))
+            for fid in range(len(features)):
+                i0, i1 = bounds[fid], bounds[fid + 1]
+                if i1 == i0:
+                    continue
+                r = self._polygon_cells(col[i0:i1], row[i0:i1], ym[i0:i1],
+                                        dx[i0:i1])
+                fields[0].append(np.full(r[0].shape[0], fid, dtype=np.int))
+                fields[1].append(r[0])
+                fields[2].append(r[1])
+                fields[3].append(sign[fid] * r[2])
+        fields = [np.concatenate(f) if len(f) > 0 else np.array([])
+                  for f in fields[:4]]
+        fid, row, col, area = fields
+        row, col = row.astype(np.int), col.astype(np.int)
+        cellarea = self.delr[col] * self.delc[row]
+        return self._get_recarray([('fid', fid), ('row', row), ('col', col)],
+                                  [('area', area),
+                                   ('fraction', area / cellarea)])
+
+    def _polygon_cells(self, col, row, ym, dx):
+        """
+        Compute the area of a polygon in each cell from the pieces of its
+        boundary.  The area of a cell is the integral of the clipped height
+        of the polygon over the width of the column, accumulated from the
+        boundary pieces that cross the column.
+
+        """
+        imin = max(row.min(), 0)
+        imax = min(row.max(), self.nrow - 1)
+        if imax < imin:
+            empty = np.array([], dtype=np.int)
+            return empty, empty, np.array([])
+        jmin, jmax = col.min(), col.max()
+        nr, nc = imax - imin + 1, jmax - jmin + 1
+        idx = row < self.nrow
+        col, row, ym, dx = col[idx], row[idx], ym[idx], dx[idx]
+        jl = col - jmin
+
+        # partial height of the piece in its own row
+        partial = np.zeros((nr, nc), dtype=np.float64)
+        inside = row >= imin
+        ybot = self.yedge[self.nrow - 1 - row[inside]]
+        np.add.at(partial, (row[inside] - imin, jl[inside]),
+                  dx[inside] * (ym[inside] - ybot))
+
+        # full height of the rows below the piece
+        full = np.zeros((nr + 1, nc), dtype=np.float64)
+        np.add.at(full, (row + 1 - imin, jl), dx)
+        full = np.cumsum(full, axis=0)[:nr]
+        area = partial + self.delc[imin:imax + 1, None] * full
+
+        tol = 1.0e-10 * self.delc[imin:imax + 1, None] * \
+              self.delr[None, jmin:jmax + 1]
+        ir, jc = np.nonzero(np.abs(area) > tol)
+        return ir + imin, jc + jmin, area[ir, jc]
+
+    def _split_segments(self, x0, y0, x1, y1):
+        """
+        Split line segments at the grid lines.
+
+        Returns
+        -------
+        seg : np.ndarray
+            segment index of each piece
+        ta, tb : np.ndarray
+            parametric start and end of each piece along the segment
+
+        """
+        nseg = x0.shape[0]
+        segs = [np.arange(nseg), np.arange(nseg)]
+        ts = [np.zeros(nseg), np.ones(nseg)]
+        for a0, a1, edges in ((x0, x1, self.xedge), (y0, y1, self.yedge)):
+            lo, hi = np.minimum(a0, a1), np.maximum(a0, a1)
+            e0 = np.searchsorted(edges, lo, side='right')
+            n = np.maximum(np.searchsorted(edges, hi, side='left') - e0, 0)
+            seg = np.repeat(np.arange(nseg), n)
+            offset = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+            e = edges[np.repeat(e0, n) + offset]
+            segs.append(seg)
+            ts.append((e - a0[seg]) / (a1 - a0)[seg])
+        seg = np.concatenate(segs)
+        t = np.concatenate(ts)
+        order = np.lexsort((t, seg))
+        seg, t = seg[order], t[order]
+        same = seg[1:] == seg[:-1]
+        seg, ta, tb = seg[:-1][same], t[:-1][same], t[1:][same]
+        idx = tb > ta
+        return seg[idx], ta[idx], tb[idx]
+
+    def _get_recarray(self, cells, values=()):
+        fid, row, col = [np.asarray(a[1], dtype=np.int) for a in cells]
+        dtype = [('fid', np.int), ('row', np.int), ('col', np.int),
+                 ('nodenumber', np.int)] + \
+                [(name, np.float64) for name, v in values]
+        result = np.recarray(fid.shape[0], dtype=dtype)
+        result['fid'] = fid
+        result['row'] = row
+        result['col'] = col
+        result['nodenumber'] = row * self.ncol + col
+        for name, v in values:
+            result[name] = v
+        return result
@@ -132,6 +132,18 @@ class MfGrdFile(FlopyBinaryData):
                   ' for {}'.format(self.file.name))
         return np.column_stack((x, y))
 
+    def get_connectivity(self):
+        """
+        Get the compressed sparse row connectivity of the grid.
+
+        Returns
+        -------
+        con : flopy.utils.Connectivity
+
+        """
+        from .connectivity import Connectivity
+        return Connectivity.from_grdfile(self)
+
     def get_verts(self):
         if self._grid == 'DISV':
             try:
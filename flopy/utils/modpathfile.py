@@ -209,9 +209,21 @@ class PathlineFile():
         >>> p = pthobj.get_alldata()
 
         """
-        plist = []
-        for partid in range(self.nid):
-            plist.append(self.get_data(partid=partid, totim=totim, ge=ge))
+        data = self._data
+        if totim is not None:
+            if ge:
+                data = data[data['time'] >= totim]
+            else:
+                data = data[data['time'] <= totim]
+        # group the records by particle, a stable sort keeps the order of
+        # the records of each particle
+        data = data[np.argsort(data['particleid'], kind='mergesort')]
+        ra = np.rec.fromarrays((data['x'], data['y'], data['z'],
+                                data['time'], data['k'], data['particleid']),
+                               dtype=self.outdtype)
+        bounds = np.searchsorted(data['particleid'], np.arange(self.nid + 1))
+        plist = [ra[bounds[partid]:bounds[partid + 1]]
+                 for partid in range(self.nid)]
         return plist
 
     def get_destination_pathline_data(self, dest_cells):
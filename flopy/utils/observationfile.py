@@ -208,23 +208,59 @@ class ObsFiles(FlopyBinaryData):
         df = pd.DataFrame(self.data[i0:i1], index=dti, columns=obsname)
         return df
 
-    def _read_data(self):
+    def _read_data(self, obsnames=None, lazy=False):
+        """
+        Read all of the observation records in the file with a single bulk
+        read. The number of records is calculated from the size of the
+        file and the record dtype.
+
+        Parameters
+        ----------
+        obsnames : str or list of str
+            Observation names to load. If obsnames is None, all
+            observations are loaded. totim is always loaded.
+            (default is None)
+        lazy : bool
+            If True, the records are memory-mapped instead of being read
+            into memory. (default is False)
+
+        """
 
         if self.data is not None:
             return
 
-        while True:
-            try:
-                r = self.read_record(count=1)
-                if self.data is None:
-                    self.data = r.copy()
-                elif r.size == 0:
-                    break
-                else:
-                    # should be hstack based on (https://mail.scipy.org/pipermail/numpy-discussion/2010-June/051107.html)
-                    self.data = np.hstack((self.data, r))
-            except:
-                break
+        # calculate the number of complete records after the header
+        ipos = self.file.tell()
+        self.file.seek(0, 2)
+        nbytes = self.file.tell() - ipos
+        self.file.seek(ipos)
+        nrecords = nbytes // self.dtype.itemsize
+
+        if nrecords == 0:
+            self.data = np.zeros(0, dtype=self.dtype)
+            return
+
+        if lazy or obsnames is not None:
+            data = np.memmap(self.file, dtype=self.dtype, mode='r',
+                             offset=ipos, shape=(nrecords,))
+        else:
+            data = self.read_record(count=nrecords)
+
+        if obsnames is not None:
+            if not isinstance(obsnames, list):
+                obsnames = [obsnames]
+            names = ['totim'] + [name for name in obsnames
+                                 if name != 'totim']
+            data = get_selection(data, names)
+            if not lazy:
+                # only copy the selected columns into memory
+                d = np.empty(nrecords, dtype=[(name, self.floattype)
+                                              for name in names])
+                for name in names:
+                    d[name] = data[name]
+                data = d
+
+        self.data = data
         return
 
     def _build_dtype(self):
@@ -257,6 +293,12 @@ class HydmodObs(ObsFiles):
         extraction.  (default is False)
     hydlbl_len : int
         Length of hydmod labels. (default is 20)
+    obsnames : str or list of str
+        Observation names to load from the file. If obsnames is None, all
+        observations are loaded. (default is None)
+    lazy : bool
+        If True, the observation data are memory-mapped and only read from
+        disk when they are accessed. (default is False)
 
     Returns
     -------
@@ -264,7 +306,8 @@ class HydmodObs(ObsFiles):
 
     """
 
-    def __init__(self, filename, verbose=False, hydlbl_len=20):
+    def __init__(self, filename, verbose=False, hydlbl_len=20,
+                 obsnames=None, lazy=False):
         """
         Class constructor.
 
@@ -302,7 +345,7 @@ class HydmodObs(ObsFiles):
         self._build_index()
 
         self.data = None
-        self._read_data()
+        self._read_data(obsnames=obsnames, lazy=lazy)
 
     def _build_dtype(self):
 
@@ -334,6 +377,12 @@ class SwrObs(ObsFiles):
         'single' or 'double'.  Default is 'double'.
     verbose : bool
         Write information to the screen.  Default is False.
+    obsnames : str or list of str
+        Observation names to load from the file. If obsnames is None, all
+        observations are loaded. Default is None.
+    lazy : bool
+        If True, the observation data are memory-mapped and only read from
+        disk when they are accessed. Default is False.
 
     Attributes
     ----------
@@ -352,10 +401,12 @@ class SwrObs(ObsFiles):
 
     >>> import flopy
     >>> so = flopy.utils.SwrObs('mymodel.swr.obs')
+    >>> so = flopy.utils.SwrObs('mymodel.swr.obs', obsnames=['OBS1', 'OBS5'])
 
     """
 
-    def __init__(self, filename, precision='double', verbose=False):
+    def __init__(self, filename, precision='double', verbose=False,
+                 obsnames=None, lazy=False):
         """
         Class constructor.
 
@@ -370,13 +421,13 @@ class SwrObs(ObsFiles):
         # NOBS
         self.nobs = self.read_integer()
         # read obsnames
-        obsnames = []
+        obs = []
         for idx in range(0, self.nobs):
             cid = self.read_text()
             if isinstance(cid, bytes):
                 cid = cid.decode()
-            obsnames.append(cid.strip())
-        self.obs = obsnames
+            obs.append(cid.strip())
+        self.obs = obs
 
         # read header information
         self._build_dtype()
@@ -386,7 +437,7 @@ class SwrObs(ObsFiles):
 
         # read data
         self.data = None
-        self._read_data()
+        self._read_data(obsnames=obsnames, lazy=lazy)
 
     def _build_dtype(self):
         vdata = [('totim', self.floattype)]
@@ -426,5 +477,10 @@ def get_selection(data, names):
         raise Exception('Error: {} names did not match'.format(ierr))
 
     # Valid list of names so make a selection
-    dtype2 = np.dtype({name: data.dtype.fields[name] for name in names})
-    return np.ndarray(data.shape, dtype2, data, 0, data.strides)
+    dtype2 = np.dtype({'names': names,
+                       'formats': [data.dtype.fields[name][0]
+                                   for name in names],
+                       'offsets': [data.dtype.fields[name][1]
+                                   for name in names],
+                       'itemsize': data.dtype.itemsize})
+    return data.view(dtype2)
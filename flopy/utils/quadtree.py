@@ -0,0 +1,964 @@
+"""
+quadtree module.  Contains the Quadtree class, which builds layered quadtree
+grids without the gridgen program.
+
+"""
+from __future__ import print_function
+import os
+import numpy as np
+
+from .gridgen import Gridgen
+
+
+def _read_asciigrid(fname):
+    """
+    Read an ESRI ascii grid and return the array and its extent as
+    (xmin, xmax, ymin, ymax).
+
+    """
+    header = {}
+    with open(fname, 'r') as f:
+        for i in range(6):
+            ll = f.readline().strip().split()
+            header[ll[0].lower()] = float(ll[1])
+        a = np.loadtxt(f, ndmin=2)
+    nrow, ncol = a.shape
+    xmin = header['xllcorner']
+    ymin = header['yllcorner']
+    dx = header['cellsize']
+    nodata = header.get('nodata_value')
+    if nodata is not None:
+        a[a == nodata] = np.nan
+    return a, (xmin, xmin + ncol * dx, ymin, ymin + nrow * dx)
+
+
+def _parts(feature):
+    """
+    Return the parts of a line or the rings of a polygon as a list of
+    (n, 2) arrays.  A feature can be a list of parts or a single list of
+    points.
+
+    """
+    if np.ndim(feature[0]) == 1:
+        feature = [feature]
+    return [np.array(p, dtype=np.float).reshape(-1, 2) for p in feature]
+
+
+def _segments(parts, closed=False):
+    """
+    Return the segments of the parts as an (n, 4) array of xa, ya, xb, yb.
+
+    """
+    segs = []
+    for p in parts:
+        if closed and len(p) > 0 and not np.array_equal(p[0], p[-1]):
+            p = np.vstack((p, p[:1]))
+        segs.append(np.hstack((p[:-1], p[1:])))
+    if len(segs) == 0:
+        return np.empty((0, 4), dtype=np.float)
+    return np.vstack(segs)
+
+
+def _crosses(xa, ya, xb, yb, x0, x1, y0, y1):
+    """
+    Liang-Barsky test for segments that pass through the interior of
+    rectangles.  Segments that only touch an edge or a corner of a
+    rectangle do not cross it.
+
+    """
+    tmin = np.zeros(xa.shape, dtype=np.float)
+    tmax = np.ones(xa.shape, dtype=np.float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, d, lo, hi in ((xa, xb - xa, x0, x1), (ya, yb - ya, y0, y1)):
+            t1 = (lo - p) / d
+            t2 = (hi - p) / d
+            par = d == 0
+            inside = (p > lo) & (p < hi)
+            tlo = np.where(par, np.where(inside, -np.inf, np.inf),
+                           np.minimum(t1, t2))
+            thi = np.where(par, np.where(inside, np.inf, -np.inf),
+                           np.maximum(t1, t2))
+            tmin = np.maximum(tmin, tlo)
+            tmax = np.minimum(tmax, thi)
+    return tmin < tmax
+
+
+def _inside(x, y, rings, chunksize=1000000):
+    """
+    Even-odd test for points inside a polygon with one or more rings.  The
+    crossings of the polygon edges are calculated once for each unique y,
+    which is efficient for the cell centers of a grid.
+
+    """
+    inside = np.zeros(x.shape, dtype=np.bool)
+    segs = _segments(rings, closed=True)
+    if x.shape[0] == 0 or segs.shape[0] == 0:
+        return inside
+    xa, ya, xb, yb = segs.T
+    yu, iu = np.unique(y, return_inverse=True)
+    e, u = [], []
+    nchunk = max(1, chunksize // segs.shape[0])
+    for istart in range(0, yu.shape[0], nchunk):
+        yc = yu[istart:istart + nchunk]
+        ec, uc = np.nonzero((ya[:, None] > yc) != (yb[:, None] > yc))
+        e.append(ec)
+        u.append(uc + istart)
+    e = np.concatenate(e)
+    u = np.concatenate(u)
+    xint = xa[e] + (xb[e] - xa[e]) * (yu[u] - ya[e]) / (yb[e] - ya[e])
+
+    # count the crossings to the right of each point with one sorted array
+    # of the crossings offset by row
+    xall = np.concatenate((xint, x))
+    xmin = xall.min()
+    width = 2. * (xall.max() - xmin) + 1.
+    keys = np.sort(xint - xmin + u * width)
+    rowend = np.cumsum(np.bincount(u, minlength=yu.shape[0]))
+    count = rowend[iu] - np.searchsorted(keys, x - xmin + iu * width,
+                                         side='right')
+    inside[:] = count % 2 == 1
+    return inside
+
+
+class Quadtree(Gridgen):
+    """
+    Class to create layered quadtree grids in Python.  It takes the same
+    active domains and refinement features as the gridgen program and
+    builds the grid without the gridgen executable or intermediate files.
+
+    Parameters
+    ----------
+    dis : flopy.modflow.ModflowDis
+        Flopy discretization object
+    model_ws : str
+        workspace location of shapefiles that are passed by name
+        (default is '.')
+    surface_interpolation : str
+        Default method for interpolating elevations.  Valid options
+        include 'replicate' (default) and 'interpolate'
+    smoothing : str
+        Smoothing of the refinement levels of neighboring cells, the same
+        as the SMOOTHING option of gridgen.  Valid options include 'full'
+        (default), which balances face and corner neighbors, 'face', which
+        only balances face neighbors, and 'none'
+
+    Attributes
+    ----------
+    nodes : int
+        number of nodes in the grid
+    nja : int
+        number of connections, including the cell itself
+    nodelay : ndarray
+        number of nodes in each layer
+
+    Notes
+    -----
+    Features are in the same coordinates as the model spatial reference
+    (dis.parent.sr).  A cell is refined when a point is in the cell, a line
+    passes through the interior of the cell, or a polygon overlaps the
+    cell.  A cell is active if it overlaps the active domain of its layer.
+    Unless smoothing is 'none', the grid is smoothed so that the
+    refinement level of neighboring cells, in the same layer and in adjacent
+    layers, differs by no more than one.  Full smoothing gives the same
+    cells as gridgen, which uses SMOOTHING = full.
+
+    For the surface elevations, the top of a layer uses the same surface as
+    the bottom of the overlying layer.
+
+    Examples
+    --------
+
+    >>> import flopy
+    >>> from flopy.utils.quadtree import Quadtree
+    >>> m = flopy.modflow.Modflow()
+    >>> dis = flopy.modflow.ModflowDis(m, nrow=10, ncol=10)
+    >>> q = Quadtree(dis)
+    >>> q.add_refinement_features([(4.5, 4.5)], 'point', 2, [0])
+    >>> q.build()
+    >>> gridprops = q.get_gridprops()
+
+    """
+
+    def __init__(self, dis, model_ws='.', surface_interpolation='replicate',
+                 smoothing='full'):
+        super(Quadtree, self).__init__(dis, model_ws=model_ws, exe_name=None,
+                                       surface_interpolation=
+                                       surface_interpolation)
+        smoothing = smoothing.lower()
+        if smoothing not in ['full', 'face', 'none']:
+            raise Exception('Error.  Unknown smoothing option: {}.  Must be '
+                            'full, face or none'.format(smoothing))
+        self.smoothing = smoothing
+        return
+
+    def _find_exe(self, exe_name):
+        # the grid is built without the gridgen executable
+        return None
+
+    def set_surface_interpolation(self, isurf, type, elev=None,
+                                  elev_extent=None):
+        """
+        Parameters
+        ----------
+        isurf : int
+            surface number where 0 is top and nlay + 1 is bottom
+        type : str
+            Must be 'INTERPOLATE', 'REPLICATE' or 'ASCIIGRID'.
+        elev : numpy.ndarray of shape (nr, nc) or str
+            Array that is used as an asciigrid.  If elev is a string, then
+            it is assumed to be the name of the asciigrid.
+        elev_extent : list-like
+            list of xmin, xmax, ymin, ymax extents of the elev grid.
+
+        Returns
+        -------
+        None
+
+        """
+        assert 0 <= isurf <= self.dis.nlay + 1
+        type = type.upper()
+        if type not in ['INTERPOLATE', 'REPLICATE', 'ASCIIGRID']:
+            raise Exception('Error.  Unknown surface interpolation type: '
+                            '{}.  Must be INTERPOLATE or '
+                            'REPLICATE'.format(type))
+        if type == 'ASCIIGRID':
+            if isinstance(elev, np.ndarray):
+                if elev_extent is None:
+                    raise Exception('Error.  ASCIIGRID was specified but '
+                                    'elev_extent was not.')
+                try:
+                    xmin, xmax, ymin, ymax = elev_extent
+                except:
+                    raise Exception('Cannot cast elev_extent into xmin, xmax, '
+                                    'ymin, ymax: {}'.format(elev_extent))
+                self._asciigrid_dict[isurf] = (elev.astype(np.float),
+                                               (xmin, xmax, ymin, ymax))
+            elif isinstance(elev, str):
+                if not os.path.isfile(elev):
+                    raise Exception('Error.  elev is not a valid file: '
+                                    '{}'.format(elev))
+                self._asciigrid_dict[isurf] = _read_asciigrid(elev)
+            else:
+                raise Exception('Error.  ASCIIGRID was specified but '
+                                'elev was not specified as a numpy ndarray or'
+                                'valid asciigrid file.')
+        self.surface_interpolation[isurf] = type
+        self.nodes = 0
+        return
+
+    def add_active_domain(self, feature, layers):
+        """
+        Parameters
+        ----------
+        feature : str or list
+            feature can be either a string containing the name of a polygon
+            shapefile or it can be a list of polygons
+        layers : list
+            A list of layers (zero based) for which this active domain
+            applies.
+
+        Returns
+        -------
+        None
+
+        """
+        self.nodes = 0
+        self.nja = 0
+        adname = 'ad{}'.format(len(self._addict))
+        self._addict[adname] = self._read_features(feature, 'polygon')
+        for k in layers:
+            self._active_domain[k] = adname
+        return
+
+    def add_refinement_features(self, features, featuretype, level, layers):
+        """
+        Parameters
+        ----------
+        features : str or list
+            features can be either a string containing the name of a shapefile
+            or it can be a list of points, lines, or polygons
+        featuretype : str
+            Must be either 'point', 'line', or 'polygon'
+        level : int
+            The level of refinement for this features
+        layers : list
+            A list of layers (zero based) for which this refinement features
+            applies.
+
+        Returns
+        -------
+        None
+
+        """
+        self.nodes = 0
+        self.nja = 0
+        featuretype = featuretype.lower()
+        rfname = 'rf{}'.format(len(self._rfdict))
+        self._rfdict[rfname] = [self._read_features(features, featuretype),
+                                featuretype, int(level)]
+        for k in layers:
+            self._refinement_features[k].append(rfname)
+        return
+
+    def build(self, verbose=False):
+        """
+        Build the quadtree grid
+
+        Parameters
+        ----------
+        verbose : bool
+            If true, print the number of cells in each layer (default is
+            False)
+
+        Returns
+        -------
+        None
+
+        """
+        dis = self.dis
+        self._delr = dis.delr.array.astype(np.float)
+        self._delc = dis.delc.array.astype(np.float)
+        self._xedge = np.add.accumulate(np.append(0., self._delr))
+        self._yedge = self._delc.sum() - \
+                      np.add.accumulate(np.append(0., self._delc))
+        levels = [rf[2] for rf in self._rfdict.values()]
+        self._maxlevel = max([0] + levels)
+        self._ni = dis.nrow << self._maxlevel
+        self._nj = dis.ncol << self._maxlevel
+
+        # refine the layers, layers with the same features are only
+        # refined once
+        refined = {}
+        leaves = []
+        for k in range(dis.nlay):
+            rfk = tuple(self._refinement_features[k])
+            if rfk not in refined:
+                refined[rfk] = self._refine(rfk)
+            leaves.append(refined[rfk])
+        leaves = self._smooth(leaves)
+
+        # remove cells outside of the active domain and number the nodes
+        for k in range(dis.nlay):
+            adname = self._active_domain[k]
+            if adname is not None:
+                active = self._mark(self._addict[adname], 'polygon',
+                                    *leaves[k])
+                leaves[k] = tuple(a[active] for a in leaves[k])
+            leaves[k] = self._sort(*leaves[k])
+            if verbose:
+                print('Layer {} has {} cells'.format(k + 1,
+                                                     leaves[k][0].shape[0]))
+        self._leaves = leaves
+        self.nodelay = np.array([lv[0].shape[0] for lv in leaves],
+                                dtype=np.int)
+        self.nodes = self.nodelay.sum()
+        if self.nodes == 0:
+            raise Exception('Quadtree resulted in no active cells.')
+        self._gridprops = self._mkgridprops()
+        self.nja = self._gridprops['nja']
+        self._vdict = None
+        return
+
+    @property
+    def _vertdict(self):
+        # dictionary of node number to vertices for the Gridgen methods,
+        # created when it is first needed
+        if not self._vdict:
+            self._vdict = dict(enumerate(self._verts.tolist()))
+        return self._vdict
+
+    @_vertdict.setter
+    def _vertdict(self, vertdict):
+        self._vdict = vertdict
+
+    def get_vertices(self, nodenumber):
+        """
+        Return a list of 5 vertices for the cell.  The first vertex should
+        be the same as the last vertex.
+
+        Parameters
+        ----------
+        nodenumber
+
+        Returns
+        -------
+        list of vertices : list
+
+        """
+        return self._verts[nodenumber].tolist()
+
+    def get_center(self, nodenumber):
+        """
+        Return the cell center x and y coordinates
+
+        Parameters
+        ----------
+        nodenumber
+
+        Returns
+        -------
+         (x, y) : tuple
+
+        """
+        return tuple(self._gridprops['cellxy'][nodenumber])
+
+    def export(self, verbose=False):
+        """
+        Export the grid to the qtgrid polygon shapefile in model_ws.
+
+        Parameters
+        ----------
+        verbose : bool
+            If true, print the name of the shapefile (default is False)
+
+        Returns
+        -------
+        None
+
+        """
+        import shapefile
+        wr = shapefile.Writer(shapeType=shapefile.POLYGON)
+        wr.field('nodenumber', 'N', 20, 0)
+        wr.field('layer', 'N', 20, 0)
+        layer = np.repeat(np.arange(self.dis.nlay), self.nodelay)
+        for n, verts in enumerate(self._verts.tolist()):
+            wr.poly([verts])
+            wr.record(n + 1, layer[n] + 1)
+        fname = os.path.join(self.model_ws, 'qtgrid')
+        wr.save(fname)
+        if verbose:
+            print('Wrote {}.shp'.format(fname))
+        return
+
+    def plot(self, ax=None, layer=0, edgecolor='k', facecolor='none',
+             cmap='Dark2', a=None, masked_values=None, **kwargs):
+        """
+        Plot the grid.
+
+        Parameters
+        ----------
+        ax : matplotlib.pyplot axis
+            The plot axis.  If not provided it, plt.gca() will be used.
+            If there is not a current axis then a new one will be created.
+        layer : int
+            Layer number to plot
+        cmap : string
+            Name of colormap to use for polygon shading (default is 'Dark2')
+        edgecolor : string
+            Color name.  (Default is 'k'.)
+        facecolor : string
+            Color name.  (Default is 'none'.)
+        a : numpy.ndarray
+            Array to plot with a value for each node in the layer.
+        masked_values : iterable of floats, ints
+            Values to mask.
+        kwargs : dictionary
+            Keyword arguments that are passed to
+            PolyCollection.set(``**kwargs``).  Some common kwargs would be
+            'linewidths', 'linestyles', 'alpha', etc.
+
+        Returns
+        -------
+        pc : matplotlib.collections.PolyCollection
+
+        """
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import PolyCollection
+
+        if ax is None:
+            ax = plt.gca()
+        istart = self.nodelay[:layer].sum()
+        verts = self._verts[istart:istart + self.nodelay[layer]]
+        pc = PolyCollection(verts, edgecolor=edgecolor, facecolor=facecolor,
+                            cmap=cmap)
+        if a is not None:
+            a = np.ma.masked_invalid(np.asarray(a, dtype=np.float).ravel())
+            if masked_values is not None:
+                for mval in masked_values:
+                    a = np.ma.masked_equal(a, mval)
+            pc.set_array(a)
+        pc.set(**kwargs)
+        ax.add_collection(pc)
+        xy = self._verts.reshape(-1, 2)
+        ax.set_xlim(xy[:, 0].min(), xy[:, 0].max())
+        ax.set_ylim(xy[:, 1].min(), xy[:, 1].max())
+        return pc
+
+    def get_nod_recarray(self):
+        """
+        Return the node information as a numpy recarray
+
+        Returns
+        -------
+        node_ra : ndarray
+            Recarray of the node, layer, cell center x, y, z and cell sizes
+            dx, dy, dz with zero-based indexing
+
+        """
+        dt = np.dtype([('node', np.int), ('layer', np.int),
+                       ('x', np.float), ('y', np.float), ('z', np.float),
+                       ('dx', np.float), ('dy', np.float), ('dz', np.float),
+                       ])
+        gp = self._gridprops
+        node_ra = np.recarray((self.nodes,), dtype=dt)
+        node_ra['node'] = np.arange(self.nodes)
+        node_ra['layer'] = np.repeat(np.arange(self.dis.nlay), self.nodelay)
+        node_ra['x'] = gp['cellxy'][:, 0]
+        node_ra['y'] = gp['cellxy'][:, 1]
+        node_ra['z'] = 0.5 * (gp['top'] + gp['bot'])
+        node_ra['dx'] = self._dx
+        node_ra['dy'] = self._dy
+        node_ra['dz'] = gp['top'] - gp['bot']
+        return node_ra
+
+    def get_gridprops(self):
+        """
+        Return a dictionary of the grid properties: nodes, nlay, nodelay,
+        top, bot, area, iac, nja, ja (one-based), fldr, ivc, cl12, fahl,
+        ihc, hwva, angldegx, nvert, vertices and cellxy. The arrays that
+        are returned are copies, so changing them does not change the grid.
+
+        """
+        gridprops = {}
+        for key, value in self._gridprops.items():
+            if isinstance(value, np.ndarray):
+                value = value.copy()
+            gridprops[key] = value
+        return gridprops
+
+    def intersect(self, features, featuretype, layer):
+        """
+        Parameters
+        ----------
+        features : str or list
+            features can be either a string containing the name of a shapefile
+            or it can be a list of points, lines, or polygons
+        featuretype : str
+            Must be either 'point', 'line', or 'polygon'
+        layer : int
+            Layer (zero based) to intersect with.  Zero based.
+
+        Returns
+        -------
+        result : np.recarray
+            Recarray with the nodenumber of the cells that intersect the
+            features.
+
+        """
+        featuretype = featuretype.lower()
+        geoms = self._read_features(features, featuretype)
+        istart = self.nodelay[:layer].sum()
+        hit = self._mark(geoms, featuretype, *self._leaves[layer])
+        nodenumber = istart + np.where(hit)[0]
+        return np.rec.fromarrays([nodenumber], names='nodenumber')
+
+    def _read_features(self, features, featuretype):
+        """
+        Return the features in model coordinates.  Points are returned as an
+        (n, 2) array, lines as a list of parts and polygons as a list of
+        lists of rings.
+
+        """
+        if featuretype not in ['point', 'line', 'polygon']:
+            raise Exception('Unrecognized feature type: {}'.format(featuretype))
+        if isinstance(features, str):
+            import shapefile
+            sn = os.path.join(self.model_ws, features + '.shp')
+            assert os.path.isfile(sn), 'Shapefile does not exist: {}'.format(sn)
+            features = []
+            for shape in shapefile.Reader(sn).shapes():
+                if featuretype == 'point':
+                    features.extend(shape.points)
+                else:
+                    idx = list(shape.parts) + [len(shape.points)]
+                    features.append([shape.points[i0:i1] for i0, i1 in
+                                     zip(idx[:-1], idx[1:])])
+
+        sr = self.dis.parent.sr
+
+        def transform(p):
+            x, y = sr.transform(p[:, 0], p[:, 1], inverse=True)
+            return np.column_stack((x, y))
+
+        if featuretype == 'point':
+            pts = np.array(features, dtype=np.float).reshape(-1, 2)
+            return transform(pts)
+        geoms = [[transform(p) for p in _parts(f)] for f in features]
+        if featuretype == 'line':
+            geoms = [p for f in geoms for p in f]
+        return geoms
+
+    def _key(self, lev, i, j):
+        return (lev * self._ni + i) * self._nj + j
+
+    def _index(self, lev, i, j):
+        # sorted keys of the cells and the order that sorts them
+        keys = self._key(lev, i, j)
+        order = np.argsort(keys)
+        return keys[order], order
+
+    def _colindex(self, x, lev):
+        ncol = self.dis.ncol
+        c = np.clip(np.searchsorted(self._xedge, x, side='right') - 1, 0,
+                    ncol - 1)
+        f = np.left_shift(1, lev)
+        s = np.floor((x - self._xedge[c]) / self._delr[c] * f).astype(np.int)
+        return (c << lev) + np.clip(s, 0, f - 1)
+
+    def _rowindex(self, y, lev):
+        nrow = self.dis.nrow
+        r = np.clip(np.searchsorted(-self._yedge, -y, side='right') - 1, 0,
+                    nrow - 1)
+        f = np.left_shift(1, lev)
+        s = np.floor((self._yedge[r] - y) / self._delc[r] * f).astype(np.int)
+        return (r << lev) + np.clip(s, 0, f - 1)
+
+    def _bounds(self, lev, i, j):
+        # cell extents xmin, xmax, ymin, ymax in model coordinates
+        c = j >> lev
+        r = i >> lev
+        f = np.left_shift(1, lev)
+        dx = self._delr[c] / f
+        x0 = self._xedge[c] + (j - (c << lev)) * dx
+        dy = self._delc[r] / f
+        y1 = self._yedge[r] - (i - (r << lev)) * dy
+        return x0, x0 + dx, y1 - dy, y1
+
+    def _segment_cells(self, segs, lev):
+        """
+        Return the row and column of the cells at level lev with an interior
+        that is crossed by the segments.
+
+        """
+        if segs.shape[0] == 0:
+            return np.empty(0, dtype=np.int), np.empty(0, dtype=np.int)
+        xa, ya, xb, yb = segs.T
+        # candidate cells are the cells that overlap the segment extents,
+        # widened by one cell for segments that end on a cell edge
+        j0 = np.maximum(self._colindex(np.minimum(xa, xb), lev) - 1, 0)
+        j1 = np.minimum(self._colindex(np.maximum(xa, xb), lev) + 1,
+                        (self.dis.ncol << lev) - 1)
+        i0 = np.maximum(self._rowindex(np.maximum(ya, yb), lev) - 1, 0)
+        i1 = np.minimum(self._rowindex(np.minimum(ya, yb), lev) + 1,
+                        (self.dis.nrow << lev) - 1)
+        nj = j1 - j0 + 1
+        count = (i1 - i0 + 1) * nj
+        iseg = np.repeat(np.arange(segs.shape[0]), count)
+        k = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count,
+                                               count)
+        i = i0[iseg] + k // nj[iseg]
+        j = j0[iseg] + k % nj[iseg]
+        x0, x1, y0, y1 = self._bounds(lev, i, j)
+        hit = _crosses(xa[iseg], ya[iseg], xb[iseg], yb[iseg], x0, x1, y0, y1)
+        return i[hit], j[hit]
+
+    def _mark(self, geoms, featuretype, lev, i, j):
+        """
+        Return a boolean array that is True for the cells that intersect
+        the features.
+
+        """
+        mark = np.zeros(lev.shape, dtype=np.bool)
+        for q in np.unique(lev):
+            idx = np.where(lev == q)[0]
+            keys = self._key(q, i[idx], j[idx])
+            if featuretype == 'point':
+                x, y = geoms[:, 0], geoms[:, 1]
+                ok = (x >= 0) & (x <= self._xedge[-1]) & \
+                     (y >= 0) & (y <= self._yedge[0])
+                hit = self._key(q, self._rowindex(y[ok], q),
+                                self._colindex(x[ok], q))
+            elif featuretype == 'line':
+                hit = self._key(q, *self._segment_cells(_segments(geoms), q))
+            else:
+                segs = [_segments(rings, closed=True) for rings in geoms]
+                allsegs = np.vstack(segs + [np.empty((0, 4))])
+                hit = self._key(q, *self._segment_cells(allsegs, q))
+                # cells with a center inside of a polygon
+                x0, x1, y0, y1 = self._bounds(q, i[idx], j[idx])
+                xc = 0.5 * (x0 + x1)
+                yc = 0.5 * (y0 + y1)
+                for rings, s in zip(geoms, segs):
+                    if s.shape[0] == 0:
+                        continue
+                    sel = np.where((xc >= s[:, [0, 2]].min()) &
+                                   (xc <= s[:, [0, 2]].max()) &
+                                   (yc >= s[:, [1, 3]].min()) &
+                                   (yc <= s[:, [1, 3]].max()))[0]
+                    inside = _inside(xc[sel], yc[sel], rings)
+                    mark[idx[sel[inside]]] = True
+            mark[idx] |= np.in1d(keys, hit)
+        return mark
+
+    def _split(self, lev, i, j, split):
+        # replace the split cells with their four children
+        lc = np.repeat(lev[split] + 1, 4)
+        ic = np.repeat(2 * i[split], 4) + np.tile([0, 0, 1, 1], split.sum())
+        jc = np.repeat(2 * j[split], 4) + np.tile([0, 1, 0, 1], split.sum())
+        keep = ~split
+        return (np.concatenate((lev[keep], lc)),
+                np.concatenate((i[keep], ic)),
+                np.concatenate((j[keep], jc)))
+
+    def _refine(self, rfnames):
+        """
+        Refine the base grid with the features and return the level, row
+        and column of the cells.
+
+        """
+        nrow, ncol = self.dis.nrow, self.dis.ncol
+        i, j = [a.ravel() for a in np.mgrid[0:nrow, 0:ncol]]
+        lev = np.zeros(i.shape, dtype=np.int)
+        features = [self._rfdict[rfname] for rfname in rfnames]
+        maxlevel = max([0] + [rf[2] for rf in features])
+        for q in range(maxlevel):
+            idx = np.where(lev == q)[0]
+            mark = np.zeros(idx.shape, dtype=np.bool)
+            for geoms, featuretype, level in features:
+                if level > q:
+                    mark |= self._mark(geoms, featuretype, lev[idx], i[idx],
+                                       j[idx])
+            split = np.zeros(lev.shape, dtype=np.bool)
+            split[idx[mark]] = True
+            lev, i, j = self._split(lev, i, j, split)
+        return lev, i, j
+
+    def _cover(self, index, lev, i, j, qmax):
+        """
+        Return the position of the cell that contains cell (lev, i, j) and
+        has a level that is not larger than qmax, or -1 if there is none.
+
+        """
+        keys, order = index
+        found = np.full(lev.shape, -1, dtype=np.int)
+        for q in range(self._maxlevel + 1):
+            idx = np.where(qmax >= q)[0]
+            if idx.shape[0] == 0:
+                continue
+            shift = lev[idx] - q
+            key = self._key(q, i[idx] >> shift, j[idx] >> shift)
+            pos = np.minimum(np.searchsorted(keys, key), keys.shape[0] - 1)
+            match = keys[pos] == key
+            found[idx[match]] = order[pos[match]]
+        return found
+
+    def _neighbors(self, lev, i, j, corners=False):
+        """
+        Yield the direction code and the row and column of the same level
+        neighbor in each horizontal direction.  If corners is True, the
+        diagonal neighbors are also yielded, with a direction code of zero.
+
+        """
+        directions = [(1, 0, 1), (-1, 0, -1), (2, -1, 0), (-2, 1, 0)]
+        if corners:
+            directions += [(0, -1, -1), (0, -1, 1), (0, 1, -1), (0, 1, 1)]
+        for fldr, di, dj in directions:
+            ni = i + di
+            nj = j + dj
+            ok = (ni >= 0) & (ni < (self.dis.nrow << lev)) & \
+                 (nj >= 0) & (nj < (self.dis.ncol << lev))
+            yield fldr, ok, ni, nj
+
+    def _smooth(self, leaves):
+        """
+        Split cells until the levels of neighboring cells in the same layer
+        and in adjacent layers differ by no more than one.  Corner neighbors
+        in the same layer are included for full smoothing.
+
+        """
+        if self.smoothing == 'none':
+            return leaves
+        corners = self.smoothing == 'full'
+        nlay = len(leaves)
+        while True:
+            index = [self._index(*lv) for lv in leaves]
+            split = [np.zeros(lv[0].shape, dtype=np.bool) for lv in leaves]
+            for k in range(nlay):
+                lev, i, j = leaves[k]
+                fine = lev >= 2
+                lev, i, j = lev[fine], i[fine], j[fine]
+                for fldr, ok, ni, nj in self._neighbors(lev, i, j,
+                                                        corners=corners):
+                    m = self._cover(index[k], lev[ok], ni[ok], nj[ok],
+                                    lev[ok] - 2)
+                    split[k][m[m >= 0]] = True
+                for kk in (k - 1, k + 1):
+                    if 0 <= kk < nlay:
+                        m = self._cover(index[kk], lev, i, j, lev - 2)
+                        split[kk][m[m >= 0]] = True
+            if not any([s.any() for s in split]):
+                break
+            leaves = [self._split(*(lv + (s,))) for lv, s in
+                      zip(leaves, split)]
+        return leaves
+
+    def _sort(self, lev, i, j):
+        """
+        Sort the cells of a layer in node order: by row and column of the
+        base grid cell and then recursively by the top left, top right,
+        bottom left and bottom right quadrants.
+
+        """
+        maxlevel = self._maxlevel
+        r = i >> lev
+        c = j >> lev
+        oi = (i << (maxlevel - lev)) - (r << maxlevel)
+        oj = (j << (maxlevel - lev)) - (c << maxlevel)
+        morton = np.zeros(lev.shape, dtype=np.int64)
+        for b in range(maxlevel):
+            morton |= ((oi >> b) & 1) << (2 * b + 1)
+            morton |= ((oj >> b) & 1) << (2 * b)
+        order = np.lexsort((morton, c, r))
+        return lev[order], i[order], j[order]
+
+    def _surface(self, isurf, lev, i, j, xc, yc):
+        """
+        Return the elevation of surface isurf for the cells.
+
+        """
+        dis = self.dis
+        if isurf == 0:
+            elev = dis.top.array
+        else:
+            elev = dis.botm.array[isurf - 1]
+        method = self.surface_interpolation[isurf]
+        if method == 'REPLICATE':
+            return elev[i >> lev, j >> lev]
+        elif method == 'INTERPOLATE':
+            # bilinear interpolation between the base grid cell centers
+            xcb = 0.5 * (self._xedge[:-1] + self._xedge[1:])
+            ycb = 0.5 * (self._yedge[:-1] + self._yedge[1:])
+            fc = np.interp(xc, xcb, np.arange(dis.ncol))
+            fr = np.interp(-yc, -ycb, np.arange(dis.nrow))
+            c0 = np.minimum(np.floor(fc).astype(np.int), dis.ncol - 1)
+            r0 = np.minimum(np.floor(fr).astype(np.int), dis.nrow - 1)
+            c1 = np.minimum(c0 + 1, dis.ncol - 1)
+            r1 = np.minimum(r0 + 1, dis.nrow - 1)
+            wc = fc - c0
+            wr = fr - r0
+            return (1. - wr) * ((1. - wc) * elev[r0, c0] + wc * elev[r0, c1]) \
+                   + wr * ((1. - wc) * elev[r1, c0] + wc * elev[r1, c1])
+        else:
+            a, extent = self._asciigrid_dict[isurf]
+            xmin, xmax, ymin, ymax = extent
+            nr, nc = a.shape
+            x, y = dis.parent.sr.transform(xc, yc)
+            col = np.floor((x - xmin) / (xmax - xmin) * nc).astype(np.int)
+            row = np.floor((ymax - y) / (ymax - ymin) * nr).astype(np.int)
+            return a[np.clip(row, 0, nr - 1), np.clip(col, 0, nc - 1)]
+
+    def _mkgridprops(self):
+        """
+        Calculate the cell properties and the connections of the grid.
+
+        """
+        nlay = self.dis.nlay
+        nodes = self.nodes
+        leaves = self._leaves
+        lev, i, j = [np.concatenate(a) for a in zip(*leaves)]
+        x0, x1, y0, y1 = self._bounds(lev, i, j)
+        xc = 0.5 * (x0 + x1)
+        yc = 0.5 * (y0 + y1)
+        top = np.empty(nodes, dtype=np.float)
+        bot = np.empty(nodes, dtype=np.float)
+        offset = np.append(0, np.cumsum(self.nodelay))
+        for k in range(nlay):
+            s = slice(offset[k], offset[k + 1])
+            top[s] = self._surface(k, lev[s], i[s], j[s], xc[s], yc[s])
+            bot[s] = self._surface(k + 1, lev[s], i[s], j[s], xc[s], yc[s])
+        dx = x1 - x0
+        dy = y1 - y0
+        dz = top - bot
+        area = dx * dy
+        self._dx, self._dy = dx, dy
+
+        # connections are found from each cell to the neighbor cell of the
+        # same or a lower level; the connections to higher level neighbors
+        # are the reverse of these
+        index = [self._index(*lv) for lv in leaves]
+        n, m, fldr = [], [], []
+        for k in range(nlay):
+            levk, ik, jk = leaves[k]
+            nodek = offset[k] + np.arange(levk.shape[0])
+            for code, ok, ni, nj in self._neighbors(levk, ik, jk):
+                mk = self._cover(index[k], levk[ok], ni[ok], nj[ok], levk[ok])
+                found = mk >= 0
+                n.append(nodek[ok][found])
+                m.append(offset[k] + mk[found])
+                fldr.append(np.full(found.sum(), code, dtype=np.int))
+            if k + 1 < nlay:
+                # cells in layer k + 1 under cells in layer k and cells in
+                # layer k above cells in layer k + 1
+                mk = self._cover(index[k + 1], levk, ik, jk, levk)
+                found = mk >= 0
+                n.append(nodek[found])
+                m.append(offset[k + 1] + mk[found])
+                fldr.append(np.full(found.sum(), -3, dtype=np.int))
+                levb, ib, jb = leaves[k + 1]
+                mk = self._cover(index[k], levb, ib, jb, levb)
+                found = mk >= 0
+                n.append(offset[k] + mk[found])
+                m.append(offset[k + 1] + np.where(found)[0])
+                fldr.append(np.full(found.sum(), -3, dtype=np.int))
+        n = np.concatenate(n)
+        m = np.concatenate(m)
+        fldr = np.concatenate(fldr)
+        n, m, fldr = (np.concatenate((n, m)), np.concatenate((m, n)),
+                      np.concatenate((fldr, -fldr)))
+        unique, iunique = np.unique(n * nodes + m, return_index=True)
+        n, m, fldr = n[iunique], m[iunique], fldr[iunique]
+
+        # add the cells themselves and sort the connections by node with the
+        # cell itself first
+        self_node = np.arange(nodes)
+        n = np.concatenate((self_node, n))
+        m = np.concatenate((self_node, m))
+        fldr = np.concatenate((np.zeros(nodes, dtype=np.int), fldr))
+        order = np.lexsort((m, m != n, n))
+        n, m, fldr = n[order], m[order], fldr[order]
+
+        absf = np.abs(fldr)
+        ihc = np.where((absf == 1) | (absf == 2), 1, 0)
+        ivc = np.where(absf == 3, 1, 0)
+        cl12 = np.where(absf == 1, 0.5 * dx[n], 0.)
+        cl12 = np.where(absf == 2, 0.5 * dy[n], cl12)
+        cl12 = np.where(absf == 3, 0.5 * dz[n], cl12)
+        hwva = np.where(absf == 1, np.minimum(dy[n], dy[m]), 0.)
+        hwva = np.where(absf == 2, np.minimum(dx[n], dx[m]), hwva)
+        hwva = np.where(absf == 3, np.minimum(area[n], area[m]), hwva)
+        fahl = np.where(ihc == 1, hwva * 0.5 * (dz[n] + dz[m]), hwva)
+        angldegx = np.zeros(fldr.shape, dtype=np.float)
+        angldegx = np.where(fldr == 0, 1.e30, angldegx)
+        angldegx = np.where(absf == 3, 1.e30, angldegx)
+        angldegx = np.where(fldr == 2, 90, angldegx)
+        angldegx = np.where(fldr == -1, 180, angldegx)
+        angldegx = np.where(fldr == -2, 270, angldegx)
+
+        # vertices in model coordinates, clockwise from the top left corner
+        xv = np.column_stack((x0, x1, x1, x0, x0))
+        yv = np.column_stack((y1, y1, y0, y0, y1))
+        xv, yv = self.dis.parent.sr.transform(xv, yv)
+        self._verts = np.dstack((xv, yv))
+        cxy = self.dis.parent.sr.transform(xc, yc)
+
+        gridprops = {}
+        gridprops['nodes'] = nodes
+        gridprops['nlay'] = nlay
+        gridprops['nodelay'] = self.nodelay.copy()
+        gridprops['top'] = top.astype(np.float32)
+        gridprops['bot'] = bot.astype(np.float32)
+        gridprops['area'] = area.astype(np.float32)
+        gridprops['iac'] = np.bincount(n, minlength=nodes)
+        gridprops['nja'] = n.shape[0]
+        gridprops['ja'] = m + 1
+        gridprops['fldr'] = fldr
+        gridprops['ivc'] = ivc
+        gridprops['cl12'] = cl12.astype(np.float32)
+        gridprops['fahl'] = fahl.astype(np.float32)
+        gridprops['ihc'] = ihc
+        gridprops['hwva'] = hwva.astype(np.float32)
+        gridprops['angldegx'] = angldegx
+        gridprops['nvert'] = nodes * 4
+        gridprops['vertices'] = self._verts[:, :-1].reshape(-1, 2)
+        gridprops['cellxy'] = np.column_stack(cxy)
+        return gridprops
@@ -6,6 +6,7 @@ import sys
 import os
 import numpy as np
 import warnings
+from collections import OrderedDict
 
 
 class SpatialReference(object):
@@ -112,6 +113,24 @@ class SpatialReference(object):
                      'centimeters': 3}
     lenuni_text = {v:k for k, v in lenuni_values.items()}
 
+    # attributes (and the instance attributes they are stored in) that
+    # change the grid geometry. Only delr and delc change the geometry in
+    # model coordinates.
+    _geometry_attrs = {'delr': 'delr', 'delc': 'delc',
+                       'xul': '_xul', 'yul': '_yul',
+                       'xll': '_xll', 'yll': '_yll',
+                       '_xul': '_xul', '_yul': '_yul',
+                       '_xll': '_xll', '_yll': '_yll',
+                       'rotation': 'rotation', 'origin_loc': 'origin_loc',
+                       'length_multiplier': '_length_multiplier',
+                       '_length_multiplier': '_length_multiplier',
+                       'lenuni': '_lenuni', '_lenuni': '_lenuni',
+                       'units': '_units', '_units': '_units',
+                       'proj4_str': '_proj4_str', '_proj4_str': '_proj4_str',
+                       'epsg': '_epsg'}
+    _local_cache_keys = ('xedge', 'yedge', 'xcenter', 'ycenter',
+                         'vertex_interp')
+
     def __init__(self, delr=np.array([]), delc=np.array([]), lenuni=2,
                  xul=None, yul=None, xll=None, yll=None, rotation=0.0,
                  proj4_str=None, epsg=None, units=None,
@@ -425,6 +444,7 @@ class SpatialReference(object):
 
     def __setattr__(self, key, value):
         reset = True
+        old = self._get_geometry_attr(key)
         if key == "delr":
             super(SpatialReference, self). \
                 __setattr__("delr", np.atleast_1d(np.array(value)))
@@ -484,23 +504,87 @@ class SpatialReference(object):
             self._proj4_str = getproj4(self._epsg)
         else:
             super(SpatialReference, self).__setattr__(key, value)
-            reset = False
-        if reset:
-            self._reset()
+            reset = key in self._geometry_attrs
+        # only discard the cached geometry if the grid actually changed
+        if reset and \
+                not self._same_value(old, self._get_geometry_attr(key)):
+            self._reset(local=key in ('delr', 'delc'))
+
+    def _get_geometry_attr(self, key):
+        name = self._geometry_attrs.get(key)
+        if name is None:
+            return None
+        return self.__dict__.get(name)
+
+    @staticmethod
+    def _same_value(v1, v2):
+        if v1 is None or v2 is None:
+            return False
+        if isinstance(v1, np.ndarray) or isinstance(v2, np.ndarray):
+            return np.array_equal(v1, v2)
+        return v1 == v2
 
     def reset(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
         return
 
-    def _reset(self):
-        self._xgrid = None
-        self._ygrid = None
-        self._ycentergrid = None
-        self._xcentergrid = None
-        self._vertices = None
+    def _reset(self, local=True):
+        """
+        Discard the cached grid geometry.  Geometry in model coordinates
+        (edges, centers, and the vertex interpolation operator) is only
+        discarded if local is True.
+
+        """
+        if '_geometry_cache' not in self.__dict__:
+            self._geometry_cache = {}
+            self._cache_stats = {'hits': 0, 'misses': 0}
+        cache = self._geometry_cache
+        for key in list(cache.keys()):
+            if local or key not in self._local_cache_keys:
+                del cache[key]
+        self._interp_cache = {}
         return
 
+    def _get_cached(self, key, func):
+        """
+        Return the cached grid geometry for key, calling func to create it
+        if it is not in the cache.
+
+        """
+        cache = self._geometry_cache
+        if key in cache:
+            self._cache_stats['hits'] += 1
+            return cache[key]
+        self._cache_stats['misses'] += 1
+        value = func()
+        cache[key] = value
+        return value
+
+    def get_cache_info(self):
+        """
+        Get information on the cached grid geometry.
+
+        Returns
+        -------
+        info : dict
+            dictionary with the number of cache hits and misses since the
+            SpatialReference was created, the names of the cached items,
+            and the number of bytes used by cached numpy arrays
+
+        """
+        cache = self._geometry_cache
+        nbytes = 0
+        for value in cache.values():
+            if not isinstance(value, tuple):
+                value = (value,)
+            nbytes += sum([v.nbytes for v in value
+                           if isinstance(v, np.ndarray)])
+        return {'hits': self._cache_stats['hits'],
+                'misses': self._cache_stats['misses'],
+                'cached': sorted(cache.keys()),
+                'nbytes': nbytes}
+
     @property
     def nrow(self):
         return self.delc.shape[0]
@@ -644,54 +728,80 @@ class SpatialReference(object):
 
     @property
     def xedge(self):
-        return self.get_xedge_array()
+        return self._get_cached('xedge', self.get_xedge_array)
 
     @property
     def yedge(self):
-        return self.get_yedge_array()
+        return self._get_cached('yedge', self.get_yedge_array)
 
     @property
     def xgrid(self):
-        if self._xgrid is None:
-            self._set_xygrid()
-        return self._xgrid
+        return self._get_cached('xygrid', self._get_xygrid)[0]
 
     @property
     def ygrid(self):
-        if self._ygrid is None:
-            self._set_xygrid()
-        return self._ygrid
+        return self._get_cached('xygrid', self._get_xygrid)[1]
 
     @property
     def xcenter(self):
-        return self.get_xcenter_array()
+        return self._get_cached('xcenter', self.get_xcenter_array)
 
     @property
     def ycenter(self):
-        return self.get_ycenter_array()
+        return self._get_cached('ycenter', self.get_ycenter_array)
 
     @property
     def ycentergrid(self):
-        if self._ycentergrid is None:
-            self._set_xycentergrid()
-        return self._ycentergrid
+        return self._get_cached('xycentergrid', self._get_xycentergrid)[1]
 
     @property
     def xcentergrid(self):
-        if self._xcentergrid is None:
-            self._set_xycentergrid()
-        return self._xcentergrid
+        return self._get_cached('xycentergrid', self._get_xycentergrid)[0]
+
+    @property
+    def cell_polygons(self):
+        """
+        Array of shape (nrow * ncol, 5, 2) with the closed polygon of each
+        cell in the same order as get_vertices()
+
+        """
+        return self._get_cached('cell_polygons', self._get_cell_polygons)
+
+    @property
+    def cell_bounds(self):
+        """
+        Array of shape (nrow * ncol, 4) with the bounding box (xmin, ymin,
+        xmax, ymax) of each cell
+
+        """
+        return self._get_cached('cell_bounds', self._get_cell_bounds)
+
+    def _get_xycentergrid(self):
+        xcentergrid, ycentergrid = np.meshgrid(self.xcenter, self.ycenter)
+        return self.transform(xcentergrid, ycentergrid)
 
-    def _set_xycentergrid(self):
-        self._xcentergrid, self._ycentergrid = np.meshgrid(self.xcenter,
-                                                           self.ycenter)
-        self._xcentergrid, self._ycentergrid = self.transform(
-            self._xcentergrid,
-            self._ycentergrid)
+    def _get_xygrid(self):
+        xgrid, ygrid = np.meshgrid(self.xedge, self.yedge)
+        return self.transform(xgrid, ygrid)
 
-    def _set_xygrid(self):
-        self._xgrid, self._ygrid = np.meshgrid(self.xedge, self.yedge)
-        self._xgrid, self._ygrid = self.transform(self._xgrid, self._ygrid)
+    def _get_cell_polygons(self):
+        xgrid, ygrid = self.xgrid, self.ygrid
+        polygons = np.empty((self.nrow * self.ncol, 5, 2), dtype=np.float64)
+        for ipt, (i0, i1, j0, j1) in enumerate([(0, -1, 0, -1),
+                                                (1, None, 0, -1),
+                                                (1, None, 1, None),
+                                                (0, -1, 1, None),
+                                                (0, -1, 0, -1)]):
+            polygons[:, ipt, 0] = xgrid[i0:i1, j0:j1].ravel()
+            polygons[:, ipt, 1] = ygrid[i0:i1, j0:j1].ravel()
+        return polygons
+
+    def _get_cell_bounds(self):
+        polygons = self.cell_polygons
+        return np.column_stack((polygons[:, :4, 0].min(axis=1),
+                                polygons[:, :4, 1].min(axis=1),
+                                polygons[:, :4, 0].max(axis=1),
+                                polygons[:, :4, 1].max(axis=1)))
 
     @staticmethod
     def rotate(x, y, theta, xorigin=0., yorigin=0.):
@@ -879,7 +989,7 @@ class SpatialReference(object):
 
     def get_vertices(self, i, j):
         pts = []
-        xgrid, ygrid = self.xgrid, self.ygrid
+        xgrid, ygrid = self._get_cached('xygrid', self._get_xygrid)
         pts.append([xgrid[i, j], ygrid[i, j]])
         pts.append([xgrid[i + 1, j], ygrid[i + 1, j]])
         pts.append([xgrid[i + 1, j + 1], ygrid[i + 1, j + 1]])
@@ -887,28 +997,48 @@ class SpatialReference(object):
         pts.append([xgrid[i, j], ygrid[i, j]])
         return pts
 
-    def get_rc(self, x, y):
-        """Return the row and column of a point or sequence of points
-        in real-world coordinates.
+    def get_rc(self, x, y, clip=True):
+        """Return the row and column of the cell that contains a point or
+        sequence of points in real-world coordinates.
 
         Parameters
         ----------
         x : scalar or sequence of x coordinates
         y : scalar or sequence of y coordinates
+        clip : bool
+            if True, points outside of the grid are assigned to the nearest
+            row and column on the edge of the grid. If False, -1 is
+            returned for the row and column of points outside of the grid.
+            (default is True)
 
         Returns
         -------
         r : row or sequence of rows (zero-based)
         c : column or sequence of columns (zero-based)
         """
-        if np.isscalar(x):
-            c = (np.abs(self.xcentergrid[0] - x)).argmin()
-            r = (np.abs(self.ycentergrid[:, 0] - y)).argmin()
+        scalar = np.isscalar(x)
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+
+        # rotate into model coordinates and locate the points using the
+        # cell edges
+        xm, ym = self.transform(x, y, inverse=True)
+        xedge = self.get_xedge_array()
+        yedge = self.get_yedge_array()[::-1]
+        c = np.searchsorted(xedge, xm, side='right') - 1
+        r = self.nrow - np.searchsorted(yedge, ym, side='left')
+        if clip:
+            c = np.clip(c, 0, self.ncol - 1)
+            r = np.clip(r, 0, self.nrow - 1)
         else:
-            xcp = np.array([self.xcentergrid[0]] * (len(x)))
-            ycp = np.array([self.ycentergrid[:, 0]] * (len(x)))
-            c = (np.abs(xcp.transpose() - x)).argmin(axis=0)
-            r = (np.abs(ycp.transpose() - y)).argmin(axis=0)
+            idx = (xm < xedge[0]) | (xm > xedge[-1]) | \
+                  (ym < yedge[0]) | (ym > yedge[-1])
+            c[idx] = -1
+            r[idx] = -1
+            c[(c == self.ncol) & ~idx] = self.ncol - 1
+            r[(r == self.nrow) & ~idx] = self.nrow - 1
+        if scalar:
+            return r[0], c[0]
         return r, c
 
     def get_grid_map_plotter(self):
@@ -1044,27 +1174,9 @@ class SpatialReference(object):
 
     @property
     def vertices(self):
-        """Returns a list of vertices for"""
-        if self._vertices is None:
-            self._set_vertices()
-        return self._vertices
-
-    def _set_vertices(self):
-        """populate vertices for the whole grid"""
-        jj, ii = np.meshgrid(range(self.ncol), range(self.nrow))
-        jj, ii = jj.ravel(), ii.ravel()
-        vrts = np.array(self.get_vertices(ii, jj)).transpose([2, 0, 1])
-        self._vertices = [v.tolist() for v in vrts]  # conversion to lists
-
-        """
-        code above is 3x faster
-        xgrid, ygrid = self.xgrid, self.ygrid
-        ij = list(map(list, zip(xgrid[:-1, :-1].ravel(), ygrid[:-1, :-1].ravel())))
-        i1j = map(list, zip(xgrid[1:, :-1].ravel(), ygrid[1:, :-1].ravel()))
-        i1j1 = map(list, zip(xgrid[1:, 1:].ravel(), ygrid[1:, 1:].ravel()))
-        ij1 = map(list, zip(xgrid[:-1, 1:].ravel(), ygrid[:-1, 1:].ravel()))
-        self._vertices = np.array(map(list, zip(ij, i1j, i1j1, ij1, ij)))
-        """
+        """Returns a list of vertices for each cell in the grid"""
+        return self._get_cached('vertices',
+                                lambda: self.cell_polygons.tolist())
 
     def interpolate(self, a, xi, method='nearest'):
         """
@@ -1072,6 +1184,10 @@ class SpatialReference(object):
         points defined in xi.  For any values outside of the grid, use
         'nearest' to find a value for them.
 
+        The triangulation of the cell centers and the interpolation weights
+        for xi are cached, so repeated calls with the same points (for
+        example for each layer of a model) only apply the weights.
+
         Parameters
         ----------
         a : numpy.ndarray
@@ -1089,31 +1205,195 @@ class SpatialReference(object):
             array of size (npts)
 
         """
-        from scipy.interpolate import griddata
-
-        # Create a 2d array of points for the grid centers
-        points = np.empty((self.ncol * self.nrow, 2))
-        points[:, 0] = self.xcentergrid.flatten()
-        points[:, 1] = self.ycentergrid.flatten()
-
-        # Use the griddata function to interpolate to the xi points
-        b = griddata(points, a.flatten(), xi, method=method, fill_value=np.nan)
+        shape = None
+        if isinstance(xi, tuple):
+            xg, yg = np.broadcast_arrays(*xi)
+            shape = xg.shape
+            xi = np.column_stack((xg.ravel(), yg.ravel()))
+        xi = np.asarray(xi, dtype=np.float64).reshape(-1, 2)
+        a = np.asarray(a, dtype=np.float64).ravel()
+
+        if method == 'cubic':
+            from scipy.interpolate import CloughTocher2DInterpolator
+            b = CloughTocher2DInterpolator(self._get_triangulation(), a,
+                                           fill_value=np.nan)(xi)
+        else:
+            idx, weights = self.get_interpolation_operator(xi, method=method)
+            b = (a[idx] * weights).sum(axis=1)
 
         # if method is linear or cubic, then replace nan's with a value
         # interpolated using nearest
         if method != 'nearest':
-            bn = griddata(points, a.flatten(), xi, method='nearest')
-            idx = np.isnan(b)
-            b[idx] = bn[idx]
-
+            inan = np.isnan(b)
+            if inan.any():
+                idx, weights = self.get_interpolation_operator(xi,
+                                                               method='nearest')
+                b[inan] = a[idx[inan, 0]]
+
+        if shape is not None:
+            b = b.reshape(shape)
         return b
 
-    def get_2d_vertex_connectivity(self):
+    def get_interpolation_operator(self, xi, method='linear'):
+        """
+        Get the (cached) indices and weights used to interpolate cell
+        centered values onto the points in xi.  Interpolated values are
+        (a.ravel()[idx] * weights).sum(axis=1).  Operators are cached using
+        the method and the points in xi and are discarded when the grid
+        changes.
+
+        Parameters
+        ----------
+        xi : numpy.ndarray
+            array containing x and y point coordinates of size (npts, 2)
+        method : {'linear', 'nearest'}
+            method to use for interpolation (default is 'linear').  For
+            'linear', points outside of the triangulation of the cell
+            centers have weights of nan.
+
+        Returns
+        -------
+        idx : numpy.ndarray
+            integer array of size (npts, 3) for 'linear' and (npts, 1) for
+            'nearest' with the node numbers used for each point
+        weights : numpy.ndarray
+            float array with the same shape as idx
+
+        """
+        import hashlib
+        xi = np.ascontiguousarray(xi, dtype=np.float64).reshape(-1, 2)
+        key = (method, xi.shape[0], hashlib.sha1(xi.tobytes()).hexdigest())
+        cache = self._interp_cache
+        if key in cache:
+            return cache[key]
+
+        if method == 'nearest':
+            if 'tree' not in cache:
+                from scipy.spatial import cKDTree
+                cache['tree'] = cKDTree(self._get_center_points())
+            idx = cache['tree'].query(xi)[1].reshape(-1, 1)
+            weights = np.ones(idx.shape, dtype=np.float64)
+        elif method == 'linear':
+            tri = self._get_triangulation()
+            isimplex = tri.find_simplex(xi)
+            inside = isimplex > -1
+            idx = np.zeros((xi.shape[0], 3), dtype=np.int)
+            weights = np.empty((xi.shape[0], 3), dtype=np.float64)
+            weights[:] = np.nan
+            t = tri.transform[isimplex[inside]]
+            bary = np.einsum('ijk,ik->ij', t[:, :2, :],
+                             xi[inside] - t[:, 2, :])
+            weights[inside, :2] = bary
+            weights[inside, 2] = 1. - bary.sum(axis=1)
+            idx[inside] = tri.simplices[isimplex[inside]]
+        else:
+            raise ValueError('unsupported interpolation method: '
+                             '{}'.format(method))
+
+        # only keep a limited number of point sets
+        keys = [k for k in cache.keys() if isinstance(k, tuple)]
+        if len(keys) >= 10:
+            del cache[keys[0]]
+        cache[key] = (idx, weights)
+        return idx, weights
+
+    def _get_center_points(self):
+        points = np.empty((self.ncol * self.nrow, 2))
+        points[:, 0] = self.xcentergrid.ravel()
+        points[:, 1] = self.ycentergrid.ravel()
+        return points
+
+    def _get_triangulation(self):
+        if 'tri' not in self._interp_cache:
+            from scipy.spatial import Delaunay
+            self._interp_cache['tri'] = Delaunay(self._get_center_points())
+        return self._interp_cache['tri']
+
+    def _get_vertex_interpolation_operator(self):
+        """
+        Return the cached bilinear operator that interpolates cell-centered
+        values to the cell vertices. Values at vertices outside of the cell
+        centers are extrapolated as constants normal to the grid edge.
+
+        Returns
+        -------
+        idx : ndarray
+            integer array of shape ((nrow + 1) * (ncol + 1), 4) with the
+            node numbers used for each vertex
+        weights : ndarray
+            float array of shape ((nrow + 1) * (ncol + 1), 4) with the
+            interpolation weights for each vertex
+
+        """
+        return self._get_cached('vertex_interp',
+                                self._get_vertex_interpolation_weights)
+
+    def _get_vertex_interpolation_weights(self):
+        def _weights(centers, edges):
+            n = centers.shape[0]
+            iv = np.arange(n + 1)
+            i0 = np.clip(iv - 1, 0, n - 1)
+            i1 = np.clip(iv, 0, n - 1)
+            dc = centers[i1] - centers[i0]
+            w1 = np.zeros(n + 1, dtype=np.float)
+            idx = dc != 0.
+            w1[idx] = (edges[idx] - centers[i0][idx]) / dc[idx]
+            return i0, i1, w1
+
+        j0, j1, wx = _weights(self.get_xcenter_array(),
+                              self.get_xedge_array())
+        i0, i1, wy = _weights(self.get_ycenter_array(),
+                              self.get_yedge_array())
+        ncol = self.ncol
+        ii0, jj0 = np.meshgrid(i0, j0, indexing='ij')
+        ii1, jj1 = np.meshgrid(i1, j1, indexing='ij')
+        wyy, wxx = np.meshgrid(wy, wx, indexing='ij')
+        idx = np.column_stack(((ii0 * ncol + jj0).ravel(),
+                               (ii0 * ncol + jj1).ravel(),
+                               (ii1 * ncol + jj0).ravel(),
+                               (ii1 * ncol + jj1).ravel()))
+        weights = np.column_stack((((1. - wyy) * (1. - wxx)).ravel(),
+                                   ((1. - wyy) * wxx).ravel(),
+                                   (wyy * (1. - wxx)).ravel(),
+                                   (wyy * wxx).ravel()))
+        return idx, weights
+
+    def interpolate_to_vertices(self, a):
+        """
+        Bilinear interpolation of cell-centered values to the cell vertices.
+        The interpolation operator is only built once and is reused for
+        every layer and for subsequent calls.
+
+        Parameters
+        ----------
+        a : numpy.ndarray
+            array of shape (nrow, ncol) or (nlay, nrow, ncol)
+
+        Returns
+        -------
+        b : numpy.ndarray
+            array of shape (nrow + 1, ncol + 1) or (nlay, nrow + 1, ncol + 1)
+
+        """
+        a = np.asarray(a, dtype=np.float)
+        assert a.shape[-2:] == (self.nrow, self.ncol)
+        idx, weights = self._get_vertex_interpolation_operator()
+        a2d = a.reshape(-1, self.nrow * self.ncol)
+        b = (a2d[:, idx] * weights).sum(axis=-1)
+        return b.reshape(a.shape[:-2] + (self.nrow + 1, self.ncol + 1))
+
+    def get_2d_vertex_connectivity(self, as_array=False):
         """
         Create the cell 2d vertices array and the iverts index array.  These
         are the same form as the ones used to instantiate an unstructured
         spatial reference.
 
+        Parameters
+        ----------
+        as_array : bool
+            return iverts as an integer array of shape (nrow * ncol, 4)
+            instead of a list (default is False)
+
         Returns
         -------
 
@@ -1125,136 +1405,130 @@ class SpatialReference(object):
             order starting with the upper left corner
 
         """
-        x = self.xgrid.flatten()
-        y = self.ygrid.flatten()
-        nrowvert = self.nrow + 1
+        verts = np.column_stack((self.xgrid.ravel(), self.ygrid.ravel()))
         ncolvert = self.ncol + 1
-        npoints = nrowvert * ncolvert
-        verts = np.empty((npoints, 2), dtype=np.float)
-        verts[:, 0] = x
-        verts[:, 1] = y
-        iverts = []
-        for i in range(self.nrow):
-            for j in range(self.ncol):
-                iv1 = i * ncolvert + j  # upper left point number
-                iv2 = iv1 + 1
-                iv4 = (i + 1) * ncolvert + j
-                iv3 = iv4 + 1
-                iverts.append([iv1, iv2, iv3, iv4])
+        i, j = np.meshgrid(np.arange(self.nrow), np.arange(self.ncol),
+                           indexing='ij')
+        iv1 = (i * ncolvert + j).ravel()  # upper left point number
+        iverts = np.column_stack((iv1, iv1 + 1, iv1 + ncolvert + 1,
+                                  iv1 + ncolvert))
+        if not as_array:
+            iverts = iverts.tolist()
         return verts, iverts
 
-    def get_3d_shared_vertex_connectivity(self, nlay, botm, ibound=None):
+    def get_3d_shared_vertex_connectivity(self, nlay, botm, ibound=None,
+                                          as_array=False, compact=False):
+        """
+        Create the 3d vertices array and the iverts index array for a grid
+        with vertices that are shared by adjacent cells. Vertex elevations
+        are bilinearly interpolated from the cell-centered elevations.
+
+        Parameters
+        ----------
+        nlay : int
+            number of layers
+        botm : ndarray
+            array of shape (nlay + 1, nrow, ncol) with the top of the model
+            and the bottom of each layer
+        ibound : ndarray
+            cells with an ibound value of zero are skipped (default is None)
+        as_array : bool
+            return iverts as an integer array of shape (ncells, 8) instead
+            of a list (default is False)
+        compact : bool
+            remove vertices that are not used by any of the cells and
+            renumber iverts (default is False)
 
-        # get the x and y points for the grid
-        x = self.xgrid.flatten()
-        y = self.ygrid.flatten()
+        Returns
+        -------
+        verts : ndarray
+            array of x, y, and z coordinates for the grid vertices
+        iverts : list
+            a list with a list of the 8 vertex indices for each cell
 
+        """
         # set the size of the vertex grid
-        nrowvert = self.nrow + 1
         ncolvert = self.ncol + 1
         nlayvert = nlay + 1
-        nrvncv = nrowvert * ncolvert
-        npoints = nrvncv * nlayvert
+        nrvncv = (self.nrow + 1) * ncolvert
 
         # create and fill a 3d points array for the grid
-        verts = np.empty((npoints, 3), dtype=np.float)
-        verts[:, 0] = np.tile(x, nlayvert)
-        verts[:, 1] = np.tile(y, nlayvert)
-        istart = 0
-        istop = nrvncv
-        for k in range(nlay + 1):
-            verts[istart:istop, 2] = self.interpolate(botm[k],
-                                                      verts[istart:istop, :2],
-                                                      method='linear')
-            istart = istop
-            istop = istart + nrvncv
-
-        # create the list of points comprising each cell. points must be
-        # listed a specific way according to vtk requirements.
-        iverts = []
-        for k in range(nlay):
-            koffset = k * nrvncv
-            for i in range(self.nrow):
-                for j in range(self.ncol):
-                    if ibound is not None:
-                        if ibound[k, i, j] == 0:
-                            continue
-                    iv1 = i * ncolvert + j + koffset
-                    iv2 = iv1 + 1
-                    iv4 = (i + 1) * ncolvert + j + koffset
-                    iv3 = iv4 + 1
-                    iverts.append([iv4 + nrvncv, iv3 + nrvncv,
-                                   iv1 + nrvncv, iv2 + nrvncv,
-                                   iv4, iv3, iv1, iv2])
+        verts = np.empty((nrvncv * nlayvert, 3), dtype=np.float)
+        verts[:, 0] = np.tile(self.xgrid.ravel(), nlayvert)
+        verts[:, 1] = np.tile(self.ygrid.ravel(), nlayvert)
+        verts[:, 2] = self.interpolate_to_vertices(
+            np.asarray(botm)[:nlayvert]).ravel()
 
+        # create the points comprising each cell. points must be
+        # listed a specific way according to vtk requirements.
+        if ibound is None:
+            ibound = np.ones((nlay, self.nrow, self.ncol), dtype=np.int)
+        k, i, j = np.nonzero(ibound)
+        iv1 = i * ncolvert + j + k * nrvncv
+        iv2 = iv1 + 1
+        iv4 = iv1 + ncolvert
+        iv3 = iv4 + 1
+        iverts = np.column_stack((iv4 + nrvncv, iv3 + nrvncv,
+                                  iv1 + nrvncv, iv2 + nrvncv,
+                                  iv4, iv3, iv1, iv2))
+
+        if compact:
+            used = np.zeros(verts.shape[0], dtype=np.bool)
+            used[iverts.ravel()] = True
+            inew = np.cumsum(used) - 1
+            verts = verts[used]
+            iverts = inew[iverts]
+
+        if not as_array:
+            iverts = iverts.tolist()
         return verts, iverts
 
-    def get_3d_vertex_connectivity(self, nlay, botm, ibound=None):
+    def get_3d_vertex_connectivity(self, nlay, botm, ibound=None,
+                                   as_array=False):
+        """
+        Create the 3d vertices array and the iverts index array for a grid
+        with 8 independent vertices for each cell.
+
+        Parameters
+        ----------
+        nlay : int
+            number of layers
+        botm : ndarray
+            array of shape (nlay + 1, nrow, ncol) with the top of the model
+            and the bottom of each layer
+        ibound : ndarray
+            cells with an ibound value of zero are skipped (default is None)
+        as_array : bool
+            return iverts as an integer array of shape (ncells, 8) instead
+            of a list (default is False)
+
+        Returns
+        -------
+        verts : ndarray
+            array of x, y, and z coordinates for the cell vertices
+        iverts : list
+            a list with a list of the 8 vertex indices for each cell
+
+        """
         if ibound is None:
-            ncells = nlay * self.nrow * self.ncol
             ibound = np.ones((nlay, self.nrow, self.ncol), dtype=np.int)
-        else:
-            ncells = (ibound != 0).sum()
-        npoints = ncells * 8
-        verts = np.empty((npoints, 3), dtype=np.float)
-        iverts = []
-        ipoint = 0
-        for k in range(nlay):
-            for i in range(self.nrow):
-                for j in range(self.ncol):
-                    if ibound[k, i, j] == 0:
-                        continue
-
-                    ivert = []
-                    pts = self.get_vertices(i, j)
-                    pt0, pt1, pt2, pt3, pt0 = pts
-
-                    z = botm[k + 1, i, j]
-
-                    verts[ipoint, 0:2] = np.array(pt1)
-                    verts[ipoint, 2] = z
-                    ivert.append(ipoint)
-                    ipoint += 1
-
-                    verts[ipoint, 0:2] = np.array(pt2)
-                    verts[ipoint, 2] = z
-                    ivert.append(ipoint)
-                    ipoint += 1
-
-                    verts[ipoint, 0:2] = np.array(pt0)
-                    verts[ipoint, 2] = z
-                    ivert.append(ipoint)
-                    ipoint += 1
-
-                    verts[ipoint, 0:2] = np.array(pt3)
-                    verts[ipoint, 2] = z
-                    ivert.append(ipoint)
-                    ipoint += 1
-
-                    z = botm[k, i, j]
-
-                    verts[ipoint, 0:2] = np.array(pt1)
-                    verts[ipoint, 2] = z
-                    ivert.append(ipoint)
-                    ipoint += 1
-
-                    verts[ipoint, 0:2] = np.array(pt2)
-                    verts[ipoint, 2] = z
-                    ivert.append(ipoint)
-                    ipoint += 1
-
-                    verts[ipoint, 0:2] = np.array(pt0)
-                    verts[ipoint, 2] = z
-                    ivert.append(ipoint)
-                    ipoint += 1
-
-                    verts[ipoint, 0:2] = np.array(pt3)
-                    verts[ipoint, 2] = z
-                    ivert.append(ipoint)
-                    ipoint += 1
-
-                    iverts.append(ivert)
-
+        k, i, j = np.nonzero(ibound)
+        ncells = k.shape[0]
+
+        # lower left, lower right, upper left, and upper right corners
+        ii = i[:, None] + np.array([1, 1, 0, 0])
+        jj = j[:, None] + np.array([0, 1, 0, 1])
+
+        # cell bottom points followed by the cell top points
+        verts = np.empty((ncells, 2, 4, 3), dtype=np.float)
+        verts[:, :, :, 0] = self.xgrid[ii, jj][:, None, :]
+        verts[:, :, :, 1] = self.ygrid[ii, jj][:, None, :]
+        verts[:, 0, :, 2] = botm[k + 1, i, j][:, None]
+        verts[:, 1, :, 2] = botm[k, i, j][:, None]
+        verts = verts.reshape(ncells * 8, 3)
+        iverts = np.arange(ncells * 8).reshape(ncells, 8)
+        if not as_array:
+            iverts = iverts.tolist()
         return verts, iverts
 
 
@@ -1268,8 +1542,9 @@ class SpatialReferenceUnstructured(SpatialReference):
     verts : ndarray
         2d array of x and y points.
 
-    iverts : list of lists
-        should be of len(ncells) with a list of vertex numbers for each cell
+    iverts : list of lists or ndarray
+        should be of len(ncells) with a list of vertex numbers for each cell,
+        or a 2d array of vertex numbers padded with negative values
 
     ncpl : ndarray
         array containing the number of cells per layer.  ncpl.sum() must be
@@ -1313,6 +1588,10 @@ class SpatialReferenceUnstructured(SpatialReference):
 
     Notes
     -----
+    The vertices of the cells are gathered from a padded array of vertex
+    numbers (see flopy.utils.cvfdutil.iverts_to_array) and cached for each
+    layer, or once for all layers if the grid is layered, until verts,
+    iverts, ncpl or layered are changed.
 
     """
 
@@ -1335,6 +1614,7 @@ class SpatialReferenceUnstructured(SpatialReference):
         self.length_multiplier = length_multiplier
 
         # set defaults
+        self.origin_loc = 'ul'
         self.xul = 0.
         self.yul = 0.
         self.rotation = 0.
@@ -1351,7 +1631,8 @@ class SpatialReferenceUnstructured(SpatialReference):
             assert self.yc.shape[0] == self.ncpl.sum()
         return
 
-    def write_shapefile(self, filename='grid.shp'):
+    def write_shapefile(self, filename='grid.shp', array_dict=None,
+                        layer=None, nan_val=-1.0e9, epsg=None, prj=None):
         """
         Write shapefile of the grid
 
@@ -1359,12 +1640,53 @@ class SpatialReferenceUnstructured(SpatialReference):
         ----------
         filename : string
             filename for shapefile
+        array_dict : dict
+            Dictionary of name and array pairs to add as attributes.  The
+            arrays have a value for each cell that is written or for each
+            cell in the grid.  For a layered grid and layer=None, arrays
+            with a value for each cell in the grid are written as an
+            attribute for each layer ('name_1', 'name_2', ...).
+        layer : int
+            zero-based layer of the cells to write (default is None, which
+            writes all of the cells in iverts)
+        nan_val : float
+            value used for nan values in the attribute arrays (default
+            -1.0e9)
+        epsg : int
+            EPSG code used to write the projection file (default is None)
+        prj : str
+            existing projection file to copy (default is None)
 
         Returns
         -------
 
         """
-        raise NotImplementedError()
+        from ..export.shapefile_utils import write_cvfd_shapefile
+        if epsg is None and prj is None:
+            epsg = self.epsg
+        ivarr, nverts = self.get_iverts_array()
+        if layer is None:
+            node0 = 0
+        else:
+            node0 = self._get_layer_offset(layer)
+            ivarr = ivarr[self._get_layer_slice(layer)]
+        nodes = np.arange(node0 + 1, node0 + ivarr.shape[0] + 1)
+
+        d = OrderedDict()
+        if array_dict is not None:
+            for name, a in array_dict.items():
+                a = np.asarray(a).ravel()
+                if layer is None and self.layered and \
+                        a.shape[0] == self.ncpl.sum():
+                    a = a.reshape(len(self.ncpl), -1)
+                    for k in range(a.shape[0]):
+                        d['{}_{}'.format(name, k + 1)] = a[k]
+                elif layer is None:
+                    d[name] = a
+                else:
+                    d[name] = self.get_layer_array(a, layer)
+        write_cvfd_shapefile(filename, self.verts, ivarr, d, nodes=nodes,
+                             nan_val=nan_val, epsg=epsg, prj=prj)
         return
 
     def write_gridSpec(self, filename):
@@ -1459,9 +1781,105 @@ class SpatialReferenceUnstructured(SpatialReference):
         return cls(xc, yc, verts, iverts, np.array(nlay * [len(iverts)]))
 
     def __setattr__(self, key, value):
+        # these are read-only properties of SpatialReference
+        if key in ('lenuni', 'epsg', 'length_multiplier', 'xul', 'yul'):
+            key = '_' + key
         super(SpatialReference, self).__setattr__(key, value)
+        # discard the cached cell vertices if the grid changed
+        if key in ('verts', 'iverts', 'ncpl', 'layered'):
+            self._reset()
         return
 
+    def _get_layer_offset(self, layer):
+        return int(np.sum(self.ncpl[:layer]))
+
+    def _get_layer_slice(self, layer):
+        # cells in iverts for a layer
+        if self.layered:
+            return slice(None)
+        i0 = self._get_layer_offset(layer)
+        return slice(i0, i0 + self.ncpl[layer])
+
+    def get_iverts_array(self):
+        """
+        Get the vertex numbers of all of the cells in iverts as a padded
+        array.
+
+        Returns
+        -------
+        ivarr : ndarray
+            array of shape (ncells, maxnverts) with the vertex numbers of
+            each cell, padded with the first vertex of the cell
+        nverts : ndarray
+            number of vertices of each cell
+
+        """
+        from .cvfdutil import iverts_to_array
+        return self._get_cached('iverts_array',
+                                lambda: iverts_to_array(self.iverts))
+
+    def get_cell_vertices(self, layer=0):
+        """
+        Get the vertices of the cells in a layer.
+
+        Parameters
+        ----------
+        layer : int
+            zero-based layer (default is 0).  All layers of a layered grid
+            have the same vertices.
+
+        Returns
+        -------
+        verts : ndarray
+            array of shape (ncpl, maxnverts + 1, 2) with the x and y
+            coordinates of the closed ring of vertices of each cell, padded
+            with the first vertex of the cell
+        nverts : ndarray
+            number of vertices of each cell
+
+        """
+        if self.layered:
+            key = 'cell_vertices'
+        else:
+            key = 'cell_vertices_{}'.format(layer)
+
+        def get_vertices():
+            ivarr, nverts = self.get_iverts_array()
+            icells = self._get_layer_slice(layer)
+            ivarr = ivarr[icells]
+            ivarr = np.column_stack((ivarr, ivarr[:, 0]))
+            return np.asarray(self.verts)[ivarr, :2], nverts[icells]
+
+        return self._get_cached(key, get_vertices)
+
+    def get_layer_array(self, a, layer=0):
+        """
+        Get the values of an array for the cells in a layer.
+
+        Parameters
+        ----------
+        a : np.ndarray
+            array with a value for each cell in the layer or for each cell
+            in the grid
+        layer : int
+            zero-based layer (default is 0)
+
+        Returns
+        -------
+        a : np.ndarray
+            one-dimensional array with a value for each cell in the layer
+
+        """
+        a = np.ravel(a)
+        if a.shape[0] == self.ncpl[layer]:
+            return a
+        msg = ('Size of array {} must equal ncpl ({}) or '
+               'ncpl.sum ({})'.format(a.shape[0], self.ncpl[layer],
+                                      self.ncpl.sum()))
+        assert a.shape[0] == self.ncpl.sum(), msg
+        i0 = self._get_layer_offset(layer)
+        return a[i0:i0 + self.ncpl[layer]]
+
     def get_extent(self):
         """
         Get the extent of the grid
@@ -1496,36 +1914,46 @@ class SpatialReferenceUnstructured(SpatialReference):
         """
         return self.yc
 
-    def plot_array(self, a, ax=None):
+    def plot_array(self, a, ax=None, layer=0):
         """
         Create a QuadMesh plot of the specified array using patches
 
         Parameters
         ----------
         a : np.ndarray
+            array with a value for each cell in the layer or for each cell
+            in the grid
+        ax : matplotlib.axes.Axes
+            ax to add the patches to (default is the current axis)
+        layer : int
+            zero-based layer to plot (default is 0)
 
         Returns
         -------
-        quadmesh : matplotlib.collections.QuadMesh
+        patch_collection : matplotlib.collections.PolyCollection
 
         """
-        from ..plot import plotutil
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import PolyCollection
         if ax is None:
             ax = plt.gca()
-        patch_collection = plotutil.plot_cvfd(self.verts, self.iverts, a=a,
-                                              ax=ax)
-        return patch_collection
+        verts, nverts = self.get_cell_vertices(layer)
+        pc = PolyCollection(verts, closed=False,
+                            cmap=plt.get_cmap('Dark2'), edgecolor='none')
+        pc.set_array(self.get_layer_array(a, layer))
+        ax.add_collection(pc)
+        return pc
 
-    def get_grid_line_collection(self, **kwargs):
+    def get_grid_line_collection(self, layer=0, **kwargs):
         """
         Get a patch collection of the grid
 
         """
-        from ..plot import plotutil
+        from matplotlib.collections import PolyCollection
         edgecolor = kwargs.pop('colors')
-        pc = plotutil.cvfd_to_patch_collection(self.verts, self.iverts)
-        pc.set(facecolor='none')
-        pc.set(edgecolor=edgecolor)
+        verts, nverts = self.get_cell_vertices(layer)
+        pc = PolyCollection(verts, closed=False, facecolor='none',
+                            edgecolor=edgecolor, **kwargs)
         return pc
 
     def contour_array(self, ax, a, **kwargs):
@@ -28,6 +28,7 @@ class SfrFile():
 
     >>> import flopy
     >>> sfq = flopy.utils.SfrFile('mymodel.sfq')
+    >>> qout = sfq.get_ts(segment=[1, 2], reach=[1, 1], column='Qout')
 
     """
 
@@ -50,19 +51,23 @@ class SfrFile():
         except:
             print('This method requires pandas')
             self.pd = None
-            return
 
         # get the number of rows to skip at top
         self.filename = filename
+        self.verbose = verbose
         self.sr, self.ncol = self.get_skiprows_ncols()
         self.names = names = ["layer", "row", "column", "segment", "reach",
                               "Qin", "Qaquifer", "Qout", "Qovr",
                               "Qprecip", "Qet",
                               "stage", "depth", "width", "Cond"]
         self._set_names() # ensure correct number of column names
+        self._build_index()
         self.times = self.get_times()
         self.geoms = None # not implemented yet
         self._df = None
+        self._store = {}
+        self._loaded = {}
+        self._reach_index = None
 
     def get_skiprows_ncols(self):
         """Get the number of rows to skip at the top."""
@@ -73,16 +78,76 @@ class SfrFile():
                     ncols = len(line)
                     return i, ncols
 
+    def _build_index(self):
+        """Record the stress period/timestep and the byte offsets of the
+        results for each time in the file, without parsing the results."""
+        self._kstpkper = []
+        self._offsets = []
+        self._nrows = []
+        kstpkper = None
+        start = end = None
+        nrows = 0
+        ipos = 0
+        with open(self.filename, 'rb') as input:
+            for line in input:
+                if b'STEP' in line:
+                    if kstpkper is not None:
+                        self._add_block(kstpkper, start, end, nrows)
+                    ll = line.strip().split()
+                    kper, kstp = int(ll[3]) - 1, int(ll[5]) - 1
+                    kstpkper = (kstp, kper)
+                    start = end = None
+                    nrows = 0
+                else:
+                    token = line[:12].split()
+                    if len(token) > 0 and token[0].isdigit():
+                        if start is None:
+                            start = ipos
+                        end = ipos + len(line)
+                        nrows += 1
+                ipos += len(line)
+        if kstpkper is not None:
+            self._add_block(kstpkper, start, end, nrows)
+        self._offsets = np.array(self._offsets, dtype=np.int64)
+        self._nrows = np.array(self._nrows, dtype=np.int64)
+        if self.verbose:
+            print('{} times indexed in {}'.format(len(self._kstpkper),
+                                                  self.filename))
+
+    def _add_block(self, kstpkper, start, end, nrows):
+        if start is None:
+            start = end = 0
+        self._kstpkper.append(kstpkper)
+        self._offsets.append((start, end))
+        self._nrows.append(nrows)
+
+    def _read_block(self, idx, f=None):
+        """Read the results for the zero-based time idx into a 2D float
+        array with shape (nrows, ncol)."""
+        start, end = self._offsets[idx]
+        nrows = self._nrows[idx]
+        if f is None:
+            with open(self.filename, 'rb') as f:
+                f.seek(start)
+                buf = f.read(end - start)
+        else:
+            f.seek(start)
+            buf = f.read(end - start)
+        a = np.fromstring(buf.decode(), sep=' ')
+        if a.size == nrows * self.ncol:
+            return a.reshape(nrows, self.ncol)
+        # ragged rows; keep the rows with a complete set of columns
+        rows = [line.split() for line in buf.decode().splitlines()]
+        rows = [row for row in rows if len(row) == self.ncol]
+        return np.array(rows, dtype=float).reshape(-1, self.ncol)
+
     def get_times(self):
         """Parse the stress period/timestep headers."""
-        kstpkper = []
-        with open(self.filename) as input:
-            for line in input:
-                if 'STEP' in line:
-                    line = line.strip().split()
-                    kper, kstp = int(line[3]) - 1, int(line[5]) - 1
-                    kstpkper.append((kstp, kper))
-        return kstpkper
+        return list(self._kstpkper)
+
+    def get_ntimes(self):
+        """Get the number of times in the file."""
+        return len(self._kstpkper)
 
     def _set_names(self):
         """Pad column names so that correct number is used 
@@ -107,33 +172,146 @@ class SfrFile():
         elif len(wherereach1) > 1:
             return wherereach1[1]
 
+    def _get_idx(self, kstpkper=None, idx=None):
+        if kstpkper is not None:
+            kstpkper = tuple(kstpkper)
+            if kstpkper not in self._kstpkper:
+                raise Exception('kstpkper {} not in {}'.format(
+                    kstpkper, self.filename))
+            return self._kstpkper.index(kstpkper)
+        elif idx is not None:
+            return idx
+        return len(self._kstpkper) - 1
+
+    def get_data(self, kstpkper=None, idx=None):
+        """Get the results for a single time.
+
+        Parameters
+        ----------
+        kstpkper : tuple of ints
+            Zero-based (kstp, kper) of the results. (default is None)
+        idx : int
+            Zero-based time index of the results. If kstpkper and idx are
+            None, the results for the last time are returned.
+            (default is None)
+
+        Returns
+        -------
+        results : numpy recarray
+            Results for every reach with one field for each column in the
+            file. Only the results for the requested time are read.
+        """
+        idx = self._get_idx(kstpkper, idx)
+        a = self._read_block(idx)
+        dtype = np.dtype([(name, self.dtypes.get(name, float))
+                          for name in self.names])
+        ra = np.zeros(a.shape[0], dtype=dtype)
+        for i, name in enumerate(self.names):
+            ra[name] = a[:, i]
+        return ra.view(np.recarray)
+
+    def _get_nstrm(self):
+        nstrm = np.unique(self._nrows)
+        if len(nstrm) > 1:
+            raise Exception('The number of reaches is not the same for '
+                            'every time in {}'.format(self.filename))
+        return nstrm[0]
+
+    def _load(self, names, itimes):
+        """Fill the (time, reach) columnar store for the names and
+        zero-based time indices that have not been read yet."""
+        ntimes = len(self._kstpkper)
+        nstrm = self._get_nstrm()
+        for name in names:
+            if name not in self._store:
+                self._store[name] = np.zeros((ntimes, nstrm),
+                                             dtype=np.float64)
+                self._loaded[name] = np.zeros(ntimes, dtype=bool)
+        need = np.zeros(ntimes, dtype=bool)
+        for name in names:
+            need[itimes] |= ~self._loaded[name][itimes]
+        icols = [self.names.index(name) for name in names]
+        with open(self.filename, 'rb') as f:
+            for idx in np.where(need)[0]:
+                a = self._read_block(idx, f=f)
+                for name, icol in zip(names, icols):
+                    self._store[name][idx] = a[:, icol]
+                    self._loaded[name][idx] = True
+
+    def _get_reach_index(self, segment, reach):
+        """Get the zero-based position of each segment and reach in the
+        results for a single time. -1 is returned if a segment and reach
+        are not in the results."""
+        if self._reach_index is None:
+            self._load(['segment', 'reach'], [0])
+            seg = self._store['segment'][0].astype(int)
+            rch = self._store['reach'][0].astype(int)
+            self._reach_index = {(s, r): i for i, (s, r) in
+                                 enumerate(zip(seg, rch))}
+        return np.array([self._reach_index.get((int(s), int(r)), -1)
+                         for s, r in zip(segment, reach)], dtype=int)
+
+    def get_ts(self, segment, reach, column='Qaquifer', kstpkper=None):
+        """Get time series of a results column for one or more reaches.
+        Only the requested times are read from the file and the values
+        are kept in memory for subsequent requests.
+
+        Parameters
+        ----------
+        segment : int or sequence of ints
+            Segment number for each location.
+        reach : int or sequence of ints
+            Reach number for each location.
+        column : str
+            Name of the results column to return. (default is 'Qaquifer')
+        kstpkper : list of tuples
+            Zero-based (kstp, kper) of the times to return. If kstpkper is
+            None, all times are returned. (default is None)
+
+        Returns
+        -------
+        ts : numpy ndarray
+            Array with shape (ntimes, nlocations). Locations that are not
+            in the file are filled with NaN.
+        """
+        if column not in self.names:
+            raise Exception('{} is not a valid column name'.format(column))
+        segment = np.array(segment, ndmin=1)
+        reach = np.array(reach, ndmin=1)
+        segment, reach = np.broadcast_arrays(segment, reach)
+        if kstpkper is None:
+            itimes = np.arange(len(self._kstpkper))
+        else:
+            itimes = np.array([self._get_idx(kstpkper=kk)
+                               for kk in kstpkper], dtype=int)
+        index = self._get_reach_index(segment, reach)
+        self._load([column], itimes)
+        ts = self._store[column][itimes][:, index]
+        ts[:, index < 0] = np.nan
+        return ts
+
     def get_dataframe(self):
         """Read the whole text file into a pandas dataframe."""
 
-        df = self.pd.read_csv(self.filename, delim_whitespace=True,
-                         header=None, names=self.names,
-                         error_bad_lines=False,
-                         skiprows=self.sr)
-        # drop text between stress periods; convert to numeric
-        df['layer'] = self.pd.to_numeric(df.layer, errors='coerce')
-        df.dropna(axis=0, inplace=True)
+        ntimes = len(self._kstpkper)
+        with open(self.filename, 'rb') as f:
+            a = [self._read_block(idx, f=f) for idx in range(ntimes)]
+        nrows = [len(v) for v in a]
+        if ntimes > 0:
+            a = np.vstack(a)
+        else:
+            a = np.zeros((0, self.ncol), dtype=np.float64)
+        df = self.pd.DataFrame(a, columns=self.names)
         # convert to proper dtypes
         for c in df.columns:
             df[c] = df[c].astype(self.dtypes.get(c, float))
 
         # add time, reachID, and reach geometry (if it exists)
         self.nstrm = self.get_nstrm(df)
-        per = []
-        timestep = []
-        dftimes = []
-        times = self.get_times()
-        newper = df.segment.diff().values < 0
-        kstpkper = times.pop(0)
-        for np in newper:
-            if np:
-                kstpkper = times.pop(0)
-            dftimes.append(kstpkper)
-        df['kstpkper'] = dftimes
+        kstpkper = np.empty(ntimes, dtype=object)
+        for idx, kk in enumerate(self._kstpkper):
+            kstpkper[idx] = kk
+        df['kstpkper'] = np.repeat(kstpkper, nrows)
         df['k'] = df['layer'] - 1
         df['i'] = df['row'] - 1
         df['j'] = df['column'] -1
@@ -145,7 +323,15 @@ class SfrFile():
         return df
 
     def _get_result(self, segment, reach):
-        return self.df.loc[(self.df.segment == segment) & (self.df.reach == reach)].copy()
+        if len(np.unique(self._nrows)) == 1:
+            # every time has the same reaches in the same order
+            ipos = self._get_reach_index([segment], [reach])[0]
+            if ipos < 0:
+                return self.df.iloc[[]].copy()
+            rows = ipos + np.arange(len(self._kstpkper)) * self._nrows[0]
+            return self.df.iloc[rows].copy()
+        return self.df.loc[(self.df.segment == segment) &
+                           (self.df.reach == reach)].copy()
 
     def get_results(self, segment, reach):
         """Get results for a single reach or sequence of segments and reaches.
@@ -319,6 +319,90 @@ class SwrFile(FlopyBinaryData):
 
         return gage_record
 
+    def get_ts_batch(self, irec=0, iconn=0, klay=0, istr=0, memmap=False):
+        """
+        Get time series for multiple reaches, connections, layers, or
+        structures from a swr binary file in a single pass through the file.
+
+        Parameters
+        ----------
+        irec : int or list of ints
+            are the zero-based reach (stage, qm, qaq) or reach group numbers
+            (budget) to retrieve. (default is 0)
+        iconn : int or list of ints
+            are the zero-based connection numbers for each reach (irec) to
+            retrieve qm data. iconn is only used if qm data is being read.
+            (default is 0)
+        klay : int or list of ints
+            are the zero-based layer numbers for each reach (irec) to
+            retrieve qaq data. klay is only used if qaq data is being read.
+            (default is 0)
+        istr : int or list of ints
+            are the zero-based structure numbers for each reach (irec) to
+            retrieve structure data. istr is only used if structure data is
+            being read. (default is 0)
+        memmap : bool
+            If True, stage, budget, and flow data are extracted from a
+            memory-mapped view of the file instead of reading every
+            record. Exchange and structure records do not have a fixed
+            size and are always read sequentially. (default is False)
+
+        Returns
+        ----------
+        out : numpy recarray
+            Array has size (ntimes, nselect), where nselect is the number of
+            reaches, connections, layers, or structures selected. Column
+            n of the array is equal to the time series returned by get_ts
+            for selection n.
+
+        See Also
+        --------
+
+        Notes
+        -----
+
+        The irec, iconn, klay, and istr values must be zero-based. Scalar
+        values are broadcast to the length of the other arguments.
+
+        Examples
+        --------
+
+        >>> import flopy
+        >>> stageobj = flopy.utils.SwrStage('mymodel.swr.stg')
+        >>> ts = stageobj.get_ts_batch(irec=range(100), memmap=True)
+        >>> stage = ts['stage'][:, 10]
+
+        """
+        if self.type == 'flow':
+            sel = iconn
+        elif self.type == 'exchange':
+            sel = klay
+        elif self.type == 'structure':
+            sel = istr
+        else:
+            sel = 0
+        irec, sel = np.broadcast_arrays(np.array(irec, dtype=np.int64,
+                                                 ndmin=1),
+                                        np.array(sel, dtype=np.int64,
+                                                 ndmin=1))
+        if irec.max() + 1 > self.nrecord:
+            err = 'Error: specified irec ({}) '.format(irec.max()) + \
+                  'exceeds the total number of records ' + \
+                  '({})'.format(self.nrecord)
+            raise Exception(err)
+
+        if self.type == 'exchange' or self.type == 'structure':
+            return self._get_ts_variable(irec, sel)
+
+        # the position of each selection in a record does not change
+        # with time so it is only calculated once
+        if self.type == 'flow':
+            index = _get_key_index(self.connectivity[:, 1],
+                                   self.connectivity[:, 2], irec, sel)
+        else:
+            index = irec
+        return self._get_ts_fixed(index, memmap=memmap)
+
     def _read_connectivity(self):
         self.conn_dtype = np.dtype([('reach', 'i4'),
                                     ('from', 'i4'), ('to', 'i4')])
@@ -394,104 +478,92 @@ class SwrFile(FlopyBinaryData):
             return 0.0, 0.0, 0, 0, 0, False
 
     def _get_ts(self, irec=0):
-
-        # create array
-        gage_record = np.zeros(self._ntimes, dtype=self.out_dtype)
-
-        # iterate through the record dictionary
-        idx = 0
-        for key, value in self.recorddict.items():
-            totim = np.array(key)
-            gage_record['totim'][idx] = totim
-
-            self.file.seek(value)
-            r = self._get_data()
-            for name in r.dtype.names:
-                gage_record[name][idx] = r[name][irec]
-            idx += 1
-
-        return gage_record.view(dtype=self.out_dtype)
+        return self.get_ts_batch(irec=irec)[:, 0].copy()
 
     def _get_ts_qm(self, irec=0, iconn=0):
-
-        # create array
-        gage_record = np.zeros(self._ntimes, dtype=self.out_dtype)
-
-        # iterate through the record dictionary
-        idx = 0
-        for key, value in self.recorddict.items():
-            totim = key
-            gage_record['totim'][idx] = totim
-
-            self.file.seek(value)
-            r = self._get_data()
-
-            # find correct entry for reach and connection
-            for i in range(self.nrecord):
-                inode = self.connectivity[i, 1]
-                ic = self.connectivity[i, 2]
-                if irec == inode and ic == iconn:
-                    for name in r.dtype.names:
-                        gage_record[name][idx] = r[name][i]
-                    break
-            idx += 1
-
-        return gage_record.view(dtype=self.out_dtype)
+        return self.get_ts_batch(irec=irec, iconn=iconn)[:, 0].copy()
 
     def _get_ts_qaq(self, irec=0, klay=0):
+        return self.get_ts_batch(irec=irec, klay=klay)[:, 0].copy()
 
-        # create array
-        gage_record = np.zeros(self._ntimes, dtype=self.out_dtype)
-
-        # iterate through the record dictionary
-        idx = 0
-        for key, value in self.recorddict.items():
-            totim = key
-            gage_record['totim'][idx] = totim
-
-            self.nitems, self.itemlist = self.nentries[key]
+    def _get_ts_structure(self, irec=0, istr=0):
+        return self.get_ts_batch(irec=irec, istr=istr)[:, 0].copy()
 
-            self.file.seek(value)
-            r = self._get_data()
+    def _get_ts_fixed(self, index, memmap=False):
+        """
+        Fill time series for stage, budget, and flow data, which have
+        the same number of entries (nrecord) in every record.
 
-            # find correct entry for record and layer
-            ilen = np.shape(r)[0]
-            for i in range(ilen):
-                ir = r['reach'][i]
-                il = r['layer'][i]
-                if ir == irec and il == klay:
-                    for name in r.dtype.names:
-                        gage_record[name][idx] = r[name][i]
-                    break
-            idx += 1
+        """
+        # create array
+        gage_record = np.zeros((self._ntimes, index.shape[0]),
+                               dtype=self.out_dtype)
+        valid = index > -1
+        index = index[valid]
+
+        totims = np.array(list(self.recorddict.keys()), dtype=np.float64)
+        positions = np.array(list(self.recorddict.values()), dtype=np.int64)
+        ntimes = totims.shape[0]
+        gage_record['totim'][:ntimes] = totims[:, np.newaxis]
+        if ntimes == 0 or index.shape[0] == 0:
+            return gage_record.view(dtype=self.out_dtype)
+
+        if memmap:
+            # each record is a fixed size header followed by nrecord items
+            hdrbytes = 2 * self.realbyte + 3 * self.integerbyte
+            block_dtype = np.dtype([('header', 'V{}'.format(hdrbytes)),
+                                    ('data', self.dtype, (self.nrecord,))])
+            offset = positions[0] - hdrbytes
+            nblocks = (positions[-1] - positions[0]) // \
+                      block_dtype.itemsize + 1
+            mm = np.memmap(self.file, dtype=block_dtype, mode='r',
+                           offset=offset, shape=(nblocks,))
+            rows = (positions - positions[0]) // block_dtype.itemsize
+            data = mm['data']
+            for name in self.dtype.names:
+                v = data[name]
+                gage_record[name][:ntimes, valid] = \
+                    v[rows[:, np.newaxis], index[np.newaxis, :]]
+        else:
+            # iterate through the records sequentially
+            for idx, ipos in enumerate(positions):
+                self.file.seek(ipos)
+                r = self.read_record(count=self.nrecord)
+                for name in r.dtype.names:
+                    gage_record[name][idx, valid] = r[name][index]
 
         return gage_record.view(dtype=self.out_dtype)
 
-    def _get_ts_structure(self, irec=0, istr=0):
+    def _get_ts_variable(self, irec, sel):
+        """
+        Fill time series for exchange and structure data, which can have
+        a different number of entries in every record.
+
+        """
+        if self.type == 'exchange':
+            selname = 'layer'
+        else:
+            selname = 'structure'
 
         # create array
-        gage_record = np.zeros(self._ntimes, dtype=self.out_dtype)
+        gage_record = np.zeros((self._ntimes, irec.shape[0]),
+                               dtype=self.out_dtype)
 
         # iterate through the record dictionary
         idx = 0
         for key, value in self.recorddict.items():
-            totim = key
-            gage_record['totim'][idx] = totim
+            gage_record['totim'][idx] = key
 
             self.nitems, self.itemlist = self.nentries[key]
 
             self.file.seek(value)
             r = self._get_data()
 
-            # find correct entry for record and structure number
-            ilen = np.shape(r)[0]
-            for i in range(ilen):
-                ir = r['reach'][i]
-                il = r['structure'][i]
-                if ir == irec and il == istr:
-                    for name in r.dtype.names:
-                        gage_record[name][idx] = r[name][i]
-                    break
+            # find correct entries for each reach and layer or structure
+            index = _get_key_index(r['reach'], r[selname], irec, sel)
+            valid = index > -1
+            for name in r.dtype.names:
+                gage_record[name][idx, valid] = r[name][index[valid]]
             idx += 1
 
         return gage_record.view(dtype=self.out_dtype)
@@ -806,3 +878,24 @@ class SwrStructure(SwrFile):
         super(SwrStructure, self).__init__(filename, swrtype='structure',
                                            precision=precision, verbose=verbose)
         return
+
+
+def _get_key_index(reach, item, irec, sel):
+    """
+    Get the position of the first entry in reach and item that matches each
+    irec and sel pair. -1 is returned for pairs that are not found.
+
+    """
+    keys = np.asarray(reach, dtype=np.int64) * 2 ** 32 + \
+           np.asarray(item, dtype=np.int64)
+    skeys = irec * 2 ** 32 + sel
+    index = -np.ones(skeys.shape[0], dtype=np.int64)
+    if keys.shape[0] == 0:
+        return index
+    order = np.argsort(keys, kind='mergesort')
+    sorted_keys = keys[order]
+    ipos = np.searchsorted(sorted_keys, skeys)
+    ipos = np.minimum(ipos, keys.shape[0] - 1)
+    found = sorted_keys[ipos] == skeys
+    index[found] = order[ipos[found]]
+    return index
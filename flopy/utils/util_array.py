@@ -665,6 +665,11 @@ class Util3d(object):
                 on the figure. (default is False)
             masked_values : list
                 List of unique values to be excluded from the plot.
+            lod : bool
+                Boolean used to determine if the arrays are plotted with
+                level-of-detail rendering, which aggregates large arrays
+                to the resolution of the figure. Only used if
+                pcolor=True. (default is False)
 
         Returns
         ----------
@@ -1351,6 +1356,11 @@ class Transient2d(object):
                 on the figure. (default is False)
             masked_values : list
                 List of unique values to be excluded from the plot.
+            lod : bool
+                Boolean used to determine if the arrays are plotted with
+                level-of-detail rendering, which aggregates large arrays
+                to the resolution of the figure. Only used if
+                pcolor=True. (default is False)
             kper : str
                 MODFLOW zero-based stress period number to return. If
                 kper='all' then data for all stress period will be
@@ -1760,6 +1770,11 @@ class Util2d(object):
                 on the figure. (default is False)
             masked_values : list
                 List of unique values to be excluded from the plot.
+            lod : bool
+                Boolean used to determine if the arrays are plotted with
+                level-of-detail rendering, which aggregates large arrays
+                to the resolution of the figure. Only used if
+                pcolor=True. (default is False)
 
         Returns
         ----------
@@ -10,7 +10,9 @@ util_list module.  Contains the mflist class.
 from __future__ import division, print_function
 
 import os
+import hashlib
 import warnings
+from collections import OrderedDict
 import numpy as np
 
 
@@ -84,6 +86,7 @@ class MfList(object):
         if data is not None:
             self.__cast_data(data)
         self.__df = None
+        self.__cell_cache = OrderedDict()
         self.list_free_format = list_free_format
         return
 
@@ -972,58 +975,113 @@ class MfList(object):
         i0 = 3
         if 'inode' in self.dtype.names:
             raise NotImplementedError()
+        shape = (self.model.nlay, self.model.nrow, self.model.ncol)
         arrays = {}
         for name in self.dtype.names[i0:]:
             if not self.dtype.fields[name][0] == object:
-                arr = np.zeros((self.model.nlay, self.model.nrow, self.model.ncol))
-                arrays[name] = arr.copy()
+                arrays[name] = np.zeros(shape)
 
-        # if this kper is not found
+        sarr = self.__get_kper_data(kper)
+
+        # if there are no entries for this kper, (maybe) mask and return
+        if sarr is None:
+            if mask:
+                for name, arr in arrays.items():
+                    arrays[name][:] = np.NaN
+            return arrays
+
+        unique, inverse, counts = self.get_cell_indices(kper)
+        for name, arr in arrays.items():
+            # sum the entries in each cell
+            values = np.bincount(inverse, weights=sarr[name],
+                                 minlength=unique.shape[0])
+            # average keys that should not be added
+            if name != 'cond' and name != 'flux':
+                values /= counts
+            arr.flat[unique] = values
+            if mask:
+                empty = np.ones(shape, dtype=np.bool)
+                empty.flat[unique] = False
+                arr = np.ma.masked_where(empty, arr)
+                arr[empty] = np.NaN
+            arrays[name] = arr
+        return arrays
+
+    def __get_kper_data(self, kper):
+        # get the recarray used for kper or None if there are no entries
         if kper not in self.data.keys():
             kpers = list(self.data.keys())
             kpers.sort()
-            # if this kper is before the first entry,
-            # (maybe) mask and return
+            # if this kper is before the first entry
             if kper < kpers[0]:
-                if mask:
-                    for name, arr in arrays.items():
-                        arrays[name][:] = np.NaN
-                return arrays
+                return None
             # find the last kper
-            else:
-                kper = self.__find_last_kper(kper)
+            kper = self.__find_last_kper(kper)
 
         sarr = self.data[kper]
-
         if np.isscalar(sarr):
+            if self.vtype[kper] == str:
+                return self.__fromfile(sarr)
             # if there are no entries for this kper
             if sarr == 0:
-                if mask:
-                    for name, arr in arrays.items():
-                        arrays[name][:] = np.NaN
-                return arrays
+                return None
             else:
                 raise Exception("MfList: something bad happened")
+        return sarr
 
-        for name, arr in arrays.items():
-            cnt = np.zeros((self.model.nlay, self.model.nrow, self.model.ncol),
-                           dtype=np.float)
-            for rec in sarr:
-                arr[rec['k'], rec['i'], rec['j']] += rec[name]
-                cnt[rec['k'], rec['i'], rec['j']] += 1.
-            # average keys that should not be added
-            if name != 'cond' and name != 'flux':
-                idx = cnt > 0.
-                arr[idx] /= cnt[idx]
-            if mask:
-                arr = np.ma.masked_where(cnt == 0., arr)
-                arr[cnt == 0.] = np.NaN
+    def get_cell_indices(self, kper=0):
+        """
+        Get the zero-based flat cell numbers (k * nrow * ncol + i * ncol + j)
+        of the cells with stress period boundary condition (MfList) data for
+        a specified stress period. The result is cached for each unique set
+        of cells, so stress periods with the same cells share the result.
 
-            arrays[name] = arr.copy()
-        # elif mask:
-        #     for name, arr in arrays.items():
-        #         arrays[name][:] = np.NaN
-        return arrays
+        Parameters
+        ----------
+        kper : int
+            MODFLOW zero-based stress period number. (default is zero)
+
+        Returns
+        ----------
+        unique : numpy.ndarray
+            sorted flat cell numbers of the cells with at least one entry
+        inverse : numpy.ndarray
+            index into unique of each entry in the stress period data
+        counts : numpy.ndarray
+            number of entries in each cell in unique
+
+        Examples
+        --------
+        >>> import flopy
+        >>> ml = flopy.modflow.Modflow.load('test.nam')
+        >>> spd = ml.wel.stress_period_data
+        >>> unique, inverse, counts = spd.get_cell_indices(kper=1)
+        >>> k, i, j = np.unravel_index(unique, (ml.nlay, ml.nrow, ml.ncol))
+
+        """
+        if 'inode' in self.dtype.names:
+            raise NotImplementedError()
+        sarr = self.__get_kper_data(kper)
+        if sarr is None:
+            empty = np.array([], dtype=np.int)
+            return empty, empty.copy(), empty.copy()
+        shape = (self.model.nlay, self.model.nrow, self.model.ncol)
+        nodes = np.ravel_multi_index((sarr['k'].astype(np.int),
+                                      sarr['i'].astype(np.int),
+                                      sarr['j'].astype(np.int)), shape)
+
+        # the cache is keyed by the cells so that changes to the
+        # stress period data are always picked up
+        key = (shape, hashlib.sha1(nodes.tobytes()).hexdigest())
+        cache = self.__cell_cache
+        if key not in cache:
+            unique, inverse = np.unique(nodes, return_inverse=True)
+            counts = np.bincount(inverse, minlength=unique.shape[0])
+            cache[key] = (unique, inverse, counts)
+            if len(cache) > 100:
+                cache.popitem(last=False)
+        unique, inverse, counts = cache[key]
+        return unique, inverse, counts
 
     @property
     def masked_4D_arrays(self):
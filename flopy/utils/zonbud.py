@@ -4,7 +4,7 @@ import sys
 import copy
 import numpy as np
 from .binaryfile import CellBudgetFile
-from itertools import groupby
+from .connectivity import Connectivity
 from collections import OrderedDict
 from ..utils.utils_def import totim_to_datetime
 
@@ -19,7 +19,9 @@ class ZoneBudget(object):
         The file name or CellBudgetFile object for which budgets will be
         computed.
     z : ndarray
-        The array containing to zones to be used.
+        The array containing to zones to be used. For an unstructured
+        (MODFLOW-USG) cell-budget file with a FLOW JA FACE record, the
+        array has a zone for each node.
     kstpkper : tuple of ints
         A tuple containing the time step and stress period (kstp, kper).
         The kstp and kper values are zero based.
@@ -31,6 +33,11 @@ class ZoneBudget(object):
         NOTE: When using this option in conjunction with a list of zones,
         the zone(s) passed may either be all strings (aliases), all
         integers, or mixed.
+    connectivity : Connectivity, ModflowDisU or MfGrdFile object
+        The node connections of an unstructured model, which are used to
+        compute the flow between zones from the FLOW JA FACE record. The
+        DISU package of the model or dis keyword arguments is used if
+        this is not specified.
 
     Example usage:
 
@@ -39,10 +46,14 @@ class ZoneBudget(object):
     >>> zb = ZoneBudget('zonebudtest.cbc', zon, kstpkper=(0, 0))
     >>> zb.to_csv('zonebudtest.csv')
     >>> zb_mgd = zb * 7.48052 / 1000000
+
+    For a MODFLOW-USG model
+
+    >>> zb = ZoneBudget('flow.cbc', zon, dis=m.disu)
     """
 
     def __init__(self, cbc_file, z, kstpkper=None, totim=None, aliases=None,
-                 **kwargs):
+                 connectivity=None, **kwargs):
 
         if 'verbose' in kwargs.keys():
             verbose = kwargs.pop('verbose')
@@ -77,6 +88,8 @@ class ZoneBudget(object):
             self.model = kwargs.pop('model')
             self.sr = self.model.sr
             self.dis = self.model.dis
+            if self.dis is None:
+                self.dis = self.model.get_package('DISU')
         if 'dis' in kwargs.keys():
             self.dis = kwargs.pop('dis')
             self.sr = self.dis.parent.sr
@@ -86,9 +99,38 @@ class ZoneBudget(object):
             args = ','.join(kwargs.keys())
             raise Exception('LayerFile error: unrecognized kwargs: ' + args)
 
-        # Check the shape of the cbc budget file arrays
-        self.cbc_shape = self.cbc.get_data(idx=0, full3D=True)[0].shape
-        self.nlay, self.nrow, self.ncol = self.cbc_shape
+        # All record names in the cell-by-cell budget binary file
+        self.record_names = [n.strip().decode("utf-8") for n in
+                             self.cbc.get_unique_record_names()]
+
+        # Unstructured budget files have a FLOW JA FACE record instead of
+        # the face flow records, and the node connections are needed to
+        # compute the flow between zones
+        self.connectivity = None
+        if 'FLOW JA FACE' in self.record_names:
+            if connectivity is None:
+                connectivity = self.dis
+            if connectivity is None:
+                raise Exception('The connectivity (a Connectivity, '
+                                'ModflowDisU or MfGrdFile object) is needed '
+                                'to compute the flow between zones from the '
+                                'FLOW JA FACE record.')
+            if not isinstance(connectivity, Connectivity):
+                connectivity = connectivity.get_connectivity()
+            self.connectivity = connectivity
+
+        # Check the shape of the cbc budget file arrays. Unstructured grids
+        # have a number of nodes in each layer instead of rows and columns.
+        self.nodes, self.nodelay = None, None
+        if self.connectivity is not None:
+            self.nodes = self.connectivity.nodes
+            self.nodelay = self.connectivity.nodelay
+            self.cbc_shape = (self.nodes,)
+            self.nlay, self.nrow, self.ncol = self.connectivity.nlay, None, \
+                                              None
+        else:
+            self.cbc_shape = self.cbc.get_data(idx=0, full3D=True)[0].shape
+            self.nlay, self.nrow, self.ncol = self.cbc_shape
         self.cbc_times = self.cbc.get_times()
         self.cbc_kstpkper = self.cbc.get_kstpkper()
         self.kstpkper = None
@@ -121,12 +163,19 @@ class ZoneBudget(object):
         self.int_type = np.int32
 
         # Check dimensions of input zone array
-        s = 'Row/col dimensions of zone array {}' \
-            ' do not match model row/col dimensions {}'.format(z.shape, self.cbc_shape)
-        assert z.shape[-2] == self.nrow and \
-               z.shape[-1] == self.ncol, s
-
-        if z.shape == self.cbc_shape:
+        if self.connectivity is not None:
+            s = 'Size of zone array {} does not match the number of ' \
+                'nodes {}'.format(z.size, self.cbc_shape[0])
+            assert z.size == self.cbc_shape[0], s
+        else:
+            s = 'Row/col dimensions of zone array {}' \
+                ' do not match model row/col dimensions {}'.format(z.shape, self.cbc_shape)
+            assert z.shape[-2] == self.nrow and \
+                   z.shape[-1] == self.ncol, s
+
+        if self.connectivity is not None:
+            izone = z.ravel().astype(self.int_type)
+        elif z.shape == self.cbc_shape:
             izone = z.copy()
         elif len(z.shape) == 2:
             izone = np.zeros(self.cbc_shape, self.int_type)
@@ -164,10 +213,6 @@ class ZoneBudget(object):
         self._iflow_from_recnames, self._iflow_to_recnames = self._get_internal_flow_record_names()
         self._zonefieldnames = list(self._zonefieldnamedict.values())
 
-        # All record names in the cell-by-cell budget binary file
-        self.record_names = [n.strip().decode("utf-8") for n in
-                             self.cbc.get_unique_record_names()]
-
         # Get imeth for each record in the CellBudgetFile record list
         self.imeth = {}
         for record in self.cbc.recordarray:
@@ -180,8 +225,8 @@ class ZoneBudget(object):
         # SWIADDTO--- terms are used by the SWI2 groundwater flow process.
         internal_flow_terms = ['CONSTANT HEAD', 'FLOW RIGHT FACE',
                                'FLOW FRONT FACE', 'FLOW LOWER FACE',
-                               'SWIADDTOCH', 'SWIADDTOFRF', 'SWIADDTOFFF',
-                               'SWIADDTOFLF']
+                               'FLOW JA FACE', 'SWIADDTOCH', 'SWIADDTOFRF',
+                               'SWIADDTOFFF', 'SWIADDTOFLF']
 
         # Source/sink/storage term record names
         # These are all of the terms that are not related to constant
@@ -203,6 +248,18 @@ class ZoneBudget(object):
         return
 
     def get_model_shape(self):
+        """
+        Get the shape of the model grid.
+
+        Returns
+        -------
+        shape : tuple
+            (nlay, nrow, ncol) for a structured grid, or (nlay, nodelay)
+            with the number of nodes in each layer for an unstructured grid
+
+        """
+        if self.nodelay is not None:
+            return self.nlay, self.nodelay
         return self.nlay, self.nrow, self.ncol
 
     def get_record_names(self, stripped=False):
@@ -445,13 +502,26 @@ class ZoneBudget(object):
         # are located.
         ich = np.zeros(self.cbc_shape, self.int_type)
 
-        if 'CONSTANT HEAD' in reclist:
+        if 'CONSTANT HEAD' in reclist and self.connectivity is not None:
+            reclist.remove('CONSTANT HEAD')
+            chd = self.cbc.get_data(text='CONSTANT HEAD', kstpkper=kstpkper,
+                                    totim=totim)[0]
+            if self.imeth['CONSTANT HEAD'] in [2, 5]:
+                ich[chd['node'][chd['q'] != 0.] - 1] = 1
+            else:
+                ich[np.ravel(chd) != 0.] = 1
+        elif 'CONSTANT HEAD' in reclist:
             reclist.remove('CONSTANT HEAD')
             chd = self.cbc.get_data(text='CONSTANT HEAD', full3D=True,
                                     kstpkper=kstpkper, totim=totim)[0]
             ich = np.zeros(self.cbc_shape, self.int_type)
             idxch = np.ma.where(chd != 0.)
             ich[idxch] = 1
+        if 'FLOW JA FACE' in reclist:
+            reclist.remove('FLOW JA FACE')
+            recordarray = self._accumulate_flow_ja(recordarray,
+                                                   'FLOW JA FACE', ich,
+                                                   kstpkper, totim)
         if 'FLOW RIGHT FACE' in reclist:
             reclist.remove('FLOW RIGHT FACE')
             recordarray = self._accumulate_flow_frf(recordarray,
@@ -503,24 +573,38 @@ class ZoneBudget(object):
 
             if imeth == 2 or imeth == 5:
                 # LIST
-                qin = np.ma.zeros((self.nlay * self.nrow * self.ncol),
-                                  self.float_type)
-                qout = np.ma.zeros((self.nlay * self.nrow * self.ncol),
-                                   self.float_type)
-                for [node, q] in zip(data['node'], data['q']):
-                    idx = node - 1
-                    if q > 0:
-                        qin.data[idx] += q
-                    elif q < 0:
-                        qout.data[idx] += q
-                qin = np.ma.reshape(qin, (self.nlay, self.nrow, self.ncol))
-                qout = np.ma.reshape(qout, (self.nlay, self.nrow, self.ncol))
+                size = int(np.prod(self.cbc_shape))
+                idx = data['node'] - 1
+                q = data['q']
+                qin = np.bincount(idx[q > 0], weights=q[q > 0],
+                                  minlength=size)
+                qout = np.bincount(idx[q < 0], weights=q[q < 0],
+                                   minlength=size)
+                qin = np.ma.reshape(qin.astype(self.float_type),
+                                    self.cbc_shape)
+                qout = np.ma.reshape(qout.astype(self.float_type),
+                                     self.cbc_shape)
             elif imeth == 0 or imeth == 1:
                 # FULL 3-D ARRAY
+                data = np.ma.reshape(data, self.cbc_shape)
                 qin = np.ma.zeros(self.cbc_shape, self.float_type)
                 qout = np.ma.zeros(self.cbc_shape, self.float_type)
                 qin[data > 0] = data[data > 0]
                 qout[data < 0] = data[data < 0]
+            elif imeth == 3 and self.connectivity is not None:
+                # 1-LAYER ARRAY WITH NODE INDICATOR ARRAY
+                idx, rdata = np.ravel(data[0]) - 1, np.ravel(data[1])
+                qin = np.zeros(self.cbc_shape, self.float_type)
+                qout = np.zeros(self.cbc_shape, self.float_type)
+                qin[idx[rdata > 0]] = rdata[rdata > 0]
+                qout[idx[rdata < 0]] = rdata[rdata < 0]
+            elif imeth == 4 and self.connectivity is not None:
+                # 1-LAYER ARRAY THAT DEFINES THE NODES IN LAYER 1
+                rdata = np.ravel(data)
+                qin = np.zeros(self.cbc_shape, self.float_type)
+                qout = np.zeros(self.cbc_shape, self.float_type)
+                qin[:rdata.shape[0]][rdata > 0] = rdata[rdata > 0]
+                qout[:rdata.shape[0]][rdata < 0] = rdata[rdata < 0]
             elif imeth == 3:
                 # 1-LAYER ARRAY WITH LAYER INDICATOR ARRAY
                 rlay, rdata = data[0], data[1]
@@ -1358,6 +1442,66 @@ class ZoneBudget(object):
                                                           fz], flux)
         return recordarray
 
+    def _accumulate_flow_ja(self, recordarray, recname, ich, kstpkper,
+                            totim):
+        # "FLOW JA FACE" COMPUTE FLOW BETWEEN ZONES ACROSS THE CONNECTIONS
+        # OF AN UNSTRUCTURED GRID. EACH CONNECTION IS LISTED FOR BOTH OF
+        # ITS NODES WITH FLOWS OF OPPOSITE SIGN, SO ONLY THE POSITIVE FLOWS,
+        # WHICH ARE INTO NODE N FROM NODE M, ARE USED.
+        con = self.connectivity
+        data = self.cbc.get_data(text=recname, kstpkper=kstpkper,
+                                 totim=totim)[0]
+        q = np.ravel(data)
+        if q.shape[0] != con.nja:
+            raise Exception('{} has {} values, which is not the number of '
+                            'connections ({}).'.format(recname, q.shape[0],
+                                                       con.nja))
+        ipos = np.where((q > 0) & (con.ja != con.n))[0]
+        n = con.n[ipos]
+        m = con.ja[ipos]
+        q = q[ipos]
+
+        # Don't include CH to CH flow (can occur if CHTOCH option is used)
+        idx = (ich[n] != 1) | (ich[m] != 1)
+        n, m, q = n[idx], m[idx], q[idx]
+
+        # Define the zone from which flow is coming and the zone to which
+        # flow is going, then group by (from_zone, to_zone) and sum the
+        # flux values
+        nzm = self.izone[m]
+        nzn = self.izone[n]
+        idx = nzm != nzn
+        fluxes = sum_flux_tuples(nzm[idx], nzn[idx], q[idx])
+        for (fz, tz, flux) in fluxes:
+            if tz != 0:
+                recordarray = self._update_record(recordarray,
+                                                  self._iflow_from_recnames[
+                                                      fz] + '_IN',
+                                                  self._zonefieldnamedict[
+                                                      tz], flux)
+            if fz != 0:
+                recordarray = self._update_record(recordarray,
+                                                  self._iflow_to_recnames[
+                                                      tz] + '_OUT',
+                                                  self._zonefieldnamedict[
+                                                      fz], flux)
+
+        # CALCULATE FLOW TO AND FROM CONSTANT-HEAD CELLS. FLOW INTO A
+        # CONSTANT-HEAD CELL LEAVES ITS ZONE THROUGH THE CONSTANT-HEAD
+        # BOUNDARY AND FLOW OUT OF IT ENTERS ITS ZONE.
+        for chn, recname in [(n, 'CONSTANT_HEAD_OUT'),
+                             (m, 'CONSTANT_HEAD_IN')]:
+            idx = ich[chn] == 1
+            nz = self.izone[chn[idx]]
+            flux = np.bincount(nz, weights=q[idx],
+                               minlength=self.izone.max() + 1)
+            for z in np.where(flux > 0)[0]:
+                if z != 0:
+                    recordarray = self._update_record(recordarray, recname,
+                                                      self._zonefieldnamedict[
+                                                          z], flux[z])
+        return recordarray
+
     def _accumulate_flow_ssst(self, recordarray, recname, qin, qout):
 
         # NOT AN INTERNAL FLOW TERM, SO MUST BE A SOURCE TERM OR STORAGE
@@ -1796,17 +1940,19 @@ def read_zbarray_old(fname):
 
 
 def sum_flux_tuples(fromzones, tozones, fluxes):
-    tup = zip(fromzones, tozones, fluxes)
-    sorted_tups = sort_tuple(tup)
-
-    # Group the sorted tuples by (from zone, to zone)
-    # itertools.groupby() returns the index (from zone, to zone) and
-    # a list of the tuples with that index
-    fluxes = []
-    for (fz, tz), ftup in groupby(sorted_tups, lambda tup: tup[:2]):
-        f = np.sum([tup[-1] for tup in list(ftup)])
-        fluxes.append((fz, tz, f))
-    return fluxes
+    fromzones = np.asarray(fromzones, dtype=np.int64)
+    tozones = np.asarray(tozones, dtype=np.int64)
+    fluxes = np.asarray(fluxes)
+    if fromzones.shape[0] == 0:
+        return []
+
+    # Group the fluxes by (from zone, to zone) with a single key for each
+    # pair, so that the fluxes can be summed with np.bincount(). The
+    # unique keys are sorted by from zone and then by to zone.
+    nz = max(fromzones.max(), tozones.max()) + 1
+    keys, inverse = np.unique(fromzones * nz + tozones, return_inverse=True)
+    f = np.bincount(inverse, weights=fluxes)
+    return list(zip(keys // nz, keys % nz, f))
 
 
 def sort_tuple(tup, n=2):